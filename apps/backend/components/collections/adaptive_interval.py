@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import logging
+import math
+import time
+import typing
+
+from django.conf import settings
+
+from apps.backend.api.constants import POLLING_INTERVAL
+from apps.backend.utils import redis
+from pipeline.core.flow import AbstractIntervalGenerator
+
+"""
+自适应轮询间隔
+背景：固定间隔下，短任务需要白等一个完整周期，长任务又会被过于频繁地查询
+1. 按 原子类型 + 任务类型 记录历史耗时（指数加权移动平均），预测本次任务的完成时间
+2. 预测完成前按预测时间等待，超过预测时间后从最小间隔开始指数退避，间隔不超过最大间隔
+3. 全局每秒轮询次数超出预算时，按超出比例拉长间隔
+"""
+
+logger = logging.getLogger("app")
+
+KEY_PREFIX = "node_man:backend:adaptive_interval"
+# 历史耗时：原子类型 + 任务类型 -> 平均耗时
+DURATION_HASH_KEY = f"{KEY_PREFIX}:duration"
+# 每秒轮询次数计数
+BUDGET_KEY_TMPL = KEY_PREFIX + ":budget:{second}"
+
+# 历史耗时的加权系数，越大越偏向最近的耗时
+DURATION_EWMA_ALPHA = 0.3
+# 预测完成时间相对平均耗时的比例，略微提前检查，避免错过完成时间
+PREDICT_RATIO = 0.8
+# 超过预测时间后，下次间隔 = 超时时长 * 退避比例，即检查时间点按 1 + BACKOFF_RATIO 倍增长
+BACKOFF_RATIO = 0.5
+
+
+def get_expected_duration(duration_key: str) -> typing.Optional[float]:
+    """
+    获取历史平均耗时
+    :param duration_key: 原子类型 + 任务类型
+    :return: 无历史数据时返回 None
+    """
+    redis_inst = redis.RedisInstSingleTon.get_inst()
+    if redis_inst is None:
+        return None
+    try:
+        duration = redis_inst.hget(DURATION_HASH_KEY, duration_key)
+    except Exception:
+        logger.exception(f"[AdaptiveInterval] failed to get expected duration of {duration_key}")
+        return None
+    return None if duration is None else float(duration)
+
+
+def record_durations(duration_key: str, durations: typing.Iterable[float]):
+    """
+    记录任务耗时，更新历史平均耗时
+    :param duration_key: 原子类型 + 任务类型
+    :param durations: 本次完成的任务耗时列表
+    :return:
+    """
+    durations = [duration for duration in durations if duration >= 0]
+    redis_inst = redis.RedisInstSingleTon.get_inst()
+    if not durations or redis_inst is None:
+        return
+    try:
+        expected_duration = get_expected_duration(duration_key)
+        for duration in durations:
+            if expected_duration is None:
+                expected_duration = duration
+            else:
+                expected_duration = DURATION_EWMA_ALPHA * duration + (1 - DURATION_EWMA_ALPHA) * expected_duration
+        redis_inst.hset(DURATION_HASH_KEY, duration_key, round(expected_duration, 3))
+    except Exception:
+        logger.exception(f"[AdaptiveInterval] failed to record durations of {duration_key}")
+
+
+def get_budget_factor() -> float:
+    """
+    获取全局轮询预算系数，当前秒内的轮询次数超出预算时按比例放大间隔
+    :return: 大于等于 1 的放大系数
+    """
+    budget: int = settings.BACKEND_POLLING_BUDGET_PER_SECOND
+    redis_inst = redis.RedisInstSingleTon.get_inst()
+    if budget <= 0 or redis_inst is None:
+        return 1
+    budget_key = BUDGET_KEY_TMPL.format(second=int(time.time()))
+    try:
+        pipeline = redis_inst.pipeline(transaction=False)
+        pipeline.incr(budget_key)
+        pipeline.expire(budget_key, 2)
+        count, __ = pipeline.execute()
+    except Exception:
+        logger.exception("[AdaptiveInterval] failed to count polling budget")
+        return 1
+    return max(1, count / budget)
+
+
+class AdaptiveIntervalGenerator(AbstractIntervalGenerator):
+    """
+    自适应轮询间隔生成器
+    间隔仅由起始时间及预测耗时计算得出，不依赖调用次数，随原子序列化后重复调用 next 也不会导致间隔错乱
+    """
+
+    def __init__(
+        self,
+        expected_duration: typing.Optional[float] = None,
+        min_interval: typing.Optional[int] = None,
+        max_interval: typing.Optional[int] = None,
+        duration_key: typing.Optional[str] = None,
+    ):
+        super().__init__()
+        self.start_time = time.time()
+        self.duration_key = duration_key
+        self.expected_duration = None if expected_duration is None else expected_duration * PREDICT_RATIO
+        self.min_interval = min_interval or settings.BACKEND_POLLING_MIN_INTERVAL
+        self.max_interval = max(max_interval or settings.BACKEND_POLLING_MAX_INTERVAL, self.min_interval)
+
+    @classmethod
+    def from_history(cls, duration_key: str, **kwargs) -> "AdaptiveIntervalGenerator":
+        return cls(expected_duration=get_expected_duration(duration_key), duration_key=duration_key, **kwargs)
+
+    def get_elapsed(self) -> float:
+        return time.time() - self.start_time
+
+    def next(self) -> int:
+        super().next()
+        elapsed = self.get_elapsed()
+        if self.expected_duration is not None and elapsed < self.expected_duration:
+            # 预测完成前，直接等待到预测完成时间
+            interval = self.expected_duration - elapsed
+        else:
+            # 超过预测时间后指数退避
+            interval = (elapsed - (self.expected_duration or 0)) * BACKOFF_RATIO
+        interval = min(max(interval, self.min_interval), self.max_interval)
+        return math.ceil(interval * get_budget_factor())
+
+
+class AdaptivePollingMixin:
+    """
+    轮询型原子的自适应间隔支持，需放在 BaseService 之前继承
+    开启 BACKEND_ADAPTIVE_POLLING_ENABLE 后，execute 时按历史耗时生成实例级的间隔生成器，
+    未开启或序列化于升级前的原子继续使用类属性上的固定间隔
+    """
+
+    def get_polling_duration_key(self, data) -> str:
+        """历史耗时统计维度，默认为原子类型"""
+        return self.__class__.__name__
+
+    def run(self, service_func, data, parent_data, **kwargs) -> bool:
+        if service_func == self._execute and settings.BACKEND_ADAPTIVE_POLLING_ENABLE:
+            # 每次执行（含重试）重新生成，实例属性会随原子序列化保存
+            self.interval = AdaptiveIntervalGenerator.from_history(self.get_polling_duration_key(data))
+        return super().run(service_func, data, parent_data, **kwargs)
+
+    def is_adaptive_polling(self) -> bool:
+        return isinstance(self.interval, AdaptiveIntervalGenerator)
+
+    def get_next_polling_time(self, polling_time: int) -> int:
+        """
+        获取下一次轮询时的累计轮询时间，自适应间隔下轮询间隔不固定，按实际流逝时间计算
+        :param polling_time: 当前累计轮询时间
+        :return:
+        """
+        if self.is_adaptive_polling():
+            return math.ceil(self.interval.get_elapsed())
+        return polling_time + POLLING_INTERVAL
+
+    def record_polling_durations(self, durations: typing.Iterable[float]):
+        """记录任务耗时，仅在自适应间隔下记录"""
+        if self.is_adaptive_polling() and self.interval.duration_key:
+            record_durations(self.interval.duration_key, durations)
+
+    def record_polling_elapsed(self):
+        """以间隔生成器的起始时间计算任务耗时并记录"""
+        if self.is_adaptive_polling():
+            self.record_polling_durations([self.interval.get_elapsed()])
@@ -461,6 +461,9 @@ class AddOrUpdateHostsService(AgentBaseService):
             batch_size=self.batch_size,
         )
         models.ProcessStatus.objects.bulk_create(proc_status_objs_to_be_created, batch_size=self.batch_size)
+        models.HostSearchToken.refresh(
+            [host_obj.bk_host_id for host_obj in host_objs_to_be_created + host_objs_to_be_updated]
+        )
 
     def _execute(self, data, parent_data, common_data: CommonData):
         subscription_instances: List[models.SubscriptionInstanceRecord] = common_data.subscription_instances
@@ -128,6 +128,8 @@ class BindHostAgentService(AgentBaseService):
                 for host_agent_relation in host_agent_relations
             ]
             models.Host.objects.bulk_update(report_agent_id_hosts, fields=["bk_agent_id"])
+            # 解绑仅会使索引产生多余的候选主机，由 like 校验过滤，只需在写入 AgentID 时刷新索引
+            models.HostSearchToken.refresh(host_ids)
             self.bind_host_agent(
                 host_id__sub_inst_id_map=common_data.host_id__sub_inst_id_map, host_agent_relations=host_agent_relations
             )
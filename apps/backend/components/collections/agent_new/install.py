@@ -8,6 +8,7 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import asyncio
 import base64
 import binascii
 import json
@@ -28,6 +29,7 @@ from apps.backend.agent.tools import InstallationTools
 from apps.backend.api.constants import POLLING_INTERVAL, POLLING_TIMEOUT
 from apps.backend.constants import (
     REDIS_AGENT_CONF_KEY_TPL,
+    REDIS_INSTALL_CALLBACK_DRAIN_BATCH_SIZE,
     REDIS_INSTALL_CALLBACK_KEY_TPL,
     SSH_RUN_TIMEOUT,
 )
@@ -35,7 +37,7 @@ from apps.backend.subscription.steps.agent_adapter.adapter import AgentStepAdapt
 from apps.backend.utils.redis import REDIS_INST
 from apps.backend.utils.wmi import execute_cmd, put_file
 from apps.core.concurrent import controller
-from apps.core.remote import conns
+from apps.core.remote import pool
 from apps.exceptions import AuthOverdueException
 from apps.node_man import constants, models
 from apps.utils import concurrent, exc, sync
@@ -171,17 +173,30 @@ class InstallService(base.AgentBaseService, remote.RemoteServiceMixin):
         get_config_dict_func=core.get_config_dict,
         get_config_dict_kwargs={"config_name": core.ServiceCCConfigName.SSH.value},
     )
-    def handle_lan_shell_sub_inst(self, install_sub_inst_objs: List[InstallSubInstObj]):
-        """处理直连且通过 Shell 执行的机器"""
-        params_list = [
-            {
-                "meta": {"blueking_language": translation.get_language()},
-                "sub_inst_id": install_sub_inst_obj.sub_inst_id,
-                "install_sub_inst_obj": install_sub_inst_obj,
-            }
-            for install_sub_inst_obj in install_sub_inst_objs
-        ]
-        return concurrent.batch_call_coroutine(func=self.execute_shell_solution_async, params_list=params_list)
+    async def handle_lan_shell_sub_inst(
+        self, install_sub_inst_objs: List[InstallSubInstObj], language: Optional[str] = None
+    ):
+        """
+        处理直连且通过 Shell 执行的机器
+        :param install_sub_inst_objs:
+        :param language: 调用方的语言设置，事件循环线程不继承调用方线程的语言，需显式传入
+        :return:
+        """
+        meta: Dict[str, Any] = {"blueking_language": language}
+        return await asyncio.gather(
+            *[
+                concurrent.bind_language(
+                    self.execute_shell_solution_async(
+                        meta=meta,
+                        sub_inst_id=install_sub_inst_obj.sub_inst_id,
+                        install_sub_inst_obj=install_sub_inst_obj,
+                    ),
+                    language,
+                )
+                for install_sub_inst_obj in install_sub_inst_objs
+            ],
+            return_exceptions=True,
+        )
 
     def _execute(self, data, parent_data, common_data: base.AgentCommonData):
         host_id__sub_inst_id = {
@@ -264,18 +279,25 @@ class InstallService(base.AgentBaseService, remote.RemoteServiceMixin):
                 pipeline.expire(cache_key, POLLING_TIMEOUT + random.randint(POLLING_TIMEOUT, 2 * POLLING_TIMEOUT))
             pipeline.execute()
 
-        remote_conn_helpers_gby_result_type = self.bulk_check_ssh(remote_conn_helpers=lan_windows_sub_inst)
+        # SSH 通道检测与 Shell 执行共用任务级连接池，检测通过的连接在执行阶段直接复用
+        self.ssh_conn_pool = pool.AsyncsshConnPool()
+        try:
+            remote_conn_helpers_gby_result_type = self.bulk_check_ssh(remote_conn_helpers=lan_windows_sub_inst)
 
-        succeed_non_lan_inst_ids = self.handle_non_lan_inst(install_sub_inst_objs=non_lan_sub_inst)
-        succeed_lan_windows_sub_inst_ids = self.handle_lan_windows_sub_inst(
-            install_sub_inst_objs=remote_conn_helpers_gby_result_type.get(
-                remote.SshCheckResultType.UNAVAILABLE.value, []
+            succeed_non_lan_inst_ids = self.handle_non_lan_inst(install_sub_inst_objs=non_lan_sub_inst)
+            succeed_lan_windows_sub_inst_ids = self.handle_lan_windows_sub_inst(
+                install_sub_inst_objs=remote_conn_helpers_gby_result_type.get(
+                    remote.SshCheckResultType.UNAVAILABLE.value, []
+                )
             )
-        )
-        succeed_lan_shell_sub_inst_ids = self.handle_lan_shell_sub_inst(
-            install_sub_inst_objs=lan_linux_sub_inst
-            + remote_conn_helpers_gby_result_type.get(remote.SshCheckResultType.AVAILABLE.value, [])
-        )
+            succeed_lan_shell_sub_inst_ids = self.handle_lan_shell_sub_inst(
+                install_sub_inst_objs=lan_linux_sub_inst
+                + remote_conn_helpers_gby_result_type.get(remote.SshCheckResultType.AVAILABLE.value, []),
+                language=translation.get_language(),
+            )
+        finally:
+            self.ssh_conn_pool.close()
+            self.ssh_conn_pool = None
         # 使用 filter 移除并发过程中抛出异常的实例
         data.outputs.scheduling_sub_inst_ids = list(
             filter(
@@ -487,8 +509,6 @@ class InstallService(base.AgentBaseService, remote.RemoteServiceMixin):
         :param install_sub_inst_obj:
         :return:
         """
-        translation.activate(meta["blueking_language"])
-
         # sudo 权限提示
         await self.sudo_prompt(install_sub_inst_obj)
 
@@ -501,7 +521,7 @@ class InstallService(base.AgentBaseService, remote.RemoteServiceMixin):
         execution_solution = installation_tool.type__execution_solution_map[
             constants.CommonExecutionSolutionType.SHELL.value
         ]
-        async with conns.AsyncsshConn(**install_sub_inst_obj.conns_init_params) as conn:
+        async with self.ssh_connection(install_sub_inst_obj.conns_init_params) as conn:
 
             for execution_solution_step in execution_solution.steps:
                 if execution_solution_step.type == constants.CommonExecutionSolutionStepType.DEPENDENCIES.value:
@@ -532,16 +552,42 @@ class InstallService(base.AgentBaseService, remote.RemoteServiceMixin):
 
         return sub_inst_id
 
-    def handle_report_data(self, sub_inst_id: int, success_callback_step: str) -> Dict:
+    @staticmethod
+    def drain_report_data(sub_inst_ids: List[int]) -> Dict[int, List[bytes]]:
+        """
+        批量取出订阅实例的上报数据
+        以非事务 Pipeline 批量读取上报列表，再按读取数量从列表尾部裁剪，一个批次仅需两次网络往返
+        1. 集群模式下 Pipeline 不支持事务及脚本（evalsha）命令，仅使用 LRANGE / LTRIM 以兼容全部部署模式
+        2. 上报数据通过 lpush 写入列表头部，读取与裁剪之间新上报的数据位于头部，裁剪尾部已读取的部分不会丢失数据
+        :param sub_inst_ids: 订阅实例ID列表
+        :return: 订阅实例ID - 上报数据列表（按上报时间先后排序）
+        """
+        sub_inst_id__report_data_map: Dict[int, List[bytes]] = {}
+        for begin in range(0, len(sub_inst_ids), REDIS_INSTALL_CALLBACK_DRAIN_BATCH_SIZE):
+            batch_sub_inst_ids: List[int] = sub_inst_ids[begin : begin + REDIS_INSTALL_CALLBACK_DRAIN_BATCH_SIZE]
+            names: List[str] = [
+                REDIS_INSTALL_CALLBACK_KEY_TPL.format(sub_inst_id=sub_inst_id) for sub_inst_id in batch_sub_inst_ids
+            ]
+            pipeline: Pipeline = REDIS_INST.pipeline(transaction=False)
+            for name in names:
+                pipeline.lrange(name, 0, -1)
+            batch_report_data: List[List[bytes]] = pipeline.execute()
+
+            pipeline = REDIS_INST.pipeline(transaction=False)
+            for name, report_data in zip(names, batch_report_data):
+                if report_data:
+                    # 保留读取后新上报的数据，列表裁剪为空时 Redis 会自动删除键
+                    pipeline.ltrim(name, 0, -len(report_data) - 1)
+            pipeline.execute()
+
+            for sub_inst_id, report_data in zip(batch_sub_inst_ids, batch_report_data):
+                # 上报数据通过 lpush 写入，倒序后即为上报顺序
+                report_data.reverse()
+                sub_inst_id__report_data_map[sub_inst_id] = report_data
+        return sub_inst_id__report_data_map
+
+    def handle_report_data(self, sub_inst_id: int, success_callback_step: str, report_data: List[bytes]) -> Dict:
         """处理上报数据"""
-        name = REDIS_INSTALL_CALLBACK_KEY_TPL.format(sub_inst_id=sub_inst_id)
-        # 先计算出要从redis取数据的长度
-        report_data_len = REDIS_INST.llen(name)
-        # 从redis中取出对应长度的数据
-        report_data = REDIS_INST.lrange(name, -report_data_len, -1)
-        # 后使用ltrim保留剩下的，可以保证report_log中新push的值不会丢失
-        REDIS_INST.ltrim(name, 0, -report_data_len - 1)
-        report_data.reverse()
         cpu_arch = None
         os_version = None
         agent_id = None
@@ -627,15 +673,18 @@ class InstallService(base.AgentBaseService, remote.RemoteServiceMixin):
             self.finish_schedule()
             return
 
-        params_list = [
-            {"sub_inst_id": sub_inst_id, "success_callback_step": success_callback_step}
-            for sub_inst_id in scheduling_sub_inst_ids
-        ]
         host_id__sub_inst_map: Dict[int, models.SubscriptionInstanceRecord] = {
             common_data.sub_inst_id__host_id_map[sub_inst.id]: sub_inst
             for sub_inst in common_data.subscription_instances
         }
-        results = concurrent.batch_call(func=self.handle_report_data, params_list=params_list)
+        # 一次性取出本轮次全部实例的上报数据，解析过程仅涉及本地计算，日志由缓冲区在调度结束时统一写入
+        sub_inst_id__report_data_map: Dict[int, List[bytes]] = self.drain_report_data(list(scheduling_sub_inst_ids))
+        results = [
+            self.handle_report_data(
+                sub_inst_id=sub_inst_id, success_callback_step=success_callback_step, report_data=report_data
+            )
+            for sub_inst_id, report_data in sub_inst_id__report_data_map.items()
+        ]
         left_scheduling_sub_inst_ids = []
         cpu_arch__host_id_map = defaultdict(list)
         os_version__host_id_map = defaultdict(list)
@@ -395,6 +395,9 @@ class RegisterHostService(AgentBaseService):
             batch_size=self.batch_size,
         )
         models.ProcessStatus.objects.bulk_create(proc_status_objs_to_be_created, batch_size=self.batch_size)
+        models.HostSearchToken.refresh(
+            [host_obj.bk_host_id for host_obj in host_objs_to_be_created + host_objs_to_be_updated]
+        )
         models.SubscriptionInstanceRecord.objects.bulk_update(
             sub_inst_objs_to_be_updated, fields=["instance_info"], batch_size=self.batch_size
         )
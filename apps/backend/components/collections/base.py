@@ -26,8 +26,6 @@ from typing import (
 )
 
 from django.conf import settings
-from django.db.models import Value
-from django.db.models.functions import Concat
 from django.utils import timezone
 from django.utils.translation import ugettext as _
 
@@ -115,14 +113,97 @@ def get_language_func(
     return data.get_one_of_inputs("blueking_language")
 
 
+class LogBuffer:
+    """
+    原子日志缓冲区
+    单次 execute / schedule 内按 订阅实例 收集日志，结束时一次性追加写入 SubscriptionInstanceStatusLog，
+    避免每条日志都对状态表执行一次 UPDATE
+    """
+
+    def __init__(self, node_id: str):
+        self.node_id = node_id
+        # 保持日志写入顺序，sub_inst_ids 为 None 表示该原子下的全部订阅实例
+        self.entries: List[Tuple[Optional[List[int]], str]] = []
+
+    def append(self, sub_inst_ids: Optional[List[int]], content: str):
+        self.entries.append((sub_inst_ids, content))
+
+    def flush(self):
+        if not self.entries:
+            return
+        entries, self.entries = self.entries, []
+        write_log_lines(self.node_id, entries)
+
+
+def write_log_lines(node_id: str, entries: List[Tuple[Optional[List[int]], str]]):
+    """
+    追加写入原子日志
+    :param node_id: 原子ID
+    :param entries: [(订阅实例ID列表，None 表示全部订阅实例), 日志内容]
+    :return:
+    """
+    now = timezone.now()
+    all_sub_inst_ids: Optional[List[int]] = None
+    touched_sub_inst_ids: Set[int] = set()
+    to_be_created_logs: List[models.SubscriptionInstanceStatusLog] = []
+    for sub_inst_ids, content in entries:
+        if sub_inst_ids is None:
+            if all_sub_inst_ids is None:
+                all_sub_inst_ids = list(
+                    models.SubscriptionInstanceStatusDetail.objects.filter(node_id=node_id).values_list(
+                        "subscription_instance_record_id", flat=True
+                    )
+                )
+            sub_inst_ids = all_sub_inst_ids
+        touched_sub_inst_ids.update(sub_inst_ids)
+        to_be_created_logs.extend(
+            models.SubscriptionInstanceStatusLog(
+                subscription_instance_record_id=sub_inst_id, node_id=node_id, content=content, create_time=now
+            )
+            for sub_inst_id in sub_inst_ids
+        )
+
+    if not to_be_created_logs:
+        return
+    batch_size = models.GlobalSettings.get_config(models.GlobalSettings.KeyEnum.BATCH_SIZE.value, default=100)
+    models.SubscriptionInstanceStatusLog.objects.bulk_create(to_be_created_logs, batch_size=batch_size)
+    models.SubscriptionInstanceStatusDetail.objects.filter(
+        node_id=node_id, subscription_instance_record_id__in=touched_sub_inst_ids
+    ).update(update_time=now)
+
+
 class LogMixin:
 
     # 日志类
     log_maker_class: Type[LogMaker] = LogMaker
+    # 日志缓冲区，仅在 execute / schedule 执行期间存在
+    log_buffer: Optional[LogBuffer] = None
 
     def get_log_maker(self):
         return self.log_maker_class()
 
+    def append_log(self, sub_inst_ids: Union[int, Iterable[int], None], content: str):
+        """
+        追加日志，缓冲区存在时延迟到本次调用结束统一写入
+        :param sub_inst_ids: 订阅实例ID，为 None 时表示该原子下的全部订阅实例
+        :param content: 已格式化的日志内容
+        :return:
+        """
+        if isinstance(sub_inst_ids, int):
+            sub_inst_ids = [sub_inst_ids]
+        elif sub_inst_ids is not None:
+            sub_inst_ids = list(sub_inst_ids)
+
+        if self.log_buffer is not None:
+            self.log_buffer.append(sub_inst_ids, content)
+        else:
+            write_log_lines(self.id, [(sub_inst_ids, content)])
+
+    def flush_log_buffer(self):
+        log_buffer, self.log_buffer = self.log_buffer, None
+        if log_buffer is not None:
+            log_buffer.flush()
+
     def log_base(
         self, sub_inst_ids: Union[int, List[int], None] = None, log_content: str = None, level: int = LogLevel.INFO
     ):
@@ -133,18 +214,7 @@ class LogMixin:
         :param level:
         :return:
         """
-        filters = {"node_id": self.id}
-        if sub_inst_ids is None:
-            pass
-        elif isinstance(sub_inst_ids, int):
-            filters["subscription_instance_record_id"] = sub_inst_ids
-        else:
-            filters["subscription_instance_record_id__in"] = sub_inst_ids
-
-        models.SubscriptionInstanceStatusDetail.objects.filter(**filters).update(
-            log=Concat("log", Value(f"\n{self.log_maker.get_log_content(level, log_content)}")),
-            update_time=timezone.now(),
-        )
+        self.append_log(sub_inst_ids, self.log_maker.get_log_content(level, log_content))
 
     def log_info(self, sub_inst_ids: Union[int, Iterable[int], None] = None, log_content: str = None):
         self.log_base(sub_inst_ids, log_content, level=LogLevel.INFO)
@@ -254,9 +324,7 @@ class BaseService(Service, LogMixin, DBHelperMixin):
 
     def bulk_set_sub_inst_status(self, status: str, sub_inst_ids: Union[List[int], Set[int]]):
         """批量设置实例状态，对于实例及原子的状态更新只应该在base内部使用"""
-        models.SubscriptionInstanceRecord.objects.filter(id__in=sub_inst_ids).update(
-            status=status, update_time=timezone.now()
-        )
+        models.SubscriptionTaskProgress.bulk_set_record_status(sub_inst_ids, status, update_time=timezone.now())
         if status in [constants.JobStatusType.FAILED]:
             self.sub_inst_failed_handler(sub_inst_ids)
 
@@ -272,12 +340,11 @@ class BaseService(Service, LogMixin, DBHelperMixin):
         """
         if not sub_inst_ids:
             return
-        update_fields = {"status": status}
-        if common_log:
-            update_fields["log"] = Concat("log", Value(f"\n{common_log}"))
         models.SubscriptionInstanceStatusDetail.objects.filter(
             subscription_instance_record_id__in=sub_inst_ids, node_id=self.id
-        ).update(**{**update_fields, "update_time": timezone.now()})
+        ).update(status=status, update_time=timezone.now())
+        if common_log:
+            self.append_log(sub_inst_ids, common_log)
 
         # 失败的实例需要更新汇总状态
         if status in [constants.JobStatusType.FAILED]:
@@ -361,6 +428,14 @@ class BaseService(Service, LogMixin, DBHelperMixin):
         pass
 
     def run(self, service_func, data, parent_data, **kwargs) -> bool:
+        # 单次 execute / schedule 内的日志先写入缓冲区，结束时统一追加写入
+        self.log_buffer = LogBuffer(node_id=self.id)
+        try:
+            return self._run(service_func, data, parent_data, **kwargs)
+        finally:
+            self.flush_log_buffer()
+
+    def _run(self, service_func, data, parent_data, **kwargs) -> bool:
 
         subscription_instance_ids = BaseService.get_subscription_instance_ids(data)
         act_name = data.get_one_of_inputs("act_name")
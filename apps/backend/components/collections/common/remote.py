@@ -8,17 +8,19 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import asyncio
 import traceback
 import typing
 from abc import ABC
 from collections import ChainMap, defaultdict
 from enum import Enum
 
+from django.utils import translation
 from django.utils.translation import ugettext_lazy as _
 
 from apps.backend import constants as backend_constants
 from apps.core.concurrent import controller
-from apps.core.remote import conns, core_remote_exceptions
+from apps.core.remote import conns, core_remote_exceptions, pool
 from apps.node_man import constants, models
 from apps.utils import concurrent, enum, exc, sync
 from apps.utils.cache import class_member_cache
@@ -100,6 +102,22 @@ def sub_inst_task_exc_handler(
 
 
 class RemoteServiceMixin(base.BaseService, ABC):
+
+    # 任务级 SSH 连接池，由原子在执行期间创建，SSH 通道检测阶段建立的连接可在后续执行阶段复用
+    ssh_conn_pool: typing.Optional[pool.AsyncsshConnPool] = None
+
+    def ssh_connection(
+        self, conns_init_params: typing.Dict[str, typing.Any]
+    ) -> typing.Union[conns.AsyncsshConn, pool.PooledConnContext]:
+        """
+        获取 SSH 连接上下文，存在连接池时从连接池获取
+        :param conns_init_params: 连接初始化参数
+        :return:
+        """
+        if self.ssh_conn_pool is None:
+            return conns.AsyncsshConn(**conns_init_params)
+        return self.ssh_conn_pool.connection(conns_init_params)
+
     @exc.ExceptionHandler(exc_handler=sub_inst_task_exc_handler)
     async def check_ssh(
         self, remote_conn_helper: RemoteConnHelperT
@@ -112,7 +130,8 @@ class RemoteServiceMixin(base.BaseService, ABC):
         check_result = {"remote_conn_helper": remote_conn_helper, "type": SshCheckResultType.AVAILABLE.value}
         conns_init_params = dict(ChainMap({"connect_timeout": 10}, remote_conn_helper.conns_init_params))
         try:
-            async with conns.AsyncsshConn(**conns_init_params):
+            # 存在连接池时，检测通过的连接归还连接池，供后续执行阶段复用
+            async with self.ssh_connection(conns_init_params):
                 pass
         except (
             core_remote_exceptions.DisconnectError,
@@ -145,16 +164,24 @@ class RemoteServiceMixin(base.BaseService, ABC):
         get_config_dict_func=core.get_config_dict,
         get_config_dict_kwargs={"config_name": core.ServiceCCConfigName.SSH.value},
     )
-    def _bulk_check_ssh(
-        self, remote_conn_helpers: typing.List[RemoteConnHelperT]
+    async def _bulk_check_ssh(
+        self, remote_conn_helpers: typing.List[RemoteConnHelperT], language: typing.Optional[str] = None
     ) -> typing.List[typing.Dict[str, typing.Union[str, RemoteConnHelperT]]]:
-        params_list = [{"remote_conn_helper": remote_conn_helper} for remote_conn_helper in remote_conn_helpers]
-        return concurrent.batch_call_coroutine(func=self.check_ssh, params_list=params_list)
+        return await asyncio.gather(
+            *[
+                concurrent.bind_language(self.check_ssh(remote_conn_helper=remote_conn_helper), language)
+                for remote_conn_helper in remote_conn_helpers
+            ],
+            return_exceptions=True,
+        )
 
     def bulk_check_ssh(
         self, remote_conn_helpers: typing.List[RemoteConnHelperT]
     ) -> typing.Dict[str, typing.List[RemoteConnHelperT]]:
-        check_results = self._bulk_check_ssh(remote_conn_helpers=remote_conn_helpers)
+        # 检测在事件循环线程中执行，显式传递调用方的语言设置，确保失败日志按调用方语言翻译
+        check_results = self._bulk_check_ssh(
+            remote_conn_helpers=remote_conn_helpers, language=translation.get_language()
+        )
         remote_conn_helpers_gby_result_type: typing.Dict[str, typing.List[RemoteConnHelper]] = defaultdict(list)
         for check_result in check_results:
             if not check_result:
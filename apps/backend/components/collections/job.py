@@ -19,11 +19,14 @@ from typing import Any, Callable, Dict, List, Optional, Set, Union
 
 import six
 from django.conf import settings
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
 from apps.backend.api.constants import POLLING_INTERVAL, POLLING_TIMEOUT
 from apps.backend.api.job import process_parms
+from apps.backend.components.collections import adaptive_interval
 from apps.backend.components.collections.base import BaseService, CommonData
+from apps.backend.components.collections.job_poller import job_status_poller
 from apps.core.files.storage import get_storage
 from apps.exceptions import AppBaseException
 from apps.node_man import constants, models
@@ -35,7 +38,7 @@ from pipeline.core.flow.activity import Service, StaticIntervalGenerator
 logger = logging.getLogger("app")
 
 
-class JobV3BaseService(six.with_metaclass(abc.ABCMeta, BaseService)):
+class JobV3BaseService(six.with_metaclass(abc.ABCMeta, adaptive_interval.AdaptivePollingMixin, BaseService)):
     """
     作业平台V3，基于subscription instance record流转，注意 execute 方法中需要写入 JobSubscriptionInstanceMap
     # 当前 pipeline 引擎中，multi callback schedule 只能串行运行，高并发时存在性能问题
@@ -65,6 +68,10 @@ class JobV3BaseService(six.with_metaclass(abc.ABCMeta, BaseService)):
         self.job_instance_id__call_params_map = {}
         super().__init__(*args, **kwargs)
 
+    def get_polling_duration_key(self, data) -> str:
+        """历史耗时统计维度：原子类型 + 脚本名称"""
+        return f"{self.__class__.__name__}:{getattr(self, 'script_name', '')}"
+
     @staticmethod
     def get_md5(content):
         md5 = hashlib.md5()
@@ -134,6 +141,7 @@ class JobV3BaseService(six.with_metaclass(abc.ABCMeta, BaseService)):
                 subscription_instance_ids=subscription_instance_id,
                 node_id=self.id,
             )
+            self.register_to_job_status_poller([job_instance_id])
             self.job_instance_id__call_params_map[job_instance_id] = {
                 "subscription_id": subscription_id,
                 "subscription_instance_id": subscription_instance_id,
@@ -262,6 +270,25 @@ class JobV3BaseService(six.with_metaclass(abc.ABCMeta, BaseService)):
                 succeed_sub_inst_ids.append(sub_inst.id)
         return succeed_sub_inst_ids
 
+    @staticmethod
+    def register_to_job_status_poller(job_instance_ids: List[int]):
+        """登记到作业状态集中轮询器，登记失败时调度节点会回退为自行查询，不影响执行"""
+        if not settings.JOB_STATUS_POLLER_ENABLE or job_status_poller.redis_inst is None:
+            return
+        try:
+            job_status_poller.register(job_instance_ids)
+        except Exception:
+            logger.exception(f"[JobStatusPoller] failed to register job_instance_ids -> {job_instance_ids}")
+
+    @staticmethod
+    def unregister_from_job_status_poller(job_instance_ids: List[int]):
+        if not settings.JOB_STATUS_POLLER_ENABLE or job_status_poller.redis_inst is None:
+            return
+        try:
+            job_status_poller.unregister(job_instance_ids)
+        except Exception:
+            logger.exception(f"[JobStatusPoller] failed to unregister job_instance_ids -> {job_instance_ids}")
+
     def request_get_job_instance_status(self, job_sub_map: models.JobSubscriptionInstanceMap):
         """
         查询作业平台执行状态
@@ -277,12 +304,23 @@ class JobV3BaseService(six.with_metaclass(abc.ABCMeta, BaseService)):
                 "return_ip_result": False,
             }
         )
-        job_status = result["job_instance"]["status"]
+        self.handle_job_status(job_sub_map, result["job_instance"]["status"])
 
+    def handle_job_status(self, job_sub_map: models.JobSubscriptionInstanceMap, job_status: int):
+        """
+        根据作业状态更新作业平台ID映射
+        :param job_sub_map:
+        :param job_status: 作业状态
+        :return:
+        """
         if job_status in (constants.BkJobStatus.PENDING, constants.BkJobStatus.RUNNING):
             # 任务未完成，直接跳过，等待下次查询
             return
 
+        job_sub_map.finish_time = timezone.now()
+        # 记录作业耗时，用于预测同类作业的完成时间
+        self.record_polling_durations([(job_sub_map.finish_time - job_sub_map.create_time).total_seconds()])
+
         if job_status == constants.BkJobStatus.SUCCEEDED:
             # 任务成功，记录状态，避免下次继续查询
             job_sub_map.status = job_status
@@ -314,33 +352,89 @@ class JobV3BaseService(six.with_metaclass(abc.ABCMeta, BaseService)):
         models.JobSubscriptionInstanceMap.objects.filter(
             node_id=self.id, job_instance_id__in=skip_job_instance_ids, status=constants.BkJobStatus.PENDING
         ).update(status=constants.BkJobStatus.SUCCEEDED)
+        self.unregister_from_job_status_poller(skip_job_instance_ids)
 
-    def _schedule(self, data, parent_data, callback_data=None):
-        polling_time = data.get_one_of_outputs("polling_time") or 0
-        skip_polling_result = data.get_one_of_inputs("skip_polling_result", default=False)
-        # 查询未完成的作业, 批量查询作业状态并更新DB
-        multi_params = [
-            {"job_sub_map": job_sub_map}
-            for job_sub_map in models.JobSubscriptionInstanceMap.objects.filter(
-                node_id=self.id, status=constants.BkJobStatus.PENDING
+    def update_job_statuses(self, pending_job_sub_maps: List[models.JobSubscriptionInstanceMap]):
+        """
+        更新未完成作业的执行状态
+        集中轮询器可用时读取其缓存的已结束作业状态，未被轮询器跟踪的作业及轮询器不可用时逐个请求作业平台
+        :param pending_job_sub_maps: 未完成的作业平台ID映射
+        :return:
+        """
+        if not pending_job_sub_maps:
+            return
+
+        if not job_status_poller.is_available():
+            request_multi_thread(
+                self.request_get_job_instance_status,
+                [{"job_sub_map": job_sub_map} for job_sub_map in pending_job_sub_maps],
+            )
+            return
+
+        job_instance_id__status_map: Dict[int, int] = job_status_poller.get_finished_statuses(
+            [job_sub_map.job_instance_id for job_sub_map in pending_job_sub_maps]
+        )
+        request_multi_thread(
+            self.handle_job_status,
+            [
+                {"job_sub_map": job_sub_map, "job_status": job_instance_id__status_map[job_sub_map.job_instance_id]}
+                for job_sub_map in pending_job_sub_maps
+                if job_sub_map.job_instance_id in job_instance_id__status_map
+            ],
+        )
+
+        # 既未登记也无结束状态的作业不会再被轮询，需自行查询，未结束的重新登记交由轮询器跟踪
+        untracked_job_instance_ids: Set[int] = set(
+            job_status_poller.filter_untracked(
+                [
+                    job_sub_map.job_instance_id
+                    for job_sub_map in pending_job_sub_maps
+                    if job_sub_map.job_instance_id not in job_instance_id__status_map
+                ]
             )
+        )
+        if not untracked_job_instance_ids:
+            return
+        untracked_job_sub_maps: List[models.JobSubscriptionInstanceMap] = [
+            job_sub_map
+            for job_sub_map in pending_job_sub_maps
+            if job_sub_map.job_instance_id in untracked_job_instance_ids
         ]
+        request_multi_thread(
+            self.request_get_job_instance_status,
+            [{"job_sub_map": job_sub_map} for job_sub_map in untracked_job_sub_maps],
+        )
+        self.register_to_job_status_poller(
+            [
+                job_sub_map.job_instance_id
+                for job_sub_map in untracked_job_sub_maps
+                if job_sub_map.status in (constants.BkJobStatus.PENDING, constants.BkJobStatus.RUNNING)
+            ]
+        )
 
+    def _schedule(self, data, parent_data, callback_data=None):
+        polling_time = data.get_one_of_outputs("polling_time") or 0
+        skip_polling_result = data.get_one_of_inputs("skip_polling_result", default=False)
         # 处理跳过作业平台结果轮训的情况
         if skip_polling_result:
             self.skip_polling_result_by_os_types()
             self.finish_schedule()
             return
 
-        request_multi_thread(self.request_get_job_instance_status, multi_params)
+        # 查询未完成的作业, 批量查询作业状态并更新DB
+        pending_job_sub_maps: List[models.JobSubscriptionInstanceMap] = list(
+            models.JobSubscriptionInstanceMap.objects.filter(node_id=self.id, status=constants.BkJobStatus.PENDING)
+        )
+        self.update_job_statuses(pending_job_sub_maps)
 
         # 判断 JobSubscriptionInstanceMap 中对应的 job_instance_id 都执行完成的，把成功的 subscription_instance_ids 向下传递
         is_finished = not models.JobSubscriptionInstanceMap.objects.filter(
             node_id=self.id, status=constants.BkJobStatus.PENDING
         ).exists()
+        next_polling_time: int = self.get_next_polling_time(polling_time)
         if is_finished:
             self.finish_schedule()
-        elif polling_time + POLLING_INTERVAL > POLLING_TIMEOUT:
+        elif next_polling_time > POLLING_TIMEOUT:
             # 由于JOB的超时机制可能会失效，因此这里节点管理自己需要有超时机制进行兜底
             pending_job_sub_maps = models.JobSubscriptionInstanceMap.objects.filter(
                 node_id=self.id, status=constants.BkJobStatus.PENDING
@@ -370,8 +464,11 @@ class JobV3BaseService(six.with_metaclass(abc.ABCMeta, BaseService)):
             models.JobSubscriptionInstanceMap.objects.filter(
                 node_id=self.id, status=constants.BkJobStatus.PENDING
             ).update(status=constants.BkJobStatus.FAILED)
+            self.unregister_from_job_status_poller(
+                [pending_job_sub_map.job_instance_id for pending_job_sub_map in pending_job_sub_maps]
+            )
             self.finish_schedule()
-        data.outputs.polling_time = polling_time + POLLING_INTERVAL
+        data.outputs.polling_time = next_polling_time
 
     @classmethod
     def append_unique_key_params_info(
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import logging
+import time
+import typing
+
+from django.conf import settings
+
+from apps.backend.api.constants import POLLING_INTERVAL
+from apps.backend.utils import redis
+from apps.node_man import constants
+from apps.prometheus import metrics
+from apps.utils.batch_request import request_multi_thread
+from common.api import JobApi
+
+"""
+作业平台执行状态集中轮询
+背景：各原子在 _schedule 中独立查询作业平台，并发流水线较多时同一周期内会产生大量重复请求
+1. 登记：原子下发作业后将 job_instance_id 登记到 Redis 有序集合，score 为下次查询的时间
+2. 轮询：周期任务对到期的作业去重后按每轮预算查询，未结束的作业按轮询间隔重新排期
+3. 缓存：已结束作业的状态写入 Redis 并设置过期时间，调度节点直接读取，不再各自请求作业平台
+"""
+
+logger = logging.getLogger("app")
+
+
+class JobStatusPoller:
+
+    KEY_PREFIX = "node_man:backend:job_status_poller"
+
+    def __init__(
+        self,
+        redis_inst=None,
+        query_func: typing.Optional[typing.Callable[[typing.Dict[str, typing.Any]], typing.Dict]] = None,
+        max_queries_per_round: typing.Optional[int] = None,
+        status_ttl: typing.Optional[int] = None,
+        interval: typing.Optional[int] = None,
+    ):
+        self.redis_inst = redis_inst or redis.RedisInstSingleTon.get_inst()
+        self.query_func = query_func or JobApi.get_job_instance_status
+        self.max_queries_per_round = max_queries_per_round or settings.JOB_STATUS_POLLER_MAX_QUERIES_PER_ROUND
+        self.status_ttl = status_ttl or settings.JOB_STATUS_POLLER_STATUS_TTL
+        self.interval = interval or POLLING_INTERVAL
+        self.pending_key = f"{self.KEY_PREFIX}:pending"
+        self.heartbeat_key = f"{self.KEY_PREFIX}:heartbeat"
+
+    def get_status_key(self, job_instance_id: int) -> str:
+        return f"{self.KEY_PREFIX}:status:{job_instance_id}"
+
+    def is_available(self) -> bool:
+        """轮询器已启用且心跳正常时，调度节点才依赖轮询结果，否则回退为自行查询"""
+        if not settings.JOB_STATUS_POLLER_ENABLE or self.redis_inst is None:
+            return False
+        try:
+            return bool(self.redis_inst.exists(self.heartbeat_key))
+        except Exception:
+            logger.exception("[JobStatusPoller] failed to check heartbeat")
+            return False
+
+    def register(self, job_instance_ids: typing.Iterable[int]):
+        """
+        登记待轮询的作业
+        :param job_instance_ids: 作业实例ID列表
+        :return:
+        """
+        now = time.time()
+        mapping = {job_instance_id: now for job_instance_id in job_instance_ids}
+        if not mapping:
+            return
+        # nx：重复登记不会推迟已排期的查询
+        self.redis_inst.zadd(self.pending_key, mapping, nx=True)
+
+    def unregister(self, job_instance_ids: typing.Iterable[int]):
+        """取消登记，用于调度节点超时或跳过轮询的场景"""
+        job_instance_ids = list(job_instance_ids)
+        if job_instance_ids:
+            self.redis_inst.zrem(self.pending_key, *job_instance_ids)
+
+    def get_finished_statuses(self, job_instance_ids: typing.Iterable[int]) -> typing.Dict[int, int]:
+        """
+        获取已结束作业的状态，未结束或未被轮询到的作业不返回
+        :param job_instance_ids: 作业实例ID列表
+        :return: 作业实例ID - 作业状态 映射
+        """
+        job_instance_ids = list(job_instance_ids)
+        if not job_instance_ids:
+            return {}
+        statuses = self.redis_inst.mget([self.get_status_key(job_instance_id) for job_instance_id in job_instance_ids])
+        return {
+            job_instance_id: int(status)
+            for job_instance_id, status in zip(job_instance_ids, statuses)
+            if status is not None
+        }
+
+    def filter_untracked(self, job_instance_ids: typing.Iterable[int]) -> typing.List[int]:
+        """
+        筛选不在登记集合中的作业，例如登记失败、轮询器启用前下发或已结束状态缓存过期的作业，
+        这些作业不会再被轮询，需由调度节点自行查询
+        :param job_instance_ids: 未获取到结束状态的作业实例ID列表
+        :return: 未登记的作业实例ID列表
+        """
+        job_instance_ids = list(job_instance_ids)
+        if not job_instance_ids:
+            return []
+        pipeline = self.redis_inst.pipeline(transaction=False)
+        for job_instance_id in job_instance_ids:
+            pipeline.zscore(self.pending_key, job_instance_id)
+        scores = pipeline.execute()
+        return [job_instance_id for job_instance_id, score in zip(job_instance_ids, scores) if score is None]
+
+    def query_status(self, job_instance_id: int) -> typing.List[typing.Tuple[int, typing.Optional[int]]]:
+        try:
+            result = self.query_func(
+                {
+                    "bk_biz_id": settings.BLUEKING_BIZ_ID,
+                    "bk_scope_type": constants.BkJobScopeType.BIZ_SET.value,
+                    "bk_scope_id": settings.BLUEKING_BIZ_ID,
+                    "job_instance_id": job_instance_id,
+                    "return_ip_result": False,
+                }
+            )
+        except Exception:
+            # 查询失败不影响其他作业，等待下一轮重试
+            logger.exception(f"[JobStatusPoller] failed to get status of job_instance_id -> {job_instance_id}")
+            metrics.job_status_poller_queries_total.labels(result="error").inc()
+            return [(job_instance_id, None)]
+        metrics.job_status_poller_queries_total.labels(result="success").inc()
+        return [(job_instance_id, result["job_instance"]["status"])]
+
+    def poll_once(self) -> typing.Dict[str, int]:
+        """
+        执行一轮轮询
+        :return: 本轮统计数据
+        """
+        now = time.time()
+        self.redis_inst.set(self.heartbeat_key, now, ex=self.interval * 3)
+        due_job_instance_ids: typing.List[int] = [
+            int(job_instance_id)
+            for job_instance_id in self.redis_inst.zrangebyscore(
+                self.pending_key, "-inf", now, start=0, num=self.max_queries_per_round
+            )
+        ]
+        if not due_job_instance_ids:
+            return {"queried": 0, "finished": 0}
+
+        query_results = request_multi_thread(
+            self.query_status,
+            [{"job_instance_id": job_instance_id} for job_instance_id in due_job_instance_ids],
+            get_data=lambda x: x,
+        )
+
+        finished_job_instance_ids: typing.List[int] = []
+        next_query_time: float = time.time() + self.interval
+        pipeline = self.redis_inst.pipeline(transaction=False)
+        for job_instance_id, status in query_results:
+            if status is None or status in (constants.BkJobStatus.PENDING, constants.BkJobStatus.RUNNING):
+                # xx：仅对仍处于登记状态的作业重新排期，避免复活已取消登记的作业
+                pipeline.zadd(self.pending_key, {job_instance_id: next_query_time}, xx=True)
+                continue
+            finished_job_instance_ids.append(job_instance_id)
+            pipeline.set(self.get_status_key(job_instance_id), status, ex=self.status_ttl)
+        if finished_job_instance_ids:
+            pipeline.zrem(self.pending_key, *finished_job_instance_ids)
+        pipeline.execute()
+        return {"queried": len(due_job_instance_ids), "finished": len(finished_job_instance_ids)}
+
+
+job_status_poller = JobStatusPoller()
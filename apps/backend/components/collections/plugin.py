@@ -32,6 +32,7 @@ from apps.backend.api.constants import (
     GseDataErrCode,
 )
 from apps.backend.api.job import process_parms
+from apps.backend.components.collections import adaptive_interval
 from apps.backend.components.collections.base import BaseService, CommonData
 from apps.backend.components.collections.common.script_content import INITIALIZE_SCRIPT
 from apps.backend.components.collections.job import (
@@ -240,6 +241,7 @@ class InitProcessStatusService(PluginBaseService):
 
         # 提前查询拓扑顺序，用于策略抑制计算，得到当期策略所属层级
         topo_order = CmdbHandler.get_topo_order()
+        suppression_index = subscription.build_suppression_index(topo_order)
         # 此处steps的长度通常为1或2，此处不必担心时间复杂度问题
         for subscription_step in subscription.steps:
             policy_step_adapter = PolicyStepAdapter(subscription_step)
@@ -253,15 +255,18 @@ class InitProcessStatusService(PluginBaseService):
             )
             group_id_status_map = {status.group_id: status for status in statuses}
             host_id__bk_obj_sub_map = models.Subscription.get_host_id__bk_obj_sub_map(bk_host_ids, plugin_name)
+            # 策略抑制计算
+            suppressed_results = subscription.bulk_check_is_suppressed(
+                action=action,
+                cmdb_host_infos=[
+                    subscription_instance.instance_info["host"] for subscription_instance in subscription_instances
+                ],
+                topo_order=topo_order,
+                host_id__bk_obj_sub_map=host_id__bk_obj_sub_map,
+                suppression_index=suppression_index,
+            )
 
-            for subscription_instance in subscription_instances:
-                # 策略抑制计算
-                result = subscription.check_is_suppressed(
-                    action=action,
-                    cmdb_host_info=subscription_instance.instance_info["host"],
-                    topo_order=topo_order,
-                    host_id__bk_obj_sub_map=host_id__bk_obj_sub_map,
-                )
+            for subscription_instance, result in zip(subscription_instances, suppressed_results):
                 bk_obj_id = result["sub_inst_bk_obj_id"]
 
                 target_host_objs = self.get_target_host_objs(
@@ -1021,12 +1026,16 @@ class RenderAndPushConfigService(PluginBaseService, JobV3BaseService):
         return True
 
 
-class GseOperateProcService(PluginBaseService):
+class GseOperateProcService(adaptive_interval.AdaptivePollingMixin, PluginBaseService):
     """调用GSE接口操作插件进程"""
 
     __need_schedule__ = True
     interval = StaticIntervalGenerator(POLLING_INTERVAL)
 
+    def get_polling_duration_key(self, data) -> str:
+        """历史耗时统计维度：原子类型 + 操作类型"""
+        return f"{self.__class__.__name__}:{data.get_one_of_inputs('op_type')}"
+
     @staticmethod
     def get_plugin_meta_name(plugin: models.GsePluginDesc, process_status: models.ProcessStatus) -> str:
         """
@@ -1240,7 +1249,7 @@ class GseOperateProcService(PluginBaseService):
         if error_code == GseDataErrCode.RUNNING:
             # 只要有运行中的任务，则认为未完成，标记 is_finished
             is_finished = False
-            if polling_time + POLLING_INTERVAL > POLLING_TIMEOUT:
+            if self.get_next_polling_time(polling_time) > POLLING_TIMEOUT:
                 self.move_insts_to_failed([subscription_instance.id], _("GSE任务轮询超时"))
         elif success_conditions:
             # 状态码非 SUCCESS 的，但满足成功的特殊条件，认为是成功的，无需做任何处理
@@ -1264,7 +1273,7 @@ class GseOperateProcService(PluginBaseService):
         api_code = result.get("code")
         if api_code == GSE_RUNNING_TASK_CODE:
             # GSE_RUNNING_TASK_CODE(1000115) 表示查询的任务等待执行中，还未入到 redis（需继续轮询进行查询）
-            data.outputs.polling_time = polling_time + POLLING_INTERVAL
+            data.outputs.polling_time = self.get_next_polling_time(polling_time)
             return True
 
         polling_time = data.get_one_of_outputs("polling_time")
@@ -1290,8 +1299,10 @@ class GseOperateProcService(PluginBaseService):
             )
 
         if is_finished:
+            # 记录 GSE 任务耗时，用于预测同类任务的完成时间
+            self.record_polling_elapsed()
             self.finish_schedule()
-        data.outputs.polling_time = polling_time + POLLING_INTERVAL
+        data.outputs.polling_time = self.get_next_polling_time(polling_time)
         return True
 
     def outputs_format(self):
@@ -124,6 +124,9 @@ class AgentMigrateType(enum.EnhanceEnum):
 # redis键名模板
 REDIS_INSTALL_CALLBACK_KEY_TPL = f"{settings.APP_CODE}:backend:agent:log:list:" + "{sub_inst_id}"
 
+# 批量拉取安装回调日志时，单个 Pipeline 包含的订阅实例数
+REDIS_INSTALL_CALLBACK_DRAIN_BATCH_SIZE = 500
+
 # redis Gse Agent 配置缓存
 REDIS_AGENT_CONF_KEY_TPL = f"{settings.APP_CODE}:backend:agent:config:" + "{file_name}:str:{sub_inst_id}"
 
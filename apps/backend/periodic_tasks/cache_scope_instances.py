@@ -30,7 +30,7 @@ def get_instances_by_scope_task(subscription_id):
         f"[cache_scope_instances] (subscription: {subscription_id}) start."
         f" scope_md5: {scope_md5}, scope: {subscription.scope}"
     )
-    # 查询后会进行缓存，详见 get_instances_by_scope 的装饰器 func_cache_decorator
+    # 查询后会进行缓存，详见 get_instances_by_scope 的装饰器 scope_instance_cache_decorator
     tools.get_instances_by_scope(subscription.scope)
     logger.info(f"[cache_subscription_scope_instances] (subscription: {subscription_id}) end.")
 
@@ -10,17 +10,17 @@ specific language governing permissions and limitations under the License.
 """
 
 import logging
+from collections import defaultdict
 from datetime import timedelta
+from typing import Dict, List
 
 from celery.task import periodic_task
-from django.db.models import Value
-from django.db.models.functions import Concat
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
+from apps.backend.components.collections.base import LogMaker, write_log_lines
 from apps.backend.subscription.constants import CHECK_ZOMBIE_SUB_INST_RECORD_INTERVAL
 from apps.node_man import constants, models
-from apps.utils.time_handler import strftime_local
 
 logger = logging.getLogger("celery")
 
@@ -49,17 +49,31 @@ def check_zombie_sub_inst_record():
     }
     base_update_kwargs = {"status": constants.JobStatusType.FAILED, "update_time": timezone.now()}
 
-    forced_failed_inst_num = models.SubscriptionInstanceRecord.objects.filter(**query_kwargs).update(
-        **base_update_kwargs
+    # 经由执行进度更新订阅实例状态，保证强制失败的实例同步计入所属任务的状态统计
+    zombie_inst_ids: List[int] = list(
+        models.SubscriptionInstanceRecord.objects.filter(**query_kwargs).values_list("id", flat=True)
     )
-
-    forced_failed_status_detail_num = models.SubscriptionInstanceStatusDetail.objects.filter(**query_kwargs).update(
-        **base_update_kwargs,
-        log=Concat(
-            "log", Value(_("\n[{time_str} ERROR] 任务长时间处在执行状态，已强制失败").format(time_str=strftime_local(timezone.now())))
-        ),
+    forced_failed_inst_num = models.SubscriptionTaskProgress.bulk_set_record_status(
+        zombie_inst_ids, **base_update_kwargs
     )
 
+    node_id__sub_inst_ids_map: Dict[str, List[int]] = defaultdict(list)
+    zombie_status_detail_ids: List[int] = []
+    for status_detail_id, node_id, sub_inst_id in models.SubscriptionInstanceStatusDetail.objects.filter(
+        **query_kwargs
+    ).values_list("id", "node_id", "subscription_instance_record_id"):
+        zombie_status_detail_ids.append(status_detail_id)
+        node_id__sub_inst_ids_map[node_id].append(sub_inst_id)
+
+    forced_failed_status_detail_num = models.SubscriptionInstanceStatusDetail.objects.filter(
+        id__in=zombie_status_detail_ids
+    ).update(**base_update_kwargs)
+
+    # 与原子日志一致，强制失败的日志追加写入日志表，保证展示在原子已有日志之后
+    log_content: str = LogMaker().error_log(_("任务长时间处在执行状态，已强制失败"))
+    for node_id, sub_inst_ids in node_id__sub_inst_ids_map.items():
+        write_log_lines(node_id, [(sub_inst_ids, log_content)])
+
     logger.info(
         f"periodic_task -> check_zombie_sub_inst_record, number_of_forced_failed_inst -> {forced_failed_inst_num}, "
         f"forced_failed_status_detail_num -> {forced_failed_status_detail_num}"
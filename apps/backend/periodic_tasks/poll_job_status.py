@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import logging
+
+from celery.task import periodic_task
+from django.conf import settings
+
+from apps.backend.api.constants import POLLING_INTERVAL
+from apps.backend.components.collections.job_poller import job_status_poller
+from apps.core.concurrent.lock import RedisLock
+
+logger = logging.getLogger("celery")
+
+
+@periodic_task(
+    run_every=POLLING_INTERVAL,
+    queue="backend",  # 这个是用来在代码调用中指定队列的，例如： update_subscription_instances.delay()
+    options={"queue": "backend"},  # 这个是用来celery beat调度指定队列的
+    ignore_result=True,
+)
+def poll_job_status():
+    """集中轮询作业平台执行状态，供 JobV3BaseService 的调度节点读取"""
+    if not settings.JOB_STATUS_POLLER_ENABLE or job_status_poller.redis_inst is None:
+        return
+
+    # 同一时刻仅允许一个轮询任务执行，上一轮未结束时跳过本轮
+    with RedisLock(lock_name="periodic_task:poll_job_status", lock_expire=POLLING_INTERVAL * 6) as identifier:
+        if identifier is None:
+            logger.info("periodic_task -> poll_job_status, previous round is still running, skipped")
+            return
+        stats = job_status_poller.poll_once()
+
+    logger.info(f"periodic_task -> poll_job_status, stats -> {stats}")
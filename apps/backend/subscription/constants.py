@@ -30,5 +30,20 @@ MAX_RETRY_TIME = 3
 # 单个任务主机数量
 TASK_HOST_LIMIT = 500
 
+# 创建任务时订阅实例分块写入及编排的实例数量，订阅实例数超过该值时启用分块模式，小于等于 0 表示不分块
+CREATE_TASK_CHUNK_SIZE = 5000
+
 # 订阅范围实例缓存时间，比自动下发周期多1小时
 SUBSCRIPTION_SCOPE_CACHE_TIME = SUBSCRIPTION_UPDATE_INTERVAL + constants.TimeUnit.HOUR
+
+# 订阅范围实例缓存逻辑过期后仍可返回旧数据的时长，期间由后台重算刷新缓存
+SUBSCRIPTION_SCOPE_CACHE_STALE_TIME = constants.TimeUnit.HOUR
+
+# 订阅范围实例缓存压缩后的分片大小（字节）
+SUBSCRIPTION_SCOPE_CACHE_CHUNK_SIZE = 512 * 1024
+
+# 订阅范围实例重算锁的超时时间，防止持锁进程异常退出后锁无法释放
+SUBSCRIPTION_SCOPE_CACHE_LOCK_TIMEOUT = 10 * constants.TimeUnit.MINUTE
+
+# 缓存未命中且其他进程正在重算时的最长等待时间（秒），超时后自行重算
+SUBSCRIPTION_SCOPE_CACHE_WAIT_TIMEOUT = constants.TimeUnit.MINUTE
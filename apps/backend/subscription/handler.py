@@ -150,25 +150,39 @@ class SubscriptionHandler(object):
         if exclude_instance_ids:
             is_query_change = True
 
-        all_instance_record_ids = SubscriptionTools.fetch_latest_record_ids_in_same_inst_id(
-            models.SubscriptionInstanceRecord.objects.filter(**base_kwargs)
-        )
-
-        if is_query_change:
-            # 附加搜索条件要在聚合之后进行搜索否则会导致搜索结果不正确，聚合之后才是实例的最新记录，需要在最新的记录之上进行搜索
-            filter_kwargs["id__in"] = all_instance_record_ids
-            filtered_instance_record_ids = list(
-                models.SubscriptionInstanceRecord.objects.filter(**filter_kwargs)
-                .exclude(instance_id__in=exclude_instance_ids)
-                .values_list("id", flat=True)
+        # 单任务视图下同一实例仅有一条执行记录，存在物化进度时无需聚合实例的最新记录
+        task_progress: Optional[models.SubscriptionTaskProgress] = None
+        if len(task_id_list) == 1 and set(base_kwargs.keys()) == {"subscription_id", "task_id__in"}:
+            task_progress = models.SubscriptionTaskProgress.objects.filter(
+                subscription_id=self.subscription_id, task_id__in=task_id_list
+            ).first()
+
+        if task_progress:
+            instance_record_qs = models.SubscriptionInstanceRecord.objects.filter(**filter_kwargs).exclude(
+                instance_id__in=exclude_instance_ids
             )
+            total: int = instance_record_qs.count() if is_query_change else task_progress.total_count
+            page_instance_record_ids = list(instance_record_qs.order_by("id").values_list("id", flat=True)[begin:end])
         else:
-            filtered_instance_record_ids = all_instance_record_ids
+            all_instance_record_ids = SubscriptionTools.fetch_latest_record_ids_in_same_inst_id(
+                models.SubscriptionInstanceRecord.objects.filter(**base_kwargs)
+            )
+
+            if is_query_change:
+                # 附加搜索条件要在聚合之后进行搜索否则会导致搜索结果不正确，聚合之后才是实例的最新记录，需要在最新的记录之上进行搜索
+                filter_kwargs["id__in"] = all_instance_record_ids
+                filtered_instance_record_ids = list(
+                    models.SubscriptionInstanceRecord.objects.filter(**filter_kwargs)
+                    .exclude(instance_id__in=exclude_instance_ids)
+                    .values_list("id", flat=True)
+                )
+            else:
+                filtered_instance_record_ids = all_instance_record_ids
+            total = len(filtered_instance_record_ids)
+            page_instance_record_ids = sorted(filtered_instance_record_ids)[begin:end]
 
         # 查询这些任务下的全部最新instance记录
-        instance_records = models.SubscriptionInstanceRecord.objects.filter(
-            id__in=sorted(filtered_instance_record_ids)[begin:end]
-        )
+        instance_records = models.SubscriptionInstanceRecord.objects.filter(id__in=page_instance_record_ids)
         instance_records = sorted(instance_records, key=lambda record: -record.id)
 
         if not instance_records and (pagesize == -1 and not return_all):
@@ -186,16 +200,19 @@ class SubscriptionHandler(object):
             return instance_status_list
 
         # 显示订阅全局的状态统计
-        status_counter = dict(
-            Counter(
-                models.SubscriptionInstanceRecord.objects.filter(
-                    subscription_id=self.subscription_id, id__in=all_instance_record_ids
-                ).values_list("status", flat=True)
+        if task_progress:
+            status_counter = task_progress.status_counter
+        else:
+            status_counter = dict(
+                Counter(
+                    models.SubscriptionInstanceRecord.objects.filter(
+                        subscription_id=self.subscription_id, id__in=all_instance_record_ids
+                    ).values_list("status", flat=True)
+                )
             )
-        )
-        status_counter["total"] = sum(list(status_counter.values()))
+            status_counter["total"] = sum(list(status_counter.values()))
         return {
-            "total": len(filtered_instance_record_ids),
+            "total": total,
             "list": instance_status_list,
             "status_counter": status_counter,
         }
@@ -280,9 +297,7 @@ class SubscriptionHandler(object):
 
         # 提前失败
         instance_record_ids = [instance_record["id"] for instance_record in instance_records]
-        models.SubscriptionInstanceRecord.objects.filter(id__in=instance_record_ids).update(
-            status=constants.JobStatusType.FAILED
-        )
+        models.SubscriptionTaskProgress.bulk_set_record_status(instance_record_ids, constants.JobStatusType.FAILED)
         # 延迟双更，避免终止前订阅实例状态被base覆盖
         tasks.set_record_status.delay(
             instance_record_ids=instance_record_ids, status=constants.JobStatusType.FAILED, delay_seconds=1
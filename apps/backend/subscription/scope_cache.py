@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import logging
+import threading
+import time
+import uuid
+import zlib
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional
+
+import ujson as json
+from django.core.cache import cache
+from django.db import connections
+
+from apps.backend.subscription import constants
+from apps.prometheus import metrics
+from apps.utils.cache import format_cache_key
+
+logger = logging.getLogger("app")
+
+
+class ScopeInstanceCache:
+    """
+    订阅范围实例缓存
+    1. 实例序列化后压缩，并按固定大小分片存储，避免单个缓存值过大
+    2. 同一缓存键同时只允许一个重算：进程内通过分段线程锁合并，跨进程通过缓存锁合并（single-flight）
+    3. 缓存逻辑过期后、物理过期前仍返回旧数据，同时在后台重算刷新（stale-while-revalidate）
+    """
+
+    KEY_PREFIX = "scope_instance_cache"
+
+    # 等待其他进程重算时的轮询间隔（秒）
+    POLL_INTERVAL = 0.5
+
+    # 进程内锁分段数
+    LOCAL_LOCK_NUM = 64
+
+    # 压缩级别，兼顾压缩率与速度
+    COMPRESS_LEVEL = 6
+
+    def __init__(
+        self,
+        cache_time: int,
+        stale_time: int = constants.SUBSCRIPTION_SCOPE_CACHE_STALE_TIME,
+        chunk_size: int = constants.SUBSCRIPTION_SCOPE_CACHE_CHUNK_SIZE,
+        lock_timeout: int = constants.SUBSCRIPTION_SCOPE_CACHE_LOCK_TIMEOUT,
+        wait_timeout: float = constants.SUBSCRIPTION_SCOPE_CACHE_WAIT_TIMEOUT,
+    ):
+        """
+        :param cache_time: 缓存有效期（秒），超过后视为旧数据
+        :param stale_time: 旧数据可继续返回的时长（秒）
+        :param chunk_size: 压缩数据分片大小（字节）
+        :param lock_timeout: 重算锁超时时间（秒）
+        :param wait_timeout: 缓存未命中时等待其他进程重算的最长时间（秒）
+        """
+        self.cache_time = cache_time
+        self.stale_time = stale_time
+        self.chunk_size = chunk_size
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self._local_locks: List[threading.Lock] = [threading.Lock() for __ in range(self.LOCAL_LOCK_NUM)]
+
+    def get_meta_key(self, key: str) -> str:
+        return f"{self.KEY_PREFIX}:{key}:meta"
+
+    def get_lock_key(self, key: str) -> str:
+        return f"{self.KEY_PREFIX}:{key}:lock"
+
+    def get_chunk_key(self, key: str, version: str, idx: int) -> str:
+        return f"{self.KEY_PREFIX}:{key}:{version}:{idx}"
+
+    def get_local_lock(self, key: str) -> threading.Lock:
+        return self._local_locks[hash(key) % self.LOCAL_LOCK_NUM]
+
+    def set(self, key: str, instances: Dict[str, Any]):
+        """
+        写入缓存，数据以新版本号写入后再切换元数据，读取方不会读到新旧混杂的分片
+        :param key: 缓存键
+        :param instances: 实例数据
+        :return:
+        """
+        raw: bytes = json.dumps(instances).encode()
+        payload: bytes = zlib.compress(raw, self.COMPRESS_LEVEL)
+        version: str = uuid.uuid4().hex
+        chunk_key__chunk_map: Dict[str, bytes] = {
+            self.get_chunk_key(key, version, idx): payload[begin : begin + self.chunk_size]
+            for idx, begin in enumerate(range(0, len(payload), self.chunk_size))
+        }
+        timeout: int = self.cache_time + self.stale_time
+        cache.set_many(chunk_key__chunk_map, timeout)
+
+        meta_key: str = self.get_meta_key(key)
+        old_meta: Optional[Dict[str, Any]] = cache.get(meta_key)
+        cache.set(
+            meta_key,
+            {
+                "version": version,
+                "chunk_num": len(chunk_key__chunk_map),
+                "fresh_until": time.time() + self.cache_time,
+                "size": len(raw),
+                "compressed_size": len(payload),
+            },
+            timeout,
+        )
+        if old_meta:
+            # 旧版本分片不再被引用，及时清理；正在读取旧版本的请求会回落到重新加载
+            cache.delete_many(
+                [self.get_chunk_key(key, old_meta["version"], idx) for idx in range(old_meta["chunk_num"])]
+            )
+
+        metrics.scope_instance_cache_payload_bytes.labels("raw").observe(len(raw))
+        metrics.scope_instance_cache_payload_bytes.labels("compressed").observe(len(payload))
+
+    def read(self, key: str, meta: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        根据元数据读取缓存，分片缺失时返回 None
+        :param key: 缓存键
+        :param meta: 元数据
+        :return:
+        """
+        chunk_keys: List[str] = [self.get_chunk_key(key, meta["version"], idx) for idx in range(meta["chunk_num"])]
+        chunk_key__chunk_map: Dict[str, bytes] = cache.get_many(chunk_keys)
+        if len(chunk_key__chunk_map) != len(chunk_keys):
+            return None
+        payload: bytes = b"".join(chunk_key__chunk_map[chunk_key] for chunk_key in chunk_keys)
+        return json.loads(zlib.decompress(payload).decode())
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        获取缓存，包含元数据及实例数据，未命中时返回 None
+        :param key: 缓存键
+        :return:
+        """
+        meta: Optional[Dict[str, Any]] = cache.get(self.get_meta_key(key))
+        if not meta:
+            return None
+        instances: Optional[Dict[str, Any]] = self.read(key, meta)
+        if instances is None:
+            return None
+        return {"meta": meta, "instances": instances}
+
+    def refresh(self, key: str, loader: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        重新计算并写入缓存
+        :param key: 缓存键
+        :param loader: 实例数据加载函数
+        :return:
+        """
+        instances: Dict[str, Any] = loader()
+        self.set(key, instances)
+        return instances
+
+    def get_or_load(self, key: str, loader: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        优先从缓存获取，旧数据直接返回并触发后台重算，未命中时仅由一个请求重算，其余请求等待结果
+        :param key: 缓存键
+        :param loader: 实例数据加载函数
+        :return:
+        """
+        cache_data: Optional[Dict[str, Any]] = self.get(key)
+        if cache_data is not None:
+            if time.time() < cache_data["meta"]["fresh_until"]:
+                metrics.scope_instance_cache_requests_total.labels("hit").inc()
+            else:
+                metrics.scope_instance_cache_requests_total.labels("stale").inc()
+                self.revalidate_async(key, loader)
+            return cache_data["instances"]
+
+        with self.get_local_lock(key):
+            # 获得进程内锁后再次检查，同进程其他线程可能已完成重算
+            cache_data = self.get(key)
+            if cache_data is not None:
+                metrics.scope_instance_cache_requests_total.labels("wait").inc()
+                return cache_data["instances"]
+
+            metrics.scope_instance_cache_requests_total.labels("miss").inc()
+            lock_key: str = self.get_lock_key(key)
+            if cache.add(lock_key, 1, self.lock_timeout):
+                try:
+                    return self.refresh(key, loader)
+                finally:
+                    cache.delete(lock_key)
+
+            # 其他进程正在重算，等待其写入缓存
+            deadline: float = time.time() + self.wait_timeout
+            while time.time() < deadline:
+                time.sleep(self.POLL_INTERVAL)
+                cache_data = self.get(key)
+                if cache_data is not None:
+                    return cache_data["instances"]
+
+            logger.warning(f"[ScopeInstanceCache] wait for {key} timeout after {self.wait_timeout}s, load directly")
+            return self.refresh(key, loader)
+
+    def revalidate_async(self, key: str, loader: Callable[[], Dict[str, Any]]):
+        """
+        后台重算缓存，已有重算进行中时跳过
+        :param key: 缓存键
+        :param loader: 实例数据加载函数
+        :return:
+        """
+        lock_key: str = self.get_lock_key(key)
+        if not cache.add(lock_key, 1, self.lock_timeout):
+            return
+
+        def _revalidate():
+            try:
+                self.refresh(key, loader)
+            except Exception:
+                logger.exception(f"[ScopeInstanceCache] revalidate {key} failed")
+            finally:
+                cache.delete(lock_key)
+                # 后台线程使用独立的数据库连接，结束时主动关闭
+                connections.close_all()
+
+        threading.Thread(target=_revalidate, daemon=True).start()
+
+
+def scope_instance_cache_decorator(scope_instance_cache: ScopeInstanceCache):
+    """
+    订阅范围实例缓存装饰器，调用方式与 func_cache_decorator 保持一致
+    get_cache=True 时优先读取缓存，否则重新计算并刷新缓存
+    :param scope_instance_cache: 订阅范围实例缓存
+    """
+
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            get_cache = kwargs.pop("get_cache", False)
+            cache_key = format_cache_key(func, *args, **kwargs)
+
+            def loader():
+                return func(*args, **kwargs)
+
+            if get_cache:
+                return scope_instance_cache.get_or_load(cache_key, loader)
+            return scope_instance_cache.refresh(cache_key, loader)
+
+        return wrapper
+
+    return decorate
@@ -13,7 +13,6 @@ import traceback
 from collections import defaultdict
 from typing import Any, Dict, List, Optional
 
-from django.db import transaction
 from django.db.models import QuerySet
 from django.utils import timezone
 
@@ -109,16 +108,25 @@ class TaskResultTools:
                 pipeline_id=subscription_task["pipeline_id"]
             )
 
+        sub_inst_ids = set([inst_record.id for inst_record in instance_records])
         fields = ["id", "subscription_instance_record_id", "node_id", "status", "update_time", "create_time"]
         if need_detail:
             fields.append("log")
         node_id_inst_status_detail_map = {
-            f"{status_detail['node_id']}-{status_detail['subscription_instance_record_id']}": status_detail
+            models.SubscriptionInstanceStatusLog.make_key(
+                status_detail["node_id"], status_detail["subscription_instance_record_id"]
+            ): status_detail
             for status_detail in models.SubscriptionInstanceStatusDetail.objects.filter(
-                subscription_instance_record_id__in=set([inst_record.id for inst_record in instance_records])
+                subscription_instance_record_id__in=sub_inst_ids
             ).values(*fields)
         }
 
+        # 仅在需要详情时加载追加日志，并拼接到状态表中记录的初始日志之后
+        if need_detail:
+            key__log_map = models.SubscriptionInstanceStatusLog.get_key__log_map(sub_inst_ids)
+            for key, status_detail in node_id_inst_status_detail_map.items():
+                status_detail["log"] = status_detail["log"] + key__log_map.get(key, "")
+
         instance_status_list = []
         for instance_record in instance_records:
             # 兼容订阅任务不存在的情况
@@ -302,11 +310,8 @@ def update_inst_record_status(
     for instance_status in instance_status_list:
         record_id_gby_status[instance_status["status"]].append(instance_status["record_id"])
 
-    with transaction.atomic():
-        for status, record_ids in record_id_gby_status.items():
-            models.SubscriptionInstanceRecord.objects.filter(id__in=record_ids).update(
-                status=status, update_time=timezone.now()
-            )
+    # 全部状态分组在同一次调用中处理：先锁定全部实例再更新进度，与原子的状态写入保持相同的加锁顺序
+    models.SubscriptionTaskProgress.bulk_set_record_statuses(record_id_gby_status, update_time=timezone.now())
 
 
 def transfer_instance_record_status(subscription_ids: List[int] = None):
@@ -13,17 +13,18 @@ from __future__ import absolute_import, unicode_literals
 import json
 import logging
 import time
-from collections import OrderedDict, defaultdict
+from collections import Counter, OrderedDict, defaultdict
 from copy import deepcopy
 from functools import wraps
-from typing import Any, Dict, List, Optional, Union
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 from django.utils.translation import ugettext as _
 
 from apps.backend.celery import app
 from apps.backend.components.collections.base import ActivityType
 from apps.backend.subscription import tools
-from apps.backend.subscription.constants import TASK_HOST_LIMIT
+from apps.backend.subscription.constants import CREATE_TASK_CHUNK_SIZE, TASK_HOST_LIMIT
 from apps.backend.subscription.errors import SubscriptionInstanceEmpty
 from apps.backend.subscription.steps import StepFactory, agent
 from apps.core.gray.tools import GrayTools
@@ -31,6 +32,7 @@ from apps.node_man import constants, models
 from apps.node_man import tools as node_man_tools
 from apps.node_man.handlers.cmdb import CmdbHandler
 from apps.utils import translation
+from apps.utils.basic import chunk_lists
 from pipeline import builder
 from pipeline.builder import Data, NodeOutput, ServiceActivity, Var
 from pipeline.core.pipeline import Pipeline
@@ -132,10 +134,54 @@ def build_instances_task(
     return instance_start
 
 
+def iter_bulk_create_instance_records(
+    records: Iterable[models.SubscriptionInstanceRecord], chunk_size: int, batch_size: int
+) -> Iterator[models.SubscriptionInstanceRecord]:
+    """
+    按块批量创建订阅实例，并逐个返回已回填主键的订阅实例
+    数据库支持 bulk_create 返回主键时直接使用，否则仅按当前块的实例 ID 回查主键，避免全量 IN 查询及重复加载实例信息
+    :param records: 待创建的订阅实例
+    :param chunk_size: 每块实例数量
+    :param batch_size: 单次 INSERT 的实例数量
+    :return:
+    """
+    chunk: List[models.SubscriptionInstanceRecord] = []
+
+    def _create_chunk() -> List[models.SubscriptionInstanceRecord]:
+        models.SubscriptionInstanceRecord.objects.bulk_create(chunk, batch_size=batch_size)
+        # 同一批订阅实例源于同一个订阅任务，按块累加任务执行进度
+        models.SubscriptionTaskProgress.incr_created_records(
+            task_id=chunk[0].task_id,
+            subscription_id=chunk[0].subscription_id,
+            status_counter=dict(Counter(record.status for record in chunk)),
+        )
+        records_without_pk = [record for record in chunk if record.pk is None]
+        if not records_without_pk:
+            return chunk
+        # 同一任务下，实例 ID 唯一确定一条订阅实例记录
+        instance_id__record_id_map: Dict[str, int] = dict(
+            models.SubscriptionInstanceRecord.objects.filter(
+                task_id=records_without_pk[0].task_id,
+                instance_id__in=[record.instance_id for record in records_without_pk],
+            ).values_list("instance_id", "id")
+        )
+        for record in records_without_pk:
+            record.id = instance_id__record_id_map[record.instance_id]
+        return chunk
+
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield from _create_chunk()
+            chunk = []
+    if chunk:
+        yield from _create_chunk()
+
+
 def create_pipeline(
     subscription: models.Subscription,
     instances_action: Dict[str, Dict[str, str]],
-    subscription_instances: List[models.SubscriptionInstanceRecord],
+    subscription_instances: Iterable[models.SubscriptionInstanceRecord],
     task_host_limit: int,
 ) -> Pipeline:
     """
@@ -171,43 +217,35 @@ def create_pipeline(
                           EndEvent
     """
 
-    subscription_instance_map: Dict[str, models.SubscriptionInstanceRecord] = {
-        subscription_instance.instance_id: subscription_instance for subscription_instance in subscription_instances
-    }
+    sub_processes = []
+    global_pipeline_data = Data()
+    start_event = builder.EmptyStartEvent()
+
+    def _build_sub_process(_metadata_json_str: str, _sub_insts: List[models.SubscriptionInstanceRecord]):
+        _metadata = json.loads(_metadata_json_str)
+        sub_processes.append(
+            build_instances_task(
+                _sub_insts, _metadata["meta"], _metadata["step_actions"], subscription, global_pipeline_data
+            )
+        )
 
+    # 流式消费订阅实例，同 metadata 的实例每凑满 ${TASK_HOST_LIMIT} 台即编排一条流水线，不保留全量订阅实例
     sub_insts_gby_metadata: Dict[str, List[models.SubscriptionInstanceRecord]] = defaultdict(list)
-    for instance_id, step_actions in instances_action.items():
-        if instance_id not in subscription_instance_map:
+    for sub_inst in subscription_instances:
+        step_actions = instances_action.get(sub_inst.instance_id)
+        if step_actions is None:
             continue
-        sub_inst = subscription_instance_map[instance_id]
         # metadata 包含：meta-任务元数据、step_actions-操作步骤及类型
-        metadata = {"meta": sub_inst.instance_info["meta"], "step_actions": step_actions}
+        metadata_json_str = json.dumps({"meta": sub_inst.instance_info["meta"], "step_actions": step_actions})
         # 聚合同 metadata 的任务
-        sub_insts_gby_metadata[json.dumps(metadata)].append(sub_inst)
+        sub_insts = sub_insts_gby_metadata[metadata_json_str]
+        sub_insts.append(sub_inst)
+        if len(sub_insts) >= task_host_limit:
+            _build_sub_process(metadata_json_str, sub_insts_gby_metadata.pop(metadata_json_str))
 
-    #
-    # # 把同类型操作进行聚合
-    # action_instances = defaultdict(list)
-    # for instance_id, step_actions in instances_action.items():
-    #     if instance_id in subscription_instance_map:
-    #         action_instances[json.dumps(step_actions)].append(subscription_instance_map[instance_id])
-
-    sub_processes = []
-    global_pipeline_data = Data()
-    start_event = builder.EmptyStartEvent()
     for metadata_json_str, sub_insts in sub_insts_gby_metadata.items():
-        start = 0
-        metadata = json.loads(metadata_json_str)
-        while start < len(sub_insts):
-            activities_start_event = build_instances_task(
-                sub_insts[start : start + task_host_limit],
-                metadata["meta"],
-                metadata["step_actions"],
-                subscription,
-                global_pipeline_data,
-            )
-            sub_processes.append(activities_start_event)
-            start = start + task_host_limit
+        _build_sub_process(metadata_json_str, sub_insts)
+
     parallel_gw = builder.ParallelGateway()
     converge_gw = builder.ConvergeGateway()
     end_event = builder.EmptyEndEvent()
@@ -293,114 +331,134 @@ def create_task(
 
     # 前置错误需要跳过的主机，不创建订阅任务实例
     error_hosts = []
-    # 批量创建订阅实例执行记录
-    to_be_created_records_map = {}
-    plugin__host_id__bk_obj_sub_map = {}
+
+    # 按 步骤 + 动作 聚合实例，单次批量计算订阅策略间的抑制关系，抑制索引在任务内仅构造一次
+    suppression_index = subscription.build_suppression_index(topo_order)
+    step_action__instance_ids_map: Dict[Tuple[str, str], List[str]] = defaultdict(list)
     for instance_id, step_action in instance_actions.items():
-        if instance_id not in instances:
-            # instance_id不在instances中，则说明该实例可能已经不在该业务中，因此无法操作，故不处理。
+        # agent 任务无需检查抑制情况
+        if instance_id not in instances or "agent" in step_action:
             continue
+        for step_id, action in step_action.items():
+            step_action__instance_ids_map[(step_id, action)].append(instance_id)
 
-        # 新装AGENT或PROXY会保存安装信息，需要清理
-        need_clean = step_action.get("agent") in [
-            agent.InstallAgent.ACTION_NAME,
-            agent.InstallAgent2.ACTION_NAME,
-            agent.InstallProxy.ACTION_NAME,
-            agent.InstallProxy2.ACTION_NAME,
-        ]
-        instance_info = instances[instance_id]
-        host_info = instance_info["host"]
-        record = models.SubscriptionInstanceRecord(
-            task_id=subscription_task.id,
-            subscription_id=subscription.id,
-            instance_id=instance_id,
-            instance_info=instance_info,
-            steps=[],
-            is_latest=True,
-            need_clean=need_clean,
+    plugin__host_id__bk_obj_sub_map = {}
+    # 仅保留被抑制实例的计算结果，避免大订阅下常驻内存
+    step_instance__suppressed_result_map: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for (step_id, action), suppressed_instance_ids in step_action__instance_ids_map.items():
+        if step_id not in plugin__host_id__bk_obj_sub_map:
+            plugin__host_id__bk_obj_sub_map[step_id] = models.Subscription.get_host_id__bk_obj_sub_map(
+                bk_host_ids, step_id
+            )
+        results = subscription.bulk_check_is_suppressed(
+            action=action,
+            cmdb_host_infos=[instances[instance_id]["host"] for instance_id in suppressed_instance_ids],
+            topo_order=topo_order,
+            host_id__bk_obj_sub_map=plugin__host_id__bk_obj_sub_map[step_id],
+            suppression_index=suppression_index,
         )
-        record.subscription = subscription
-
-        # agent 任务无需检查抑制情况
-        if "agent" in step_action:
-            to_be_created_records_map[instance_id] = record
-            continue
+        for instance_id, result in zip(suppressed_instance_ids, results):
+            if result["is_suppressed"]:
+                step_instance__suppressed_result_map[(step_id, instance_id)] = result
+
+    def _iter_records_to_be_created() -> Iterable[models.SubscriptionInstanceRecord]:
+        """按 instance_actions 顺序生成待创建的订阅实例执行记录，被抑制的实例记入 error_hosts"""
+        for instance_id, step_action in instance_actions.items():
+            if instance_id not in instances:
+                # instance_id不在instances中，则说明该实例可能已经不在该业务中，因此无法操作，故不处理。
+                continue
 
-        is_suppressed = False
-        for step_id, action in step_action.items():
-            if step_id in plugin__host_id__bk_obj_sub_map:
-                host_id__bk_obj_sub_map = plugin__host_id__bk_obj_sub_map.get(step_id)
-            else:
-                host_id__bk_obj_sub_map = models.Subscription.get_host_id__bk_obj_sub_map(bk_host_ids, step_id)
-                plugin__host_id__bk_obj_sub_map[step_id] = host_id__bk_obj_sub_map
-
-            # 检查订阅策略间的抑制关系
-            result = subscription.check_is_suppressed(
-                action=action,
-                cmdb_host_info=record.instance_info["host"],
-                topo_order=topo_order,
-                host_id__bk_obj_sub_map=host_id__bk_obj_sub_map,
+            # 新装AGENT或PROXY会保存安装信息，需要清理
+            need_clean = step_action.get("agent") in [
+                agent.InstallAgent.ACTION_NAME,
+                agent.InstallAgent2.ACTION_NAME,
+                agent.InstallProxy.ACTION_NAME,
+                agent.InstallProxy2.ACTION_NAME,
+            ]
+            instance_info = instances[instance_id]
+            host_info = instance_info["host"]
+            record = models.SubscriptionInstanceRecord(
+                task_id=subscription_task.id,
+                subscription_id=subscription.id,
+                instance_id=instance_id,
+                instance_info=instance_info,
+                steps=[],
+                is_latest=True,
+                need_clean=need_clean,
             )
-            is_suppressed = result["is_suppressed"]
-            if is_suppressed:
-                # 策略被抑制，跳过部署，记为已忽略
-                suppressed_by_id: int = result["suppressed_by"]["subscription_id"]
-                suppressed_by_name: str = result["suppressed_by"]["name"]
-                error_hosts.append(
-                    {
-                        "ip": host_info.get("bk_host_innerip") or host_info.get("bk_host_innerip_v6"),
-                        "inner_ip": host_info.get("bk_host_innerip"),
-                        "inner_ipv6": host_info.get("bk_host_innerip_v6"),
-                        "bk_host_id": host_info.get("bk_host_id"),
-                        "bk_biz_id": host_info.get("bk_biz_id"),
-                        "bk_cloud_id": host_info.get("bk_cloud_id"),
-                        "suppressed_by_id": suppressed_by_id,
-                        "suppressed_by_name": suppressed_by_name,
-                        "os_type": node_man_tools.HostV2Tools.get_os_type(host_info),
-                        "status": constants.JobStatusType.IGNORED,
-                        "msg": _(
-                            "当前{category_alias}（{bk_obj_name} 级）"
-                            "已被优先级更高的{suppressed_by_category_alias}【{suppressed_by_name}(ID: {suppressed_by_id})】"
-                            "（{suppressed_by_obj_name} 级）抑制"
-                        ).format(
-                            category_alias=models.Subscription.CATEGORY_ALIAS_MAP[result["category"]],
-                            bk_obj_name=constants.CmdbObjectId.OBJ_ID_ALIAS_MAP.get(
-                                result["sub_inst_bk_obj_id"],
-                                constants.CmdbObjectId.OBJ_ID_ALIAS_MAP[constants.CmdbObjectId.CUSTOM],
-                            ),
-                            suppressed_by_category_alias=models.Subscription.CATEGORY_ALIAS_MAP[
-                                result["suppressed_by"]["category"]
-                            ],
-                            suppressed_by_name=suppressed_by_name,
-                            suppressed_by_id=suppressed_by_id,
-                            suppressed_by_obj_name=constants.CmdbObjectId.OBJ_ID_ALIAS_MAP.get(
-                                result["suppressed_by"]["bk_obj_id"],
-                                constants.CmdbObjectId.OBJ_ID_ALIAS_MAP[constants.CmdbObjectId.CUSTOM],
+            record.subscription = subscription
+
+            # agent 任务无需检查抑制情况
+            if "agent" in step_action:
+                yield record
+                continue
+
+            is_suppressed = False
+            for step_id in step_action:
+                # 订阅策略间的抑制关系已在前面批量计算，未命中表示未被抑制
+                result = step_instance__suppressed_result_map.get((step_id, instance_id))
+                is_suppressed = result is not None
+                if is_suppressed:
+                    # 策略被抑制，跳过部署，记为已忽略
+                    suppressed_by_id: int = result["suppressed_by"]["subscription_id"]
+                    suppressed_by_name: str = result["suppressed_by"]["name"]
+                    error_hosts.append(
+                        {
+                            "ip": host_info.get("bk_host_innerip") or host_info.get("bk_host_innerip_v6"),
+                            "inner_ip": host_info.get("bk_host_innerip"),
+                            "inner_ipv6": host_info.get("bk_host_innerip_v6"),
+                            "bk_host_id": host_info.get("bk_host_id"),
+                            "bk_biz_id": host_info.get("bk_biz_id"),
+                            "bk_cloud_id": host_info.get("bk_cloud_id"),
+                            "suppressed_by_id": suppressed_by_id,
+                            "suppressed_by_name": suppressed_by_name,
+                            "os_type": node_man_tools.HostV2Tools.get_os_type(host_info),
+                            "status": constants.JobStatusType.IGNORED,
+                            "msg": _(
+                                "当前{category_alias}（{bk_obj_name} 级）"
+                                "已被优先级更高的{suppressed_by_category_alias}【{suppressed_by_name}(ID: {suppressed_by_id})】"
+                                "（{suppressed_by_obj_name} 级）抑制"
+                            ).format(
+                                category_alias=models.Subscription.CATEGORY_ALIAS_MAP[result["category"]],
+                                bk_obj_name=constants.CmdbObjectId.OBJ_ID_ALIAS_MAP.get(
+                                    result["sub_inst_bk_obj_id"],
+                                    constants.CmdbObjectId.OBJ_ID_ALIAS_MAP[constants.CmdbObjectId.CUSTOM],
+                                ),
+                                suppressed_by_category_alias=models.Subscription.CATEGORY_ALIAS_MAP[
+                                    result["suppressed_by"]["category"]
+                                ],
+                                suppressed_by_name=suppressed_by_name,
+                                suppressed_by_id=suppressed_by_id,
+                                suppressed_by_obj_name=constants.CmdbObjectId.OBJ_ID_ALIAS_MAP.get(
+                                    result["suppressed_by"]["bk_obj_id"],
+                                    constants.CmdbObjectId.OBJ_ID_ALIAS_MAP[constants.CmdbObjectId.CUSTOM],
+                                ),
                             ),
-                        ),
-                    }
-                )
-                break
-        if is_suppressed:
-            continue
-        to_be_created_records_map[instance_id] = record
+                        }
+                    )
+                    break
+            if is_suppressed:
+                continue
+            yield record
 
     # 保存 instance_actions，用于重试场景
     subscription_task.actions = instance_actions
     if preview_only:
         # 仅做预览，不执行下面的代码逻辑，直接返回计算后的结果
         return {
-            "to_be_created_records_map": to_be_created_records_map,
+            "to_be_created_records_map": {record.instance_id: record for record in _iter_records_to_be_created()},
             "error_hosts": error_hosts,
         }
 
-    # 这里反写到 job 表里，与SaaS逻辑耦合了，需解耦
-    if error_hosts:
-        models.Job.objects.filter(subscription_id=subscription.id, task_id_list__contains=subscription_task.id).update(
-            error_hosts=error_hosts
-        )
+    records_to_be_created = _iter_records_to_be_created()
+    first_record = next(records_to_be_created, None)
+    if first_record is None:
+        # 这里反写到 job 表里，与SaaS逻辑耦合了，需解耦
+        if error_hosts:
+            models.Job.objects.filter(
+                subscription_id=subscription.id, task_id_list__contains=subscription_task.id
+            ).update(error_hosts=error_hosts)
 
-    if not to_be_created_records_map:
         logger.warning(f"[create task] skipped: no instances to execute, subscription_task -> {subscription_task}")
         if subscription_task.is_auto_trigger:
             # 如果是自动触发，且没有任何实例，那么直接抛出异常，回滚数据库
@@ -409,27 +467,49 @@ def create_task(
 
         # 非自动触发的直接退出即可
         return {
-            "to_be_created_records_map": to_be_created_records_map,
+            "to_be_created_records_map": {},
             "error_hosts": error_hosts,
         }
+    records_to_be_created = chain([first_record], records_to_be_created)
 
-    # 将最新属性置为False并批量创建订阅实例
-    models.SubscriptionInstanceRecord.objects.filter(
-        subscription_id=subscription.id, instance_id__in=instance_id_list
-    ).update(is_latest=False)
-    models.SubscriptionInstanceRecord.objects.bulk_create(to_be_created_records_map.values(), batch_size=batch_size)
+    # 实例数超过分块阈值时，订阅实例记录按块写入并流式编排 pipeline，不在内存中保留全量实例记录
+    chunk_size = models.GlobalSettings.get_config(
+        models.GlobalSettings.KeyEnum.CREATE_TASK_CHUNK_SIZE.value, default=CREATE_TASK_CHUNK_SIZE
+    )
+    to_be_created_records_map = {}
+    if 0 < chunk_size < len(instance_id_list):
+        logger.info(
+            f"[create task] chunked mode: subscription_task -> {subscription_task}, "
+            f"instance_num -> {len(instance_id_list)}, chunk_size -> {chunk_size}"
+        )
+    else:
+        chunk_size = len(instance_id_list)
+        to_be_created_records_map = {record.instance_id: record for record in records_to_be_created}
+        records_to_be_created = to_be_created_records_map.values()
 
-    # 批量创建订阅实例，由于bulk_create返回的objs没有主键，此处需要重新查出
-    created_instance_records = list(
+    # 将最新属性置为False，需在创建订阅实例前完成
+    for instance_ids in chunk_lists(instance_id_list, chunk_size):
         models.SubscriptionInstanceRecord.objects.filter(
-            subscription_id=subscription.id, instance_id__in=instance_id_list, is_latest=True
-        )
-    )
+            subscription_id=subscription.id, instance_id__in=instance_ids
+        ).update(is_latest=False)
 
     task_host_limit = models.GlobalSettings.get_config(
         models.GlobalSettings.KeyEnum.TASK_HOST_LIMIT.value, default=TASK_HOST_LIMIT
     )
-    pipeline = create_pipeline(subscription, instance_actions, created_instance_records, task_host_limit)
+    # 批量创建订阅实例的同时编排 pipeline
+    pipeline = create_pipeline(
+        subscription,
+        instance_actions,
+        iter_bulk_create_instance_records(records_to_be_created, chunk_size=chunk_size, batch_size=batch_size),
+        task_host_limit,
+    )
+
+    # 实例记录生成完毕后 error_hosts 才完整，这里反写到 job 表里，与SaaS逻辑耦合了，需解耦
+    if error_hosts:
+        models.Job.objects.filter(subscription_id=subscription.id, task_id_list__contains=subscription_task.id).update(
+            error_hosts=error_hosts
+        )
+
     # 保存pipeline id
     subscription_task.pipeline_id = pipeline.id
     subscription_task.save(update_fields=["actions", "pipeline_id"])
@@ -640,7 +720,7 @@ def retry_node(node_id: str):
 def set_record_status(instance_record_ids: List[str], status: str, delay_seconds: float):
     # 不允许长时间占用资源
     time.sleep(delay_seconds if delay_seconds < 2 else 2)
-    models.SubscriptionInstanceRecord.objects.filter(id__in=instance_record_ids).update(status=status)
+    models.SubscriptionTaskProgress.bulk_set_record_status(instance_record_ids, status)
 
 
 @app.task(queue="backend_additional_task", ignore_result=True)
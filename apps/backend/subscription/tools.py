@@ -32,6 +32,10 @@ from apps.backend.subscription.errors import (
     MultipleObjectError,
     PipelineTreeParseError,
 )
+from apps.backend.subscription.scope_cache import (
+    ScopeInstanceCache,
+    scope_instance_cache_decorator,
+)
 from apps.backend.utils.data_renderer import nested_render_data
 from apps.component.esbclient import client_v2
 from apps.exceptions import ComponentCallError
@@ -39,7 +43,6 @@ from apps.node_man import constants, models
 from apps.node_man import tools as node_man_tools
 from apps.utils.basic import chunk_lists, distinct_dict_list, order_dict
 from apps.utils.batch_request import batch_request, request_multi_thread
-from apps.utils.cache import func_cache_decorator
 from apps.utils.time_handler import strftime_local
 
 logger = logging.getLogger("app")
@@ -694,7 +697,7 @@ def support_multi_biz(get_instances_by_scope_func):
 
 
 @support_multi_biz
-@func_cache_decorator(cache_time=SUBSCRIPTION_SCOPE_CACHE_TIME)
+@scope_instance_cache_decorator(ScopeInstanceCache(cache_time=SUBSCRIPTION_SCOPE_CACHE_TIME))
 def get_instances_by_scope(scope: Dict[str, Union[Dict, int, Any]]) -> Dict[str, Dict[str, Union[Dict, Any]]]:
     """
     获取范围内的所有主机
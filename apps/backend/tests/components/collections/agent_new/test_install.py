@@ -14,11 +14,14 @@ import json
 import os
 import random
 import re
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 import mock
 from django.conf import settings
 from django.test import override_settings
+from redis import Redis
+from rediscluster.exceptions import RedisClusterException
+from rediscluster.pipeline import block_pipeline_command
 
 from apps.backend.agent.solution_maker import ExecutionSolution
 from apps.backend.agent.tools import InstallationTools, gen_commands
@@ -45,6 +48,42 @@ from pipeline.component_framework.test import (
 from . import utils
 
 
+class ClusterRedisMock:
+    """模拟集群模式客户端，与 rediscluster 保持一致：Pipeline 不支持事务，且屏蔽脚本等跨节点命令"""
+
+    BLOCKED_PIPELINE_COMMANDS: List[str] = ["evalsha", "script_load", "mget", "mset"]
+
+    def __init__(self, redis_inst: Redis, on_execute: Optional[Callable[[], None]] = None):
+        """
+        :param redis_inst: 实际执行命令的客户端
+        :param on_execute: Pipeline 提交后的回调，用于模拟提交间隙的并发写入
+        """
+        self.redis_inst = redis_inst
+        self.on_execute = on_execute
+
+    def __getattr__(self, item):
+        return getattr(self.redis_inst, item)
+
+    def pipeline(self, transaction=None, shard_hint=None):
+        if transaction:
+            raise RedisClusterException("transaction is deprecated in cluster mode")
+
+        pipeline = self.redis_inst.pipeline(transaction=False)
+        for command in self.BLOCKED_PIPELINE_COMMANDS:
+            setattr(pipeline, command, block_pipeline_command(getattr(Redis, command)))
+
+        execute = pipeline.execute
+
+        def _execute(*args, **kwargs):
+            result = execute(*args, **kwargs)
+            if self.on_execute:
+                self.on_execute()
+            return result
+
+        pipeline.execute = _execute
+        return pipeline
+
+
 class InstallBaseTestCase(utils.AgentServiceBaseTestCase):
 
     OS_TYPE = constants.OsType.LINUX
@@ -278,6 +317,39 @@ class LinuxInstallTestCase(InstallBaseTestCase):
             ],
         )
 
+    def test_drain_report_data(self):
+        sub_inst_ids: List[int] = self.common_inputs["subscription_instance_ids"]
+        name = REDIS_INSTALL_CALLBACK_KEY_TPL.format(sub_inst_id=sub_inst_ids[0])
+        REDIS_INST.delete(name)
+        REDIS_INST.lpush(name, "1", "2")
+        sub_inst_id__report_data_map = install.InstallService.drain_report_data(sub_inst_ids + [-1])
+        # 按上报顺序返回，取出后列表被清空
+        self.assertEqual(sub_inst_id__report_data_map[sub_inst_ids[0]], [b"1", b"2"])
+        self.assertEqual(sub_inst_id__report_data_map[-1], [])
+        self.assertEqual(REDIS_INST.llen(name), 0)
+
+    def test_drain_report_data_with_cluster_client(self):
+        sub_inst_ids: List[int] = self.common_inputs["subscription_instance_ids"]
+        name = REDIS_INSTALL_CALLBACK_KEY_TPL.format(sub_inst_id=sub_inst_ids[0])
+        REDIS_INST.delete(name)
+        REDIS_INST.lpush(name, "1", "2")
+
+        reported: List[int] = []
+
+        def _report_during_drain():
+            # 读取之后、裁剪之前上报新数据
+            if not reported:
+                reported.append(REDIS_INST.lpush(name, "3"))
+
+        with mock.patch.object(install, "REDIS_INST", ClusterRedisMock(REDIS_INST, on_execute=_report_during_drain)):
+            sub_inst_id__report_data_map = install.InstallService.drain_report_data(sub_inst_ids + [-1])
+            self.assertEqual(sub_inst_id__report_data_map[sub_inst_ids[0]], [b"1", b"2"])
+            self.assertEqual(sub_inst_id__report_data_map[-1], [])
+            # 拉取间隙新上报的数据不会丢失，在下一次拉取时返回
+            sub_inst_id__report_data_map = install.InstallService.drain_report_data(sub_inst_ids)
+            self.assertEqual(sub_inst_id__report_data_map[sub_inst_ids[0]], [b"3"])
+        self.assertEqual(REDIS_INST.llen(name), 0)
+
 
 class InstallWindowsSSHTestCase(InstallBaseTestCase):
     OS_TYPE = constants.OsType.WINDOWS
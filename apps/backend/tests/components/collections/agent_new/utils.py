@@ -602,13 +602,20 @@ class AgentServiceBaseTestCase(CustomAPITestCase, ComponentTestMixin, ABC):
             sub_inst_id = sub_inst_status_detail_obj.subscription_instance_record_id
             sub_inst_id__status_detail_obj_map[sub_inst_id] = sub_inst_status_detail_obj
 
+        key__log_map: Dict[str, str] = models.SubscriptionInstanceStatusLog.get_key__log_map(
+            self.common_inputs["subscription_instance_ids"]
+        )
+
         for sub_inst_obj in self.obj_factory.sub_inst_record_objs:
             print(f"sub_inst_id -> {sub_inst_obj.id} | ip -> {sub_inst_obj.instance_info['host']['bk_host_innerip']}")
             sub_inst_status_detail_obj = sub_inst_id__status_detail_obj_map.get(sub_inst_obj.id)
             if sub_inst_status_detail_obj is None:
                 log = "There is no SubscriptionInstanceStatusDetail"
             else:
-                log = sub_inst_status_detail_obj.log
+                log = sub_inst_status_detail_obj.log + key__log_map.get(
+                    models.SubscriptionInstanceStatusLog.make_key(sub_inst_status_detail_obj.node_id, sub_inst_obj.id),
+                    "",
+                )
             # 多行缩进，参考：https://stackoverflow.com/questions/8234274/
             print(textwrap.indent(log, 4 * " "))
 
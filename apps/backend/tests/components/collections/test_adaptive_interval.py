@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import mock
+
+from apps.backend.components.collections import adaptive_interval
+from apps.backend.components.collections.adaptive_interval import (
+    AdaptiveIntervalGenerator,
+)
+from apps.utils.unittest.testcase import CustomBaseTestCase
+
+
+class AdaptiveIntervalGeneratorTestCase(CustomBaseTestCase):
+
+    OVERWRITE_OBJ__KV_MAP = {
+        adaptive_interval.settings: {
+            "BACKEND_POLLING_MIN_INTERVAL": 1,
+            "BACKEND_POLLING_MAX_INTERVAL": 30,
+            "BACKEND_POLLING_BUDGET_PER_SECOND": 0,
+        }
+    }
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.now = 1000
+        mock.patch.object(adaptive_interval.time, "time", side_effect=lambda: self.now).start()
+
+    def tearDown(self) -> None:
+        mock.patch.stopall()
+        super().tearDown()
+
+    def take_intervals(self, generator: AdaptiveIntervalGenerator, times: int):
+        intervals = []
+        for __ in range(times):
+            interval = generator.next()
+            intervals.append(interval)
+            self.now += interval
+        return intervals
+
+    def test_backoff_without_history(self):
+        generator = AdaptiveIntervalGenerator()
+        # 从最小间隔开始，按 1 + BACKOFF_RATIO 倍退避，不超过最大间隔
+        self.assertEqual(self.take_intervals(generator, 8), [1, 1, 1, 2, 3, 4, 6, 9])
+        self.assertEqual(self.take_intervals(generator, 4), [14, 21, 30, 30])
+
+    def test_wait_for_expected_duration(self):
+        generator = AdaptiveIntervalGenerator(expected_duration=25)
+        # 先等待至预测完成时间（平均耗时 * PREDICT_RATIO），再从最小间隔开始退避
+        self.assertEqual(self.take_intervals(generator, 4), [20, 1, 1, 1])
+        # 预测耗时超过最大间隔时，最长等待不超过最大间隔
+        generator = AdaptiveIntervalGenerator(expected_duration=100)
+        self.assertEqual(self.take_intervals(generator, 3), [30, 30, 20])
+
+    def test_budget(self):
+        generator = AdaptiveIntervalGenerator(expected_duration=10)
+        with mock.patch.object(adaptive_interval, "get_budget_factor", return_value=2):
+            self.assertEqual(generator.next(), 16)
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import time
+from unittest.mock import MagicMock, patch
+
+from django.test import override_settings
+
+from apps.backend.components.collections.job import JobExecuteScriptService
+from apps.backend.components.collections.job_poller import JobStatusPoller
+from apps.mock_data.api_mkd.job.utils import FakeJobApi
+from apps.node_man import constants, models
+from apps.utils.unittest.testcase import CustomBaseTestCase
+
+
+class JobStatusPollerForTest(JobStatusPoller):
+    KEY_PREFIX = "node_man:test:job_status_poller"
+
+
+class JobStatusPollerTestCase(CustomBaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.fake_job_api = FakeJobApi(min_duration=0, max_duration=0)
+        self.poller = JobStatusPollerForTest(
+            query_func=self.fake_job_api.get_job_instance_status, max_queries_per_round=2, interval=1
+        )
+        self.job_instance_ids = [self.fake_job_api.fast_execute_script({})["job_instance_id"] for __ in range(3)]
+
+    def tearDown(self) -> None:
+        self.poller.redis_inst.delete(
+            self.poller.pending_key,
+            self.poller.heartbeat_key,
+            *[self.poller.get_status_key(job_instance_id) for job_instance_id in self.job_instance_ids],
+        )
+        super().tearDown()
+
+    def test_poll_once(self):
+        # 重复登记会被去重
+        self.poller.register(self.job_instance_ids)
+        self.poller.register(self.job_instance_ids)
+
+        # 每轮最多查询 max_queries_per_round 个作业
+        self.assertEqual(self.poller.poll_once(), {"queried": 2, "finished": 2})
+        self.assertEqual(self.poller.poll_once(), {"queried": 1, "finished": 1})
+        self.assertEqual(self.poller.poll_once(), {"queried": 0, "finished": 0})
+        self.assertEqual(self.fake_job_api.call_counter["get_job_instance_status"], 3)
+
+        self.assertEqual(
+            self.poller.get_finished_statuses(self.job_instance_ids),
+            {job_instance_id: constants.BkJobStatus.SUCCEEDED for job_instance_id in self.job_instance_ids},
+        )
+
+    def test_reschedule_unfinished(self):
+        self.fake_job_api.job_instance_id__finish_time_map[self.job_instance_ids[0]] = time.time() + 60
+        self.poller.register(self.job_instance_ids[:1])
+
+        self.assertEqual(self.poller.poll_once(), {"queried": 1, "finished": 0})
+        # 未结束的作业按轮询间隔重新排期，本轮不会被重复查询
+        self.assertEqual(self.poller.poll_once(), {"queried": 0, "finished": 0})
+        self.assertEqual(self.poller.get_finished_statuses(self.job_instance_ids[:1]), {})
+
+        self.poller.unregister(self.job_instance_ids[:1])
+        self.assertEqual(self.poller.redis_inst.zcard(self.poller.pending_key), 0)
+
+    def test_filter_untracked(self):
+        self.poller.register(self.job_instance_ids[:1])
+        self.assertEqual(self.poller.filter_untracked(self.job_instance_ids), self.job_instance_ids[1:])
+
+
+@override_settings(JOB_STATUS_POLLER_ENABLE=True)
+class UpdateJobStatusesTestCase(CustomBaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.fake_job_api = FakeJobApi(min_duration=0, max_duration=0)
+        self.poller = JobStatusPollerForTest(query_func=self.fake_job_api.get_job_instance_status, interval=1)
+        self.job_instance_ids = [self.fake_job_api.fast_execute_script({})["job_instance_id"] for __ in range(3)]
+        # 心跳正常，调度节点依赖轮询结果
+        self.poller.redis_inst.set(self.poller.heartbeat_key, time.time())
+        patch("apps.backend.components.collections.job.job_status_poller", self.poller).start()
+        patch("apps.backend.components.collections.job.JobApi", self.fake_job_api).start()
+
+        self.service = JobExecuteScriptService()
+        self.service.handle_job_status = MagicMock()
+        self.job_sub_maps = [
+            models.JobSubscriptionInstanceMap(job_instance_id=job_instance_id, node_id="node_id")
+            for job_instance_id in self.job_instance_ids
+        ]
+
+    def tearDown(self) -> None:
+        patch.stopall()
+        self.poller.redis_inst.delete(
+            self.poller.pending_key,
+            self.poller.heartbeat_key,
+            *[self.poller.get_status_key(job_instance_id) for job_instance_id in self.job_instance_ids],
+        )
+        super().tearDown()
+
+    def test_untracked_jobs(self):
+        finished_job_id, tracked_job_id, untracked_job_id = self.job_instance_ids
+        # 已被轮询到结束状态的作业
+        self.poller.redis_inst.set(self.poller.get_status_key(finished_job_id), constants.BkJobStatus.SUCCEEDED)
+        # 仍在轮询中的作业
+        self.poller.register([tracked_job_id])
+        # 登记失败或结束状态缓存已过期、且仍在执行的作业
+        self.fake_job_api.job_instance_id__finish_time_map[untracked_job_id] = time.time() + 60
+
+        self.service.update_job_statuses(self.job_sub_maps)
+
+        # 仅未被跟踪的作业直接请求作业平台
+        self.assertEqual(self.fake_job_api.call_counter["get_job_instance_status"], 1)
+        self.assertEqual(
+            sorted(
+                (call[1]["job_sub_map"].job_instance_id, call[1]["job_status"])
+                for call in self.service.handle_job_status.call_args_list
+            ),
+            [(finished_job_id, constants.BkJobStatus.SUCCEEDED), (untracked_job_id, constants.BkJobStatus.RUNNING)],
+        )
+        # 未结束的作业重新登记，交由轮询器跟踪
+        self.assertEqual(self.poller.filter_untracked(self.job_instance_ids), [finished_job_id])
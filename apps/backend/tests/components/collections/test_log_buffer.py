@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from apps.backend.components.collections.base import LogBuffer, LogMaker, LogMixin
+from apps.node_man import constants, models
+from apps.utils.unittest.testcase import CustomBaseTestCase
+
+
+class LogServiceForTest(LogMixin):
+    def __init__(self, node_id: str):
+        self.id = node_id
+        self.log_maker = LogMaker()
+
+
+class LogBufferTestCase(CustomBaseTestCase):
+
+    NODE_ID = "node_id_for_test"
+    SUB_INST_IDS = [1, 2, 3]
+
+    def setUp(self) -> None:
+        super().setUp()
+        models.SubscriptionInstanceStatusDetail.objects.bulk_create(
+            [
+                models.SubscriptionInstanceStatusDetail(
+                    subscription_instance_record_id=sub_inst_id,
+                    node_id=self.NODE_ID,
+                    status=constants.JobStatusType.RUNNING,
+                    log="start",
+                )
+                for sub_inst_id in self.SUB_INST_IDS
+            ]
+        )
+        self.service = LogServiceForTest(self.NODE_ID)
+
+    def test_buffered_log(self):
+        self.service.log_buffer = LogBuffer(node_id=self.NODE_ID)
+        self.service.log_info(sub_inst_ids=1, log_content="first")
+        self.service.log_error(sub_inst_ids=[1, 2], log_content="second")
+        self.service.log_warning(log_content="third")
+
+        # 缓冲期间不落库
+        self.assertFalse(models.SubscriptionInstanceStatusLog.objects.exists())
+        self.service.flush_log_buffer()
+        self.assertIsNone(self.service.log_buffer)
+
+        key__log_map = models.SubscriptionInstanceStatusLog.get_key__log_map(self.SUB_INST_IDS)
+        log_lines = key__log_map[models.SubscriptionInstanceStatusLog.make_key(self.NODE_ID, 1)].split("\n")[1:]
+        self.assertEqual(len(log_lines), 3)
+        self.assertTrue(log_lines[0].endswith("INFO] first"))
+        self.assertTrue(log_lines[1].endswith("ERROR] second"))
+        self.assertTrue(log_lines[2].endswith("WARNING] third"))
+        self.assertEqual(key__log_map[models.SubscriptionInstanceStatusLog.make_key(self.NODE_ID, 3)].count("\n"), 1)
+
+        # 初始日志保持不变，不再对状态表执行 CONCAT
+        self.assertEqual(set(models.SubscriptionInstanceStatusDetail.objects.values_list("log", flat=True)), {"start"})
+
+    def test_unbuffered_log(self):
+        self.service.log_info(sub_inst_ids=[2], log_content="direct")
+        key__log_map = models.SubscriptionInstanceStatusLog.get_key__log_map([2], node_ids=[self.NODE_ID])
+        self.assertEqual(list(key__log_map.keys()), [models.SubscriptionInstanceStatusLog.make_key(self.NODE_ID, 2)])
@@ -13,7 +13,8 @@ import json
 import os
 import random
 import shutil
-from typing import Dict
+from collections import defaultdict
+from typing import Dict, List
 
 import mock
 from django.conf import settings
@@ -25,7 +26,7 @@ from apps.core.files import constants as core_const
 from apps.mock_data import api_mkd, utils
 from apps.mock_data.api_mkd.gse.utils import GseApiMockClient, get_gse_api_helper
 from apps.node_man import constants
-from apps.node_man.models import AccessPoint, InstallChannel
+from apps.node_man.models import AccessPoint, Host, InstallChannel
 from apps.node_man.tests.utils import create_ap, create_cloud_area, create_host
 from apps.utils import files
 from apps.utils.files import md5sum
@@ -86,6 +87,27 @@ OVERWRITE_OBJ__KV_MAP = {
 }
 
 
+class GseApiHelperMock:
+    """按 GSE 版本记录查询过的主机，并返回 Agent 存活的状态"""
+
+    def __init__(self, gse_version: str, version__hosts_map: Dict[str, List[Dict]]):
+        self.gse_version = gse_version
+        self.version__hosts_map = version__hosts_map
+
+    @staticmethod
+    def get_agent_id(host) -> str:
+        if isinstance(host, dict):
+            return f"{host['bk_cloud_id']}:{host['ip']}"
+        return f"{host.bk_cloud_id}:{host.inner_ip}"
+
+    def list_agent_state(self, hosts: List[Dict]) -> Dict[str, Dict]:
+        self.version__hosts_map[self.gse_version].extend(hosts)
+        return {
+            self.get_agent_id(host): {"version": "", "bk_agent_alive": constants.BkAgentStatus.ALIVE.value}
+            for host in hosts
+        }
+
+
 class TestUpdateProxyFile(CustomBaseTestCase):
     download_files = [file_name for file_set in constants.FILES_TO_PUSH_TO_PROXY for file_name in file_set["files"]]
 
@@ -233,3 +255,35 @@ class TestUpdateProxyFile(CustomBaseTestCase):
             BKREPO_BUCKET=OVERWRITE_OBJ__KV_MAP["settings"]["BKREPO_BUCKET"],
         ):
             self.assertIsNone(call_command("update_proxy_file"))
+
+    def test_proxies_under_multiple_gse_versions(self):
+        self.init_ap_db()
+        for bk_host_id, ip in [(1001, "127.0.0.11"), (1002, "127.0.0.12"), (1003, "127.0.0.13")]:
+            create_host(number=1, node_type=constants.NodeType.PROXY, ip=ip, bk_cloud_id=1, bk_host_id=bk_host_id)
+        # 以接入点区分 Proxy 的 GSE 版本
+        Host.objects.filter(bk_host_id=1002).update(ap_id=2)
+        ap_id__gse_version_map: Dict[int, str] = {1: GseVersion.V1.value, 2: GseVersion.V2.value}
+
+        version__hosts_map: Dict[str, List[Dict]] = defaultdict(list)
+        correct_file_action_mock = mock.MagicMock()
+        with patch(
+            "apps.node_man.periodic_tasks.update_proxy_file.GrayTools.get_host_ap_gse_versions",
+            lambda _, biz_ap_pairs: [ap_id__gse_version_map[ap_id] for _, ap_id in biz_ap_pairs],
+        ), patch(
+            "apps.node_man.periodic_tasks.update_proxy_file.get_gse_api_helper",
+            lambda gse_version: GseApiHelperMock(gse_version, version__hosts_map),
+        ), patch(
+            "apps.node_man.periodic_tasks.update_proxy_file.get_storage", mock.MagicMock()
+        ), patch(
+            "apps.node_man.periodic_tasks.update_proxy_file.correct_file_action", correct_file_action_mock
+        ):
+            call_command("update_proxy_file")
+
+        # 每个 GSE 版本仅查询该版本下的 Proxy
+        self.assertEqual(
+            {gse_version: sorted(host["ip"] for host in hosts) for gse_version, hosts in version__hosts_map.items()},
+            {GseVersion.V1.value: ["127.0.0.11", "127.0.0.13"], GseVersion.V2.value: ["127.0.0.12"]},
+        )
+        # 全部版本下存活的 Proxy 均需下发文件
+        alive_hosts: List[Dict] = correct_file_action_mock.call_args[0][1]
+        self.assertEqual(sorted(host["bk_host_id"] for host in alive_hosts), [1001, 1002, 1003])
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import typing
+from unittest.mock import patch
+
+from apps.backend.subscription import task_tools
+from apps.backend.subscription.handler import SubscriptionHandler, SubscriptionTools
+from apps.backend.subscription.tasks import iter_bulk_create_instance_records
+from apps.node_man import constants, models
+from apps.utils.unittest.testcase import CustomBaseTestCase
+
+
+def list_subscription_task_instance_status(
+    instance_records: typing.List[models.SubscriptionInstanceRecord], need_detail: bool = False
+) -> typing.List[typing.Dict[str, typing.Any]]:
+    """仅返回实例记录的关键信息，用于对比分页内容"""
+    return [
+        {"record_id": record.id, "instance_id": record.instance_id, "status": record.status}
+        for record in instance_records
+    ]
+
+
+class TestTaskResult(CustomBaseTestCase):
+    SUBSCRIPTION_ID = 1
+    RECORD_NUM = 25
+
+    # 各查询场景：(过滤参数, 分页参数)
+    QUERY_CASES: typing.List[typing.Tuple[typing.Dict[str, typing.Any], typing.Dict[str, typing.Any]]] = [
+        ({}, {"page": 1, "pagesize": 10}),
+        ({}, {"page": 3, "pagesize": 10}),
+        ({}, {"start": 5, "pagesize": 10}),
+        ({}, {"return_all": True, "pagesize": 10}),
+        ({"statuses": [constants.JobStatusType.FAILED]}, {"page": 1, "pagesize": 5}),
+        ({"statuses": [constants.JobStatusType.SUCCESS, constants.JobStatusType.RUNNING]}, {"page": 2, "pagesize": 5}),
+        (
+            {"instance_id_list": [f"host|instance|host|{index}" for index in range(0, 25, 2)]},
+            {"page": 1, "pagesize": 5},
+        ),
+        (
+            {
+                "statuses": [constants.JobStatusType.PENDING, constants.JobStatusType.FAILED],
+                "instance_id_list": [f"host|instance|host|{index}" for index in range(0, 25, 3)],
+            },
+            {"page": 1, "pagesize": 10},
+        ),
+        ({"exclude_instance_ids": ["host|instance|host|0", "host|instance|host|1"]}, {"page": 1, "pagesize": 10}),
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.task_id: int = models.SubscriptionTask.objects.create(
+            subscription_id=self.SUBSCRIPTION_ID, scope={}, actions={}, is_ready=True
+        ).id
+        record_ids: typing.List[int] = [
+            record.id
+            for record in iter_bulk_create_instance_records(
+                models.SubscriptionInstanceRecord(
+                    task_id=self.task_id,
+                    subscription_id=self.SUBSCRIPTION_ID,
+                    instance_id=f"host|instance|host|{index}",
+                    instance_info={"host": {"bk_host_id": index}},
+                    steps=[],
+                )
+                for index in range(self.RECORD_NUM)
+            )
+        ]
+        # 通过状态流转构造多种状态，进度随之增量更新
+        models.SubscriptionTaskProgress.bulk_set_record_status(record_ids[:10], constants.JobStatusType.RUNNING)
+        models.SubscriptionTaskProgress.bulk_set_record_status(record_ids[5:12], constants.JobStatusType.SUCCESS)
+        models.SubscriptionTaskProgress.bulk_set_record_status(record_ids[15:20], constants.JobStatusType.FAILED)
+
+        patch.object(
+            task_tools.TaskResultTools,
+            "list_subscription_task_instance_status",
+            side_effect=list_subscription_task_instance_status,
+        ).start()
+        self.fetch_latest_record_ids = patch.object(
+            SubscriptionTools,
+            "fetch_latest_record_ids_in_same_inst_id",
+            wraps=SubscriptionTools.fetch_latest_record_ids_in_same_inst_id,
+        ).start()
+
+    def tearDown(self):
+        patch.stopall()
+        super().tearDown()
+
+    def query_all_cases(self) -> typing.List[typing.Dict[str, typing.Any]]:
+        handler = SubscriptionHandler(self.SUBSCRIPTION_ID)
+        return [
+            handler.task_result(task_id_list=[self.task_id], **filter_kwargs, **page_kwargs)
+            for filter_kwargs, page_kwargs in self.QUERY_CASES
+        ]
+
+    def test_progress_consistent_with_aggregation(self):
+        # 存在物化进度时直接读取，无需聚合实例的最新记录
+        progress_results = self.query_all_cases()
+        self.fetch_latest_record_ids.assert_not_called()
+
+        # 移除进度后回退为实时聚合
+        models.SubscriptionTaskProgress.objects.filter(task_id=self.task_id).delete()
+        aggregation_results = self.query_all_cases()
+        self.assertEqual(self.fetch_latest_record_ids.call_count, len(self.QUERY_CASES))
+
+        for (filter_kwargs, page_kwargs), progress_result, aggregation_result in zip(
+            self.QUERY_CASES, progress_results, aggregation_results
+        ):
+            with self.subTest(filter_kwargs=filter_kwargs, page_kwargs=page_kwargs):
+                self.assertEqual(progress_result["total"], aggregation_result["total"])
+                self.assertEqual(progress_result["status_counter"], aggregation_result["status_counter"])
+                self.assertEqual(progress_result["list"], aggregation_result["list"])
+
+    def test_status_counter(self):
+        progress_result = SubscriptionHandler(self.SUBSCRIPTION_ID).task_result(
+            task_id_list=[self.task_id], statuses=[constants.JobStatusType.FAILED], page=1, pagesize=10
+        )
+        self.assertEqual(progress_result["total"], 5)
+        self.assertEqual(
+            [instance["status"] for instance in progress_result["list"]], [constants.JobStatusType.FAILED] * 5
+        )
+        # 状态统计为任务全局视图，不受过滤条件影响
+        self.assertEqual(
+            progress_result["status_counter"],
+            {
+                constants.JobStatusType.PENDING: 8,
+                constants.JobStatusType.RUNNING: 5,
+                constants.JobStatusType.SUCCESS: 7,
+                constants.JobStatusType.FAILED: 5,
+                "total": self.RECORD_NUM,
+            },
+        )
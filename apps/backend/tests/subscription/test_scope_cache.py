@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import time
+
+import mock
+
+from apps.backend.subscription.scope_cache import ScopeInstanceCache
+from apps.utils.unittest.testcase import CustomBaseTestCase
+
+
+class TestScopeInstanceCache(CustomBaseTestCase):
+    CACHE_KEY = "test_scope_instance_cache"
+
+    def setUp(self):
+        super().setUp()
+        # 分片足够小，确保数据被切分为多个分片
+        self.scope_instance_cache = ScopeInstanceCache(cache_time=60, chunk_size=64)
+        self.instances = {
+            f"host|instance|host|{bk_host_id}": {"host": {"bk_host_id": bk_host_id, "bk_host_innerip": "127.0.0.1"}}
+            for bk_host_id in range(100)
+        }
+        self.loader = mock.MagicMock(return_value=self.instances)
+
+    def test_set_and_get(self):
+        self.scope_instance_cache.set(self.CACHE_KEY, self.instances)
+        cache_data = self.scope_instance_cache.get(self.CACHE_KEY)
+        self.assertGreater(cache_data["meta"]["chunk_num"], 1)
+        self.assertLess(cache_data["meta"]["compressed_size"], cache_data["meta"]["size"])
+        self.assertEqual(cache_data["instances"], self.instances)
+
+    def test_get_or_load(self):
+        self.assertEqual(self.scope_instance_cache.get_or_load(self.CACHE_KEY, self.loader), self.instances)
+        self.assertEqual(self.scope_instance_cache.get_or_load(self.CACHE_KEY, self.loader), self.instances)
+        # 第二次读取命中缓存，不再重算
+        self.loader.assert_called_once()
+
+    def test_stale_while_revalidate(self):
+        self.scope_instance_cache.set(self.CACHE_KEY, self.instances)
+        with mock.patch("apps.backend.subscription.scope_cache.time.time", return_value=time.time() + 120):
+            with mock.patch.object(self.scope_instance_cache, "revalidate_async") as revalidate_async:
+                # 逻辑过期后仍返回旧数据，并触发后台重算
+                self.assertEqual(self.scope_instance_cache.get_or_load(self.CACHE_KEY, self.loader), self.instances)
+                revalidate_async.assert_called_once()
+        self.loader.assert_not_called()
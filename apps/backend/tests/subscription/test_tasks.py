@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from apps.backend.subscription.tasks import iter_bulk_create_instance_records
+from apps.node_man import constants, models
+from apps.utils.unittest.testcase import CustomBaseTestCase
+
+
+class TestIterBulkCreateInstanceRecords(CustomBaseTestCase):
+    TASK_ID = 1
+    SUBSCRIPTION_ID = 1
+
+    def build_records(self, num: int):
+        for index in range(num):
+            yield models.SubscriptionInstanceRecord(
+                task_id=self.TASK_ID,
+                subscription_id=self.SUBSCRIPTION_ID,
+                instance_id=f"host|instance|host|{index}",
+                instance_info={"host": {"bk_host_id": index}},
+                steps=[],
+            )
+
+    def test_chunked_create(self):
+        created_records = []
+        records_iter = iter_bulk_create_instance_records(self.build_records(25), chunk_size=10, batch_size=3)
+        # 按块写入：消费第一条记录时仅写入首个分块
+        created_records.append(next(records_iter))
+        self.assertEqual(models.SubscriptionInstanceRecord.objects.filter(task_id=self.TASK_ID).count(), 10)
+
+        created_records.extend(records_iter)
+        self.assertEqual(len(created_records), 25)
+        instance_id__record_id_map = dict(
+            models.SubscriptionInstanceRecord.objects.filter(task_id=self.TASK_ID).values_list("instance_id", "id")
+        )
+        self.assertEqual(
+            {record.instance_id: record.id for record in created_records},
+            instance_id__record_id_map,
+        )
+
+        # 按块累加的任务执行进度与实际创建的订阅实例一致
+        task_progress = models.SubscriptionTaskProgress.objects.get(task_id=self.TASK_ID)
+        self.assertEqual(task_progress.subscription_id, self.SUBSCRIPTION_ID)
+        self.assertEqual(task_progress.status_counter, {constants.JobStatusType.PENDING: 25, "total": 25})
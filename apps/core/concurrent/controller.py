@@ -8,6 +8,7 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import inspect
 from collections import ChainMap
 from typing import Any, Callable, Dict, List, Optional, Tuple, Type
 
@@ -53,6 +54,9 @@ class ConcurrentController:
             经测试，如果需要下发多条命令，一次并发量 <= CONCURRENT_NUMBER 是安全的
         - JOB 执行脚本接口调用限频
         ...
+    原生协程模式：
+        被装饰者为协程函数时，全部批次在进程级常驻事件循环中执行，批次并发数通过信号量控制，
+        不再为每个批次创建线程及事件循环，调用方仍以同步方式获取结果
     """
 
     # 并发配置类
@@ -132,14 +136,37 @@ class ConcurrentController:
         :return:
         """
         config_obj = self.get_config_obj()
+        is_coroutine: bool = inspect.iscoroutinefunction(wrapped)
         # 如果指定全量执行或者待执行对象列表为空，直接执行无需分片
         if config_obj.execute_all or not kwargs.get(self.data_list_name):
+            if is_coroutine:
+                return concurrent.run_coroutine(wrapped(*args, **kwargs))
             return wrapped(*args, **kwargs)
 
         params_list: List[Dict[str, Any]] = []
         for chunk_list in basic.chunk_lists(kwargs[self.data_list_name], config_obj.limit):
             params_list.append(dict(ChainMap({self.data_list_name: chunk_list}, kwargs)))
 
+        if is_coroutine:
+            return concurrent.run_coroutine(
+                concurrent.batch_call_async(
+                    func=wrapped,
+                    params_list=params_list,
+                    **dict(
+                        ChainMap(
+                            self.batch_call_kwargs,
+                            {
+                                "get_data": self.get_data,
+                                "extend_result": self.extend_result,
+                                "interval": config_obj.interval,
+                                # 批次间非并发时串行执行
+                                "concurrency": None if config_obj.is_concurrent_between_batches else 1,
+                            },
+                        )
+                    )
+                )
+            )
+
         # 如果批次间非并发，batch_call_func 默认使用 batch_call_serial
         if not config_obj.is_concurrent_between_batches:
             self.batch_call_func = concurrent.batch_call_serial
@@ -8,13 +8,15 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import asyncio
 import math
 import random
+import threading
 import time
 from typing import Any, Dict, List, Optional
 
 from django.conf import settings
-from django.utils import timezone
+from django.utils import timezone, translation
 
 from apps.utils import concurrent
 from apps.utils.unittest import testcase
@@ -125,3 +127,51 @@ class ConcurrentControllerTestCase(testcase.CustomBaseTestCase):
             data_list_name="numbers", batch_call_func=concurrent.batch_call
         )(list_double_numbers)(numbers=[])
         self.assertEqual(double_numbers, [])
+
+    def test_coroutine(self):
+        """验证原生协程模式：全部批次在进程级常驻事件循环中执行"""
+        thread_names = set()
+
+        async def list_double_numbers_async(numbers: List[int]) -> List[int]:
+            thread_names.add(threading.current_thread().name)
+            await asyncio.sleep(0)
+            return [2 * number for number in numbers]
+
+        controller_inst = controller.ConcurrentController(
+            data_list_name="numbers",
+            batch_call_func=concurrent.batch_call,
+            get_config_dict_func=lambda: {"limit": 10},
+        )
+        numbers = list(range(95))
+        double_numbers = controller_inst(list_double_numbers_async)(numbers=numbers)
+        # 结果与输入顺序一致
+        self.assertEqual(double_numbers, list_double_numbers(numbers))
+        self.assertEqual(thread_names, {"EventLoopThread"})
+
+    def test_coroutine_language(self):
+        """验证原生协程模式：同一事件循环中交替执行的协程各自沿用绑定的语言设置"""
+
+        async def list_languages(numbers: List[int]) -> List[str]:
+            languages = []
+            for __ in numbers:
+                # 让出控制权，与其他协程交替执行
+                await asyncio.sleep(0)
+                languages.append(translation.get_language())
+            return languages
+
+        async def list_languages_interleaved() -> List[List[str]]:
+            return await asyncio.gather(
+                concurrent.bind_language(list_languages(numbers=[1, 2, 3]), "en"),
+                concurrent.bind_language(list_languages(numbers=[1, 2, 3]), "zh-hans"),
+            )
+
+        self.assertEqual(concurrent.run_coroutine(list_languages_interleaved()), [["en"] * 3, ["zh-hans"] * 3])
+
+        controller_inst = controller.ConcurrentController(
+            data_list_name="numbers",
+            batch_call_func=concurrent.batch_call,
+            get_config_dict_func=lambda: {"limit": 10},
+        )
+        with translation.override("en"):
+            languages = controller_inst(list_languages)(numbers=list(range(35)))
+        self.assertEqual(languages, ["en"] * 35)
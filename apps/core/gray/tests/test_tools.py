@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import copy
+
+from apps.core.gray.tools import GrayTools, GseVersionLookupTable
+from apps.mock_data.common_unit.host import AP_MODEL_DATA
+from apps.node_man import constants, models
+from apps.utils.unittest.testcase import CustomBaseTestCase
+from env.constants import GseVersion
+
+
+class GseVersionLookupTableTestCase(CustomBaseTestCase):
+    V2_AP_ID = 2
+    GRAY_BIZ_ID = 100
+
+    def setUp(self):
+        super().setUp()
+        models.AccessPoint.objects.update_or_create(id=AP_MODEL_DATA["id"], defaults=AP_MODEL_DATA)
+        v2_ap_data = copy.deepcopy(AP_MODEL_DATA)
+        v2_ap_data.update(id=self.V2_AP_ID, is_default=False, gse_version=GseVersion.V2.value)
+        models.AccessPoint.objects.update_or_create(id=self.V2_AP_ID, defaults=v2_ap_data)
+        self.lookup_table = GseVersionLookupTable.build(
+            gse2_gray_scope_list=[self.GRAY_BIZ_ID], gray_ap_map={AP_MODEL_DATA["id"]: self.V2_AP_ID}
+        )
+
+    def test_get_gse_versions(self):
+        biz_ap_pairs = [
+            (self.GRAY_BIZ_ID, constants.DEFAULT_AP_ID),
+            (self.GRAY_BIZ_ID + 1, constants.DEFAULT_AP_ID),
+            (self.GRAY_BIZ_ID + 1, self.V2_AP_ID),
+            (self.GRAY_BIZ_ID + 1, constants.DEFAULT_AP_ID),
+        ]
+        gray_tools = GrayTools()
+        gray_tools.lookup_table = self.lookup_table
+        self.assertEqual(
+            self.lookup_table.get_gse_versions(biz_ap_pairs),
+            [GseVersion.V2.value, GseVersion.V1.value, GseVersion.V2.value, GseVersion.V1.value],
+        )
+        # 批量解析结果与逐台解析保持一致
+        self.assertEqual(
+            self.lookup_table.get_gse_versions(biz_ap_pairs),
+            [gray_tools.get_host_ap_gse_version(*biz_ap) for biz_ap in biz_ap_pairs],
+        )
+
+    def test_install_other_agent(self):
+        self.assertEqual(
+            self.lookup_table.get_gse_version(self.GRAY_BIZ_ID, AP_MODEL_DATA["id"], is_install_other_agent=True),
+            models.AccessPoint.objects.get(id=AP_MODEL_DATA["id"]).gse_version,
+        )
+        self.assertEqual(
+            self.lookup_table.get_gse_version(self.GRAY_BIZ_ID + 1, None),
+            self.lookup_table.ap_id__gse_version_map[constants.DEFAULT_AP_ID],
+        )
+
+    def test_lookup_table_cache(self):
+        lookup_table = GrayTools.get_gse_version_lookup_table()
+        self.assertIs(GrayTools.get_gse_version_lookup_table(), lookup_table)
+        # 灰度配置变更后重新构建
+        models.GlobalSettings.update_config(
+            models.GlobalSettings.KeyEnum.GSE2_GRAY_SCOPE_LIST.value, [self.GRAY_BIZ_ID]
+        )
+        lookup_table = GrayTools.get_gse_version_lookup_table()
+        self.assertEqual(lookup_table.gse2_gray_scope_set, {self.GRAY_BIZ_ID})
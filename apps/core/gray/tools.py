@@ -8,15 +8,82 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import json
 import typing
 
 from apps.node_man import constants as node_man_constants
 from apps.node_man import models as node_man_models
-from apps.utils.cache import func_cache_decorator
+from apps.utils.cache import LocalTTLCache, func_cache_decorator
 from env.constants import GseVersion
 
 
+class GseVersionLookupTable:
+    """
+    GSE 版本查找表，预先计算灰度业务集合及接入点 GSE 版本，用于批量解析主机应使用的 GSE 版本
+    """
+
+    def __init__(
+        self,
+        gse2_gray_scope_list: typing.List[int],
+        gray_ap_map: typing.Dict[int, int],
+        ap_id__gse_version_map: typing.Dict[typing.Optional[int], str],
+    ):
+        self.gse2_gray_scope_set: typing.Set[int] = set(gse2_gray_scope_list)
+        # GSE1.0 接入点 ID -> GSE2.0 接入点 ID
+        self.gray_ap_map: typing.Dict[int, int] = gray_ap_map
+        self.ap_id__gse_version_map: typing.Dict[typing.Optional[int], str] = ap_id__gse_version_map
+
+    @classmethod
+    def build(
+        cls, gse2_gray_scope_list: typing.List[int], gray_ap_map: typing.Dict[int, int]
+    ) -> "GseVersionLookupTable":
+        ap_infos: typing.List[typing.Tuple[int, str]] = list(
+            node_man_models.AccessPoint.objects.values_list("id", "gse_version")
+        )
+        ap_id__gse_version_map: typing.Dict[typing.Optional[int], str] = dict(ap_infos)
+        if ap_infos:
+            # 与 AccessPoint.ap_id_obj_map 保持一致：未选择接入点的则取默认接入点
+            ap_id__gse_version_map.update({node_man_constants.DEFAULT_AP_ID: ap_infos[0][1], None: ap_infos[0][1]})
+        return cls(gse2_gray_scope_list, gray_ap_map, ap_id__gse_version_map)
+
+    def get_gse_version(self, bk_biz_id: typing.Any, ap_id: int, is_install_other_agent: bool = False) -> str:
+        if is_install_other_agent:
+            # 注入AP ID 优先使用注入AP 的GSE 版本
+            return self.ap_id__gse_version_map[ap_id]
+        elif bk_biz_id in self.gse2_gray_scope_set:
+            # 业务整体处于 2.0 灰度
+            return GseVersion.V2.value
+        elif ap_id == node_man_constants.DEFAULT_AP_ID:
+            # 业务不处于整体灰度中，并且关联默认接入点，视为灰度范围之外
+            return GseVersion.V1.value
+        else:
+            # 具有明确的接入点
+            return self.ap_id__gse_version_map[ap_id]
+
+    def get_gse_versions(
+        self,
+        biz_ap_pairs: typing.Iterable[typing.Tuple[typing.Any, typing.Optional[int]]],
+        is_install_other_agent: bool = False,
+    ) -> typing.List[str]:
+        """
+        批量获取主机应使用的 GSE 版本，相同的 (业务, 接入点) 仅计算一次
+        :param biz_ap_pairs: (业务 ID, 接入点 ID) 列表
+        :param is_install_other_agent: 是否为安装额外 Agent
+        :return: 与 biz_ap_pairs 一一对应的 GSE 版本列表
+        """
+        biz_ap__gse_version_map: typing.Dict[typing.Tuple[typing.Any, typing.Optional[int]], str] = {}
+        gse_versions: typing.List[str] = []
+        for biz_ap in biz_ap_pairs:
+            if biz_ap not in biz_ap__gse_version_map:
+                biz_ap__gse_version_map[biz_ap] = self.get_gse_version(*biz_ap, is_install_other_agent)
+            gse_versions.append(biz_ap__gse_version_map[biz_ap])
+        return gse_versions
+
+
 class GrayTools:
+    # 查找表按灰度配置内容缓存，灰度配置变更后旧表自然不再命中，接入点变更在过期后生效
+    _lookup_table_cache = LocalTTLCache(max_size=4, ttl=20 * node_man_constants.TimeUnit.SECOND)
+
     @classmethod
     @func_cache_decorator(cache_time=20 * node_man_constants.TimeUnit.SECOND)
     def get_or_create_gse2_gray_scope_list(cls) -> typing.List[int]:
@@ -33,9 +100,42 @@ class GrayTools:
         node_man_models.GlobalSettings.set_config(node_man_models.GlobalSettings.KeyEnum.GSE2_GRAY_SCOPE_LIST.value, [])
         return []
 
+    @classmethod
+    def get_gse_version_lookup_table(cls) -> GseVersionLookupTable:
+        """
+        获取 GSE 版本查找表，灰度业务列表或灰度接入点映射变更后重新构建
+        :return:
+        """
+        key__value_map: typing.Dict[str, typing.Any] = node_man_models.GlobalSettings.get_configs(
+            [
+                node_man_models.GlobalSettings.KeyEnum.GSE2_GRAY_SCOPE_LIST.value,
+                node_man_models.GlobalSettings.KeyEnum.GSE2_GRAY_AP_MAP.value,
+            ]
+        )
+        gse2_gray_scope_list: typing.Optional[typing.List[int]] = key__value_map[
+            node_man_models.GlobalSettings.KeyEnum.GSE2_GRAY_SCOPE_LIST.value
+        ]
+        if gse2_gray_scope_list is None:
+            gse2_gray_scope_list = cls.get_or_create_gse2_gray_scope_list(get_cache=False)
+        gray_ap_map: typing.Dict[str, int] = (
+            key__value_map[node_man_models.GlobalSettings.KeyEnum.GSE2_GRAY_AP_MAP.value] or {}
+        )
+
+        cache_key: str = json.dumps([gse2_gray_scope_list, gray_ap_map], sort_keys=True)
+        is_hit, lookup_table = cls._lookup_table_cache.get(cache_key)
+        if is_hit:
+            return lookup_table
+
+        lookup_table = GseVersionLookupTable.build(
+            gse2_gray_scope_list=gse2_gray_scope_list,
+            gray_ap_map={int(v1_ap_id): int(v2_ap_id) for v1_ap_id, v2_ap_id in gray_ap_map.items()},
+        )
+        cls._lookup_table_cache.set(cache_key, lookup_table)
+        return lookup_table
+
     def __init__(self):
-        self.gse2_gray_scope_set: typing.Set[int] = set(self.get_or_create_gse2_gray_scope_list(get_cache=True))
-        self.ap_id_obj_map: typing.Dict[int, node_man_models.AccessPoint] = node_man_models.AccessPoint.ap_id_obj_map()
+        self.lookup_table: GseVersionLookupTable = self.get_gse_version_lookup_table()
+        self.gse2_gray_scope_set: typing.Set[int] = self.lookup_table.gse2_gray_scope_set
 
     def is_gse2_gray(self, bk_biz_id: typing.Any) -> bool:
         """
@@ -49,19 +149,17 @@ class GrayTools:
         """
         :return 返回当前主机应使用的 GSE VERSION
         """
-        if is_install_other_agent:
-            # 注入AP ID 优先使用注入AP 的GSE 版本
-            gse_version: str = self.ap_id_obj_map[ap_id].gse_version
-        elif self.is_gse2_gray(bk_biz_id):
-            # 业务整体处于 2.0 灰度
-            gse_version: str = GseVersion.V2.value
-        elif ap_id == node_man_constants.DEFAULT_AP_ID:
-            # 业务不处于整体灰度中，并且关联默认接入点，视为灰度范围之外
-            gse_version: str = GseVersion.V1.value
-        else:
-            # 具有明确的接入点
-            gse_version: str = self.ap_id_obj_map[ap_id].gse_version
-        return gse_version
+        return self.lookup_table.get_gse_version(bk_biz_id, ap_id, is_install_other_agent)
+
+    def get_host_ap_gse_versions(
+        self, biz_ap_pairs: typing.Iterable[typing.Tuple[typing.Any, typing.Optional[int]]]
+    ) -> typing.List[str]:
+        """
+        批量获取主机应使用的 GSE VERSION
+        :param biz_ap_pairs: (业务 ID, 接入点 ID) 列表
+        :return: 与 biz_ap_pairs 一一对应的 GSE VERSION 列表
+        """
+        return self.lookup_table.get_gse_versions(biz_ap_pairs)
 
     def inject_meta_to_instances(
         self, instances: typing.Dict[str, typing.Dict[str, typing.Union[typing.Dict, typing.Any]]]
@@ -71,32 +169,36 @@ class GrayTools:
         :param instances:
         :return:
         """
+        # 仅查询未携带 ap_id 的主机
         bk_host_ids: typing.Set[int] = {
             instance_info["host"]["bk_host_id"]
             for instance_info in instances.values()
-            if instance_info["host"].get("bk_host_id")
+            if instance_info["host"].get("bk_host_id") and not instance_info["host"].get("ap_id")
         }
-        host_infos: typing.List[typing.Dict[str, typing.Any]] = node_man_models.Host.objects.filter(
-            bk_host_id__in=bk_host_ids
-        ).values("bk_host_id", "ap_id")
         host_id__ap_id_map: typing.Dict[int, typing.Optional[int]] = {}
+        if bk_host_ids:
+            host_id__ap_id_map = dict(
+                node_man_models.Host.objects.filter(bk_host_id__in=bk_host_ids).values_list("bk_host_id", "ap_id")
+            )
 
-        for host_info in host_infos:
-            host_id__ap_id_map[host_info["bk_host_id"]] = host_info["ap_id"]
-
+        # 相同的 (业务, 接入点, 是否安装额外 Agent) 仅计算一次 GSE 版本
+        gse_version_cache: typing.Dict[typing.Tuple[typing.Any, typing.Optional[int], bool], str] = {}
         for instance_id, instance_info in instances.items():
             host_info = instance_info["host"]
             # 优先取 host_info 中的 ap_id，用于 Agent 操作场景下确定 ap
             ap_id: typing.Optional[int] = host_info.get("ap_id") or host_id__ap_id_map.get(host_info.get("bk_host_id"))
+            is_install_other_agent: bool = bool(host_info.get("is_need_inject_ap_id"))
             meta: typing.Dict[str, typing.Any] = {}
-            if host_info.get("is_need_inject_ap_id"):
+            if is_install_other_agent:
                 # 双如果为安装额外Agent 将ap_id 注入 meta
                 meta["AP_ID"] = ap_id
 
-            gse_version: str = self.get_host_ap_gse_version(
-                bk_biz_id=host_info.get("bk_biz_id"),
-                ap_id=ap_id,
-                is_install_other_agent=host_info.get("is_need_inject_ap_id"),
+            gse_version_key: typing.Tuple[typing.Any, typing.Optional[int], bool] = (
+                host_info.get("bk_biz_id"),
+                ap_id,
+                is_install_other_agent,
             )
-            meta["GSE_VERSION"] = gse_version
+            if gse_version_key not in gse_version_cache:
+                gse_version_cache[gse_version_key] = self.lookup_table.get_gse_version(*gse_version_key)
+            meta["GSE_VERSION"] = gse_version_cache[gse_version_key]
             instance_info["meta"] = meta
@@ -73,3 +73,11 @@ class AgentStatusType(EnhanceEnum):
     @classmethod
     def _get_member__alias_map(cls) -> Dict[Enum, str]:
         return {cls.ALIVE: _("存活"), cls.NO_ALIVE: _("未存活")}
+
+
+# 业务拓扑物化结构缓存时间（秒），拓扑或主机变更时通过版本号主动失效，过期时间仅作为兜底
+BIZ_TOPO_INDEX_CACHE_TIME = 5 * 60
+# 业务拓扑物化结构版本号缓存时间（秒）
+BIZ_TOPO_INDEX_VERSION_CACHE_TIME = 24 * 60 * 60
+# 进程内最多缓存的业务拓扑物化结构数量
+BIZ_TOPO_INDEX_LOCAL_CACHE_SIZE = 64
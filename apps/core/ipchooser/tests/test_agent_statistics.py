@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import copy
+import typing
+from collections import Counter
+from unittest.mock import patch
+
+from apps.core.ipchooser.query import resource
+from apps.core.ipchooser.tools import base, topo_index, topo_tool
+from apps.mock_data import utils as mock_data_utils
+from apps.mock_data.common_unit import host as host_unit
+from apps.node_man import constants, models
+from apps.utils.unittest.testcase import CustomBaseTestCase
+
+BK_BIZ_ID = mock_data_utils.DEFAULT_BK_BIZ_ID
+
+
+def make_node(bk_obj_id: str, bk_inst_id: int, child=None):
+    return {
+        "bk_obj_id": bk_obj_id,
+        "bk_obj_name": bk_obj_id,
+        "bk_inst_id": bk_inst_id,
+        "bk_inst_name": f"{bk_obj_id}-{bk_inst_id}",
+        "child": child or [],
+    }
+
+
+TOPO_TREE = make_node(
+    "biz",
+    BK_BIZ_ID,
+    [
+        make_node("set", 10, [make_node("module", 100), make_node("module", 101), make_node("module", 103)]),
+        make_node("custom", 20, [make_node("set", 11, [make_node("module", 102)])]),
+    ],
+)
+
+# 主机 2 同时属于两个模块，主机 6 未同步到节点管理，主机 5 不属于任何模块
+HOST_IDS_GBY_MODULE_ID = {100: [1, 2], 101: [2, 3], 102: [4, 6], 103: []}
+
+HOST_ID__STATUS_MAP = {
+    1: constants.ProcStateType.RUNNING,
+    2: constants.ProcStateType.TERMINATED,
+    3: constants.ProcStateType.NOT_INSTALLED,
+    4: constants.ProcStateType.UNKNOWN,
+    5: constants.ProcStateType.RUNNING,
+}
+
+
+def get_agent_statistics_by_counter(node: typing.Dict[str, typing.Any]) -> typing.Dict[str, int]:
+    """按单节点查询主机并在内存中计数，与优化前的统计方式保持一致，作为对照结果"""
+    host_queryset = base.HostQueryHelper.query_hosts_base(node_list=[node], conditions=[])
+    statuses: typing.List[str] = list(host_queryset.values_list("status", flat=True))
+    status__count_map: typing.Dict[str, int] = dict(Counter(statuses))
+    running_count: int = status__count_map.get(constants.ProcStateType.RUNNING, 0)
+    not_install_count: int = status__count_map.get(constants.ProcStateType.NOT_INSTALLED, 0)
+    return {
+        "total": len(statuses),
+        constants.ProcStateType.RUNNING: running_count,
+        constants.ProcStateType.NOT_INSTALLED: not_install_count,
+        constants.ProcStateType.TERMINATED: len(statuses) - running_count - not_install_count,
+    }
+
+
+class AgentStatisticsTestCase(CustomBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        host_objs: typing.List[models.Host] = []
+        proc_status_objs: typing.List[models.ProcessStatus] = []
+        for bk_host_id, status in HOST_ID__STATUS_MAP.items():
+            host_data = copy.deepcopy(host_unit.HOST_MODEL_DATA)
+            host_data.update(bk_host_id=bk_host_id, inner_ip=f"127.0.0.{bk_host_id}")
+            host_objs.append(models.Host(**host_data))
+
+            proc_status_data = copy.deepcopy(host_unit.PROCESS_STATUS_MODEL_DATA)
+            proc_status_data.update(bk_host_id=bk_host_id, status=status)
+            proc_status_objs.append(models.ProcessStatus(**proc_status_data))
+
+        # 其他业务的主机不应计入统计
+        other_biz_host_data = copy.deepcopy(host_unit.HOST_MODEL_DATA)
+        other_biz_host_data.update(bk_host_id=7, bk_biz_id=BK_BIZ_ID + 1, inner_ip="127.0.0.7")
+        host_objs.append(models.Host(**other_biz_host_data))
+        other_biz_proc_status_data = copy.deepcopy(host_unit.PROCESS_STATUS_MODEL_DATA)
+        other_biz_proc_status_data.update(bk_host_id=7)
+        proc_status_objs.append(models.ProcessStatus(**other_biz_proc_status_data))
+
+        models.Host.objects.bulk_create(host_objs)
+        models.ProcessStatus.objects.bulk_create(proc_status_objs)
+
+        self.biz_topo_index = topo_index.BizTopoIndex(BK_BIZ_ID, TOPO_TREE, HOST_IDS_GBY_MODULE_ID)
+        patch.object(topo_index, "get_biz_topo_index", return_value=self.biz_topo_index).start()
+        patch.object(resource.ResourceQueryHelper, "fetch_biz_hosts", side_effect=self.fetch_biz_hosts).start()
+
+    def tearDown(self):
+        patch.stopall()
+        super().tearDown()
+
+    def fetch_biz_hosts(
+        self, bk_biz_id: int, fields: typing.List[str] = None, filter_obj_id: str = None, filter_inst_ids=None, **kwargs
+    ) -> typing.List[typing.Dict[str, int]]:
+        """基于拓扑物化结构模拟 CMDB 按节点查询主机"""
+        bk_host_ids: typing.Set[int] = set()
+        for bk_inst_id in filter_inst_ids or []:
+            idx: typing.Optional[int] = self.biz_topo_index.get_idx(filter_obj_id, bk_inst_id)
+            if idx is not None:
+                bk_host_ids |= self.biz_topo_index.get_host_ids(idx)
+        return [{"bk_host_id": bk_host_id} for bk_host_id in bk_host_ids]
+
+    def test_format_agent_statistics(self):
+        self.assertEqual(
+            base.HostQueryHelper.format_agent_statistics(
+                {
+                    constants.ProcStateType.RUNNING: 3,
+                    constants.ProcStateType.NOT_INSTALLED: 2,
+                    constants.ProcStateType.UNKNOWN: 1,
+                    constants.ProcStateType.TERMINATED: 1,
+                }
+            ),
+            {
+                "total": 7,
+                constants.ProcStateType.RUNNING: 3,
+                constants.ProcStateType.NOT_INSTALLED: 2,
+                constants.ProcStateType.TERMINATED: 2,
+            },
+        )
+        self.assertEqual(
+            base.HostQueryHelper.format_agent_statistics({}),
+            {
+                "total": 0,
+                constants.ProcStateType.RUNNING: 0,
+                constants.ProcStateType.NOT_INSTALLED: 0,
+                constants.ProcStateType.TERMINATED: 0,
+            },
+        )
+
+    def test_get_agent_statistics(self):
+        node = {"bk_obj_id": "biz", "bk_inst_id": BK_BIZ_ID, "bk_biz_id": BK_BIZ_ID}
+        host_queryset = base.HostQueryHelper.query_hosts_base(node_list=[node], conditions=[])
+        self.assertEqual(
+            base.HostQueryHelper.get_agent_statistics(host_queryset), get_agent_statistics_by_counter(node)
+        )
+
+    def test_fetch_agent_statistics_infos(self):
+        node_list: typing.List[typing.Dict[str, typing.Any]] = [
+            # 业务节点
+            {"bk_obj_id": "biz", "bk_inst_id": BK_BIZ_ID, "bk_biz_id": BK_BIZ_ID},
+            # 集群 / 模块节点，主机 2 同时属于模块 100 / 101，集群计数需要去重
+            {"bk_obj_id": "set", "bk_inst_id": 10, "bk_biz_id": BK_BIZ_ID},
+            {"bk_obj_id": "module", "bk_inst_id": 100, "bk_biz_id": BK_BIZ_ID},
+            {"bk_obj_id": "module", "bk_inst_id": 101, "bk_biz_id": BK_BIZ_ID},
+            # 自定义层级
+            {"bk_obj_id": "custom", "bk_inst_id": 20, "bk_biz_id": BK_BIZ_ID},
+            # 空节点：无主机的模块、拓扑中不存在的模块
+            {"bk_obj_id": "module", "bk_inst_id": 103, "bk_biz_id": BK_BIZ_ID},
+            {"bk_obj_id": "module", "bk_inst_id": 999, "bk_biz_id": BK_BIZ_ID},
+        ]
+        agent_statistics_infos = topo_tool.TopoTool.fetch_agent_statistics_infos(node_list)
+
+        # 与节点顺序一致，且逐节点、逐状态计数与单节点内存计数结果一致
+        self.assertEqual([info["node"] for info in agent_statistics_infos], node_list)
+        for agent_statistics_info in agent_statistics_infos:
+            self.assertEqual(
+                agent_statistics_info["agent_statistics"],
+                get_agent_statistics_by_counter(agent_statistics_info["node"]),
+            )
+
+        node_key__total_map: typing.Dict[str, int] = {
+            f"{info['node']['bk_obj_id']}-{info['node']['bk_inst_id']}": info["agent_statistics"]["total"]
+            for info in agent_statistics_infos
+        }
+        self.assertEqual(
+            node_key__total_map,
+            {
+                f"biz-{BK_BIZ_ID}": 5,
+                "set-10": 3,
+                "module-100": 2,
+                "module-101": 2,
+                "custom-20": 1,
+                "module-103": 0,
+                "module-999": 0,
+            },
+        )
+
+    def test_fetch_agent_statistics_infos_with_empty_nodes(self):
+        # 全部为空节点时无需查询主机
+        node_list: typing.List[typing.Dict[str, typing.Any]] = [
+            {"bk_obj_id": "module", "bk_inst_id": 103, "bk_biz_id": BK_BIZ_ID},
+            {"bk_obj_id": "set", "bk_inst_id": 999, "bk_biz_id": BK_BIZ_ID},
+        ]
+        with self.assertNumQueries(0):
+            agent_statistics_infos = topo_tool.TopoTool.fetch_agent_statistics_infos(node_list)
+        for agent_statistics_info in agent_statistics_infos:
+            self.assertEqual(
+                agent_statistics_info["agent_statistics"],
+                {
+                    "total": 0,
+                    constants.ProcStateType.RUNNING: 0,
+                    constants.ProcStateType.NOT_INSTALLED: 0,
+                    constants.ProcStateType.TERMINATED: 0,
+                },
+            )
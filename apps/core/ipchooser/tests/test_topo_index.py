@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from unittest.mock import patch
+
+from apps.core.ipchooser.tools import topo_index
+from apps.utils.unittest.testcase import CustomBaseTestCase
+
+
+def make_node(bk_obj_id: str, bk_inst_id: int, child=None):
+    return {
+        "bk_obj_id": bk_obj_id,
+        "bk_obj_name": bk_obj_id,
+        "bk_inst_id": bk_inst_id,
+        "bk_inst_name": f"{bk_obj_id}-{bk_inst_id}",
+        "child": child or [],
+    }
+
+
+TOPO_TREE = make_node(
+    "biz",
+    2,
+    [
+        make_node("set", 10, [make_node("module", 100), make_node("module", 101)]),
+        make_node("custom", 20, [make_node("set", 11, [make_node("module", 102)])]),
+    ],
+)
+
+HOST_IDS_GBY_MODULE_ID = {100: [1, 2], 101: [2, 3], 102: [4]}
+
+
+class TestBizTopoIndex(CustomBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.biz_topo_index = topo_index.BizTopoIndex(2, TOPO_TREE, HOST_IDS_GBY_MODULE_ID)
+
+    def test_flatten(self):
+        self.assertEqual([node["bk_inst_id"] for node in self.biz_topo_index.nodes], [2, 10, 100, 101, 20, 11, 102])
+        self.assertEqual(self.biz_topo_index.parent_indices, [-1, 0, 1, 1, 0, 4, 5])
+        self.assertEqual(self.biz_topo_index.subtree_sizes, [7, 3, 1, 1, 3, 2, 1])
+
+    def test_host_counts(self):
+        # 主机 2 同时属于两个模块，集群及业务计数需要去重
+        self.assertEqual(self.biz_topo_index.host_counts, [4, 3, 2, 2, 1, 1, 1])
+        self.assertEqual(self.biz_topo_index.get_host_ids(self.biz_topo_index.get_idx("custom", 20)), {4})
+        self.assertEqual(self.biz_topo_index.to_tree(with_count=True)["child"][0]["count"], 3)
+
+    def test_to_tree(self):
+        tree = self.biz_topo_index.to_tree()
+        self.assertEqual(tree, TOPO_TREE)
+        # 每次返回新对象，修改不影响缓存结构
+        tree["child"].clear()
+        self.assertEqual(self.biz_topo_index.to_tree(), TOPO_TREE)
+
+    def test_get_path(self):
+        path = self.biz_topo_index.get_path(self.biz_topo_index.get_idx("module", 102))
+        self.assertEqual([node["bk_inst_id"] for node in path], [2, 20, 11, 102])
+        self.assertIsNone(self.biz_topo_index.get_idx("module", 999))
+
+    def test_get_biz_topo_index(self):
+        topo_index.invalidate([2])
+        with patch.object(topo_index.BizTopoIndex, "build", return_value=self.biz_topo_index) as build:
+            topo_index.get_biz_topo_index(2)
+            topo_index.get_biz_topo_index(2)
+            self.assertEqual(build.call_count, 1)
+
+            # 版本号变更后重新构建
+            topo_index.invalidate([2])
+            topo_index.get_biz_topo_index(2)
+            self.assertEqual(build.call_count, 2)
@@ -9,9 +9,9 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 import typing
-from collections import Counter, defaultdict
+from collections import defaultdict
 
-from django.db.models import CharField, Q, QuerySet, Value
+from django.db.models import CharField, Count, Q, QuerySet, Value
 from django.db.models.functions import Concat
 
 from apps.node_man import constants as node_man_constants
@@ -20,6 +20,7 @@ from apps.utils import basic, concurrent, string
 
 from .. import constants, types
 from ..query import resource
+from . import topo_index
 
 
 class HostQuerySqlHelper:
@@ -29,6 +30,21 @@ class HostQuerySqlHelper:
             node_man_models.Cloud.objects.filter(bk_cloud_name__icontains=name).values_list("bk_cloud_id", flat=True)
         )
 
+    @staticmethod
+    def search_token_subquery(token_count: int) -> str:
+        """
+        生成通过 n-gram 索引过滤主机的子查询，命中全部 token 的主机才是候选主机
+        :param token_count: token 数量
+        :return:
+        """
+        search_token_table: str = node_man_models.HostSearchToken._meta.db_table
+        return (
+            f"{node_man_models.Host._meta.db_table}.bk_host_id in ("
+            f"select {search_token_table}.bk_host_id from {search_token_table} "
+            f"where {search_token_table}.token in ({','.join(['%s'] * token_count)}) "
+            f"group by {search_token_table}.bk_host_id having count(*) = %s)"
+        )
+
     @classmethod
     def fuzzy_cond(
         cls,
@@ -47,6 +63,7 @@ class HostQuerySqlHelper:
         """
 
         where_or: typing.List[str] = []
+        like_fields: typing.List[str] = []
 
         for fuzzy_search_field in fuzzy_search_fields:
             if fuzzy_search_field == "bk_cloud_id":
@@ -58,8 +75,21 @@ class HostQuerySqlHelper:
                     where_or.append(f"{node_man_models.Host._meta.db_table}.{fuzzy_search_field} in (%s)")
                     sql_params.append(cloud_ids_str)
             else:
-                where_or.append(f"{node_man_models.Host._meta.db_table}.{fuzzy_search_field} like %s")
-                sql_params.extend([f"%{cond_val}%"])
+                like_fields.append(fuzzy_search_field)
+
+        if like_fields:
+            like_where: str = " OR ".join(
+                [f"{node_man_models.Host._meta.db_table}.{like_field} like %s" for like_field in like_fields]
+            )
+            search_tokens: typing.Optional[typing.List[str]] = node_man_models.HostSearchToken.get_query_tokens(
+                cond_val, like_fields
+            )
+            if search_tokens:
+                # 优先通过 n-gram 索引得到候选主机，like 仅对候选主机做校验，索引不可用时回退为 like 全表扫描
+                like_where = f"{cls.search_token_subquery(len(search_tokens))} AND ({like_where})"
+                sql_params.extend(search_tokens + [len(search_tokens)])
+            where_or.append(f"({like_where})")
+            sql_params.extend([f"%{cond_val}%"] * len(like_fields))
 
         wheres.append(f"( {' OR '.join(where_or)} )")
 
@@ -390,29 +420,17 @@ class HostQueryHelper:
         :return:
         """
         target_inst_ids: typing.Set[int] = set(target_inst_ids)
-        topo_tree: types.TreeNode = resource.ResourceQueryHelper.get_topo_tree(bk_biz_id)
-
-        # 遍历拓扑，将指定实例 ID 节点（子树）加入 child_topo_tree_stack
-        child_topo_tree_stack: typing.List[types.TreeNode] = []
-        topo_tree_stack: typing.List[types.TreeNode] = [topo_tree]
-        while topo_tree_stack:
-            node: types.TreeNode = topo_tree_stack.pop()
-            if node["bk_inst_id"] in target_inst_ids:
-                child_topo_tree_stack.append(node)
-                if len(child_topo_tree_stack) == len(target_inst_ids):
-                    # 已完成查询，提前返回减少无效遍历
-                    break
-                continue
-            topo_tree_stack.extend(node.get("child", []))
+        biz_topo_index: topo_index.BizTopoIndex = topo_index.get_biz_topo_index(bk_biz_id)
 
-        # 遍历获取的子树，从中获取集群 ID
+        # 子树在物化结构中连续分布，直接在指定实例 ID 节点的子树区间内获取集群 ID
         set_ids: typing.Set[int] = set()
-        while child_topo_tree_stack:
-            node: types.TreeNode = child_topo_tree_stack.pop()
-            if node["bk_inst_id"] == constants.ObjectType.SET.value:
-                set_ids.add(node["bk_inst_id"])
+        for idx, node in enumerate(biz_topo_index.nodes):
+            if node["bk_inst_id"] not in target_inst_ids:
                 continue
-            child_topo_tree_stack.extend(node.get("child", []))
+            set_ids.update(
+                biz_topo_index.nodes[set_idx]["bk_inst_id"]
+                for set_idx in biz_topo_index.get_descendant_indices(idx, constants.ObjectType.SET.value)
+            )
 
         return list(set_ids)
 
@@ -515,17 +533,13 @@ class HostQueryHelper:
         return host_queryset.filter(or_query)
 
     @staticmethod
-    def get_agent_statistics(host_queryset: QuerySet) -> typing.Dict:
+    def format_agent_statistics(status__count_map: typing.Dict[str, int]) -> typing.Dict:
         """
-        获取 Agent 状态统计
-        :param host_queryset: 经过 multiple_cond_sql 产生 queryset
+        将 状态 - 主机数量 映射转为 Agent 状态统计信息
+        :param status__count_map: 状态 - 主机数量 映射
         :return: Agent 状态统计信息
         """
-        # 按 status group by
-        statuses: typing.List[str] = list(host_queryset.values_list("status", flat=True))
-
-        total: int = len(statuses)
-        status__count_map: typing.Dict[str, int] = dict(Counter(statuses))
+        total: int = sum(status__count_map.values())
 
         # 转为可读格式
         running_count: int = status__count_map.get(node_man_constants.ProcStateType.RUNNING, 0)
@@ -537,3 +551,20 @@ class HostQueryHelper:
             # 将 RUNNING / NOT_INSTALLED 外的状态汇总为 TERMINATED
             node_man_constants.ProcStateType.TERMINATED: total - running_count - not_install_count,
         }
+
+    @classmethod
+    def get_agent_statistics(cls, host_queryset: QuerySet) -> typing.Dict:
+        """
+        获取 Agent 状态统计
+        :param host_queryset: 经过 multiple_cond_sql 产生 queryset
+        :return: Agent 状态统计信息
+        """
+        # 按 status group by，由数据库完成计数，仅返回各状态的统计行
+        # 需要清除默认排序，否则排序字段会被加入 group by
+        status_counts: QuerySet = (
+            host_queryset.order_by()
+            .values("status")
+            .annotate(host_count=Count("bk_host_id"))
+            .values_list("status", "host_count")
+        )
+        return cls.format_agent_statistics(dict(status_counts))
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import logging
+import typing
+import uuid
+from collections import defaultdict
+
+from django.core.cache import cache
+
+from apps.node_man import models as node_man_models
+from apps.utils.cache import LocalTTLCache
+
+from .. import constants, types
+from ..query import resource
+
+logger = logging.getLogger("app")
+
+
+class BizTopoIndex:
+    """
+    业务拓扑物化结构
+    拓扑按先序遍历展开为扁平数组，节点间关系通过下标表示，节点 i 的子树为数组区间 [i, i + subtree_sizes[i])
+    """
+
+    def __init__(
+        self, bk_biz_id: int, topo_tree: types.TreeNode, host_ids_gby_module_id: typing.Dict[int, typing.List[int]]
+    ):
+        self.bk_biz_id: int = bk_biz_id
+        # 节点信息，不包含 child
+        self.nodes: typing.List[types.TreeNode] = []
+        # 父节点下标，根节点为 -1
+        self.parent_indices: typing.List[int] = []
+        # 根节点到当前节点（含）的下标路径
+        self.paths: typing.List[typing.List[int]] = []
+        self.subtree_sizes: typing.List[int] = []
+        # 子树去重后的主机数量
+        self.host_counts: typing.List[int] = []
+        # 模块节点下标 - 主机 ID 列表
+        self.module_idx__host_ids_map: typing.Dict[int, typing.List[int]] = {}
+        # 节点 key（bk_obj_id-bk_inst_id）- 节点下标
+        self.inst_key__idx_map: typing.Dict[str, int] = {}
+
+        self._flatten(topo_tree, host_ids_gby_module_id)
+        self._count_hosts()
+
+    @staticmethod
+    def get_inst_key(bk_obj_id: str, bk_inst_id: int) -> str:
+        return f"{bk_obj_id}-{bk_inst_id}"
+
+    def _flatten(self, topo_tree: types.TreeNode, host_ids_gby_module_id: typing.Dict[int, typing.List[int]]):
+        # 逆序入栈，保证展开顺序与子节点原有顺序一致
+        topo_tree_stack: typing.List[typing.Tuple[types.TreeNode, int]] = [(topo_tree, -1)]
+        while topo_tree_stack:
+            node, parent_idx = topo_tree_stack.pop()
+            idx: int = len(self.nodes)
+            self.nodes.append({key: value for key, value in node.items() if key != "child"})
+            self.parent_indices.append(parent_idx)
+            self.paths.append((self.paths[parent_idx] if parent_idx != -1 else []) + [idx])
+            self.inst_key__idx_map.setdefault(self.get_inst_key(node["bk_obj_id"], node["bk_inst_id"]), idx)
+            if node["bk_obj_id"] == constants.ObjectType.MODULE.value:
+                self.module_idx__host_ids_map[idx] = host_ids_gby_module_id.get(node["bk_inst_id"]) or []
+            topo_tree_stack.extend((child_node, idx) for child_node in reversed(node.get("child") or []))
+
+        self.subtree_sizes = [1] * len(self.nodes)
+        for idx in range(len(self.nodes) - 1, 0, -1):
+            self.subtree_sizes[self.parent_indices[idx]] += self.subtree_sizes[idx]
+
+    def _count_hosts(self):
+        # 先序遍历下子孙节点下标均大于祖先，逆序遍历即可自底向上合并子树主机
+        subtree_host_ids: typing.List[typing.Optional[typing.Set[int]]] = [None] * len(self.nodes)
+        self.host_counts = [0] * len(self.nodes)
+        for idx in range(len(self.nodes) - 1, -1, -1):
+            host_ids: typing.Set[int] = subtree_host_ids[idx] or set()
+            host_ids.update(self.module_idx__host_ids_map.get(idx, []))
+            self.host_counts[idx] = len(host_ids)
+            subtree_host_ids[idx] = None
+
+            parent_idx: int = self.parent_indices[idx]
+            if parent_idx == -1:
+                continue
+            parent_host_ids: typing.Optional[typing.Set[int]] = subtree_host_ids[parent_idx]
+            if parent_host_ids is None:
+                subtree_host_ids[parent_idx] = host_ids
+                continue
+            # 小集合并入大集合，减少拷贝
+            if len(parent_host_ids) < len(host_ids):
+                parent_host_ids, host_ids = host_ids, parent_host_ids
+            parent_host_ids.update(host_ids)
+            subtree_host_ids[parent_idx] = parent_host_ids
+
+    @classmethod
+    def build(cls, bk_biz_id: int) -> "BizTopoIndex":
+        topo_tree: types.TreeNode = resource.ResourceQueryHelper.get_topo_tree(bk_biz_id)
+        cache_host_ids: typing.Set[int] = set(
+            node_man_models.Host.objects.filter(bk_biz_id=bk_biz_id).values_list("bk_host_id", flat=True)
+        )
+        host_ids_gby_module_id: typing.Dict[int, typing.List[int]] = defaultdict(list)
+        for host_topo_relation in resource.ResourceQueryHelper.fetch_host_topo_relations(bk_biz_id):
+            bk_host_id: int = host_topo_relation["bk_host_id"]
+            # 暂不统计非缓存数据，遇到不一致的情况需要触发缓存更新
+            if bk_host_id not in cache_host_ids:
+                continue
+            host_ids_gby_module_id[host_topo_relation["bk_module_id"]].append(bk_host_id)
+        return cls(bk_biz_id, topo_tree, host_ids_gby_module_id)
+
+    def get_idx(self, bk_obj_id: str, bk_inst_id: int) -> typing.Optional[int]:
+        return self.inst_key__idx_map.get(self.get_inst_key(bk_obj_id, bk_inst_id))
+
+    def to_tree(self, with_count: bool = False) -> types.TreeNode:
+        """
+        还原为拓扑树，每次返回新的对象，调用方可直接修改
+        :param with_count: 是否填充节点主机数量
+        :return:
+        """
+        tree_nodes: typing.List[types.TreeNode] = []
+        for idx, node in enumerate(self.nodes):
+            tree_node: types.TreeNode = {**node, "child": []}
+            if with_count:
+                tree_node["count"] = self.host_counts[idx]
+            tree_nodes.append(tree_node)
+            if idx != 0:
+                tree_nodes[self.parent_indices[idx]]["child"].append(tree_node)
+        return tree_nodes[0]
+
+    def get_path(self, idx: int) -> typing.List[types.TreeNode]:
+        return [dict(self.nodes[path_idx]) for path_idx in self.paths[idx]]
+
+    def get_host_ids(self, idx: int) -> typing.Set[int]:
+        host_ids: typing.Set[int] = set()
+        for subtree_idx in range(idx, idx + self.subtree_sizes[idx]):
+            host_ids.update(self.module_idx__host_ids_map.get(subtree_idx, []))
+        return host_ids
+
+    def get_descendant_indices(self, idx: int, bk_obj_id: str) -> typing.List[int]:
+        return [
+            subtree_idx
+            for subtree_idx in range(idx, idx + self.subtree_sizes[idx])
+            if self.nodes[subtree_idx]["bk_obj_id"] == bk_obj_id
+        ]
+
+
+# 进程内缓存按 (业务 ID, 版本号) 存储，版本号变更后旧结构自然不再命中
+_local_cache = LocalTTLCache(
+    max_size=constants.BIZ_TOPO_INDEX_LOCAL_CACHE_SIZE, ttl=constants.BIZ_TOPO_INDEX_CACHE_TIME
+)
+
+
+def get_version_key(bk_biz_id: int) -> str:
+    return f"ipchooser:biz_topo_index:version:{bk_biz_id}"
+
+
+def get_version(bk_biz_id: int) -> str:
+    version_key: str = get_version_key(bk_biz_id)
+    version: typing.Optional[str] = cache.get(version_key)
+    if version is None:
+        version = uuid.uuid4().hex
+        # 并发初始化时以先写入的版本号为准
+        if not cache.add(version_key, version, constants.BIZ_TOPO_INDEX_VERSION_CACHE_TIME):
+            version = cache.get(version_key) or version
+    return version
+
+
+def invalidate(bk_biz_ids: typing.Iterable[int]):
+    """
+    使业务拓扑物化结构失效，拓扑或主机发生变更时调用
+    :param bk_biz_ids: 业务 ID 列表
+    :return:
+    """
+    for bk_biz_id in set(bk_biz_ids):
+        cache.set(get_version_key(bk_biz_id), uuid.uuid4().hex, constants.BIZ_TOPO_INDEX_VERSION_CACHE_TIME)
+
+
+def get_biz_topo_index(bk_biz_id: int) -> BizTopoIndex:
+    """
+    获取业务拓扑物化结构，依次查找进程内缓存、共享缓存，均未命中时从 CMDB 构建
+    :param bk_biz_id: 业务 ID
+    :return:
+    """
+    version: str = get_version(bk_biz_id)
+    is_hit, topo_index = _local_cache.get((bk_biz_id, version))
+    if is_hit:
+        return topo_index
+
+    cache_key: str = f"ipchooser:biz_topo_index:{bk_biz_id}:{version}"
+    topo_index: typing.Optional[BizTopoIndex] = cache.get(cache_key)
+    if topo_index is None:
+        topo_index = BizTopoIndex.build(bk_biz_id)
+        cache.set(cache_key, topo_index, constants.BIZ_TOPO_INDEX_CACHE_TIME)
+        logger.info(f"[get_biz_topo_index] build: bk_biz_id -> {bk_biz_id}, node_count -> {len(topo_index.nodes)}")
+
+    _local_cache.set((bk_biz_id, version), topo_index)
+    return topo_index
@@ -10,18 +10,17 @@ specific language governing permissions and limitations under the License.
 """
 
 import logging
+import operator
 import typing
-from collections import defaultdict
-from copy import deepcopy
+from functools import reduce
 
-from django.db.models import Count, QuerySet
+from django.db.models import Count, Q, QuerySet
 
 from apps.node_man import models as node_man_models
 from apps.utils import concurrent
 
 from .. import constants, types
-from ..query import resource
-from . import base
+from . import base, topo_index
 
 logger = logging.getLogger("app")
 
@@ -29,28 +28,11 @@ logger = logging.getLogger("app")
 class TopoTool:
     @staticmethod
     def find_topo_node_paths(bk_biz_id: int, node_list: typing.List[types.TreeNode]):
-        def _find_topo_node_paths(
-            _cur_node: types.TreeNode, _cur_path: typing.List[types.TreeNode], _hit_inst_keys: typing.Set[str]
-        ):
-            _inst_key: str = f"{_cur_node['bk_obj_id']}-{_cur_node['bk_inst_id']}"
-            if _inst_key in inst_key__node_map:
-                inst_key__node_map[_inst_key]["bk_path"] = deepcopy(_cur_path)
-                _hit_inst_keys.add(_inst_key)
-                # 全部命中后提前返回
-                if len(_hit_inst_keys) == len(inst_key__node_map.keys()):
-                    return
-
-            for _child_node in _cur_node.get("child") or []:
-                _cur_path.append(_child_node)
-                _find_topo_node_paths(_child_node, _cur_path, _hit_inst_keys)
-                # 以 del 代替 [:-1]，防止后者产生 list 对象导致路径重复压栈
-                del _cur_path[-1]
-
-        topo_tree: types.TreeNode = resource.ResourceQueryHelper.get_topo_tree(bk_biz_id)
-        inst_key__node_map: typing.Dict[str, types.TreeNode] = {
-            f"{bk_node['bk_obj_id']}-{bk_node['bk_inst_id']}": bk_node for bk_node in node_list
-        }
-        _find_topo_node_paths(topo_tree, [topo_tree], set())
+        biz_topo_index: topo_index.BizTopoIndex = topo_index.get_biz_topo_index(bk_biz_id)
+        for bk_node in node_list:
+            idx: typing.Optional[int] = biz_topo_index.get_idx(bk_node["bk_obj_id"], bk_node["bk_inst_id"])
+            if idx is not None:
+                bk_node["bk_path"] = biz_topo_index.get_path(idx)
         return node_list
 
     @staticmethod
@@ -69,55 +51,101 @@ class TopoTool:
         return biz_id__host_count_map
 
     @classmethod
-    def fill_host_count_to_tree(
-        cls, nodes: typing.List[types.TreeNode], host_ids_gby_module_id: typing.Dict[int, typing.List[int]]
-    ) -> typing.Set[int]:
-        total_host_ids: typing.Set[int] = set()
-        for node in nodes:
-            bk_host_ids: typing.Set[int] = set()
-            if node.get("bk_obj_id") == constants.ObjectType.MODULE.value:
-                bk_host_ids = bk_host_ids | set(host_ids_gby_module_id.get(node["bk_inst_id"], set()))
-            else:
-                bk_host_ids = cls.fill_host_count_to_tree(node.get("child", []), host_ids_gby_module_id)
-            node["count"] = len(bk_host_ids)
-            total_host_ids = bk_host_ids | total_host_ids
-        return total_host_ids
+    def get_topo_tree_with_count(cls, bk_biz_id: int) -> types.TreeNode:
+        return topo_index.get_biz_topo_index(bk_biz_id).to_tree(with_count=True)
 
     @classmethod
-    def get_topo_tree_with_count(cls, bk_biz_id: int) -> types.TreeNode:
-        topo_tree: types.TreeNode = resource.ResourceQueryHelper.get_topo_tree(bk_biz_id)
-        host_topo_relations: typing.List[typing.Dict] = resource.ResourceQueryHelper.fetch_host_topo_relations(
-            bk_biz_id
-        )
-        cache_host_ids: typing.Set[int] = set(
-            node_man_models.Host.objects.filter(bk_biz_id=bk_biz_id).values_list("bk_host_id", flat=True)
-        )
-        host_ids_gby_module_id: typing.Dict[int, typing.List[int]] = defaultdict(list)
-        for host_topo_relation in host_topo_relations:
-            bk_host_id: int = host_topo_relation["bk_host_id"]
-            # 暂不统计非缓存数据，遇到不一致的情况需要触发缓存更新
-            if bk_host_id not in cache_host_ids:
-                continue
-            host_ids_gby_module_id[host_topo_relation["bk_module_id"]].append(bk_host_id)
-        cls.fill_host_count_to_tree([topo_tree], host_ids_gby_module_id)
-        return topo_tree
+    def get_node_key__host_ids_map(
+        cls, bk_biz_id: int, node_list: typing.List[types.TreeNode]
+    ) -> typing.Dict[str, typing.Set[int]]:
+        """
+        基于业务拓扑物化结构，计算同一业务下各拓扑节点（含自定义层级）的主机 ID 集合
+        :param bk_biz_id: 业务 ID
+        :param node_list: 拓扑节点列表
+        :return: 节点 key（bk_obj_id-bk_inst_id）- 主机 ID 集合
+        """
+        biz_topo_index: topo_index.BizTopoIndex = topo_index.get_biz_topo_index(bk_biz_id)
+        node_key__host_ids_map: typing.Dict[str, typing.Set[int]] = {}
+        for node in node_list:
+            idx: typing.Optional[int] = biz_topo_index.get_idx(node["bk_obj_id"], node["bk_inst_id"])
+            # 拓扑中不存在的节点视为无主机
+            node_key__host_ids_map[f"{node['bk_obj_id']}-{node['bk_inst_id']}"] = (
+                set() if idx is None else biz_topo_index.get_host_ids(idx)
+            )
+        return node_key__host_ids_map
 
     @classmethod
     def fetch_agent_statistics_infos(cls, node_list: typing.List[types.TreeNode]) -> typing.List[typing.Dict]:
         """
         获取各节点 Agent 状态统计信息
+        各节点的主机范围转为条件计数，通过一次 group by status 查询得到全部节点的分状态计数
         :param node_list:
         :return:
         """
+        # 业务节点直接按 bk_biz_id 过滤，其他节点需要基于拓扑计算主机范围
+        biz_id__topo_nodes_map: typing.Dict[int, typing.List[types.TreeNode]] = {}
+        for node in node_list:
+            if node["bk_obj_id"] != constants.ObjectType.BIZ.value:
+                biz_id__topo_nodes_map.setdefault(node["bk_biz_id"], []).append(node)
 
-        def _get_node_agent_statistics_info_base(_node: types.TreeNode) -> typing.Dict:
-            """为了并发封装的一个原子函数，用于获取单节点 Agent 状态信息"""
-            _host_queryset: QuerySet = base.HostQueryHelper.query_hosts_base(node_list=[_node], conditions=[])
-            return {"node": _node, "agent_statistics": base.HostQueryHelper.get_agent_statistics(_host_queryset)}
+        def _get_biz_node_key__host_ids_map(
+            _bk_biz_id: int, _node_list: typing.List[types.TreeNode]
+        ) -> typing.Dict[str, typing.Set[int]]:
+            """为了并发封装的一个原子函数，节点 key 加上业务 ID 前缀，便于合并多业务结果"""
+            return {
+                f"{_bk_biz_id}-{_node_key}": _host_ids
+                for _node_key, _host_ids in cls.get_node_key__host_ids_map(_bk_biz_id, _node_list).items()
+            }
 
         # 多线程请求，提高处理效率
-        params_list: typing.List[typing.Dict] = [{"_node": node} for node in node_list]
-        node_agent_statistics_infos = concurrent.batch_call(
-            func=_get_node_agent_statistics_info_base, params_list=params_list
-        )
-        return node_agent_statistics_infos
+        biz_node_key__host_ids_map: typing.Dict[str, typing.Set[int]] = {}
+        for node_key__host_ids_map in concurrent.batch_call(
+            func=_get_biz_node_key__host_ids_map,
+            params_list=[
+                {"_bk_biz_id": bk_biz_id, "_node_list": topo_nodes}
+                for bk_biz_id, topo_nodes in biz_id__topo_nodes_map.items()
+            ],
+        ):
+            biz_node_key__host_ids_map.update(node_key__host_ids_map)
+
+        # 每个节点对应一个条件计数列，无主机的节点无需参与查询
+        node_idx__filter_map: typing.Dict[int, Q] = {}
+        for node_idx, node in enumerate(node_list):
+            if node["bk_obj_id"] == constants.ObjectType.BIZ.value:
+                node_idx__filter_map[node_idx] = Q(bk_biz_id=node["bk_biz_id"])
+                continue
+            host_ids: typing.Set[int] = biz_node_key__host_ids_map.get(
+                f"{node['bk_biz_id']}-{node['bk_obj_id']}-{node['bk_inst_id']}"
+            )
+            if host_ids:
+                node_idx__filter_map[node_idx] = Q(bk_biz_id=node["bk_biz_id"], bk_host_id__in=host_ids)
+
+        node_idx__status_count_map: typing.Dict[int, typing.Dict[str, int]] = {
+            node_idx: {} for node_idx in range(len(node_list))
+        }
+        if node_idx__filter_map:
+            host_queryset: QuerySet = base.HostQuerySqlHelper.multiple_cond_sql(
+                params={}, biz_scope={node["bk_biz_id"] for node in node_list}, return_all_node_type=True
+            )
+            status_counts: typing.List[typing.Dict[str, typing.Any]] = list(
+                host_queryset.filter(reduce(operator.or_, node_idx__filter_map.values()))
+                .order_by()
+                .values("status")
+                .annotate(
+                    **{
+                        f"node_{node_idx}": Count("bk_host_id", filter=node_filter)
+                        for node_idx, node_filter in node_idx__filter_map.items()
+                    }
+                )
+            )
+            for status_count in status_counts:
+                for node_idx in node_idx__filter_map:
+                    node_idx__status_count_map[node_idx][status_count["status"]] = status_count[f"node_{node_idx}"]
+
+        return [
+            {
+                "node": node,
+                "agent_statistics": base.HostQueryHelper.format_agent_statistics(node_idx__status_count_map[node_idx]),
+            }
+            for node_idx, node in enumerate(node_list)
+        ]
@@ -34,6 +34,10 @@ class AsyncsshConn(base.BaseConn):
     def close(self):
         pass
 
+    def is_closed(self) -> bool:
+        # asyncssh 在连接断开后将 _transport 置空
+        return self._conn is None or getattr(self._conn, "_transport", self._conn) is None
+
     async def connect(self):
         client_keys = []
         for client_key_string in self.client_key_strings:
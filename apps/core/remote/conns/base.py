@@ -92,6 +92,10 @@ class BaseConn(abc.ABC):
     def close(self):
         raise NotImplementedError
 
+    def is_closed(self) -> bool:
+        """连接是否已关闭"""
+        return self._conn is None
+
     @abc.abstractmethod
     def connect(self):
         """
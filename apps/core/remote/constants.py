@@ -55,3 +55,9 @@ DEFAULT_CONNECT_TIMEOUT = 30
 
 # 默认的命令执行最长等待时间
 DEFAULT_CMD_RUN_TIMEOUT = 30
+
+# SSH 连接池中连接的最长空闲时间（秒），超过后关闭
+SSH_CONN_POOL_IDLE_TIMEOUT = 300
+
+# SSH 连接池中空闲连接数上限，超过后关闭最久未使用的连接
+SSH_CONN_POOL_MAX_IDLE = 100
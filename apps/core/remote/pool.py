@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import hashlib
+import json
+import logging
+import time
+import typing
+from collections import defaultdict
+
+import asyncssh
+
+from apps.utils import concurrent
+
+from . import conns, constants, exceptions
+from .clients import file
+
+logger = logging.getLogger("app")
+
+# 复用的空闲连接可能已被 NAT / sshd 静默断开，首次打开通道时抛出以下异常
+STALE_CONN_EXCEPTIONS: typing.Tuple[typing.Type[BaseException], ...] = (
+    exceptions.SessionError,
+    asyncssh.ChannelOpenError,
+    asyncssh.DisconnectError,
+    OSError,
+)
+
+
+class ReusableFileClient:
+    """可复用的文件客户端，退出上下文时不关闭 SFTP 会话，由所属连接归还或关闭时统一关闭"""
+
+    def __init__(self, file_client: file.AsyncSFTPClient):
+        self.file_client = file_client
+
+    async def __aenter__(self) -> file.AsyncSFTPClient:
+        return self.file_client
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+class PooledConn:
+    """
+    连接池中的连接，命令执行委托给底层连接，SFTP 会话在单次持有期间复用
+    从空闲列表复用的连接在首次打开通道失败时，重建连接并重试一次，此时尚未执行任何命令，重试是安全的
+    """
+
+    def __init__(
+        self, pool_key: str, conns_init_params: typing.Dict[str, typing.Any], conn: conns.AsyncsshConn, reused: bool
+    ):
+        self.pool_key = pool_key
+        self.conns_init_params = conns_init_params
+        self.conn = conn
+        # 是否为尚未验证可用的复用连接
+        self.reused = reused
+        self.last_used_at: float = time.monotonic()
+        self._file_client: typing.Optional[file.AsyncSFTPClient] = None
+
+    async def _call(self, func_name: str, *args, **kwargs):
+        try:
+            result = await getattr(self.conn, func_name)(*args, **kwargs)
+        except STALE_CONN_EXCEPTIONS as e:
+            if not self.reused:
+                raise
+            logger.warning(
+                f"[AsyncsshConnPool] reused conn to {self.conn.host}:{self.conn.port} is stale, reconnect: {e}"
+            )
+            await self.close()
+            self.reused = False
+            self.conn = conns.AsyncsshConn(**self.conns_init_params)
+            await self.conn.connect()
+            result = await getattr(self.conn, func_name)(*args, **kwargs)
+        self.reused = False
+        return result
+
+    async def run(
+        self, command: str, check: bool = False, timeout: typing.Optional[typing.Union[int, float]] = None, **kwargs
+    ) -> conns.RunOutput:
+        return await self._call("run", command, check, timeout, **kwargs)
+
+    async def file_client(self) -> ReusableFileClient:
+        if self._file_client is None:
+            self._file_client = await self._call("file_client")
+        return ReusableFileClient(self._file_client)
+
+    async def close_file_client(self):
+        if self._file_client is None:
+            return
+        try:
+            await self._file_client.close()
+        except Exception as e:
+            logger.warning(f"[AsyncsshConnPool] close sftp to {self.conn.host}:{self.conn.port} failed: {e}")
+        self._file_client = None
+
+    async def close(self):
+        await self.close_file_client()
+        try:
+            await self.conn.__aexit__(None, None, None)
+        except Exception as e:
+            logger.warning(f"[AsyncsshConnPool] close conn to {self.conn.host}:{self.conn.port} failed: {e}")
+
+
+class PooledConnContext:
+    """连接上下文，正常退出时连接归还连接池，发生异常时关闭连接"""
+
+    def __init__(self, pool: "AsyncsshConnPool", conns_init_params: typing.Dict[str, typing.Any]):
+        self.pool = pool
+        self.conns_init_params = conns_init_params
+        self.pooled_conn: typing.Optional[PooledConn] = None
+
+    async def __aenter__(self) -> PooledConn:
+        self.pooled_conn = await self.pool.acquire(self.conns_init_params)
+        return self.pooled_conn
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.pool.release(self.pooled_conn, reusable=exc_type is None)
+        self.pooled_conn = None
+
+
+class AsyncsshConnPool:
+    """
+    任务级异步 SSH 连接池
+    1. asyncssh 连接与事件循环绑定，连接池需要在进程级常驻事件循环（concurrent.run_coroutine）中使用，
+       SSH 通道检测阶段建立的连接可以直接用于后续执行阶段，省去重复的密钥交换及认证
+    2. 以 连接地址 + 端口 + 登录身份 为维度复用连接，同一连接同一时间仅被一个协程持有
+    3. 空闲超过 idle_timeout 的连接在获取 / 归还连接时淘汰，空闲连接总数超过 max_idle 时优先淘汰最久未使用的连接，
+       连接池关闭时关闭全部连接
+    4. 复用的空闲连接可能已被静默断开，首次打开通道失败时重建连接并重试一次
+    """
+
+    def __init__(
+        self,
+        idle_timeout: float = constants.SSH_CONN_POOL_IDLE_TIMEOUT,
+        max_idle: int = constants.SSH_CONN_POOL_MAX_IDLE,
+    ):
+        self.idle_timeout = idle_timeout
+        self.max_idle = max_idle
+        # 仅在事件循环中访问，无需加锁
+        self._key__idle_conns_map: typing.Dict[str, typing.List[PooledConn]] = defaultdict(list)
+
+    @staticmethod
+    def get_pool_key(conns_init_params: typing.Dict[str, typing.Any]) -> str:
+        """连接超时时间等参数不影响连接复用，仅以连接地址及登录身份计算"""
+        identity: typing.Dict[str, typing.Any] = {
+            field: conns_init_params.get(field)
+            for field in ["host", "port", "username", "password", "client_key_strings"]
+        }
+        return hashlib.sha256(json.dumps(identity, sort_keys=True).encode()).hexdigest()
+
+    def connection(self, conns_init_params: typing.Dict[str, typing.Any]) -> PooledConnContext:
+        """
+        获取连接上下文，需要在进程级常驻事件循环中使用
+        :param conns_init_params: 连接初始化参数
+        :return:
+        """
+        return PooledConnContext(self, conns_init_params)
+
+    async def acquire(self, conns_init_params: typing.Dict[str, typing.Any]) -> PooledConn:
+        pool_key: str = self.get_pool_key(conns_init_params)
+        await self.evict_idle_conns()
+        idle_conns: typing.List[PooledConn] = self._key__idle_conns_map.get(pool_key, [])
+        while idle_conns:
+            pooled_conn: PooledConn = idle_conns.pop()
+            if not pooled_conn.conn.is_closed():
+                pooled_conn.conns_init_params = conns_init_params
+                pooled_conn.reused = True
+                pooled_conn.last_used_at = time.monotonic()
+                return pooled_conn
+            await pooled_conn.close()
+
+        conn = conns.AsyncsshConn(**conns_init_params)
+        await conn.connect()
+        return PooledConn(pool_key, conns_init_params, conn, reused=False)
+
+    async def release(self, pooled_conn: PooledConn, reusable: bool = True):
+        if not reusable or pooled_conn.conn.is_closed():
+            await pooled_conn.close()
+            return
+        # 空闲期间连接可能被静默断开，不保留 SFTP 会话，以便复用时通过打开通道验证连接可用性
+        await pooled_conn.close_file_client()
+        pooled_conn.last_used_at = time.monotonic()
+        self._key__idle_conns_map[pooled_conn.pool_key].append(pooled_conn)
+        await self.evict_idle_conns()
+
+    async def evict_idle_conns(self, force: bool = False):
+        """
+        淘汰空闲连接
+        :param force: 是否淘汰全部空闲连接
+        :return:
+        """
+        expired_at: float = time.monotonic() - self.idle_timeout
+        expired_conns: typing.List[PooledConn] = []
+        for pool_key in list(self._key__idle_conns_map.keys()):
+            idle_conns: typing.List[PooledConn] = self._key__idle_conns_map[pool_key]
+            alive_conns: typing.List[PooledConn] = []
+            for pooled_conn in idle_conns:
+                if force or pooled_conn.last_used_at < expired_at:
+                    expired_conns.append(pooled_conn)
+                else:
+                    alive_conns.append(pooled_conn)
+            if alive_conns:
+                self._key__idle_conns_map[pool_key] = alive_conns
+            else:
+                self._key__idle_conns_map.pop(pool_key)
+
+        # 空闲连接总数超过上限时，淘汰最久未使用的连接
+        all_idle_conns: typing.List[PooledConn] = sorted(
+            [pooled_conn for idle_conns in self._key__idle_conns_map.values() for pooled_conn in idle_conns],
+            key=lambda pooled_conn: pooled_conn.last_used_at,
+        )
+        for pooled_conn in all_idle_conns[: max(len(all_idle_conns) - self.max_idle, 0)]:
+            self._key__idle_conns_map[pooled_conn.pool_key].remove(pooled_conn)
+            if not self._key__idle_conns_map[pooled_conn.pool_key]:
+                self._key__idle_conns_map.pop(pooled_conn.pool_key)
+            expired_conns.append(pooled_conn)
+
+        for pooled_conn in expired_conns:
+            await pooled_conn.close()
+
+    def close(self):
+        """关闭全部连接，需要在同步代码中调用"""
+        concurrent.run_coroutine(self.evict_idle_conns(force=True))
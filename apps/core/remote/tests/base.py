@@ -60,7 +60,7 @@ class AsyncsshSFTPMockClient:
     def exit(self, *args, **kwargs):
         pass
 
-    def wait_closed(self, *args, **kwargs):
+    async def wait_closed(self, *args, **kwargs):
         pass
 
 
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import asyncio
+import random
+import typing
+
+import asyncssh
+
+from apps.mock_data import utils
+from apps.utils import concurrent
+from apps.utils.unittest import testcase
+
+from .. import exceptions, pool
+from . import base
+
+
+class CountedAsyncSSHMockClient(base.AsyncSSHMockClient):
+    connect_count: int = 0
+
+    def __init__(self):
+        CountedAsyncSSHMockClient.connect_count += 1
+
+
+class StaleAsyncSSHMockClient(CountedAsyncSSHMockClient):
+    instances: typing.List["StaleAsyncSSHMockClient"] = []
+
+    def __init__(self):
+        super().__init__()
+        # 模拟连接被 NAT / sshd 静默断开，连接对象仍存活，但打开通道失败
+        self.stale: bool = False
+        StaleAsyncSSHMockClient.instances.append(self)
+
+    def check_stale(self):
+        if self.stale:
+            raise asyncssh.ChannelOpenError(asyncssh.OPEN_CONNECT_FAILED, "SSH connection closed")
+
+    async def run(self, *args, **kwargs):
+        self.check_stale()
+        return await super().run(*args, **kwargs)
+
+    async def start_sftp_client(self, *args, **kwargs):
+        self.check_stale()
+        return await super().start_sftp_client(*args, **kwargs)
+
+
+class AsyncsshConnPoolTestCase(testcase.CustomBaseTestCase):
+    CONNS_INIT_PARAMS = {"host": utils.DEFAULT_IP, "port": 22, "username": utils.DEFAULT_USERNAME, "password": "123"}
+
+    def setUp(self) -> None:
+        super().setUp()
+        CountedAsyncSSHMockClient.connect_count = 0
+        base.get_asyncssh_connect_mock_patch(CountedAsyncSSHMockClient).start()
+        self.conn_pool = pool.AsyncsshConnPool()
+
+    def tearDown(self) -> None:
+        self.conn_pool.close()
+        super().tearDown()
+
+    @staticmethod
+    def batch_call(func, params_list):
+        return concurrent.run_coroutine(concurrent.batch_call_async(func=func, params_list=params_list))
+
+    async def check(self, connect_timeout: int):
+        async with self.conn_pool.connection(dict(self.CONNS_INIT_PARAMS, connect_timeout=connect_timeout)):
+            pass
+
+    async def execute(self):
+        async with self.conn_pool.connection(self.CONNS_INIT_PARAMS) as conn:
+            # 持有连接期间让出执行权，模拟并发执行
+            await asyncio.sleep(0)
+            async with await conn.file_client() as file_client:
+                await file_client.makedirs(path="/tmp")
+            async with await conn.file_client() as file_client:
+                await file_client.put(localpaths=[], remotepath="/tmp")
+            return await conn.run("echo hello", check=True)
+
+    def test_reuse_between_batches(self):
+        self.batch_call(func=self.check, params_list=[{"connect_timeout": 10}])
+        outputs = self.batch_call(func=self.execute, params_list=[{}])
+        self.assertEqual(outputs[0].stdout, "")
+        # 连接超时时间不同不影响复用，检测阶段建立的连接在执行阶段复用
+        self.assertEqual(CountedAsyncSSHMockClient.connect_count, 1)
+
+    def test_concurrent_acquire(self):
+        test_num = random.randint(2, 5)
+        self.batch_call(func=self.execute, params_list=[{} for __ in range(test_num)])
+        # 同一连接同一时间仅被一个协程持有
+        self.assertEqual(CountedAsyncSSHMockClient.connect_count, test_num)
+        self.batch_call(func=self.execute, params_list=[{} for __ in range(test_num)])
+        self.assertEqual(CountedAsyncSSHMockClient.connect_count, test_num)
+
+    def test_evict_idle_conns(self):
+        # 连接归还后立即过期
+        self.conn_pool.idle_timeout = -1
+        self.batch_call(func=self.execute, params_list=[{}])
+        self.batch_call(func=self.execute, params_list=[{}])
+        self.assertEqual(CountedAsyncSSHMockClient.connect_count, 2)
+
+    def test_max_idle(self):
+        test_num = random.randint(3, 5)
+        self.conn_pool.max_idle = 1
+        self.batch_call(func=self.execute, params_list=[{} for __ in range(test_num)])
+        # 超过空闲连接数上限的连接被关闭，仅保留一个空闲连接
+        self.assertEqual(sum(len(idle_conns) for idle_conns in self.conn_pool._key__idle_conns_map.values()), 1)
+        self.batch_call(func=self.execute, params_list=[{} for __ in range(test_num)])
+        self.assertEqual(CountedAsyncSSHMockClient.connect_count, test_num * 2 - 1)
+
+
+class AsyncsshConnPoolStaleConnTestCase(AsyncsshConnPoolTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        StaleAsyncSSHMockClient.instances = []
+        base.get_asyncssh_connect_mock_patch(StaleAsyncSSHMockClient).start()
+
+    def mark_stale(self):
+        for client in StaleAsyncSSHMockClient.instances:
+            client.stale = True
+
+    def test_retry_stale_reused_conn(self):
+        self.batch_call(func=self.check, params_list=[{"connect_timeout": 10}])
+        self.mark_stale()
+        outputs = self.batch_call(func=self.execute, params_list=[{}])
+        self.assertEqual(outputs[0].stdout, "")
+        # 复用的连接已失效，重建连接后执行成功
+        self.assertEqual(CountedAsyncSSHMockClient.connect_count, 2)
+
+    def test_not_retry_verified_conn(self):
+        async def execute():
+            async with self.conn_pool.connection(self.CONNS_INIT_PARAMS) as conn:
+                await conn.run("echo hello", check=True)
+                self.mark_stale()
+                return await conn.run("echo hello", check=True)
+
+        # 新建或已验证可用的连接失败时不重试，避免重复执行命令
+        with self.assertRaises(exceptions.SessionError):
+            concurrent.run_coroutine(execute())
+        self.assertEqual(CountedAsyncSSHMockClient.connect_count, 1)
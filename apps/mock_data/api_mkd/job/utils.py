@@ -8,6 +8,14 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import copy
+import random
+import threading
+import time
+import typing
+from collections import defaultdict
+
+from apps.node_man import constants
 from common.api import JobApi
 
 from ... import utils
@@ -50,3 +58,63 @@ class JobApiMockClient(utils.BaseMockClient):
         self.fast_execute_script = self.call_recorder.start(self.fast_execute_script, key=JobApi.fast_execute_script)
         self.fast_transfer_file = self.call_recorder.start(self.fast_transfer_file, key=JobApi.fast_transfer_file)
         self.push_config_file = self.call_recorder.start(self.push_config_file, key=JobApi.push_config_file)
+
+
+class FakeJobApi:
+    """
+    本地作业平台替身，用于压测作业状态查询链路
+    作业创建后经过随机时长结束，状态查询接口可模拟网络延迟，并统计各接口的调用次数
+    """
+
+    def __init__(
+        self,
+        min_duration: float = 1,
+        max_duration: float = 10,
+        latency: float = 0,
+        failed_rate: float = 0,
+    ):
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self.latency = latency
+        self.failed_rate = failed_rate
+        self.call_counter: typing.Dict[str, int] = defaultdict(int)
+        self.job_instance_id__finish_time_map: typing.Dict[int, float] = {}
+        self.job_instance_id__final_status_map: typing.Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._last_job_instance_id = 0
+
+    def _record(self, api_name: str):
+        with self._lock:
+            self.call_counter[api_name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def fast_execute_script(self, query_params: typing.Dict[str, typing.Any]) -> typing.Dict[str, typing.Any]:
+        self._record("fast_execute_script")
+        with self._lock:
+            self._last_job_instance_id += 1
+            job_instance_id = self._last_job_instance_id
+        self.job_instance_id__finish_time_map[job_instance_id] = time.time() + random.uniform(
+            self.min_duration, self.max_duration
+        )
+        self.job_instance_id__final_status_map[job_instance_id] = (
+            constants.BkJobStatus.FAILED if random.random() < self.failed_rate else constants.BkJobStatus.SUCCEEDED
+        )
+        return {**unit.OP_DATA, "job_instance_id": job_instance_id}
+
+    fast_transfer_file = push_config_file = fast_execute_script
+
+    def get_job_instance_status(self, query_params: typing.Dict[str, typing.Any]) -> typing.Dict[str, typing.Any]:
+        self._record("get_job_instance_status")
+        job_instance_id: int = query_params["job_instance_id"]
+        if time.time() < self.job_instance_id__finish_time_map[job_instance_id]:
+            status = constants.BkJobStatus.RUNNING
+        else:
+            status = self.job_instance_id__final_status_map[job_instance_id]
+
+        result = copy.deepcopy(unit.GET_JOB_INSTANCE_STATUS_DATA)
+        result["job_instance"].update(job_instance_id=job_instance_id, status=status)
+        result["finished"] = status not in (constants.BkJobStatus.PENDING, constants.BkJobStatus.RUNNING)
+        if not query_params.get("return_ip_result"):
+            result["step_instance_list"][0].pop("step_ip_result_list", None)
+        return result
@@ -64,6 +64,8 @@ SYNC_PROC_STATUS_TASK_INTERVAL = 20 * TimeUnit.MINUTE
 CLEAN_EXPIRED_INFO_INTERVAL = 6 * TimeUnit.HOUR
 
 SYNC_CMDB_BIZ_TOPO_TASK_INTERVAL = 1 * TimeUnit.DAY
+# 业务拓扑缓存由集群 / 模块变更事件增量更新，过期时间比全量同步周期多1小时
+BIZ_TOPO_CACHE_TIMEOUT = SYNC_CMDB_BIZ_TOPO_TASK_INTERVAL + 1 * TimeUnit.HOUR
 SYNC_CMDB_HOST_INTERVAL = 1 * TimeUnit.DAY
 
 ########################################################################################################
@@ -554,16 +556,27 @@ WINDOWS_PORT = 445
 WINDOWS_ACCOUNT = "Administrator"
 LINUX_ACCOUNT = "root"
 APPLY_RESOURCE_WATCH_EVENT_LENS = 2000
+# 游标失效时从检查点回放事件，向前多回放的时间，用于覆盖检查点写入前已产生但未拉取到的事件
+RESOURCE_WATCH_REPLAY_OVERLAP = 1 * TimeUnit.MINUTE
 
 BIZ_CACHE_SUFFIX = "_biz_cache"
 BIZ_CUSTOM_PROPERTY_CACHE_SUFFIX = "_property_cache"
+
+# 全局配置缓存
+GLOBAL_SETTINGS_CACHE_VERSION_KEY = f"{settings.APP_CODE}:global_settings:version"
+GLOBAL_SETTINGS_CACHE_DATA_KEY_TMPL = settings.APP_CODE + ":global_settings:v{version}"
 JOB_MAX_VALUE = 100000
 
 # 监听资源类型
-RESOURCE_TUPLE = ("host", "host_relation", "process")
+RESOURCE_TUPLE = ("host", "host_relation", "process", "set", "module")
 RESOURCE_CHOICES = tuple_choices(RESOURCE_TUPLE)
 ResourceType = choices_to_namedtuple(RESOURCE_CHOICES)
 
+# 监听资源事件类型
+RESOURCE_EVENT_TYPE_TUPLE = ("create", "update", "delete")
+RESOURCE_EVENT_TYPE_CHOICES = tuple_choices(RESOURCE_EVENT_TYPE_TUPLE)
+ResourceEventType = choices_to_namedtuple(RESOURCE_EVENT_TYPE_CHOICES)
+
 QUERY_BIZ_LENS = 200
 
 
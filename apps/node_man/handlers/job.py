@@ -589,6 +589,8 @@ class JobHandler(APIModel):
             models.IdentityData.objects.bulk_create(identity_to_create)
             models.Host.objects.bulk_create(host_to_create)
 
+        models.HostSearchToken.refresh([host.bk_host_id for host in host_to_create] + host_id_to_delete)
+
         return update_data_info["subscription_host_ids"], ip_filter_list
 
     def operate(self, job_type, bk_host_ids, bk_biz_scope, extra_params, extra_config):
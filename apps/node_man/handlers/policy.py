@@ -852,18 +852,18 @@ class PolicyHandler:
         )
 
         for host in host_page["list"]:
-
             # 适配同值但不同数据源的主机信息，DB中host的内网IP字段为 inner_ip，需要适配为 cmdb 返回的字段名称 -> bk_host_innerip
             host["bk_host_innerip"] = host["inner_ip"]
 
-            check_is_suppressed_result = subscription.check_is_suppressed(
-                # 策略回滚操作的动作为MAIN_INSTALL_PLUGIN
-                action=constants.JobType.MAIN_INSTALL_PLUGIN,
-                cmdb_host_info=host,
-                topo_order=topo_order,
-                host_id__bk_obj_sub_map=host_id__bk_obj_sub_map,
-            )
+        check_is_suppressed_results = subscription.bulk_check_is_suppressed(
+            # 策略回滚操作的动作为MAIN_INSTALL_PLUGIN
+            action=constants.JobType.MAIN_INSTALL_PLUGIN,
+            cmdb_host_infos=host_page["list"],
+            topo_order=topo_order,
+            host_id__bk_obj_sub_map=host_id__bk_obj_sub_map,
+        )
 
+        for host, check_is_suppressed_result in zip(host_page["list"], check_is_suppressed_results):
             host["target_policy"] = {}
             # 管控主机被其他策略抑制，一般不会出现这种情况
             if check_is_suppressed_result["is_suppressed"]:
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("node_man", "0071_update_ap_gse_version_to_v2"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ResourceWatchCursor",
+            fields=[
+                (
+                    "bk_resource",
+                    models.CharField(max_length=32, primary_key=True, serialize=False, verbose_name="资源"),
+                ),
+                ("bk_cursor", models.CharField(default="", max_length=128, verbose_name="游标")),
+                (
+                    "head_time",
+                    models.DateTimeField(blank=True, null=True, verbose_name="最近追平CMDB事件头部的时间"),
+                ),
+                ("update_time", models.DateTimeField(auto_now=True, verbose_name="检查点更新时间")),
+            ],
+            options={
+                "verbose_name": "CMDB资源监听游标",
+                "verbose_name_plural": "CMDB资源监听游标",
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("node_man", "0074_jobsubscriptioninstancemap_time"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HostSearchToken",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("token", models.CharField(max_length=3, verbose_name="N-gram")),
+                ("bk_host_id", models.IntegerField(db_index=True, verbose_name="主机ID")),
+            ],
+            options={
+                "verbose_name": "主机搜索索引",
+                "verbose_name_plural": "主机搜索索引",
+                "unique_together": {("token", "bk_host_id")},
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("node_man", "0075_hostsearchtoken"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SubscriptionTaskProgress",
+            fields=[
+                ("task_id", models.IntegerField(primary_key=True, serialize=False, verbose_name="任务ID")),
+                ("subscription_id", models.IntegerField(db_index=True, verbose_name="订阅ID")),
+                ("total_count", models.IntegerField(default=0, verbose_name="实例总数")),
+                ("pending_count", models.IntegerField(default=0, verbose_name="等待执行数")),
+                ("running_count", models.IntegerField(default=0, verbose_name="正在执行数")),
+                ("success_count", models.IntegerField(default=0, verbose_name="执行成功数")),
+                ("failed_count", models.IntegerField(default=0, verbose_name="执行失败数")),
+                ("update_time", models.DateTimeField(auto_now=True, verbose_name="更新时间")),
+            ],
+            options={
+                "verbose_name": "订阅任务执行进度",
+                "verbose_name_plural": "订阅任务执行进度",
+            },
+        ),
+    ]
@@ -12,9 +12,11 @@ import base64
 import copy
 import hashlib
 import json
+import math
 import operator
 import os
 import random
+import re
 import shutil
 import subprocess
 import tarfile
@@ -24,16 +26,18 @@ from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from distutils.dir_util import copy_tree
 from enum import Enum
-from functools import cmp_to_key, reduce
-from typing import Any, Dict, List, Optional, Set, Union
+from functools import reduce
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
 import requests
 import six
 from Cryptodome.Cipher import AES
 from django.conf import settings
 from django.core.cache import cache
-from django.db import models
-from django.db.models import Q, QuerySet
+from django.db import models, transaction
+from django.db.models import F, Q, QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.encoding import force_text
 from django.utils.functional import Promise
@@ -63,6 +67,7 @@ from apps.prometheus.models import (
     export_subscription_prometheus_mixin,
 )
 from apps.utils import basic, files, orm, translation
+from apps.utils.cache import LocalTTLCache
 from common.log import logger
 from env.constants import GseVersion
 from pipeline.parser import PipelineParser
@@ -92,6 +97,8 @@ class GlobalSettings(models.Model):
         CONCURRENT_CONTROLLER_SETTINGS = "CONCURRENT_CONTROLLER_SETTINGS"
         # 订阅任务单Pipeline执行主机数
         TASK_HOST_LIMIT = "TASK_HOST_LIMIT"
+        # 创建订阅任务时分块写入实例记录的数量
+        CREATE_TASK_CHUNK_SIZE = "CREATE_TASK_CHUNK_SIZE"
         # DB 每批操作数
         BATCH_SIZE = "BATCH_SIZE"
         USE_TJJ = "USE_TJJ"  # 是否启用TJJ
@@ -132,6 +139,8 @@ class GlobalSettings(models.Model):
         NEED_TO_WAIT_EXTRA_INSTALL_COMPLETE = "NEED_TO_WAIT_EXTRA_INSTALL_COMPLETE"
         # P-Agent 安装脚本名称
         SETUP_PAGENT_SCRIPT_FILENAME = "SETUP_PAGENT_SCRIPT_FILENAME"
+        # 主机模糊搜索 n-gram 索引是否已完成全量构建
+        HOST_SEARCH_INDEX_READY = "HOST_SEARCH_INDEX_READY"
 
     key = models.CharField(_("键"), max_length=255, db_index=True, primary_key=True)
     v_json = JSONField(_("值"))
@@ -154,26 +163,144 @@ class GlobalSettings(models.Model):
 
         return result
 
+    # 两级缓存：进程内缓存（短 TTL）+ Redis 缓存（按版本号隔离），配置变更时递增版本号使所有进程的 Redis 缓存失效
+    _local_cache = LocalTTLCache(
+        max_size=settings.GLOBAL_SETTINGS_LOCAL_CACHE_SIZE, ttl=settings.GLOBAL_SETTINGS_LOCAL_CACHE_TTL
+    )
+    # 标记配置不存在，避免不存在的配置反复穿透到 DB
+    _MISSING_MARK = "__missing__"
+
     @classmethod
-    def get_config(cls, key=None, default=None):
+    def _get_redis_inst(cls):
+        from apps.backend.utils.redis import RedisInstSingleTon
+
+        return RedisInstSingleTon.get_inst()
+
+    @classmethod
+    def _get_cache_data_key(cls, redis_inst) -> Optional[str]:
         try:
-            return cls.objects.get(key=key).v_json
-        except cls.DoesNotExist:
+            version = redis_inst.get(constants.GLOBAL_SETTINGS_CACHE_VERSION_KEY) or 0
+        except Exception as e:
+            logger.warning(f"[GlobalSettings] get cache version failed, err_msg -> {e}")
+            return None
+        return constants.GLOBAL_SETTINGS_CACHE_DATA_KEY_TMPL.format(version=int(version))
+
+    @classmethod
+    def _load_configs(cls, keys: List[str]) -> Dict[str, Any]:
+        """
+        依次从 进程内缓存 -> Redis -> DB 加载配置，并回填上一级缓存
+        :param keys: 配置键列表
+        :return: 配置键 - 配置值映射，不存在的配置值为 _MISSING_MARK
+        """
+        key__value_map: Dict[str, Any] = {}
+        for key in keys:
+            is_hit, value = cls._local_cache.get(key)
+            if is_hit:
+                key__value_map[key] = value
+
+        missing_keys: List[str] = [key for key in keys if key not in key__value_map]
+        if not missing_keys:
+            return key__value_map
+
+        redis_inst = cls._get_redis_inst()
+        cache_data_key: Optional[str] = cls._get_cache_data_key(redis_inst) if redis_inst else None
+        if cache_data_key:
+            try:
+                cached_values: List[Optional[str]] = redis_inst.hmget(cache_data_key, missing_keys)
+            except Exception as e:
+                logger.warning(f"[GlobalSettings] get configs from redis failed, err_msg -> {e}")
+                cached_values = [None] * len(missing_keys)
+            for key, cached_value in zip(missing_keys, cached_values):
+                if cached_value is None:
+                    continue
+                key__value_map[key] = json.loads(cached_value)
+                cls._local_cache.set(key, key__value_map[key])
+
+        missing_keys = [key for key in keys if key not in key__value_map]
+        if not missing_keys:
+            return key__value_map
+
+        db_key__value_map: Dict[str, Any] = dict(cls.objects.filter(key__in=missing_keys).values_list("key", "v_json"))
+        for key in missing_keys:
+            key__value_map[key] = db_key__value_map.get(key, cls._MISSING_MARK)
+            cls._local_cache.set(key, key__value_map[key])
+
+        if cache_data_key:
+            try:
+                with redis_inst.pipeline() as pipe:
+                    pipe.hset(cache_data_key, mapping={key: json.dumps(key__value_map[key]) for key in missing_keys})
+                    pipe.expire(cache_data_key, settings.GLOBAL_SETTINGS_REDIS_CACHE_TTL)
+                    pipe.execute()
+            except Exception as e:
+                logger.warning(f"[GlobalSettings] set configs to redis failed, err_msg -> {e}")
+
+        return key__value_map
+
+    @classmethod
+    def invalidate_cache(cls, key: Optional[str] = None):
+        """
+        使配置缓存失效
+        :param key: 配置键，本进程内仅失效该键，为空时清空本进程缓存；Redis 缓存通过递增版本号整体失效
+        :return:
+        """
+        if key is None:
+            cls._local_cache.clear()
+        else:
+            cls._local_cache.delete(key)
+
+        redis_inst = cls._get_redis_inst()
+        if not redis_inst:
+            return
+        try:
+            redis_inst.incr(constants.GLOBAL_SETTINGS_CACHE_VERSION_KEY)
+        except Exception as e:
+            logger.warning(f"[GlobalSettings] incr cache version failed, err_msg -> {e}")
+
+    @classmethod
+    def get_config(cls, key=None, default=None):
+        value = cls._load_configs([key])[key]
+        if value == cls._MISSING_MARK:
             return default
+        # 返回副本，防止调用方修改缓存中的对象
+        return copy.deepcopy(value)
+
+    @classmethod
+    def get_configs(cls, keys: List[str], default=None) -> Dict[str, Any]:
+        """
+        批量获取配置，未命中缓存的配置通过一次查询加载
+        :param keys: 配置键列表
+        :param default: 配置不存在时的默认值
+        :return: 配置键 - 配置值映射
+        """
+        key__value_map: Dict[str, Any] = cls._load_configs(list(set(keys)))
+        return {
+            key: (default if value == cls._MISSING_MARK else copy.deepcopy(value))
+            for key, value in key__value_map.items()
+        }
 
     @classmethod
     def set_config(cls, key, value):
+        # 缓存由 post_save 信号失效
         cls.objects.create(key=key, v_json=value)
 
     @classmethod
     def update_config(cls, key, value):
         cls.objects.filter(key=key).update(v_json=value)
+        cls.invalidate_cache(key)
 
     class Meta:
         verbose_name = _("配置表（GlobalSettings）")
         verbose_name_plural = _("配置表（GlobalSettings）")
 
 
+@receiver([post_save, post_delete], sender=GlobalSettings)
+def invalidate_global_settings_cache(sender, instance: GlobalSettings, **kwargs):
+    """通过模型保存 / 删除修改配置时（如 admin、update_or_create），同样需要使缓存失效"""
+    sender.invalidate_cache(instance.key)
+    # 事务提交前其他进程仍可能回填旧值，提交后再次失效
+    transaction.on_commit(lambda: sender.invalidate_cache(instance.key))
+
+
 class AESCipher(object):
     """
     AES256加解密器
@@ -556,6 +683,134 @@ class Host(models.Model):
         ordering = ["-updated_at", "-bk_host_id"]
 
 
+class HostSearchToken(models.Model):
+    """
+    主机模糊搜索 n-gram 倒排索引，每行记录一个 token 及包含该 token 的主机
+    模糊搜索时先按输入的 n-gram 求交得到候选主机，再对候选主机执行 like 校验，避免 like '%value%' 全表扫描
+    """
+
+    # n-gram 长度
+    TOKEN_SIZE = 3
+    # 单次查询最多使用的 token 数量，token 越多候选集越小，但子查询代价越高
+    MAX_QUERY_TOKENS = 8
+    # 建立索引的主机字段
+    INDEX_FIELDS = ["inner_ip", "inner_ipv6", "bk_host_name", "bk_agent_id"]
+    # 单批次刷新的主机数量
+    REFRESH_BATCH_SIZE = 1000
+
+    # 主机变更时索引按主机删除后重建，自增ID消耗较快
+    id = models.BigAutoField(primary_key=True)
+    token = models.CharField(_("N-gram"), max_length=TOKEN_SIZE)
+    bk_host_id = models.IntegerField(_("主机ID"), db_index=True)
+
+    class Meta:
+        verbose_name = _("主机搜索索引")
+        verbose_name_plural = _("主机搜索索引")
+        unique_together = (("token", "bk_host_id"),)
+
+    @classmethod
+    def tokenize(cls, value: str) -> List[str]:
+        """
+        将字符串切分为 n-gram，按出现顺序去重，统一转为小写以匹配 like 的大小写不敏感语义
+        :param value: 待切分字符串
+        :return:
+        """
+        value = (value or "").lower()
+        return list(dict.fromkeys(value[idx : idx + cls.TOKEN_SIZE] for idx in range(len(value) - cls.TOKEN_SIZE + 1)))
+
+    @classmethod
+    def is_ready(cls) -> bool:
+        return bool(GlobalSettings.get_config(key=GlobalSettings.KeyEnum.HOST_SEARCH_INDEX_READY.value, default=False))
+
+    @classmethod
+    def set_ready(cls, is_ready: bool):
+        # 缓存由 GlobalSettings 的 post_save 信号失效
+        GlobalSettings.objects.update_or_create(
+            key=GlobalSettings.KeyEnum.HOST_SEARCH_INDEX_READY.value, defaults={"v_json": is_ready}
+        )
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return settings.HOST_SEARCH_INDEX_ENABLE and cls.is_ready()
+
+    @classmethod
+    def get_query_tokens(cls, value: str, fuzzy_search_fields: List[str]) -> Optional[List[str]]:
+        """
+        获取模糊查询可用的 token 列表
+        :param value: 用户输入
+        :param fuzzy_search_fields: 模糊查询字段
+        :return: 索引不可用或无法通过索引缩小范围时返回 None，此时应回退为 like 查询
+        """
+        if not (fuzzy_search_fields and set(fuzzy_search_fields).issubset(cls.INDEX_FIELDS)):
+            return None
+        if not cls.is_available():
+            return None
+
+        # like 通配符及转义符可匹配任意内容，仅使用字面量片段切分 token，保证候选集包含全部 like 命中结果
+        tokens: List[str] = []
+        for segment in re.split(r"[%_\\]", value):
+            tokens.extend(cls.tokenize(segment))
+        tokens = list(dict.fromkeys(tokens))
+        if not tokens:
+            return None
+        # token 过多时均匀采样，任意子集求交均为结果的超集
+        step: int = math.ceil(len(tokens) / cls.MAX_QUERY_TOKENS)
+        return tokens[::step]
+
+    @classmethod
+    def refresh(cls, bk_host_ids: Union[List[int], Set[int]]):
+        """
+        刷新主机索引，主机不存在时仅清理索引
+        :param bk_host_ids: 主机ID列表
+        :return:
+        """
+        # 未完成全量构建时，索引不会被查询使用，无需维护
+        if not cls.is_ready():
+            return
+        cls.refresh_without_check(bk_host_ids)
+
+    @classmethod
+    def refresh_without_check(cls, bk_host_ids: Union[List[int], Set[int]]):
+        bk_host_ids: List[int] = list(set(bk_host_ids))
+        for begin in range(0, len(bk_host_ids), cls.REFRESH_BATCH_SIZE):
+            partial_host_ids: List[int] = bk_host_ids[begin : begin + cls.REFRESH_BATCH_SIZE]
+            token_objs: List[HostSearchToken] = []
+            for host_info in Host.objects.filter(bk_host_id__in=partial_host_ids).values(
+                "bk_host_id", *cls.INDEX_FIELDS
+            ):
+                tokens: Set[str] = set()
+                for field in cls.INDEX_FIELDS:
+                    tokens.update(cls.tokenize(host_info[field]))
+                token_objs.extend([cls(token=token, bk_host_id=host_info["bk_host_id"]) for token in tokens])
+
+            with transaction.atomic():
+                cls.objects.filter(bk_host_id__in=partial_host_ids).delete()
+                # 同一主机并发刷新时，写入的 token 可能已由另一事务写入，忽略冲突避免刷新失败
+                # 并发刷新最多残留旧 token，仅扩大候选集，结果仍由 like 校验保证准确
+                cls.objects.bulk_create(token_objs, batch_size=cls.REFRESH_BATCH_SIZE, ignore_conflicts=True)
+
+    @classmethod
+    def rebuild(cls):
+        """全量重建索引，构建期间标记为不可用，查询回退为 like"""
+        cls.set_ready(False)
+        cls.objects.all().delete()
+
+        last_host_id: int = 0
+        while True:
+            bk_host_ids: List[int] = list(
+                Host.objects.filter(bk_host_id__gt=last_host_id)
+                .order_by("bk_host_id")
+                .values_list("bk_host_id", flat=True)[: cls.REFRESH_BATCH_SIZE]
+            )
+            if not bk_host_ids:
+                break
+            cls.refresh_without_check(bk_host_ids)
+            last_host_id = bk_host_ids[-1]
+            logger.info(f"[HostSearchToken] rebuild: last_host_id -> {last_host_id}")
+
+        cls.set_ready(True)
+
+
 class ProcessStatus(models.Model):
     class SourceType(object):
         DEFAULT = "default"
@@ -2034,120 +2289,143 @@ class Subscription(export_subscription_prometheus_mixin(), orm.SoftDeleteModel):
             )
         return host_id__bk_obj_sub_map
 
-    def check_is_suppressed(
+    def build_suppression_index(self, topo_order: List[str]) -> Dict[str, Any]:
+        """
+        预编译当前订阅的策略抑制索引，同一订阅任务内仅需构造一次
+        :param topo_order: 拓扑层级顺序，越靠后层级越低、优先级越高
+        :return:
+            {
+                # CMDB对象ID -> 优先级，等价于 topo_order.index(bk_obj_id)
+                "bk_obj_id__priority_map": {"biz": 0, "set": 1, "module": 2, "host": 3},
+                # 订阅范围内的业务ID
+                "biz_inst_ids": {2},
+                # 除业务、主机外的拓扑层级 -> 订阅范围内的实例ID，按优先级降序排列
+                "bk_obj_id__inst_ids_list": [("module", {10}), ("set", {5})],
+                # 订阅范围内的主机ID
+                "host_ids": {1},
+                # 订阅范围内的 管控区域 + IP
+                "cloud_ip_set": {(0, "127.0.0.1")},
+            }
+        """
+        bk_obj_id__priority_map: Dict[str, int] = {}
+        for priority, bk_obj_id in enumerate(topo_order):
+            # 与 list.index 保持一致，取首次出现的位置
+            bk_obj_id__priority_map.setdefault(bk_obj_id, priority)
+
+        biz_inst_ids: Set[Any] = set()
+        host_ids: Set[Any] = set()
+        cloud_ip_set: Set[Tuple[Any, Any]] = set()
+        bk_obj_id__inst_ids_map: Dict[str, Set[Any]] = defaultdict(set)
+        for sub_scope in self.nodes:
+            bk_obj_id = sub_scope.get("bk_obj_id")
+            if bk_obj_id == constants.CmdbObjectId.BIZ:
+                biz_inst_ids.add(sub_scope.get("bk_inst_id"))
+            elif bk_obj_id is not None:
+                bk_obj_id__inst_ids_map[bk_obj_id].add(sub_scope.get("bk_inst_id"))
+
+            if "bk_host_id" in sub_scope:
+                host_ids.add(sub_scope["bk_host_id"])
+            if "bk_cloud_id" in sub_scope and "ip" in sub_scope:
+                cloud_ip_set.add((sub_scope["bk_cloud_id"], sub_scope["ip"]))
+
+        # 低层级的匹配结果覆盖高层级，倒序遍历时命中即可返回
+        bk_obj_id__inst_ids_list: List[Tuple[str, Set[Any]]] = []
+        for bk_obj_id in reversed(topo_order):
+            if bk_obj_id in [constants.CmdbObjectId.BIZ, constants.CmdbObjectId.HOST]:
+                continue
+            if bk_obj_id__inst_ids_map.get(bk_obj_id):
+                bk_obj_id__inst_ids_list.append((bk_obj_id, bk_obj_id__inst_ids_map[bk_obj_id]))
+
+        return {
+            "bk_obj_id__priority_map": bk_obj_id__priority_map,
+            "biz_inst_ids": biz_inst_ids,
+            "bk_obj_id__inst_ids_list": bk_obj_id__inst_ids_list,
+            "host_ids": host_ids,
+            "cloud_ip_set": cloud_ip_set,
+        }
+
+    def get_sub_inst_bk_obj_id(
+        self, cmdb_host_info: Dict[str, Any], suppression_index: Dict[str, Any]
+    ) -> Optional[str]:
+        """
+        获取订阅实例目标匹配的拓扑层级，匹配优先级：主机 > 自定义层级（由低到高） > 业务
+        :param cmdb_host_info: cmdb的host结构，所需字段：bk_biz_id bk_cloud_id bk_host_innerip bk_host_id
+        :param suppression_index: build_suppression_index 构造的抑制索引
+        :return:
+        """
+        # 订阅全为主机节点，表明目标匹配的拓扑层级为HOST，直接返回
+        if self.node_type == self.NodeType.INSTANCE and self.object_type == self.ObjectType.HOST:
+            return constants.CmdbObjectId.HOST
+
+        bk_biz_id = cmdb_host_info["bk_biz_id"]
+
+        # 最低层级一定是主机，兼容 bk_host_id 和 IP+管控区域两种模式
+        if cmdb_host_info["bk_host_id"] in suppression_index["host_ids"]:
+            return constants.CmdbObjectId.HOST
+        if suppression_index["cloud_ip_set"] and (
+            (cmdb_host_info["bk_cloud_id"], cmdb_host_info["bk_host_innerip"]) in suppression_index["cloud_ip_set"]
+        ):
+            return constants.CmdbObjectId.HOST
+
+        for bk_obj_id, inst_ids in suppression_index["bk_obj_id__inst_ids_list"]:
+            if not inst_ids.isdisjoint(cmdb_host_info.get(bk_obj_id) or []):
+                return bk_obj_id
+
+        if bk_biz_id in suppression_index["biz_inst_ids"]:
+            return constants.CmdbObjectId.BIZ
+        return None
+
+    def bulk_check_is_suppressed(
         self,
         action: str,
-        cmdb_host_info: Dict[str, Any],
+        cmdb_host_infos: List[Dict[str, Any]],
         topo_order: List[str],
         host_id__bk_obj_sub_map: Dict[int, Any],
-    ) -> Dict:
+        suppression_index: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict]:
         """
-        计算被抑制的订阅实例是否被抑制，并返回订阅实例在指定订阅中的CMDB对象ID
+        批量计算订阅实例是否被抑制，返回结果与 cmdb_host_infos 一一对应，单个结果结构同 check_is_suppressed
         :param action: 实例执行动作
-        :param cmdb_host_info: cmdb的host结构，所需字段：bk_biz_id bk_cloud_id bk_host_innerip bk_host_id
+        :param cmdb_host_infos: cmdb的host结构列表，所需字段：bk_biz_id bk_cloud_id bk_host_innerip bk_host_id
         :param topo_order:
-        :param host_id__bk_obj_sub_map: 主机插件对应的CMDB对象及订阅映射
-            {
-                1: [{
-                    "bk_obj_id": "biz",
-                    "subscription": Subscription,
-                }],
-                2: [{
-                    "bk_obj_id": "host",
-                    "subscription": Subscription,
-                }]
-            }
+        :param host_id__bk_obj_sub_map: 主机插件对应的CMDB对象及订阅映射，参考 get_host_id__bk_obj_sub_map
+        :param suppression_index: 预编译的抑制索引，为空时根据 topo_order 构造
         :return:
         """
 
-        def _cal_priority(_bk_obj_sub: Dict) -> int:
-            """计算主机部署策略优先级"""
-            _bk_obj_id = _bk_obj_sub["bk_obj_id"]
-            _priority = topo_order.index(_bk_obj_id) if _bk_obj_id in topo_order else -1
-            return _priority
+        # TODO 非策略、非一次性订阅任务的其他订阅无需考虑抑制情况，是否校验其他订阅存在部署主配置的情况等待讨论
+        # 一次性订阅仅 「安装 / 更新插件」（Action相同）需要计算抑制关系，其他动作允许策略中豁免
+        if not self.category or (
+            self.category == self.CategoryType.ONCE and action not in [constants.JobType.MAIN_INSTALL_PLUGIN]
+        ):
+            return [
+                {"is_suppressed": False, "sub_inst_bk_obj_id": None, "ordered_bk_obj_subs": None}
+                for __ in cmdb_host_infos
+            ]
+
+        if suppression_index is None:
+            suppression_index = self.build_suppression_index(topo_order)
+        bk_obj_id__priority_map: Dict[str, int] = suppression_index["bk_obj_id__priority_map"]
 
-        def _bk_obj_sub_comparator(_left: Dict, _right: Dict) -> int:
+        def _bk_obj_sub_sort_key(_bk_obj_sub: Dict) -> Tuple[int, Any]:
             """
-            主机部署策略优先级比较器
+            主机部署策略优先级排序键，升序排列
             优先级比已存在的小，则认为被抑制
             相同优先级时，新策略抑制旧策略（通过创建时间判断）
             """
-            # _left < _right 返回-1，在sorted体现升序
-            if _cal_priority(_left) < _cal_priority(_right) or (
-                _cal_priority(_left) == _cal_priority(_right)
-                and _left["subscription"].create_time < _right["subscription"].create_time
-            ):
-                return -1
-            return 1
-
-        def _get_ordered_bk_obj_subs(_bk_obj_subs: List[Dict]) -> List[Dict]:
-            """获取优先级升序的主机部署策略列表"""
-            _sorted_bk_obj_subs = sorted(_bk_obj_subs, key=cmp_to_key(_bk_obj_sub_comparator))
-            return _sorted_bk_obj_subs
-
-        def _fetch_bk_obj_subs_by_host_id(_bk_host_id) -> List[Dict]:
-            """根据主机ID获取主机部署策略列表"""
-            _bk_obj_subs = []
-            for _bk_obj_sub in host_id__bk_obj_sub_map.get(_bk_host_id, []):
-                # 跳过当前订阅：
-                if _bk_obj_sub["subscription"].id == self.id:
-                    continue
-                _bk_obj_subs.append(_bk_obj_sub)
-            return _bk_obj_subs
-
-        def _get_sub_inst_bk_obj_id() -> Optional[str]:
-            """获取订阅实例目标匹配的拓扑层级"""
-
-            # 订阅全为主机节点，表明目标匹配的拓扑层级为HOST，直接返回
-            if self.node_type == self.NodeType.INSTANCE and self.object_type == self.ObjectType.HOST:
-                return constants.CmdbObjectId.HOST
-
-            # 订阅实例目标匹配的拓扑层级
-            _sub_inst_bk_obj_id = None
-
-            _bk_biz_id = cmdb_host_info["bk_biz_id"]
-
-            for sub_scope in self.nodes:
-                # 单独处理业务层级
-                if (
-                    sub_scope.get("bk_obj_id") == constants.CmdbObjectId.BIZ
-                    and sub_scope.get("bk_inst_id") == _bk_biz_id
-                ):
-                    _sub_inst_bk_obj_id = constants.CmdbObjectId.BIZ
-
-            for bk_obj_id in topo_order:
-                if bk_obj_id in [constants.CmdbObjectId.BIZ, constants.CmdbObjectId.HOST]:
-                    # 业务和主机单独处理
-                    continue
-
-                # 其它层级统一处理
-                bk_inst_ids = cmdb_host_info.get(bk_obj_id, [])
-                for sub_scope in self.nodes:
-                    # 找出实例在scope中所属节点的bk_obj_id
-                    if sub_scope.get("bk_obj_id") == bk_obj_id and sub_scope.get("bk_inst_id") in bk_inst_ids:
-                        _sub_inst_bk_obj_id = bk_obj_id
-
-            # 最低层级一定是主机
-            for sub_scope in self.nodes:
-                # 单独处理业务层级，兼容 bk_host_id 和 IP+管控区域两种模式
-                if ("bk_host_id" in sub_scope and sub_scope["bk_host_id"] == cmdb_host_info["bk_host_id"]) or (
-                    "bk_cloud_id" in sub_scope
-                    and "ip" in sub_scope
-                    and sub_scope["bk_cloud_id"] == cmdb_host_info["bk_cloud_id"]
-                    and sub_scope["ip"] == cmdb_host_info["bk_host_innerip"]
-                ):
-                    _sub_inst_bk_obj_id = constants.CmdbObjectId.HOST
-            return _sub_inst_bk_obj_id
+            return (
+                bk_obj_id__priority_map.get(_bk_obj_sub["bk_obj_id"], -1),
+                _bk_obj_sub["subscription"].create_time,
+            )
 
         def _construct_return_data(
-            _is_suppressed: bool,
-            _sub_inst_bk_obj_id: Optional[str] = None,
-            _highest_priority_target: Optional[Dict[str, Any]] = None,
+            _sub_inst_bk_obj_id: Optional[str],
             _ordered_bk_obj_subs: Optional[List[Dict[str, Any]]] = None,
-        ):
-            if not _is_suppressed:
+            _highest_priority_target: Optional[Dict[str, Any]] = None,
+        ) -> Dict[str, Any]:
+            if _highest_priority_target is None:
                 return {
-                    "is_suppressed": _is_suppressed,
+                    "is_suppressed": False,
                     "sub_inst_bk_obj_id": _sub_inst_bk_obj_id,
                     "ordered_bk_obj_subs": _ordered_bk_obj_subs,
                 }
@@ -2166,51 +2444,81 @@ class Subscription(export_subscription_prometheus_mixin(), orm.SoftDeleteModel):
                 },
             }
 
-        # TODO 非策略、非一次性订阅任务的其他订阅无需考虑抑制情况，是否校验其他订阅存在部署主配置的情况等待讨论
-        if not self.category:
-            return _construct_return_data(_is_suppressed=False)
-
-        # 一次性订阅仅 「安装 / 更新插件」（Action相同）需要计算抑制关系，其他动作允许策略中豁免
-        if self.category == self.CategoryType.ONCE and action not in [constants.JobType.MAIN_INSTALL_PLUGIN]:
-            return _construct_return_data(_is_suppressed=False)
+        results: List[Dict[str, Any]] = []
+        for cmdb_host_info in cmdb_host_infos:
+            # 获取订阅实例目标匹配的拓扑层级
+            sub_inst_bk_obj_id = self.get_sub_inst_bk_obj_id(cmdb_host_info, suppression_index)
+            # 根据主机ID获取主机部署策略列表，跳过当前订阅
+            bk_obj_subs = [
+                bk_obj_sub
+                for bk_obj_sub in host_id__bk_obj_sub_map.get(cmdb_host_info["bk_host_id"], [])
+                if bk_obj_sub["subscription"].id != self.id
+            ]
+
+            if self.category == self.CategoryType.ONCE:
+                """
+                一次性订阅的优先级规则：
+                「主机所属订阅均为一次性订阅」「主机所属订阅为空」 新订阅抑制旧订阅
+                「主机所属订阅包含策略类型」被所有策略类型的订阅抑制
+                综上：由于 host_id__bk_obj_sub_map 仅查询「策略」，当主机归属策略不为空时，主机所属一次性订阅被抑制
+                简述：一次性订阅不能操作被「策略」覆盖的主机
+                """
+                if not bk_obj_subs:
+                    results.append(_construct_return_data(sub_inst_bk_obj_id))
+                    continue
 
-        # 获取订阅实例目标匹配的拓扑层级
-        sub_inst_bk_obj_id = _get_sub_inst_bk_obj_id()
+                # 主机已被策略部署，一次性订阅被抑制，返回被最高优先级策略抑制的信息
+                ordered_bk_obj_subs = sorted(bk_obj_subs, key=_bk_obj_sub_sort_key)
+                results.append(_construct_return_data(sub_inst_bk_obj_id, ordered_bk_obj_subs, ordered_bk_obj_subs[-1]))
+                continue
 
-        if self.category == self.CategoryType.ONCE:
-            """
-            一次性订阅的优先级规则：
-            「主机所属订阅均为一次性订阅」「主机所属订阅为空」 新订阅抑制旧订阅
-            「主机所属订阅包含策略类型」被所有策略类型的订阅抑制
-            综上：由于 host_id__bk_obj_sub_map 仅查询「策略」，当主机归属策略不为空时，主机所属一次性订阅被抑制
-            简述：一次性订阅不能操作被「策略」覆盖的主机
-            """
-            bk_obj_subs = _fetch_bk_obj_subs_by_host_id(cmdb_host_info["bk_host_id"])
-            if not bk_obj_subs:
-                return _construct_return_data(False, sub_inst_bk_obj_id)
+            # 根据当前订阅实例构造一个bk_obj_sub，整合已部署的主机策略信息及当前策略进行优先级排序
+            bk_obj_subs.append({"subscription": self, "bk_obj_id": sub_inst_bk_obj_id})
+            ordered_bk_obj_subs = sorted(bk_obj_subs, key=_bk_obj_sub_sort_key)
 
-            # 主机已被策略部署，一次性订阅被抑制，返回被最高优先级策略抑制的信息
-            ordered_bk_obj_subs = _get_ordered_bk_obj_subs(bk_obj_subs)
             highest_priority_target = ordered_bk_obj_subs[-1]
-            return _construct_return_data(
-                True, sub_inst_bk_obj_id, highest_priority_target, _ordered_bk_obj_subs=ordered_bk_obj_subs
-            )
-
-        # 根据当前订阅实例构造一个bk_obj_sub
-        current_bk_obj_sub = {"subscription": self, "bk_obj_id": sub_inst_bk_obj_id}
-        # 整合已部署的主机策略信息及当前策略进行优先级排序
-        ordered_bk_obj_subs = _get_ordered_bk_obj_subs(
-            _fetch_bk_obj_subs_by_host_id(cmdb_host_info["bk_host_id"]) + [current_bk_obj_sub]
-        )
+            # 当前实例的部署策略不是最高优先级，返回被抑制情况
+            if highest_priority_target["subscription"].id != self.id:
+                results.append(_construct_return_data(sub_inst_bk_obj_id, ordered_bk_obj_subs, highest_priority_target))
+            else:
+                results.append(_construct_return_data(sub_inst_bk_obj_id, ordered_bk_obj_subs))
+        return results
 
-        highest_priority_target = ordered_bk_obj_subs[-1]
-        highest_priority_sub = highest_priority_target["subscription"]
-        # 当前实例的部署策略不是最高优先级，返回被抑制情况
-        if highest_priority_sub.id != self.id:
-            return _construct_return_data(
-                True, sub_inst_bk_obj_id, highest_priority_target, _ordered_bk_obj_subs=ordered_bk_obj_subs
-            )
-        return _construct_return_data(False, sub_inst_bk_obj_id, _ordered_bk_obj_subs=ordered_bk_obj_subs)
+    def check_is_suppressed(
+        self,
+        action: str,
+        cmdb_host_info: Dict[str, Any],
+        topo_order: List[str],
+        host_id__bk_obj_sub_map: Dict[int, Any],
+        suppression_index: Optional[Dict[str, Any]] = None,
+    ) -> Dict:
+        """
+        计算被抑制的订阅实例是否被抑制，并返回订阅实例在指定订阅中的CMDB对象ID
+        批量场景请使用 bulk_check_is_suppressed，避免逐台主机重复构造抑制索引
+        :param action: 实例执行动作
+        :param cmdb_host_info: cmdb的host结构，所需字段：bk_biz_id bk_cloud_id bk_host_innerip bk_host_id
+        :param topo_order:
+        :param host_id__bk_obj_sub_map: 主机插件对应的CMDB对象及订阅映射
+            {
+                1: [{
+                    "bk_obj_id": "biz",
+                    "subscription": Subscription,
+                }],
+                2: [{
+                    "bk_obj_id": "host",
+                    "subscription": Subscription,
+                }]
+            }
+        :param suppression_index: 预编译的抑制索引，为空时根据 topo_order 构造
+        :return:
+        """
+        return self.bulk_check_is_suppressed(
+            action=action,
+            cmdb_host_infos=[cmdb_host_info],
+            topo_order=topo_order,
+            host_id__bk_obj_sub_map=host_id__bk_obj_sub_map,
+            suppression_index=suppression_index,
+        )[0]
 
     class Meta:
         verbose_name = _("订阅（Subscription）")
@@ -2400,11 +2708,142 @@ class SubscriptionInstanceRecord(models.Model):
         verbose_name_plural = _("订阅实例记录")
 
 
+class SubscriptionTaskProgress(models.Model):
+    """
+    订阅任务执行进度
+    按状态物化任务下订阅实例的数量，随订阅实例的创建及状态流转增量更新，
+    轮询任务结果时直接读取，无需对任务下的全部订阅实例记录重新聚合
+    """
+
+    task_id = models.IntegerField(_("任务ID"), primary_key=True)
+    subscription_id = models.IntegerField(_("订阅ID"), db_index=True)
+    total_count = models.IntegerField(_("实例总数"), default=0)
+    pending_count = models.IntegerField(_("等待执行数"), default=0)
+    running_count = models.IntegerField(_("正在执行数"), default=0)
+    success_count = models.IntegerField(_("执行成功数"), default=0)
+    failed_count = models.IntegerField(_("执行失败数"), default=0)
+    update_time = models.DateTimeField(_("更新时间"), auto_now=True)
+
+    # 订阅实例状态 -> 计数字段
+    STATUS_FIELD_MAP: Dict[str, str] = {
+        constants.JobStatusType.PENDING: "pending_count",
+        constants.JobStatusType.RUNNING: "running_count",
+        constants.JobStatusType.SUCCESS: "success_count",
+        constants.JobStatusType.FAILED: "failed_count",
+    }
+
+    class Meta:
+        verbose_name = _("订阅任务执行进度")
+        verbose_name_plural = _("订阅任务执行进度")
+
+    @property
+    def status_counter(self) -> Dict[str, int]:
+        """状态统计，与实时聚合的结构保持一致：仅包含存在实例的状态及总数"""
+        status_counter: Dict[str, int] = {}
+        for status, field in self.STATUS_FIELD_MAP.items():
+            count: int = getattr(self, field)
+            if count:
+                status_counter[status] = count
+        status_counter["total"] = self.total_count
+        return status_counter
+
+    @classmethod
+    def incr_created_records(cls, task_id: int, subscription_id: int, status_counter: Dict[str, int]):
+        """
+        记录任务下新创建的订阅实例
+        :param task_id: 任务ID
+        :param subscription_id: 订阅ID
+        :param status_counter: 新建订阅实例的状态统计
+        """
+        update_kwargs: Dict[str, Any] = {"total_count": F("total_count") + sum(status_counter.values())}
+        for status, count in status_counter.items():
+            field = cls.STATUS_FIELD_MAP[status]
+            update_kwargs[field] = F(field) + count
+        if cls.objects.filter(task_id=task_id).update(**update_kwargs):
+            return
+
+        # 任务下的订阅实例按块串行创建，首块创建时初始化进度
+        create_kwargs: Dict[str, int] = {
+            cls.STATUS_FIELD_MAP[status]: count for status, count in status_counter.items()
+        }
+        cls.objects.create(
+            task_id=task_id, subscription_id=subscription_id, total_count=sum(status_counter.values()), **create_kwargs
+        )
+
+    @classmethod
+    def bulk_set_record_status(cls, record_ids: Union[List[int], Set[int]], status: str, **update_kwargs) -> int:
+        """
+        批量设置订阅实例状态，并按状态流转增量更新所属任务的执行进度
+        :param record_ids: 订阅实例ID列表
+        :param status: 目标状态
+        :param update_kwargs: 需要一并更新的其他字段
+        :return: 更新的订阅实例数量
+        """
+        return cls.bulk_set_record_statuses({status: record_ids}, **update_kwargs)
+
+    @classmethod
+    def bulk_set_record_statuses(
+        cls, status__record_ids_map: Dict[str, Union[List[int], Set[int]]], **update_kwargs
+    ) -> int:
+        """
+        按目标状态分组批量设置订阅实例状态，并按状态流转增量更新所属任务的执行进度
+        同一事务内先锁定全部订阅实例，再按任务ID升序更新进度，与其他状态写入的加锁顺序保持一致，避免死锁
+        存在无法物化的状态流转时，移除对应任务的进度，查询时回退为实时聚合
+        :param status__record_ids_map: 目标状态 - 订阅实例ID列表
+        :param update_kwargs: 需要一并更新的其他字段
+        :return: 更新的订阅实例数量
+        """
+        record_id__status_map: Dict[int, str] = {
+            record_id: status for status, record_ids in status__record_ids_map.items() for record_id in record_ids
+        }
+        if not record_id__status_map:
+            return 0
+
+        updated_num: int = 0
+        task_id__field_delta_map: Dict[int, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        with transaction.atomic():
+            # 锁定订阅实例，保证读取的原状态与本次更新之间不会被并发的状态流转覆盖
+            records = (
+                SubscriptionInstanceRecord.objects.select_for_update()
+                .filter(id__in=record_id__status_map.keys())
+                .order_by("id")
+                .values_list("id", "task_id", "status")
+            )
+            for record_id, task_id, old_status in records:
+                status: str = record_id__status_map[record_id]
+                if old_status == status:
+                    continue
+                task_id__field_delta_map[task_id][cls.STATUS_FIELD_MAP.get(old_status)] -= 1
+                task_id__field_delta_map[task_id][cls.STATUS_FIELD_MAP.get(status)] += 1
+
+            for status, record_ids in status__record_ids_map.items():
+                if record_ids:
+                    updated_num += SubscriptionInstanceRecord.objects.filter(id__in=record_ids).update(
+                        status=status, **update_kwargs
+                    )
+
+            # 按任务ID升序逐行更新进度，并发事务以相同顺序加锁，避免交叉持锁导致死锁
+            for task_id in sorted(task_id__field_delta_map):
+                field_delta_map: Dict[str, int] = task_id__field_delta_map[task_id]
+                if None in field_delta_map:
+                    cls.objects.filter(task_id=task_id).delete()
+                    continue
+                progress_update_kwargs: Dict[str, Any] = {
+                    field: F(field) + delta for field, delta in field_delta_map.items() if delta
+                }
+                if progress_update_kwargs:
+                    cls.objects.filter(task_id=task_id).update(**progress_update_kwargs)
+
+        return updated_num
+
+
 class JobSubscriptionInstanceMap(models.Model):
     job_instance_id = models.BigIntegerField(_("作业实例ID"), db_index=True)
     subscription_instance_ids = JSONField(_("订阅实例ID列表"), default=list)
     node_id = models.CharField(_("节点ID"), max_length=32, db_index=True)
     status = models.CharField(_("作业状态"), max_length=45, default=constants.BkJobStatus.PENDING)
+    create_time = models.DateTimeField(_("创建时间"), default=timezone.now)
+    finish_time = models.DateTimeField(_("结束时间"), null=True, blank=True)
 
     class Meta:
         verbose_name = _("作业平台ID映射表")
@@ -2443,6 +2882,52 @@ class SubscriptionInstanceStatusDetail(models.Model):
         verbose_name_plural = _("订阅实例状态表")
 
 
+class SubscriptionInstanceStatusLog(models.Model):
+    """
+    订阅实例原子日志，只追加不更新
+    避免在 SubscriptionInstanceStatusDetail.log 上反复 CONCAT 导致长任务的日志写入量随日志长度平方增长
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    subscription_instance_record_id = models.BigIntegerField(_("订阅实例ID"))
+    node_id = models.CharField(_("Pipeline原子ID"), max_length=50, default="", blank=True)
+    content = models.TextField(_("日志内容"))
+    create_time = models.DateTimeField(_("创建时间"), default=timezone.now)
+
+    class Meta:
+        verbose_name = _("订阅实例日志表")
+        verbose_name_plural = _("订阅实例日志表")
+        index_together = [["subscription_instance_record_id", "node_id"]]
+
+    @staticmethod
+    def make_key(node_id: str, sub_inst_id: int) -> str:
+        return f"{node_id}-{sub_inst_id}"
+
+    @classmethod
+    def get_key__log_map(
+        cls, sub_inst_ids: Union[List[int], Set[int]], node_ids: Optional[List[str]] = None
+    ) -> Dict[str, str]:
+        """
+        按 原子ID-订阅实例ID 聚合追加日志
+        :param sub_inst_ids: 订阅实例ID列表
+        :param node_ids: 原子ID列表，为空时查询订阅实例下的全部原子
+        :return: {"{node_id}-{sub_inst_id}": "\n{line1}\n{line2}"}
+        """
+        filters = {"subscription_instance_record_id__in": sub_inst_ids}
+        if node_ids is not None:
+            filters["node_id__in"] = node_ids
+        log_lines = (
+            cls.objects.filter(**filters)
+            .order_by("id")
+            .values_list("subscription_instance_record_id", "node_id", "content")
+        )
+        key__lines_map: Dict[str, List[str]] = defaultdict(list)
+        for sub_inst_id, node_id, content in log_lines:
+            key__lines_map[cls.make_key(node_id, sub_inst_id)].append(content)
+        # 与原 CONCAT 写入的格式保持一致：每行日志以换行符开头
+        return {key: "".join(f"\n{line}" for line in lines) for key, lines in key__lines_map.items()}
+
+
 class CmdbEventRecord(models.Model):
     """记录CMDB事件回调"""
 
@@ -2506,3 +2991,21 @@ class ResourceWatchEvent(models.Model):
             f"<{self.__class__.__name__}({self.pk}) "
             f"info -> [{self.bk_event_type}|{self.bk_resource}|{self.bk_detail.get('bk_biz_id')}]>"
         )
+
+
+class ResourceWatchCursor(models.Model):
+    """
+    资源监听游标检查点，按资源类型持久化，进程重启或长时间暂停后可从检查点继续监听
+    """
+
+    bk_resource = models.CharField(_("资源"), max_length=32, primary_key=True)
+    bk_cursor = models.CharField(_("游标"), max_length=128, default="")
+    head_time = models.DateTimeField(_("最近追平CMDB事件头部的时间"), null=True, blank=True)
+    update_time = models.DateTimeField(_("检查点更新时间"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("CMDB资源监听游标")
+        verbose_name_plural = _("CMDB资源监听游标")
+
+    def __str__(self):
+        return f"<{self.__class__.__name__}({self.pk}) cursor -> {self.bk_cursor}>"
@@ -10,18 +10,30 @@ specific language governing permissions and limitations under the License.
 """
 import logging
 import random
+import threading
 import time
 import typing
+from collections import defaultdict
 from functools import wraps
 
 from django.conf import settings
 from django.core.cache import cache
 from django.db.models import Q
 from django.db.utils import IntegrityError
+from django.utils import timezone
 
 from apps.component.esbclient import client_v2
+from apps.exceptions import ComponentCallError
 from apps.node_man import constants
-from apps.node_man.models import GlobalSettings, Host, ResourceWatchEvent, Subscription
+from apps.node_man.models import (
+    GlobalSettings,
+    Host,
+    ResourceWatchCursor,
+    ResourceWatchEvent,
+    Subscription,
+)
+from apps.node_man.periodic_tasks.sync_cmdb_host import bulk_differential_sync_biz_hosts
+from apps.prometheus import metrics
 from apps.utils.cache import format_cache_key
 
 logger = logging.getLogger("app")
@@ -29,6 +41,8 @@ logger = logging.getLogger("app")
 RESOURCE_WATCH_HOST_CURSOR_KEY = "resource_watch_host_cursor"
 RESOURCE_WATCH_HOST_RELATION_CURSOR_KEY = "resource_watch_host_relation_cursor"
 RESOURCE_WATCH_PROCESS_CURSOR_KEY = "resource_watch_process_cursor"
+RESOURCE_WATCH_SET_CURSOR_KEY = "resource_watch_set_cursor"
+RESOURCE_WATCH_MODULE_CURSOR_KEY = "resource_watch_module_cursor"
 APPLY_RESOURCE_WATCHED_EVENTS_KEY = "apply_resource_watched_events"
 
 
@@ -51,6 +65,15 @@ class BaseEventPreprocessHelper:
         """
         pass
 
+    @classmethod
+    def get_convergence_key(cls, event: typing.Dict) -> typing.Any:
+        """
+        获取事件收敛的维度，默认按 scope 收敛
+        :param event:
+        :return:
+        """
+        return cls.get_scope_from_event(event)
+
     @classmethod
     def event_convergence(cls, events: typing.List[typing.Dict]) -> typing.List[typing.Dict]:
         """
@@ -58,13 +81,24 @@ class BaseEventPreprocessHelper:
         :param events:
         :return:
         """
-        scope__event_map: typing.Dict[typing.Any, typing.Dict] = {}
+        convergence_key__event_map: typing.Dict[typing.Any, typing.Dict] = {}
         for event in events:
             scope: int = cls.get_scope_from_event(event)
             if scope:
-                # 对相同的 scope 仅保留一则数据
-                scope__event_map[scope] = event
-        return list(scope__event_map.values())
+                # 对相同的收敛维度仅保留最后一则数据，并保持首次出现的顺序
+                convergence_key__event_map[cls.get_convergence_key(event)] = event
+        return list(convergence_key__event_map.values())
+
+
+class HostRelationEventPreprocessHelper(BaseEventPreprocessHelper):
+    @classmethod
+    def get_convergence_key(cls, event: typing.Dict) -> typing.Any:
+        """
+        按 业务 + 主机 收敛，保留变更的主机ID用于按主机差量同步
+        :param event:
+        :return:
+        """
+        return cls.get_scope_from_event(event), event["bk_detail"].get("bk_host_id")
 
     @classmethod
     def do_preprocess(cls, events: typing.List[typing.Dict]) -> typing.List[typing.Dict]:
@@ -72,7 +106,7 @@ class BaseEventPreprocessHelper:
         return cls.event_convergence(events)
 
 
-class HostEventPreprocessHelper(BaseEventPreprocessHelper):
+class HostEventPreprocessHelper(HostRelationEventPreprocessHelper):
     @staticmethod
     def fill_scope_to_event(events: typing.List[typing.Dict]):
         """
@@ -105,16 +139,103 @@ class HostEventPreprocessHelper(BaseEventPreprocessHelper):
                 event["bk_detail"]["bk_biz_id"] = bk_biz_id
 
 
+class TopoEventPreprocessHelper(BaseEventPreprocessHelper):
+    @classmethod
+    def get_convergence_key(cls, event: typing.Dict) -> typing.Any:
+        """
+        按拓扑节点收敛，拓扑事件用于增量更新业务拓扑
+        :param event:
+        :return:
+        """
+        bk_resource: str = event["bk_resource"]
+        return bk_resource, event["bk_detail"][f"bk_{bk_resource}_id"]
+
+
 RESOURCE_TYPE__EVENT_HELPER_MAP: typing.Dict[str, typing.Type[BaseEventPreprocessHelper]] = {
     constants.ResourceType.host: HostEventPreprocessHelper,
     constants.ResourceType.process: BaseEventPreprocessHelper,
-    constants.ResourceType.host_relation: BaseEventPreprocessHelper,
+    constants.ResourceType.host_relation: HostRelationEventPreprocessHelper,
+    constants.ResourceType.set: TopoEventPreprocessHelper,
+    constants.ResourceType.module: TopoEventPreprocessHelper,
 }
 
+# 业务拓扑相关的监听资源类型
+TOPO_RESOURCE_TYPES: typing.List[str] = [constants.ResourceType.set, constants.ResourceType.module]
+
+
+def get_checkpoint(bk_resource: str) -> typing.Optional[ResourceWatchCursor]:
+    """
+    获取资源监听检查点
+    :param bk_resource: 资源类型
+    :return:
+    """
+    return ResourceWatchCursor.objects.filter(bk_resource=bk_resource).first()
+
+
+def save_checkpoint(bk_resource: str, data: typing.Dict[str, typing.Any]):
+    """
+    持久化最新游标，未监听到事件时说明已追平 CMDB 事件头部
+    :param bk_resource: 资源类型
+    :param data: resource_watch 返回数据
+    :return:
+    """
+    now = timezone.now()
+    defaults = {"bk_cursor": data["bk_events"][-1]["bk_cursor"]}
+    if not data["bk_watched"]:
+        defaults["head_time"] = now
+    checkpoint, __ = ResourceWatchCursor.objects.update_or_create(bk_resource=bk_resource, defaults=defaults)
+
+    if checkpoint.head_time:
+        metrics.resource_watch_cursor_lag_seconds.labels(resource=bk_resource).set(
+            max((now - checkpoint.head_time).total_seconds(), 0)
+        )
+
+
+def watch_from_checkpoint(
+    cursor_key: str,
+    kwargs: typing.Dict[str, typing.Any],
+    on_cursor_lost: typing.Optional[typing.Callable[[], None]] = None,
+) -> typing.Dict[str, typing.Any]:
+    """
+    从检查点继续监听资源事件
+    1. 优先使用检查点游标
+    2. 游标失效时按检查点时间回放事件（bk_start_from）
+    3. 回放失败且从 CMDB 事件头部监听正常，说明检查点已超出 CMDB 事件保留时长，产生了事件断层，执行兜底
+    4. 从 CMDB 事件头部监听也失败，说明 CMDB 不可用，抛出异常
+    :param cursor_key: 游标键，仅用于日志
+    :param kwargs: 监听参数
+    :param on_cursor_lost: 游标丢失（首次启动或事件断层）时的回调，用于全量兜底
+    :return:
+    """
+    bk_resource: str = kwargs["bk_resource"]
+    kwargs.pop("bk_cursor", None)
+    kwargs.pop("bk_start_from", None)
 
-def set_cursor(data, cursor_key):
-    new_cursor = data["bk_events"][-1]["bk_cursor"]
-    cache.set(cursor_key, new_cursor, 120)
+    checkpoint: typing.Optional[ResourceWatchCursor] = get_checkpoint(bk_resource)
+    if checkpoint and checkpoint.bk_cursor:
+        try:
+            return client_v2.cc.resource_watch({**kwargs, "bk_cursor": checkpoint.bk_cursor})
+        except ComponentCallError as e:
+            logger.warning(f"[{cursor_key}] failed to watch from cursor -> {checkpoint.bk_cursor}, err_msg -> {e}")
+
+        bk_start_from = int(checkpoint.update_time.timestamp()) - constants.RESOURCE_WATCH_REPLAY_OVERLAP
+        try:
+            data = client_v2.cc.resource_watch({**kwargs, "bk_start_from": bk_start_from})
+        except ComponentCallError as e:
+            logger.warning(f"[{cursor_key}] failed to replay from bk_start_from -> {bk_start_from}, err_msg -> {e}")
+        else:
+            logger.info(f"[{cursor_key}] replay from checkpoint: bk_start_from -> {bk_start_from}")
+            metrics.resource_watch_cursor_gaps_total.labels(resource=bk_resource, action="replayed").inc()
+            return data
+
+    # 首次启动或事件断层，先确认 CMDB 可用，再执行兜底，避免 CMDB 短暂不可用时触发全量同步
+    data = client_v2.cc.resource_watch(kwargs)
+    if checkpoint and checkpoint.bk_cursor:
+        metrics.resource_watch_cursor_gaps_total.labels(resource=bk_resource, action="lost").inc()
+    if on_cursor_lost is not None:
+        logger.warning(f"[{cursor_key}] cursor lost, run fallback -> {on_cursor_lost.__name__}")
+        on_cursor_lost()
+    return data
 
 
 def random_key():
@@ -164,7 +285,14 @@ def is_lock(config_key, id_key):
     return True
 
 
-def _resource_watch(cursor_key, kwargs):
+def _resource_watch(cursor_key, kwargs, on_cursor_lost: typing.Optional[typing.Callable[[], None]] = None):
+    """
+    监听 CMDB 资源变更事件并入库
+    :param cursor_key: 游标缓存键
+    :param kwargs: 监听参数
+    :param on_cursor_lost: 游标丢失（首次启动或事件断层）时的回调，用于全量兜底
+    :return:
+    """
     # 用于标识自己
     id_key = random_key()
 
@@ -177,14 +305,10 @@ def _resource_watch(cursor_key, kwargs):
             logger.info(f"[{cursor_key}] will try to acquire the lock, if there is no error output, it means listening")
             continue
 
-        bk_cursor = cache.get(cursor_key)
-        if bk_cursor:
-            kwargs["bk_cursor"] = bk_cursor
-
-        data = client_v2.cc.resource_watch(kwargs)
+        data = watch_from_checkpoint(cursor_key, kwargs, on_cursor_lost)
         if not data["bk_watched"]:
             # 记录最新cursor
-            set_cursor(data, cursor_key)
+            save_checkpoint(kwargs["bk_resource"], data)
             continue
 
         event_helper: typing.Type[BaseEventPreprocessHelper] = RESOURCE_TYPE__EVENT_HELPER_MAP[kwargs["bk_resource"]]
@@ -198,12 +322,13 @@ def _resource_watch(cursor_key, kwargs):
             )
             for event in event_helper.do_preprocess(data["bk_events"])
         ]
-        ResourceWatchEvent.objects.bulk_create(objs)
+        # 从检查点回放时可能拉取到已入库的事件，忽略重复游标
+        ResourceWatchEvent.objects.bulk_create(objs, ignore_conflicts=True)
 
         logger.info(f"[{cursor_key}] receive new resource watch event: count -> {len(objs)}")
 
         # 记录最新cursor
-        set_cursor(data, cursor_key)
+        save_checkpoint(kwargs["bk_resource"], data)
 
 
 def sync_resource_watch_host_event():
@@ -235,15 +360,114 @@ def sync_resource_watch_process_event():
     _resource_watch(RESOURCE_WATCH_PROCESS_CURSOR_KEY, kwargs)
 
 
-def apply_resource_watched_events():
-    def _get_event_str(_event):
-        return "<Event({bk_cursor}) info -> [{bk_event_type}|{bk_resource}|{bk_biz_id}]>".format(
-            bk_cursor=_event["bk_cursor"],
-            bk_event_type=event["bk_event_type"],
-            bk_resource=event["bk_resource"],
-            bk_biz_id=event["bk_detail"].get("bk_biz_id"),
-        )
+def sync_resource_watch_set_event():
+    """
+    拉取集群事件
+    """
+    kwargs = {
+        "bk_resource": constants.ResourceType.set,
+        "bk_fields": ["bk_set_id", "bk_set_name", "bk_parent_id", "bk_biz_id"],
+    }
+    _resource_watch(RESOURCE_WATCH_SET_CURSOR_KEY, kwargs, on_cursor_lost=rebuild_all_biz_topo)
+
+
+def sync_resource_watch_module_event():
+    """
+    拉取模块事件
+    """
+    kwargs = {
+        "bk_resource": constants.ResourceType.module,
+        "bk_fields": ["bk_module_id", "bk_module_name", "bk_set_id", "bk_biz_id"],
+    }
+    _resource_watch(RESOURCE_WATCH_MODULE_CURSOR_KEY, kwargs, on_cursor_lost=rebuild_all_biz_topo)
+
+
+def sync_resource_watch_biz_topo_event():
+    """
+    拉取业务拓扑（集群 & 模块）事件，两类资源分别在独立线程中监听
+    """
+    watch_threads = [
+        threading.Thread(target=watch_func, name=watch_func.__name__, daemon=True)
+        for watch_func in [sync_resource_watch_set_event, sync_resource_watch_module_event]
+    ]
+    for watch_thread in watch_threads:
+        watch_thread.start()
+    for watch_thread in watch_threads:
+        watch_thread.join()
+
+
+def rebuild_all_biz_topo():
+    """游标丢失时，异步全量重建业务拓扑缓存"""
+    from apps.node_man.periodic_tasks.sync_cmdb_biz_topo_task import (
+        cache_all_biz_topo_delay_task,
+    )
+
+    cache_all_biz_topo_delay_task.delay()
+
+
+def apply_topo_events(events: typing.List[typing.Dict]):
+    """
+    按业务聚合拓扑事件并增量更新业务拓扑缓存
+    :param events: 按发生顺序排列的拓扑事件
+    :return:
+    """
+    from apps.node_man.periodic_tasks.sync_cmdb_biz_topo_task import (
+        apply_biz_topo_events,
+    )
+
+    bk_biz_id__events_map: typing.Dict[int, typing.List[typing.Dict]] = defaultdict(list)
+    for event in events:
+        bk_biz_id__events_map[event["bk_detail"]["bk_biz_id"]].append(event)
+
+    for bk_biz_id, biz_events in bk_biz_id__events_map.items():
+        try:
+            apply_biz_topo_events(bk_biz_id, biz_events)
+        except Exception as err:
+            logger.exception(f"[apply_topo_events] failed: bk_biz_id -> {bk_biz_id}, error -> {err}")
+
 
+def coalesce_resource_watched_events(events: typing.List[typing.Dict]) -> typing.Dict[str, typing.Any]:
+    """
+    合并一批资源事件，按业务聚合需要同步的主机，并收集需要触发订阅的业务
+    :param events: 按发生顺序排列的事件
+    :return:
+    {
+        "topo_events": [],
+        "bk_host_ids_gby_bk_biz_id": {2: {1, 2}},
+        "affected_bk_biz_ids": {2},
+        "ignored_event_count": 0
+    }
+    """
+    topo_events: typing.List[typing.Dict] = []
+    bk_host_ids_gby_bk_biz_id: typing.Dict[int, typing.Set[int]] = defaultdict(set)
+    affected_bk_biz_ids: typing.Set[int] = set()
+    ignored_event_count: int = 0
+    for event in events:
+        # 拓扑事件仅用于增量更新业务拓扑缓存，无需触发主机同步及订阅
+        if event["bk_resource"] in TOPO_RESOURCE_TYPES:
+            topo_events.append(event)
+            continue
+
+        bk_biz_id: typing.Optional[int] = event["bk_detail"].get("bk_biz_id")
+        if not bk_biz_id:
+            ignored_event_count += 1
+            continue
+        affected_bk_biz_ids.add(bk_biz_id)
+
+        # 进程事件不涉及主机信息变更，仅需触发订阅
+        bk_host_id: typing.Optional[int] = event["bk_detail"].get("bk_host_id")
+        if event["bk_resource"] in [constants.ResourceType.host, constants.ResourceType.host_relation] and bk_host_id:
+            bk_host_ids_gby_bk_biz_id[bk_biz_id].add(bk_host_id)
+
+    return {
+        "topo_events": topo_events,
+        "bk_host_ids_gby_bk_biz_id": dict(bk_host_ids_gby_bk_biz_id),
+        "affected_bk_biz_ids": affected_bk_biz_ids,
+        "ignored_event_count": ignored_event_count,
+    }
+
+
+def apply_resource_watched_events():
     id_key = random_key()
     config_key = APPLY_RESOURCE_WATCHED_EVENTS_KEY
 
@@ -261,7 +485,10 @@ def apply_resource_watched_events():
             GlobalSettings.KeyEnum.APPLY_RESOURCE_WATCHED_EVENTS_CONTROLLER_KEY.value
         )
         if not apply_resource_watched_events_controller:
-            apply_resource_watched_events_controller = {"limit": 10, "seconds_to_wait_for_no_events": 10}
+            apply_resource_watched_events_controller = {
+                "window_size": constants.APPLY_RESOURCE_WATCH_EVENT_LENS,
+                "seconds_to_wait_for_no_events": 10,
+            }
             GlobalSettings.set_config(
                 GlobalSettings.KeyEnum.APPLY_RESOURCE_WATCHED_EVENTS_CONTROLLER_KEY.value,
                 apply_resource_watched_events_controller,
@@ -269,39 +496,69 @@ def apply_resource_watched_events():
 
         logger.info(f"[{config_key}] load events_controller -> {apply_resource_watched_events_controller}")
 
-        events = ResourceWatchEvent.objects.order_by("create_time")[
-            0 : apply_resource_watched_events_controller["limit"]
-        ].values()
+        # 单次取出一个窗口的事件，合并后统一消费
+        window_size: int = apply_resource_watched_events_controller.get(
+            "window_size", constants.APPLY_RESOURCE_WATCH_EVENT_LENS
+        )
+        events: typing.List[typing.Dict] = list(
+            ResourceWatchEvent.objects.order_by("create_time").values(
+                "bk_cursor", "bk_event_type", "bk_resource", "bk_detail", "create_time"
+            )[0:window_size]
+        )
         if not events:
+            metrics.resource_watch_events_apply_lag_seconds.set(0)
             time.sleep(apply_resource_watched_events_controller["seconds_to_wait_for_no_events"])
             continue
 
-        events_after_convergence = HostEventPreprocessHelper.event_convergence(events)
-        logger.info(f"[{config_key}] length of events_after_convergence -> {len(events_after_convergence)}")
-        for event in events_after_convergence:
-            event_str = _get_event_str(event)
-            event_bk_biz_id = event["bk_detail"].get("bk_biz_id")
-            logger.info(f"[{config_key}] event being consumed -> {event_str}")
-            try:
-                if event_bk_biz_id:
-                    # 触发同步CMDB
-                    trigger_sync_cmdb_host(bk_biz_id=event_bk_biz_id)
-
-                if event_bk_biz_id and settings.USE_CMDB_SUBSCRIPTION_TRIGGER:
-                    try:
-                        # 触发订阅
-                        trigger_nodeman_subscription(event_bk_biz_id)
-                    except Exception as e:
-                        logger.exception(
-                            f"[trigger_nodeman_subscription] failed: bk_biz_id -> {event_bk_biz_id}, " f"error -> {e}"
-                        )
+        begin_time: float = time.time()
+        # 窗口内最早事件的入库时长，即消费滞后时间
+        lag_seconds: float = (timezone.now() - events[0]["create_time"]).total_seconds()
+        metrics.resource_watch_events_apply_lag_seconds.set(lag_seconds)
+
+        coalesce_result: typing.Dict[str, typing.Any] = coalesce_resource_watched_events(events)
+        bk_host_ids_gby_bk_biz_id: typing.Dict[int, typing.Set[int]] = coalesce_result["bk_host_ids_gby_bk_biz_id"]
+        logger.info(
+            f"[{config_key}] events_num -> {len(events)}, topo_events_num -> {len(coalesce_result['topo_events'])}, "
+            f"affected_bk_biz_ids -> {coalesce_result['affected_bk_biz_ids']}, "
+            f"bk_host_ids_gby_bk_biz_id -> {bk_host_ids_gby_bk_biz_id}, "
+            f"ignored_event_count -> {coalesce_result['ignored_event_count']}, lag_seconds -> {lag_seconds}"
+        )
+
+        if coalesce_result["topo_events"]:
+            apply_topo_events(coalesce_result["topo_events"])
 
+        if bk_host_ids_gby_bk_biz_id:
+            try:
+                # 每个业务仅同步一次，且仅同步发生变更的主机
+                bulk_differential_sync_biz_hosts(bk_host_ids_gby_bk_biz_id, only_incremental=False)
             except Exception as err:
-                logger.exception(f"[{config_key}] failed: event -> {event_str}, error -> {err}")
+                logger.exception(
+                    f"[{config_key}] bulk_differential_sync_biz_hosts failed: "
+                    f"bk_host_ids_gby_bk_biz_id -> {bk_host_ids_gby_bk_biz_id}, error -> {err}"
+                )
+                # 增量同步失败时，退化为防抖的业务全量同步
+                for bk_biz_id in bk_host_ids_gby_bk_biz_id:
+                    trigger_sync_cmdb_host(bk_biz_id=bk_biz_id)
+
+        if settings.USE_CMDB_SUBSCRIPTION_TRIGGER:
+            for bk_biz_id in coalesce_result["affected_bk_biz_ids"]:
+                try:
+                    # 触发订阅
+                    trigger_nodeman_subscription(bk_biz_id)
+                except Exception as e:
+                    logger.exception(f"[trigger_nodeman_subscription] failed: bk_biz_id -> {bk_biz_id}, error -> {e}")
 
         # 删除事件记录
         ResourceWatchEvent.objects.filter(bk_cursor__in=[event["bk_cursor"] for event in events]).delete()
 
+        cost_time: float = time.time() - begin_time
+        for event in events:
+            metrics.resource_watch_events_applied_total.labels(event["bk_resource"]).inc()
+        logger.info(
+            f"[{config_key}] applied: events_num -> {len(events)}, cost_time -> {cost_time:.3f}s, "
+            f"throughput -> {len(events) / max(cost_time, 1e-3):.1f}/s"
+        )
+
 
 def func_debounce_decorator(func):
     """
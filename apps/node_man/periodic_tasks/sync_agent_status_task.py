@@ -17,6 +17,7 @@ from django.db.models import QuerySet
 from django.db.transaction import atomic
 
 from apps.adapters.api.gse import get_gse_api_helper
+from apps.adapters.api.gse.base import GseApiBaseHelper
 from apps.core.gray.tools import GrayTools
 from apps.node_man import constants
 from apps.node_man.models import Host, ProcessStatus
@@ -26,12 +27,12 @@ from common.log import logger
 
 
 @task(queue="default", ignore_result=True)
-def update_or_create_host_agent_status(task_id: int, host_queryset: QuerySet):
+def update_or_create_host_agent_status(task_id: int, host_queryset: QuerySet) -> int:
     """
     更新 Agent 状态
     :param task_id: 任务 ID
     :param host_queryset: 主机查询条件
-    :return:
+    :return: 实际发生变更的记录数
     """
     hosts: typing.List[typing.Dict[str, typing.Any]] = list(
         host_queryset.values(
@@ -40,7 +41,7 @@ def update_or_create_host_agent_status(task_id: int, host_queryset: QuerySet):
     )
     if not hosts:
         # 结束递归
-        return
+        return 0
 
     logger.info(
         f"{task_id} | sync_agent_status_task: Start updating agent status, "
@@ -53,11 +54,18 @@ def update_or_create_host_agent_status(task_id: int, host_queryset: QuerySet):
 
     # 生成查询参数host弄表
     # 需要区分 GSE 版本，(区分方式：灰度业务 or 灰度接入点) -> 使用 V2 API，其他情况 -> 使用 V1 API
+    # 同一批次内按 (业务, 接入点) 预先计算 GSE 版本，避免逐台主机重复计算及构造 ApiHelper
     gray_tools_instance: GrayTools = GrayTools()
+    gse_versions: typing.List[str] = gray_tools_instance.get_host_ap_gse_versions(
+        [(host["bk_biz_id"], host["ap_id"]) for host in hosts]
+    )
+    gse_version__api_helper_map: typing.Dict[str, GseApiBaseHelper] = {
+        gse_version: get_gse_api_helper(gse_version) for gse_version in set(gse_versions)
+    }
+
     gse_version__query_hosts_map: typing.Dict[str, typing.List[typing.Dict]] = defaultdict(list)
-    for host in hosts:
-        gse_version = gray_tools_instance.get_host_ap_gse_version(host["bk_biz_id"], host["ap_id"])
-        agent_id = get_gse_api_helper(gse_version).get_agent_id(host)
+    for host, gse_version in zip(hosts, gse_versions):
+        agent_id = gse_version__api_helper_map[gse_version].get_agent_id(host)
         agent_id__host_id_map[agent_id] = host["bk_host_id"]
         agent_id__node_from_map[agent_id] = host["node_from"]
         gse_version__query_hosts_map[gse_version].append(
@@ -70,7 +78,7 @@ def update_or_create_host_agent_status(task_id: int, host_queryset: QuerySet):
 
     agent_id__agent_state_info_map: typing.Dict[str, typing.Dict] = {}
     for gse_version, query_hosts in gse_version__query_hosts_map.items():
-        gse_api_helper = get_gse_api_helper(gse_version)
+        gse_api_helper = gse_version__api_helper_map[gse_version]
         agent_id__agent_state_info_map.update(gse_api_helper.list_agent_state(query_hosts))
 
     # 查询需要更新主机的ProcessStatus对象
@@ -145,11 +153,13 @@ def update_or_create_host_agent_status(task_id: int, host_queryset: QuerySet):
         f"{task_id} | sync_agent_status_task: Not need to update record "
         f"count -> {not_need_to_be_updated_process_status_count}"
     )
+    delete_row_count: int = 0
     with atomic():
-        ProcessStatus.objects.bulk_update(
-            to_be_updated_process_status_objs, fields=["version", "status"], batch_size=1000
-        )
-        logger.info(f"{task_id} | sync_agent_status_task: Updated {len(to_be_updated_process_status_objs)} records")
+        if to_be_updated_process_status_objs:
+            ProcessStatus.objects.bulk_update(
+                to_be_updated_process_status_objs, fields=["version", "status"], batch_size=1000
+            )
+            logger.info(f"{task_id} | sync_agent_status_task: Updated {len(to_be_updated_process_status_objs)} records")
         if to_be_updated_node_from_host_objs:
             Host.objects.bulk_update(to_be_updated_node_from_host_objs, fields=["node_from"], batch_size=1000)
             logger.info(f"{task_id} | sync_agent_status_task: Updated {len(to_be_updated_node_from_host_objs)} hosts")
@@ -159,10 +169,61 @@ def update_or_create_host_agent_status(task_id: int, host_queryset: QuerySet):
         if to_be_delete_process_status_ids:
             __, delete_row_count = ProcessStatus.objects.filter(id__in=to_be_delete_process_status_ids).delete()
             logger.info(f"{task_id} | sync_agent_status_task: Deleted {delete_row_count} duplicate records")
+
+    changed_count: int = (
+        len(to_be_updated_process_status_objs)
+        + len(to_be_updated_node_from_host_objs)
+        + len(to_be_created_process_status_objs)
+        + delete_row_count
+    )
     logger.info(
         f"{task_id} | sync_agent_status_task: Complete agent status update, "
-        f"start Host ID -> {hosts[0]['bk_host_id']}, count -> {len(hosts)}"
+        f"start Host ID -> {hosts[0]['bk_host_id']}, count -> {len(hosts)}, changed -> {changed_count}"
     )
+    return changed_count
+
+
+@task(queue="default", ignore_result=True)
+def update_or_create_host_agent_status_by_id_range(
+    task_id: int, bk_biz_id: int, start_bk_host_id: int, end_bk_host_id: typing.Optional[int] = None
+) -> int:
+    """
+    按主机 ID 区间更新 Agent 状态，消息中仅传递区间边界
+    :param task_id: 任务 ID
+    :param bk_biz_id: 业务 ID
+    :param start_bk_host_id: 起始主机 ID（包含）
+    :param end_bk_host_id: 结束主机 ID（包含），为 None 表示不设上界
+    :return: 实际发生变更的记录数
+    """
+    host_queryset: QuerySet = Host.objects.filter(bk_biz_id=bk_biz_id, bk_host_id__gte=start_bk_host_id)
+    if end_bk_host_id is not None:
+        host_queryset = host_queryset.filter(bk_host_id__lte=end_bk_host_id)
+    return update_or_create_host_agent_status(task_id, host_queryset)
+
+
+def iter_host_id_ranges(
+    bk_biz_id: int, limit: int = constants.QUERY_AGENT_STATUS_HOST_LENS
+) -> typing.Iterator[typing.Tuple[int, typing.Optional[int]]]:
+    """
+    按主机 ID 游标（keyset）切分业务下的主机，每次查询基于上一批次的边界定位，避免 OFFSET 带来的重复扫描
+    :param bk_biz_id: 业务 ID
+    :param limit: 每个区间的主机数量
+    :return: (起始主机 ID, 结束主机 ID)，最后一个区间的结束主机 ID 为 None
+    """
+    host_id_queryset: QuerySet = Host.objects.filter(bk_biz_id=bk_biz_id).order_by("bk_host_id")
+    start_bk_host_id: typing.Optional[int] = host_id_queryset.values_list("bk_host_id", flat=True).first()
+    while start_bk_host_id is not None:
+        end_bk_host_ids: typing.List[int] = list(
+            host_id_queryset.filter(bk_host_id__gte=start_bk_host_id).values_list("bk_host_id", flat=True)[
+                limit - 1 : limit + 1
+            ]
+        )
+        if len(end_bk_host_ids) < 2:
+            # 剩余主机不足一个区间，最后一个区间不设上界，避免遗漏同步过程中新增的主机
+            yield start_bk_host_id, None
+            return
+        yield start_bk_host_id, end_bk_host_ids[0]
+        start_bk_host_id = end_bk_host_ids[1]
 
 
 @periodic_task(
@@ -195,16 +256,19 @@ def sync_agent_status_periodic_task():
             f"{task_id} | sync_agent_status_task: start to sync bk_biz_id -> {bk_biz_id}, host_count -> {count}"
         )
 
-        for start in range(0, count, constants.QUERY_AGENT_STATUS_HOST_LENS):
+        for index, (start_bk_host_id, end_bk_host_id) in enumerate(iter_host_id_ranges(bk_biz_id)):
 
             countdown = calculate_countdown(
                 count=count / constants.QUERY_AGENT_STATUS_HOST_LENS,
-                index=start / constants.QUERY_AGENT_STATUS_HOST_LENS,
+                index=index,
                 duration=constants.SYNC_AGENT_STATUS_TASK_INTERVAL,
             )
-            logger.info(f"{task_id} | sync_agent_status_task: bk_biz_id -> {bk_biz_id}, sync after {countdown} seconds")
-            update_or_create_host_agent_status.apply_async(
-                (task_id, host_queryset[start : start + constants.QUERY_AGENT_STATUS_HOST_LENS]), countdown=countdown
+            logger.info(
+                f"{task_id} | sync_agent_status_task: bk_biz_id -> {bk_biz_id}, "
+                f"bk_host_id range -> [{start_bk_host_id}, {end_bk_host_id}], sync after {countdown} seconds"
+            )
+            update_or_create_host_agent_status_by_id_range.apply_async(
+                (task_id, bk_biz_id, start_bk_host_id, end_bk_host_id), countdown=countdown
             )
 
         logger.info(f"{task_id} | sync_agent_status_task: sync agent status complete")
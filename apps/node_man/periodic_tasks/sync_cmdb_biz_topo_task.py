@@ -8,6 +8,8 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import typing
+from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from copy import deepcopy
 
@@ -16,12 +18,53 @@ from django.conf import settings
 from django.core.cache import cache
 
 from apps.component.esbclient import client_v2
+from apps.core.ipchooser.tools import topo_index
 from apps.node_man import constants
 from apps.node_man.handlers import cmdb
 from apps.utils.periodic_task import calculate_countdown
 from common.log import logger
 
 
+def flatten_biz_format_topo(biz_format_topo: dict) -> typing.List[typing.Dict[str, typing.Any]]:
+    """
+    根据格式化业务拓扑（原地）计算节点路径及唯一ID，并线性化得到业务节点列表
+    :param biz_format_topo: 格式化业务拓扑
+    :return: [{"name": "biz_name", "id": 1, "type": "biz", "path": "biz"}]
+    """
+    bk_biz_id = biz_format_topo["id"]
+
+    biz_nodes = []
+    stack = [(biz_format_topo, [biz_format_topo["name"]])]
+    while stack:
+        cur_node, node_path_list = stack.pop()
+        cur_node["bk_biz_id"] = bk_biz_id
+        # 防止多业务情况下，不同业务下节点id重复，生成一个唯一id
+        cur_node["biz_inst_id"] = f"biz:{bk_biz_id}:obj:{cur_node['type']}:id:{cur_node['id']}"
+        # 保存topo路径
+        cur_node["path"] = " / ".join(node_path_list)
+
+        # 线性化保存业务节点
+        biz_nodes.append(
+            {
+                "bk_biz_id": bk_biz_id,
+                "name": cur_node["name"],
+                "id": cur_node["id"],
+                "type": cur_node["type"],
+                "path": cur_node["path"],
+                "biz_inst_id": cur_node["biz_inst_id"],
+                "bk_obj_id": cur_node["type"],
+                "bk_inst_id": cur_node["id"],
+                "bk_inst_name": cur_node["name"],
+            }
+        )
+
+        for child_node in cur_node.get("children", []):
+            stack.append((child_node, node_path_list + [child_node["name"]]))
+
+    biz_nodes.sort(key=lambda node: node["path"])
+    return biz_nodes
+
+
 def format_biz_topo(biz_topo: dict) -> dict:
     """
     格式化业务拓扑并获取业务节点列表
@@ -37,52 +80,133 @@ def format_biz_topo(biz_topo: dict) -> dict:
         "biz_nodes": [{"name": "biz_name", "id": 1, "type": "biz", "path": "biz"}]
     }
     """
-    bk_biz_id = biz_topo["bk_inst_id"]
-
     biz_topo_copy = deepcopy(biz_topo)
-    biz_topo_copy["path"] = [biz_topo_copy["bk_inst_name"]]
 
-    biz_nodes = []
     stack = [biz_topo_copy]
     while stack:
         cur_node = stack.pop()
         cur_node.update(
             {
-                "bk_biz_id": bk_biz_id,
                 "name": cur_node.pop("bk_inst_name"),
                 "id": cur_node.pop("bk_inst_id"),
                 "type": cur_node.pop("bk_obj_id"),
                 "children": cur_node.pop("child"),
             }
         )
-        # 防止多业务情况下，不同业务下节点id重复，生成一个唯一id
-        cur_node["biz_inst_id"] = f"biz:{cur_node['bk_biz_id']}:obj:{cur_node['type']}:id:{cur_node['id']}"
+        stack.extend(cur_node["children"])
 
-        # 保存topo路径
-        node_path_list = cur_node.pop("path")
-        cur_node["path"] = " / ".join(node_path_list)
+    return {"biz_format_topo": biz_topo_copy, "biz_nodes": flatten_biz_format_topo(biz_topo_copy)}
 
-        # 线性化保存业务节点
-        biz_nodes.append(
-            {
-                "bk_biz_id": bk_biz_id,
-                "name": cur_node["name"],
-                "id": cur_node["id"],
-                "type": cur_node["type"],
-                "path": " / ".join(node_path_list),
-                "biz_inst_id": cur_node["biz_inst_id"],
-                "bk_obj_id": cur_node["type"],
-                "bk_inst_id": cur_node["id"],
-                "bk_inst_name": cur_node["name"],
-            }
-        )
 
-        for child_node in cur_node.get("children", []):
-            child_node["path"] = node_path_list + [child_node["bk_inst_name"]]
-            stack.append(child_node)
+def patch_biz_format_topo(biz_format_topo: dict, events: typing.List[typing.Dict[str, typing.Any]]) -> bool:
+    """
+    根据 CMDB 集群 / 模块的变更事件（原地）增量更新格式化业务拓扑，节点路径等信息需通过 flatten_biz_format_topo 重新计算
+    :param biz_format_topo: 格式化业务拓扑
+    :param events: 按发生顺序排列的资源变更事件，bk_resource 为 set / module
+    :return: 是否更新成功，找不到父节点（例如新增了自定义层级）等无法增量更新的情况返回 False，此时需全量重建
+    """
+    bk_biz_id = biz_format_topo["id"]
 
-    biz_nodes.sort(key=lambda node: node["path"])
-    return {"biz_format_topo": biz_topo_copy, "biz_nodes": biz_nodes}
+    # 建立 (节点类型, 节点ID) -> 节点 / 父节点 的索引
+    type_id__node_map: typing.Dict[typing.Tuple[str, int], typing.Dict] = {}
+    type_id__parent_map: typing.Dict[typing.Tuple[str, int], typing.Dict] = {}
+    # 业务及自定义层级节点，作为集群的父节点候选
+    mainline_id__nodes_map: typing.Dict[int, typing.List[typing.Dict]] = defaultdict(list)
+
+    def _index_node(_node: typing.Dict, _parent: typing.Optional[typing.Dict]):
+        _stack = [(_node, _parent)]
+        while _stack:
+            _cur_node, _cur_parent = _stack.pop()
+            type_id__node_map[(_cur_node["type"], _cur_node["id"])] = _cur_node
+            type_id__parent_map[(_cur_node["type"], _cur_node["id"])] = _cur_parent
+            if _cur_node["type"] not in [constants.CmdbObjectId.SET, constants.CmdbObjectId.MODULE]:
+                mainline_id__nodes_map[_cur_node["id"]].append(_cur_node)
+            _stack.extend((_child_node, _cur_node) for _child_node in _cur_node.get("children", []))
+
+    _index_node(biz_format_topo, None)
+
+    for event in events:
+        bk_detail = event["bk_detail"]
+        bk_obj_id = event["bk_resource"]
+        if bk_obj_id == constants.CmdbObjectId.SET:
+            bk_inst_id = bk_detail["bk_set_id"]
+            bk_inst_name = bk_detail.get("bk_set_name")
+            candidate_parents = [
+                node
+                for node in mainline_id__nodes_map.get(bk_detail.get("bk_parent_id"), [])
+                if node["type"] != constants.CmdbObjectId.BIZ
+            ]
+            # 集群的父节点为自定义层级，不存在自定义层级时父节点为业务
+            if not candidate_parents and bk_detail.get("bk_parent_id") == bk_biz_id:
+                candidate_parents = [biz_format_topo]
+        else:
+            bk_inst_id = bk_detail["bk_module_id"]
+            bk_inst_name = bk_detail.get("bk_module_name")
+            candidate_parents = [type_id__node_map.get((constants.CmdbObjectId.SET, bk_detail.get("bk_set_id")))]
+
+        node = type_id__node_map.get((bk_obj_id, bk_inst_id))
+        if event["bk_event_type"] == constants.ResourceEventType.delete:
+            if node is None:
+                continue
+            parent = type_id__parent_map[(bk_obj_id, bk_inst_id)]
+            parent["children"] = [child_node for child_node in parent["children"] if child_node is not node]
+            type_id__node_map.pop((bk_obj_id, bk_inst_id))
+            continue
+
+        if node is not None:
+            # 集群 / 模块不支持移动，仅需更新名称
+            node["name"] = bk_inst_name
+            continue
+
+        parent = candidate_parents[0] if len(candidate_parents) == 1 else None
+        if parent is None:
+            logger.warning(
+                f"patch_biz_format_topo: parent of {bk_obj_id}({bk_inst_id}) not found in topo, "
+                f"bk_biz_id -> {bk_biz_id}, event -> {event}"
+            )
+            return False
+        node = {"name": bk_inst_name, "id": bk_inst_id, "type": bk_obj_id, "children": []}
+        parent["children"].append(node)
+        _index_node(node, parent)
+
+    return True
+
+
+def cache_format_biz_topo(bk_biz_id: int, biz_format_topo: dict, biz_nodes: typing.List[typing.Dict[str, typing.Any]]):
+    """
+    缓存格式化业务拓扑及业务节点列表
+    :param bk_biz_id: 业务ID
+    :param biz_format_topo: 格式化业务拓扑
+    :param biz_nodes: 业务节点列表
+    :return:
+    """
+    cache.set(f"{bk_biz_id}_topo_cache", biz_format_topo, constants.BIZ_TOPO_CACHE_TIMEOUT)
+    cache.set(f"{bk_biz_id}_topo_nodes", biz_nodes, constants.BIZ_TOPO_CACHE_TIMEOUT)
+    topo_index.invalidate([bk_biz_id])
+
+
+def apply_biz_topo_events(bk_biz_id: int, events: typing.List[typing.Dict[str, typing.Any]]):
+    """
+    根据 CMDB 集群 / 模块的变更事件增量更新业务拓扑缓存，无法增量更新时异步全量重建
+    :param bk_biz_id: 业务ID
+    :param events: 按发生顺序排列的资源变更事件
+    :return:
+    """
+    # IP 选择器拓扑物化结构不支持增量更新，直接失效
+    topo_index.invalidate([bk_biz_id])
+    biz_format_topo = cache.get(f"{bk_biz_id}_topo_cache")
+    if not biz_format_topo:
+        # 缓存不存在时无需更新，查询时会按需全量构建
+        logger.info(f"apply_biz_topo_events: bk_biz_id -> {bk_biz_id} topo not cached, skipped")
+        return
+
+    if not patch_biz_format_topo(biz_format_topo, events):
+        logger.warning(f"apply_biz_topo_events: bk_biz_id -> {bk_biz_id} failed to patch topo, fallback to rebuild")
+        get_and_cache_format_biz_topo.delay(bk_biz_id)
+        return
+
+    cache_format_biz_topo(bk_biz_id, biz_format_topo, flatten_biz_format_topo(biz_format_topo))
+    logger.info(f"apply_biz_topo_events: bk_biz_id -> {bk_biz_id} topo patched, events_num -> {len(events)}")
 
 
 @task(queue="default", ignore_result=True)
@@ -134,9 +258,7 @@ def get_and_cache_format_biz_topo(bk_biz_id: int) -> dict:
     )
 
     format_result = format_biz_topo(biz_topo)
-
-    cache.set(f"{bk_biz_id}_topo_cache", format_result["biz_format_topo"], 60 * 15)
-    cache.set(f"{bk_biz_id}_topo_nodes", format_result["biz_nodes"], 60 * 15)
+    cache_format_biz_topo(bk_biz_id, format_result["biz_format_topo"], format_result["biz_nodes"])
 
     logger.info(f"Cached {bk_biz_id} topo and nodes")
 
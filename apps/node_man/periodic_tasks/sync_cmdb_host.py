@@ -18,9 +18,11 @@ from django.db import transaction
 
 from apps.backend.celery import app
 from apps.component.esbclient import client_v2
+from apps.core.ipchooser.tools import topo_index
 from apps.exceptions import ComponentCallError
 from apps.node_man import constants, models, tools
 from apps.node_man.periodic_tasks.utils import query_bk_biz_ids
+from apps.prometheus import metrics
 from apps.utils.batch_request import batch_request
 from apps.utils.concurrent import batch_call
 from common.log import logger
@@ -79,24 +81,42 @@ def _list_resource_pool_hosts(start):
         return {"info": []}
 
 
+# 从 CMDB 同步的主机字段
+SYNC_HOST_FIELDS: typing.List[str] = [
+    "node_type",
+    "bk_biz_id",
+    "bk_cloud_id",
+    "bk_host_name",
+    "bk_addressing",
+    "inner_ip",
+    "outer_ip",
+    "inner_ipv6",
+    "outer_ipv6",
+    "bk_agent_id",
+    "os_type",
+]
+
+
 def _bulk_update_host(hosts, extra_fields):
-    update_fields = [
-        "node_type",
-        "bk_biz_id",
-        "bk_cloud_id",
-        "bk_host_name",
-        "bk_addressing",
-        "inner_ip",
-        "outer_ip",
-        "inner_ipv6",
-        "outer_ipv6",
-        "bk_agent_id",
-        "os_type",
-    ] + extra_fields
+    update_fields = SYNC_HOST_FIELDS + extra_fields
     if hosts:
         models.Host.objects.bulk_update(hosts, fields=update_fields)
 
 
+def _is_host_changed(exist_host_info: typing.Dict[str, typing.Any], host_params: typing.Dict[str, typing.Any]) -> bool:
+    """
+    对比本地主机与 CMDB 主机的同步字段，判断是否需要更新
+    :param exist_host_info: 本地主机同步字段信息
+    :param host_params: 根据 CMDB 主机生成的待更新字段信息
+    :return:
+    """
+    for field, value in host_params.items():
+        # 按模型字段类型转换后再对比，避免 CMDB 返回类型与数据库存储类型不一致导致误判
+        if exist_host_info.get(field) != models.Host._meta.get_field(field).to_python(value):
+            return True
+    return False
+
+
 def _generate_host(biz_id, host, ap_id, is_os_type_priority=False, is_sync_cmdb_host_apply_cpu_arch=False):
     os_type = tools.HostV2Tools.get_os_type(host, is_os_type_priority)
     cpu_arch = tools.HostV2Tools.get_cpu_arch(host, is_sync_cmdb_host_apply_cpu_arch, os_type=os_type)
@@ -156,17 +176,20 @@ def find_host_biz_relations(find_host_biz_ids):
 def update_or_create_host_base(biz_id, task_id, cmdb_host_data):
     bk_host_ids = [_host["bk_host_id"] for _host in cmdb_host_data]
 
-    # 查询节点管理已存在的主机
-    exist_proxy_host_ids: typing.Set[int] = set(
-        models.Host.objects.filter(bk_host_id__in=bk_host_ids, node_type=constants.NodeType.PROXY).values_list(
-            "bk_host_id", flat=True
+    # 查询节点管理已存在的主机，同时取出同步字段用于变更对比，仅对发生变更的主机进行更新
+    host_id__exist_host_info_map: typing.Dict[int, typing.Dict[str, typing.Any]] = {
+        exist_host_info["bk_host_id"]: exist_host_info
+        for exist_host_info in models.Host.objects.filter(bk_host_id__in=bk_host_ids).values(
+            "bk_host_id", "cpu_arch", *SYNC_HOST_FIELDS
         )
-    )
-    exist_agent_host_ids: typing.Set[int] = set(
-        models.Host.objects.filter(bk_host_id__in=bk_host_ids)
-        .exclude(node_type=constants.NodeType.PROXY)
-        .values_list("bk_host_id", flat=True)
-    )
+    }
+    exist_proxy_host_ids: typing.Set[int] = set()
+    exist_agent_host_ids: typing.Set[int] = set()
+    for bk_host_id, exist_host_info in host_id__exist_host_info_map.items():
+        if exist_host_info["node_type"] == constants.NodeType.PROXY:
+            exist_proxy_host_ids.add(bk_host_id)
+        else:
+            exist_agent_host_ids.add(bk_host_id)
     host_ids_in_exist_identity_data: typing.Set[int] = set(
         models.IdentityData.objects.filter(bk_host_id__in=bk_host_ids).values_list("bk_host_id", flat=True)
     )
@@ -188,6 +211,8 @@ def update_or_create_host_base(biz_id, task_id, cmdb_host_data):
     need_create_host_identity_objs: typing.List[models.IdentityData] = []
     need_create_process_status_objs: typing.List[models.ProcessStatus] = []
     need_update_host_identity_objs: typing.List[models.IdentityData] = []
+    # 同步字段无变化，跳过更新的主机数量
+    skipped_host_count: int = 0
 
     ap_id = constants.DEFAULT_AP_ID if models.AccessPoint.objects.count() > 1 else models.AccessPoint.objects.first().id
 
@@ -246,10 +271,15 @@ def update_or_create_host_base(biz_id, task_id, cmdb_host_data):
         )
         if is_sync_cmdb_host_apply_cpu_arch and cpu_arch:
             host_params["cpu_arch"] = cpu_arch
-            need_update_hosts_with_arch.append(models.Host(**host_params))
+
+        if not _is_host_changed(host_id__exist_host_info_map[host["bk_host_id"]], host_params):
+            skipped_host_count += 1
             continue
 
-        need_update_hosts.append(models.Host(**host_params))
+        if "cpu_arch" in host_params:
+            need_update_hosts_with_arch.append(models.Host(**host_params))
+        else:
+            need_update_hosts.append(models.Host(**host_params))
 
     with transaction.atomic():
         _bulk_update_host(need_update_hosts, [])
@@ -266,46 +296,120 @@ def update_or_create_host_base(biz_id, task_id, cmdb_host_data):
         if need_create_process_status_objs:
             models.ProcessStatus.objects.bulk_create(need_create_process_status_objs, batch_size=500)
 
+    # 仅刷新新建及同步字段发生变更的主机
+    models.HostSearchToken.refresh(
+        [host.bk_host_id for host in need_create_hosts + need_update_hosts + need_update_hosts_with_arch]
+    )
+    if need_create_hosts or need_update_hosts or need_update_hosts_with_arch:
+        topo_index.invalidate([biz_id])
+
+    updated_host_count: int = len(need_update_hosts) + len(need_update_hosts_with_arch)
+    metrics.sync_cmdb_host_rows_by_action.labels("created").inc(len(need_create_hosts))
+    metrics.sync_cmdb_host_rows_by_action.labels("updated").inc(updated_host_count)
+    metrics.sync_cmdb_host_rows_by_action.labels("skipped").inc(skipped_host_count)
+    logger.info(
+        f"[sync_cmdb_host] update_or_create_host: task_id -> {task_id}, bk_biz_id -> {biz_id}, "
+        f"created -> {len(need_create_hosts)}, updated -> {updated_host_count}, skipped -> {skipped_host_count}"
+    )
+
     return bk_host_ids
 
 
-def sync_biz_incremental_hosts(bk_biz_id: int, expected_bk_host_ids: typing.Iterable[int]):
+def sync_biz_incremental_hosts(
+    bk_biz_id: int, expected_bk_host_ids: typing.Iterable[int], only_incremental: bool = True
+) -> typing.Dict[str, typing.Any]:
     """
     同步业务增量主机
     :param bk_biz_id: 业务ID
     :param expected_bk_host_ids: 期望得到的主机ID列表
-    :return:
+    :param only_incremental: 是否仅同步本地不存在的主机，为 False 时同步全部期望主机，用于主机信息发生变更的场景
+    :return: 业务ID 及 CMDB 中该业务下实际存在的主机ID列表
     """
     logger.info(
-        f"[sync_cmdb_host] sync_biz_incremental_hosts: "
-        f"bk_biz_id -> {bk_biz_id}, expected_bk_host_ids -> {expected_bk_host_ids}"
+        f"[sync_cmdb_host] sync_biz_incremental_hosts: bk_biz_id -> {bk_biz_id}, "
+        f"expected_bk_host_ids -> {expected_bk_host_ids}, only_incremental -> {only_incremental}"
     )
     expected_bk_host_ids: typing.Set[int] = set(expected_bk_host_ids)
-    exists_host_ids: typing.Set[int] = set(
-        models.Host.objects.filter(bk_biz_id=bk_biz_id, bk_host_id__in=expected_bk_host_ids).values_list(
-            "bk_host_id", flat=True
+    if only_incremental:
+        exists_host_ids: typing.Set[int] = set(
+            models.Host.objects.filter(bk_biz_id=bk_biz_id, bk_host_id__in=expected_bk_host_ids).values_list(
+                "bk_host_id", flat=True
+            )
         )
-    )
-    # 计算出对比本地主机缓存，增量的主机 ID
-    incremental_host_ids: typing.List[int] = list(expected_bk_host_ids - exists_host_ids)
+        # 计算出对比本地主机缓存，增量的主机 ID
+        need_sync_host_ids: typing.List[int] = list(expected_bk_host_ids - exists_host_ids)
+    else:
+        need_sync_host_ids: typing.List[int] = list(expected_bk_host_ids)
+
+    if not need_sync_host_ids:
+        return {"bk_biz_id": bk_biz_id, "bk_host_ids": []}
+
     # 尝试获取增量主机信息
-    hosts: typing.List[typing.Dict] = query_biz_hosts(bk_biz_id=bk_biz_id, bk_host_ids=incremental_host_ids)
+    hosts: typing.List[typing.Dict] = query_biz_hosts(bk_biz_id=bk_biz_id, bk_host_ids=need_sync_host_ids)
     # 更新本地缓存
     update_or_create_host_base(
         biz_id=bk_biz_id, task_id=f"differential_sync_biz_hosts_{bk_biz_id}", cmdb_host_data=hosts
     )
+    return {"bk_biz_id": bk_biz_id, "bk_host_ids": [host["bk_host_id"] for host in hosts]}
 
 
-def bulk_differential_sync_biz_hosts(expected_bk_host_ids_gby_bk_biz_id: typing.Dict[int, typing.Iterable[int]]):
+def bulk_differential_sync_biz_hosts(
+    expected_bk_host_ids_gby_bk_biz_id: typing.Dict[int, typing.Iterable[int]], only_incremental: bool = True
+):
     """
     并发同步增量主机
     :param expected_bk_host_ids_gby_bk_biz_id: 按业务ID聚合主机ID列表
+    :param only_incremental: 是否仅同步本地不存在的主机，为 False 时同步全部期望主机，并删除 CMDB 中已不属于该业务的本地主机
     :return:
     """
     params_list: typing.List[typing.Dict] = []
     for bk_biz_id, bk_host_ids in expected_bk_host_ids_gby_bk_biz_id.items():
-        params_list.append({"bk_biz_id": bk_biz_id, "expected_bk_host_ids": bk_host_ids})
-    batch_call(func=sync_biz_incremental_hosts, params_list=params_list)
+        params_list.append(
+            {"bk_biz_id": bk_biz_id, "expected_bk_host_ids": bk_host_ids, "only_incremental": only_incremental}
+        )
+    sync_results: typing.List[typing.Dict[str, typing.Any]] = batch_call(
+        func=sync_biz_incremental_hosts, params_list=params_list
+    )
+    # 主机转移模块不会改变主机字段，需要按业务使拓扑物化结构失效
+    topo_index.invalidate(expected_bk_host_ids_gby_bk_biz_id.keys())
+    if only_incremental:
+        return
+
+    # 全部业务同步完成后再计算需要删除的主机，避免主机跨业务转移时，目标业务尚未同步导致主机被误删
+    bk_biz_id__cc_host_ids_map: typing.Dict[int, typing.Set[int]] = {
+        sync_result["bk_biz_id"]: set(sync_result["bk_host_ids"]) for sync_result in sync_results
+    }
+    need_delete_host_ids: typing.Set[int] = set()
+    for bk_biz_id, bk_host_ids in expected_bk_host_ids_gby_bk_biz_id.items():
+        absent_host_ids: typing.Set[int] = set(bk_host_ids) - bk_biz_id__cc_host_ids_map.get(bk_biz_id, set())
+        if not absent_host_ids:
+            continue
+        need_delete_host_ids.update(
+            models.Host.objects.filter(bk_biz_id=bk_biz_id, bk_host_id__in=absent_host_ids).values_list(
+                "bk_host_id", flat=True
+            )
+        )
+    delete_hosts(need_delete_host_ids, task_id="differential_sync_biz_hosts")
+
+
+def delete_hosts(need_delete_host_ids: typing.Iterable[int], task_id=None):
+    """
+    删除节点管理主机及相关数据
+    :param need_delete_host_ids: 需要删除的主机ID列表
+    :param task_id: 任务ID
+    :return:
+    """
+    need_delete_host_ids: typing.Set[int] = set(need_delete_host_ids)
+    if not need_delete_host_ids:
+        return
+    topo_index.invalidate(
+        models.Host.objects.filter(bk_host_id__in=need_delete_host_ids).values_list("bk_biz_id", flat=True).distinct()
+    )
+    models.Host.objects.filter(bk_host_id__in=need_delete_host_ids).delete()
+    models.IdentityData.objects.filter(bk_host_id__in=need_delete_host_ids).delete()
+    models.ProcessStatus.objects.filter(bk_host_id__in=need_delete_host_ids).delete()
+    models.HostSearchToken.refresh(need_delete_host_ids)
+    logger.info(f"[sync_cmdb_host] task_id -> {task_id}, need_delete_host_ids -> {need_delete_host_ids}")
 
 
 def _update_or_create_host(biz_id, start=0, task_id=None):
@@ -356,11 +460,7 @@ def sync_cmdb_host(bk_biz_id=None, task_id=None):
 
     # 节点管理需要删除的host_id
     need_delete_host_ids = set(node_man_host_ids) - set(cc_bk_host_ids)
-    if need_delete_host_ids:
-        models.Host.objects.filter(bk_host_id__in=need_delete_host_ids).delete()
-        models.IdentityData.objects.filter(bk_host_id__in=need_delete_host_ids).delete()
-        models.ProcessStatus.objects.filter(bk_host_id__in=need_delete_host_ids).delete()
-        logger.info(f"[sync_cmdb_host] task_id -> {task_id}, need_delete_host_ids -> {need_delete_host_ids}")
+    delete_hosts(need_delete_host_ids, task_id=task_id)
 
     logger.info(f"[sync_cmdb_host] complete: task_id -> {task_id}, bk_biz_ids -> {bk_biz_ids}")
 
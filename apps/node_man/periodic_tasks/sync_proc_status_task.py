@@ -51,8 +51,10 @@ def update_or_create_proc_status(
     agent_id__host_id_map: typing.Dict[str, int] = {}
     # 需要区分 GSE 版本，(区分方式：灰度业务 or 灰度接入点) -> 使用 V2 API，其他情况 -> 使用 V1 API
     gse_version__query_hosts_map: typing.Dict[str, typing.List[typing.Dict]] = defaultdict(list)
-    for host in hosts:
-        gse_version = gray_tools_instance.get_host_ap_gse_version(host["bk_biz_id"], host["ap_id"])
+    gse_versions: typing.List[str] = gray_tools_instance.get_host_ap_gse_versions(
+        [(host["bk_biz_id"], host["ap_id"]) for host in hosts]
+    )
+    for host, gse_version in zip(hosts, gse_versions):
         agent_id = get_gse_api_helper(gse_version).get_agent_id(host)
         agent_id__host_id_map[agent_id] = host["bk_host_id"]
         gse_version__query_hosts_map[gse_version].append(
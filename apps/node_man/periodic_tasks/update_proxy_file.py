@@ -59,27 +59,28 @@ def update_proxy_files():
     if not total_update_hosts_queryset.exists():
         return
 
-    gray_tools_instance: GrayTools = GrayTools()
+    total_update_hosts: List[Host] = list(total_update_hosts_queryset)
+    gse_versions: List[str] = GrayTools().get_host_ap_gse_versions(
+        [(update_host_obj.bk_biz_id, update_host_obj.ap_id) for update_host_obj in total_update_hosts]
+    )
     gse_version__total_update_hosts_map: Dict[str, List[Dict[str, Union[str, int]]]] = defaultdict(list)
-    for host_info in total_update_hosts_queryset.values("inner_ip", "bk_cloud_id", "bk_agent_id", "bk_biz_id", "ap_id"):
-        gse_version = gray_tools_instance.get_host_ap_gse_version(host_info["bk_biz_id"], host_info["ap_id"])
+    for update_host_obj, gse_version in zip(total_update_hosts, gse_versions):
         gse_version__total_update_hosts_map[gse_version].append(
             {
-                "ip": host_info["inner_ip"],
-                "bk_cloud_id": host_info["bk_cloud_id"],
-                "bk_agent_id": host_info["bk_agent_id"],
+                "ip": update_host_obj.inner_ip,
+                "bk_cloud_id": update_host_obj.bk_cloud_id,
+                "bk_agent_id": update_host_obj.bk_agent_id,
             }
         )
 
     # 实时查询主机状态
     # 根据 Proxy 机器的灰度情况，选择相应版本的 gse_api_helper
     agent_statuses: Dict[str, Dict] = {}
-    for gse_version, total_update_hosts in gse_version__total_update_hosts_map.items():
+    for gse_version, version_hosts in gse_version__total_update_hosts_map.items():
         gse_api_helper = get_gse_api_helper(gse_version)
-        agent_statuses.update(gse_api_helper.list_agent_state(total_update_hosts))
+        agent_statuses.update(gse_api_helper.list_agent_state(version_hosts))
 
-    for update_host_obj in total_update_hosts_queryset:
-        gse_version = gray_tools_instance.get_host_ap_gse_version(update_host_obj.bk_biz_id, update_host_obj.ap_id)
+    for update_host_obj, gse_version in zip(total_update_hosts, gse_versions):
         agent_id = get_gse_api_helper(gse_version).get_agent_id(update_host_obj)
         agent_state_info = agent_statuses.get(agent_id, {"version": "", "bk_agent_alive": None})
         agent_status = constants.PROC_STATUS_DICT.get(agent_state_info["bk_agent_alive"], None)
@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from collections import Counter
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.core.ipchooser.tools.base import HostQuerySqlHelper
+from apps.node_man import constants, models
+from apps.node_man.tests.utils import SEARCH_BUSINESS, create_host
+from apps.utils.unittest.testcase import CustomBaseTestCase
+
+
+class TestGlobalSettingsCache(CustomBaseTestCase):
+    KEY = "TEST_GLOBAL_SETTINGS_CACHE"
+
+    def test_get_config_cached(self):
+        models.GlobalSettings.set_config(self.KEY, {"limit": 10})
+        self.assertEqual(models.GlobalSettings.get_config(self.KEY), {"limit": 10})
+        # 命中缓存后不再查询 DB
+        with self.assertNumQueries(0):
+            self.assertEqual(models.GlobalSettings.get_config(self.KEY), {"limit": 10})
+
+    def test_get_config_return_copy(self):
+        models.GlobalSettings.set_config(self.KEY, {"limit": 10})
+        models.GlobalSettings.get_config(self.KEY)["limit"] = 20
+        self.assertEqual(models.GlobalSettings.get_config(self.KEY), {"limit": 10})
+
+    def test_missing_config(self):
+        self.assertEqual(models.GlobalSettings.get_config(self.KEY, default=[]), [])
+        with self.assertNumQueries(0):
+            self.assertIsNone(models.GlobalSettings.get_config(self.KEY))
+
+    def test_invalidate_on_update(self):
+        models.GlobalSettings.set_config(self.KEY, 1)
+        self.assertEqual(models.GlobalSettings.get_config(self.KEY), 1)
+        models.GlobalSettings.update_config(self.KEY, 2)
+        self.assertEqual(models.GlobalSettings.get_config(self.KEY), 2)
+        models.GlobalSettings.objects.filter(key=self.KEY).delete()
+        self.assertEqual(models.GlobalSettings.get_config(self.KEY, default=3), 3)
+
+    def test_get_configs(self):
+        models.GlobalSettings.set_config(self.KEY, 1)
+        models.GlobalSettings.set_config(f"{self.KEY}_2", 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                models.GlobalSettings.get_configs([self.KEY, f"{self.KEY}_2", f"{self.KEY}_3"], default=0),
+                {self.KEY: 1, f"{self.KEY}_2": 2, f"{self.KEY}_3": 0},
+            )
+
+    @patch("apps.node_man.models.GlobalSettings._get_redis_inst", lambda: None)
+    def test_without_redis(self):
+        models.GlobalSettings.set_config(self.KEY, 1)
+        self.assertEqual(models.GlobalSettings.get_config(self.KEY), 1)
+
+
+class TestSubscriptionSuppression(CustomBaseTestCase):
+    TOPO_ORDER = ["biz", "set", "module", "host"]
+
+    @staticmethod
+    def make_subscription(sub_id: int, nodes, create_time, category=models.Subscription.CategoryType.POLICY):
+        return models.Subscription(
+            id=sub_id,
+            name=f"policy-{sub_id}",
+            object_type=models.Subscription.ObjectType.HOST,
+            node_type=models.Subscription.NodeType.TOPO,
+            nodes=nodes,
+            category=category,
+            create_time=create_time,
+        )
+
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        self.biz_sub = self.make_subscription(1, [{"bk_obj_id": "biz", "bk_inst_id": 2}], now - timedelta(days=2))
+        self.module_sub = self.make_subscription(
+            2, [{"bk_obj_id": "module", "bk_inst_id": 10}], now - timedelta(days=1)
+        )
+        self.current_sub = self.make_subscription(
+            3,
+            [
+                {"bk_obj_id": "biz", "bk_inst_id": 2},
+                {"bk_obj_id": "set", "bk_inst_id": 5},
+                {"bk_cloud_id": 0, "ip": "127.0.0.3"},
+            ],
+            now,
+        )
+        self.host_id__bk_obj_sub_map = {
+            1: [{"bk_obj_id": "biz", "subscription": self.biz_sub}],
+            2: [
+                {"bk_obj_id": "module", "subscription": self.module_sub},
+                {"bk_obj_id": "biz", "subscription": self.biz_sub},
+            ],
+            3: [{"bk_obj_id": "module", "subscription": self.module_sub}],
+        }
+        self.cmdb_host_infos = [
+            {"bk_host_id": 1, "bk_biz_id": 2, "bk_cloud_id": 0, "bk_host_innerip": "127.0.0.1", "set": [5]},
+            {"bk_host_id": 2, "bk_biz_id": 2, "bk_cloud_id": 0, "bk_host_innerip": "127.0.0.2", "module": [10]},
+            {"bk_host_id": 3, "bk_biz_id": 2, "bk_cloud_id": 0, "bk_host_innerip": "127.0.0.3", "module": [10]},
+            {"bk_host_id": 4, "bk_biz_id": 3, "bk_cloud_id": 0, "bk_host_innerip": "127.0.0.4"},
+        ]
+
+    def test_bulk_check_is_suppressed(self):
+        results = self.current_sub.bulk_check_is_suppressed(
+            action=constants.JobType.MAIN_INSTALL_PLUGIN,
+            cmdb_host_infos=self.cmdb_host_infos,
+            topo_order=self.TOPO_ORDER,
+            host_id__bk_obj_sub_map=self.host_id__bk_obj_sub_map,
+        )
+        self.assertEqual(
+            [(result["is_suppressed"], result["sub_inst_bk_obj_id"]) for result in results],
+            [(False, "set"), (True, "biz"), (False, "host"), (False, None)],
+        )
+        self.assertEqual(results[1]["suppressed_by"]["subscription_id"], self.module_sub.id)
+        # 优先级升序：业务级策略 < 当前策略（业务级，创建时间更晚） < 模块级策略
+        self.assertEqual(
+            [bk_obj_sub["subscription"].id for bk_obj_sub in results[1]["ordered_bk_obj_subs"]],
+            [self.biz_sub.id, self.current_sub.id, self.module_sub.id],
+        )
+        # 批量计算与逐台计算结果一致
+        suppression_index = self.current_sub.build_suppression_index(self.TOPO_ORDER)
+        for cmdb_host_info, result in zip(self.cmdb_host_infos, results):
+            self.assertEqual(
+                self.current_sub.check_is_suppressed(
+                    action=constants.JobType.MAIN_INSTALL_PLUGIN,
+                    cmdb_host_info=cmdb_host_info,
+                    topo_order=self.TOPO_ORDER,
+                    host_id__bk_obj_sub_map=self.host_id__bk_obj_sub_map,
+                    suppression_index=suppression_index,
+                ),
+                result,
+            )
+
+    def test_once_subscription_suppressed_by_policy(self):
+        once_sub = self.make_subscription(
+            4, self.current_sub.nodes, timezone.now(), category=models.Subscription.CategoryType.ONCE
+        )
+        results = once_sub.bulk_check_is_suppressed(
+            action=constants.JobType.MAIN_INSTALL_PLUGIN,
+            cmdb_host_infos=self.cmdb_host_infos,
+            topo_order=self.TOPO_ORDER,
+            host_id__bk_obj_sub_map=self.host_id__bk_obj_sub_map,
+        )
+        self.assertEqual([result["is_suppressed"] for result in results], [True, True, True, False])
+        self.assertEqual(results[1]["suppressed_by"]["subscription_id"], self.module_sub.id)
+
+        # 一次性订阅的非安装动作不计算抑制关系
+        results = once_sub.bulk_check_is_suppressed(
+            action=constants.JobType.MAIN_STOP_PLUGIN,
+            cmdb_host_infos=self.cmdb_host_infos,
+            topo_order=self.TOPO_ORDER,
+            host_id__bk_obj_sub_map=self.host_id__bk_obj_sub_map,
+        )
+        self.assertFalse(any(result["is_suppressed"] for result in results))
+
+
+class TestHostSearchToken(CustomBaseTestCase):
+    OVERWRITE_OBJ__KV_MAP = {settings: {"HOST_SEARCH_INDEX_ENABLE": True}}
+
+    @staticmethod
+    def search_host_ids(keyword: str):
+        host_queryset = HostQuerySqlHelper.multiple_cond_sql(
+            params={"conditions": [{"key": "query", "value": keyword}]},
+            biz_scope=[biz["bk_biz_id"] for biz in SEARCH_BUSINESS],
+            return_all_node_type=True,
+        )
+        return set(host_queryset.values_list("bk_host_id", flat=True))
+
+    def test_tokenize(self):
+        self.assertEqual(models.HostSearchToken.tokenize("10.0.AB"), ["10.", "0.0", ".0.", "0.a", ".ab"])
+        self.assertEqual(models.HostSearchToken.tokenize("ab"), [])
+        self.assertEqual(models.HostSearchToken.tokenize(None), [])
+
+    def test_get_query_tokens(self):
+        # 索引未构建，回退为 like
+        self.assertIsNone(models.HostSearchToken.get_query_tokens("web", ["bk_host_name"]))
+
+        models.HostSearchToken.set_ready(True)
+        # like 通配符不参与切分
+        self.assertEqual(models.HostSearchToken.get_query_tokens("web_01", ["inner_ip", "bk_host_name"]), ["web"])
+        self.assertIsNone(models.HostSearchToken.get_query_tokens("ab", ["bk_host_name"]))
+        # 存在未建立索引的字段
+        self.assertIsNone(models.HostSearchToken.get_query_tokens("web", ["bk_host_name", "outer_ip"]))
+        self.assertLessEqual(
+            len(models.HostSearchToken.get_query_tokens("0123456789abcdef", ["bk_agent_id"])),
+            models.HostSearchToken.MAX_QUERY_TOKENS,
+        )
+
+    def test_search(self):
+        create_host(20)
+        like_results = {keyword: self.search_host_ids(keyword) for keyword in ["1.1", ".1", "25", "not-exist"]}
+
+        models.HostSearchToken.rebuild()
+        self.assertTrue(models.HostSearchToken.is_available())
+        for keyword, like_host_ids in like_results.items():
+            self.assertEqual(self.search_host_ids(keyword), like_host_ids)
+
+        # 主机更新后刷新索引
+        host = models.Host.objects.first()
+        models.Host.objects.filter(bk_host_id=host.bk_host_id).update(inner_ip="192.168.255.254")
+        models.HostSearchToken.refresh([host.bk_host_id])
+        self.assertEqual(self.search_host_ids("168.255"), {host.bk_host_id})
+
+        # 主机删除后清理索引
+        models.Host.objects.filter(bk_host_id=host.bk_host_id).delete()
+        models.HostSearchToken.refresh([host.bk_host_id])
+        self.assertFalse(models.HostSearchToken.objects.filter(bk_host_id=host.bk_host_id).exists())
+
+    def test_concurrent_refresh(self):
+        create_host(1)
+        host = models.Host.objects.first()
+        models.HostSearchToken.refresh_without_check([host.bk_host_id])
+        token_num: int = models.HostSearchToken.objects.filter(bk_host_id=host.bk_host_id).count()
+
+        # 模拟并发刷新：删除后另一事务已写入相同 token，本次写入不应因唯一键冲突失败
+        with patch("django.db.models.query.QuerySet.delete", return_value=(0, {})):
+            models.HostSearchToken.refresh_without_check([host.bk_host_id])
+        self.assertEqual(models.HostSearchToken.objects.filter(bk_host_id=host.bk_host_id).count(), token_num)
+
+
+class TestSubscriptionTaskProgress(CustomBaseTestCase):
+    TASK_ID = 1
+    SUBSCRIPTION_ID = 1
+
+    def setUp(self):
+        super().setUp()
+        records = [
+            models.SubscriptionInstanceRecord(
+                task_id=self.TASK_ID,
+                subscription_id=self.SUBSCRIPTION_ID,
+                instance_id=f"host|instance|host|{index}",
+                instance_info={"host": {"bk_host_id": index}},
+                steps=[],
+            )
+            for index in range(10)
+        ]
+        models.SubscriptionInstanceRecord.objects.bulk_create(records)
+        models.SubscriptionTaskProgress.incr_created_records(
+            task_id=self.TASK_ID,
+            subscription_id=self.SUBSCRIPTION_ID,
+            status_counter={constants.JobStatusType.PENDING: 10},
+        )
+        self.record_ids = list(
+            models.SubscriptionInstanceRecord.objects.filter(task_id=self.TASK_ID)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+
+    def get_status_counter(self):
+        return models.SubscriptionTaskProgress.objects.get(task_id=self.TASK_ID).status_counter
+
+    def get_aggregated_status_counter(self):
+        status_counter = dict(
+            Counter(
+                models.SubscriptionInstanceRecord.objects.filter(task_id=self.TASK_ID).values_list("status", flat=True)
+            )
+        )
+        status_counter["total"] = sum(status_counter.values())
+        return status_counter
+
+    def test_bulk_set_record_status(self):
+        models.SubscriptionTaskProgress.bulk_set_record_status(self.record_ids[:6], constants.JobStatusType.RUNNING)
+        models.SubscriptionTaskProgress.bulk_set_record_status(self.record_ids[:3], constants.JobStatusType.SUCCESS)
+        models.SubscriptionTaskProgress.bulk_set_record_status(self.record_ids[2:4], constants.JobStatusType.FAILED)
+        # 状态未变化的实例不计入流转
+        models.SubscriptionTaskProgress.bulk_set_record_status(self.record_ids[2:4], constants.JobStatusType.FAILED)
+
+        self.assertEqual(
+            self.get_status_counter(),
+            {
+                constants.JobStatusType.PENDING: 4,
+                constants.JobStatusType.RUNNING: 2,
+                constants.JobStatusType.SUCCESS: 2,
+                constants.JobStatusType.FAILED: 2,
+                "total": 10,
+            },
+        )
+        self.assertEqual(self.get_status_counter(), self.get_aggregated_status_counter())
+
+    def test_bulk_set_record_statuses(self):
+        models.SubscriptionTaskProgress.bulk_set_record_status(self.record_ids[:2], constants.JobStatusType.RUNNING)
+        # 多个状态分组在一次调用中流转，仅锁定一次进度
+        updated_num = models.SubscriptionTaskProgress.bulk_set_record_statuses(
+            {
+                constants.JobStatusType.SUCCESS: self.record_ids[:3],
+                constants.JobStatusType.FAILED: self.record_ids[3:5],
+                constants.JobStatusType.RUNNING: [],
+            }
+        )
+        self.assertEqual(updated_num, 5)
+        self.assertEqual(
+            self.get_status_counter(),
+            {
+                constants.JobStatusType.PENDING: 5,
+                constants.JobStatusType.SUCCESS: 3,
+                constants.JobStatusType.FAILED: 2,
+                "total": 10,
+            },
+        )
+        self.assertEqual(self.get_status_counter(), self.get_aggregated_status_counter())
+
+    def test_unmaterialized_status(self):
+        models.SubscriptionTaskProgress.bulk_set_record_status(self.record_ids[:1], constants.JobStatusType.IGNORED)
+        # 无法物化的状态流转移除任务进度，查询时回退为实时聚合
+        self.assertFalse(models.SubscriptionTaskProgress.objects.filter(task_id=self.TASK_ID).exists())
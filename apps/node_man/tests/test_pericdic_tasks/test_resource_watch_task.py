@@ -15,12 +15,16 @@ from unittest.mock import MagicMock, patch
 
 from django.core.cache import cache
 
-from apps.node_man.models import Host
+from apps.exceptions import ComponentCallError
+from apps.node_man import constants
+from apps.node_man.models import Host, ResourceWatchCursor
 from apps.node_man.periodic_tasks.resource_watch_task import (
     apply_resource_watched_events,
+    coalesce_resource_watched_events,
     sync_resource_watch_host_event,
     sync_resource_watch_host_relation_event,
     sync_resource_watch_process_event,
+    watch_from_checkpoint,
 )
 from apps.utils.unittest.testcase import CustomBaseTestCase
 
@@ -50,6 +54,7 @@ class TestResourceWatchTask(CustomBaseTestCase):
     # mock掉GlobalSettings.update_config是为了让循环函数只执行一次
     @patch("apps.node_man.periodic_tasks.resource_watch_task.GlobalSettings.update_config", InterruptedError)
     @patch("apps.node_man.periodic_tasks.resource_watch_task.client_v2", MockClient)
+    @patch("apps.node_man.periodic_tasks.resource_watch_task.bulk_differential_sync_biz_hosts", MagicMock())
     def test_sync_resource_watch_host_event(self):
         self.init_db()
 
@@ -62,7 +67,7 @@ class TestResourceWatchTask(CustomBaseTestCase):
 
     @patch("apps.node_man.periodic_tasks.resource_watch_task.GlobalSettings.update_config", InterruptedError)
     @patch("apps.node_man.periodic_tasks.resource_watch_task.client_v2", MockClient)
-    @patch("apps.node_man.periodic_tasks.resource_watch_task.trigger_sync_cmdb_host", MagicMock())
+    @patch("apps.node_man.periodic_tasks.resource_watch_task.bulk_differential_sync_biz_hosts", MagicMock())
     def test_sync_resource_watch_host_relation_event(self):
         @exception_handler
         def _sync_resource_watch_host_relation_event():
@@ -71,10 +76,13 @@ class TestResourceWatchTask(CustomBaseTestCase):
         _sync_resource_watch_host_relation_event()
         self._apply_resource_watched_events()
         from apps.node_man.periodic_tasks.resource_watch_task import (
-            trigger_sync_cmdb_host,
+            bulk_differential_sync_biz_hosts,
         )
 
-        trigger_sync_cmdb_host.assert_has_calls([mock.call(bk_biz_id=999)])
+        # 按业务合并，仅同步发生变更的主机
+        bulk_differential_sync_biz_hosts.assert_has_calls(
+            [mock.call({999: {mock_data.MOCK_HOST["bk_host_id"]}}, only_incremental=False)]
+        )
 
     @patch("apps.node_man.periodic_tasks.resource_watch_task.GlobalSettings.update_config", InterruptedError)
     @patch("apps.node_man.periodic_tasks.resource_watch_task.client_v2", MockClient)
@@ -89,3 +97,59 @@ class TestResourceWatchTask(CustomBaseTestCase):
         # 验证是否触发了订阅，从而证明是否监视进程改变
         debounce_window_key = "debounce_window__trigger_nodeman_subscription_404407a5290c409be67c50f4494f5f9f"
         self.assertEqual(bool(cache.get(debounce_window_key)), True)
+
+    def test_coalesce_resource_watched_events(self):
+        events = [
+            {"bk_resource": "host", "bk_detail": {"bk_biz_id": 1, "bk_host_id": 1}},
+            {"bk_resource": "host", "bk_detail": {"bk_biz_id": 1, "bk_host_id": 1}},
+            {"bk_resource": "host_relation", "bk_detail": {"bk_biz_id": 1, "bk_host_id": 2}},
+            {"bk_resource": "host_relation", "bk_detail": {"bk_biz_id": 2, "bk_host_id": 2}},
+            {"bk_resource": "process", "bk_detail": {"bk_biz_id": 3}},
+            {"bk_resource": "set", "bk_detail": {"bk_biz_id": 3, "bk_set_id": 1}},
+            {"bk_resource": "host", "bk_detail": {"bk_host_id": 3}},
+        ]
+        coalesce_result = coalesce_resource_watched_events(events)
+        self.assertEqual(coalesce_result["bk_host_ids_gby_bk_biz_id"], {1: {1, 2}, 2: {2}})
+        self.assertEqual(coalesce_result["affected_bk_biz_ids"], {1, 2, 3})
+        self.assertEqual(len(coalesce_result["topo_events"]), 1)
+        self.assertEqual(coalesce_result["ignored_event_count"], 1)
+
+
+class TestWatchFromCheckpoint(CustomBaseTestCase):
+    HEAD_DATA = {"bk_events": [{"bk_cursor": "head"}], "bk_watched": False}
+
+    def setUp(self):
+        super().setUp()
+        ResourceWatchCursor.objects.create(bk_resource=constants.ResourceType.set, bk_cursor="expired")
+        self.kwargs = {"bk_resource": constants.ResourceType.set}
+        self.on_cursor_lost = MagicMock(__name__="on_cursor_lost")
+
+    def watch(self, side_effect):
+        with patch("apps.node_man.periodic_tasks.resource_watch_task.client_v2") as client:
+            client.cc.resource_watch.side_effect = side_effect
+            data = watch_from_checkpoint("cursor_key", self.kwargs, self.on_cursor_lost)
+        return data, client.cc.resource_watch.call_args_list
+
+    def test_watch_from_cursor(self):
+        data, calls = self.watch([self.HEAD_DATA])
+        self.assertEqual(data, self.HEAD_DATA)
+        self.assertEqual(calls[0][0][0]["bk_cursor"], "expired")
+        self.on_cursor_lost.assert_not_called()
+
+    def test_replay_from_checkpoint(self):
+        data, calls = self.watch([ComponentCallError(), self.HEAD_DATA])
+        self.assertEqual(data, self.HEAD_DATA)
+        self.assertIn("bk_start_from", calls[1][0][0])
+        self.assertNotIn("bk_cursor", calls[1][0][0])
+        self.on_cursor_lost.assert_not_called()
+
+    def test_gap_fallback(self):
+        data, calls = self.watch([ComponentCallError(), ComponentCallError(), self.HEAD_DATA])
+        self.assertEqual(data, self.HEAD_DATA)
+        self.assertEqual(calls[2][0][0], {"bk_resource": constants.ResourceType.set})
+        self.on_cursor_lost.assert_called_once()
+
+    def test_cmdb_unavailable(self):
+        with self.assertRaises(ComponentCallError):
+            self.watch([ComponentCallError()] * 3)
+        self.on_cursor_lost.assert_not_called()
@@ -8,6 +8,7 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import copy
 from unittest.mock import patch
 
 from django.conf import settings
@@ -22,8 +23,10 @@ from apps.mock_data.common_unit.host import (
 from apps.node_man import constants
 from apps.node_man.models import Host, ProcessStatus
 from apps.node_man.periodic_tasks.sync_agent_status_task import (
+    iter_host_id_ranges,
     sync_agent_status_periodic_task,
     update_or_create_host_agent_status,
+    update_or_create_host_agent_status_by_id_range,
 )
 from apps.node_man.tests.test_pericdic_tasks.utils import MockClient
 from apps.utils.unittest.testcase import CustomBaseTestCase
@@ -101,3 +104,32 @@ class TestSyncAgentStatus(CustomBaseTestCase):
         update_or_create_host_agent_status(None, Host.objects.all())
         process_status = ProcessStatus.objects.get(bk_host_id=host.bk_host_id)
         self.assertEqual(process_status.status, constants.ProcStateType.NOT_INSTALLED)
+
+    def test_iter_host_id_ranges(self):
+        host_objs = []
+        for bk_host_id in range(1, 11):
+            host_data = copy.deepcopy(HOST_MODEL_DATA)
+            host_data["bk_host_id"] = bk_host_id
+            host_objs.append(Host(**host_data))
+        Host.objects.bulk_create(host_objs)
+
+        bk_biz_id = HOST_MODEL_DATA["bk_biz_id"]
+        self.assertEqual(list(iter_host_id_ranges(bk_biz_id, limit=4)), [(1, 4), (5, 8), (9, None)])
+        self.assertEqual(list(iter_host_id_ranges(bk_biz_id, limit=5)), [(1, 5), (6, None)])
+        self.assertEqual(list(iter_host_id_ranges(bk_biz_id, limit=10)), [(1, None)])
+        self.assertEqual(list(iter_host_id_ranges(bk_biz_id + 1, limit=10)), [])
+
+    @patch(
+        "apps.node_man.periodic_tasks.sync_agent_status_task.get_gse_api_helper",
+        get_gse_api_helper(settings.GSE_VERSION, GseApiMockClient()),
+    )
+    def test_update_or_create_host_agent_status_by_id_range(self):
+        host = Host.objects.create(**HOST_MODEL_DATA)
+        changed_count = update_or_create_host_agent_status_by_id_range(
+            None, host.bk_biz_id, host.bk_host_id, host.bk_host_id
+        )
+        # 新建进程状态 + 管控权变更
+        self.assertEqual(changed_count, 2)
+        self.assertEqual(ProcessStatus.objects.get(bk_host_id=host.bk_host_id).status, constants.ProcStateType.RUNNING)
+        # 状态无变化时不产生写入
+        self.assertEqual(update_or_create_host_agent_status_by_id_range(None, host.bk_biz_id, host.bk_host_id), 0)
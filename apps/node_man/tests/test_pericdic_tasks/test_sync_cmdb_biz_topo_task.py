@@ -14,7 +14,10 @@ from unittest.mock import patch
 
 from django.core.cache import cache
 
+from apps.node_man import constants
 from apps.node_man.periodic_tasks.sync_cmdb_biz_topo_task import (
+    apply_biz_topo_events,
+    format_biz_topo,
     get_and_cache_format_biz_topo,
 )
 from apps.utils.unittest.testcase import CustomBaseTestCase
@@ -43,3 +46,72 @@ class TestSyncCMDBBizTopo(CustomBaseTestCase):
         self.get_topo_path(topo_cache__id_path_map, topo_cache)
 
         self.assertEqual(topo_cache__id_path_map, topo_nodes__id_path_map)
+
+    @staticmethod
+    def build_biz_topo(set_name: str = "set", module_name: str = "module"):
+        return {
+            "bk_obj_id": "biz",
+            "bk_inst_id": MOCK_BK_BIZ_ID,
+            "bk_inst_name": "biz",
+            "child": [
+                {
+                    "bk_obj_id": "set",
+                    "bk_inst_id": 10,
+                    "bk_inst_name": set_name,
+                    "child": [{"bk_obj_id": "module", "bk_inst_id": 100, "bk_inst_name": module_name, "child": []}],
+                },
+                {"bk_obj_id": "set", "bk_inst_id": 11, "bk_inst_name": "deleted_set", "child": []},
+            ],
+        }
+
+    def test_apply_biz_topo_events(self):
+        format_result = format_biz_topo(self.build_biz_topo())
+        cache.set(f"{MOCK_BK_BIZ_ID}_topo_cache", format_result["biz_format_topo"])
+        cache.set(f"{MOCK_BK_BIZ_ID}_topo_nodes", format_result["biz_nodes"])
+
+        events = [
+            {
+                "bk_event_type": constants.ResourceEventType.update,
+                "bk_resource": constants.ResourceType.set,
+                "bk_detail": {"bk_set_id": 10, "bk_set_name": "new_set", "bk_parent_id": MOCK_BK_BIZ_ID},
+            },
+            {
+                "bk_event_type": constants.ResourceEventType.create,
+                "bk_resource": constants.ResourceType.module,
+                "bk_detail": {"bk_module_id": 101, "bk_module_name": "new_module", "bk_set_id": 10},
+            },
+            {
+                "bk_event_type": constants.ResourceEventType.delete,
+                "bk_resource": constants.ResourceType.set,
+                "bk_detail": {"bk_set_id": 11, "bk_set_name": "deleted_set", "bk_parent_id": MOCK_BK_BIZ_ID},
+            },
+        ]
+        with patch("apps.node_man.periodic_tasks.sync_cmdb_biz_topo_task.get_and_cache_format_biz_topo") as rebuild:
+            apply_biz_topo_events(MOCK_BK_BIZ_ID, events)
+            rebuild.delay.assert_not_called()
+
+        # 增量更新结果与全量格式化结果一致
+        expect_biz_topo = self.build_biz_topo(set_name="new_set")
+        expect_biz_topo["child"] = expect_biz_topo["child"][:1]
+        expect_biz_topo["child"][0]["child"].append(
+            {"bk_obj_id": "module", "bk_inst_id": 101, "bk_inst_name": "new_module", "child": []}
+        )
+        expect_format_result = format_biz_topo(expect_biz_topo)
+        self.assertEqual(cache.get(f"{MOCK_BK_BIZ_ID}_topo_nodes"), expect_format_result["biz_nodes"])
+        self.assertEqual(cache.get(f"{MOCK_BK_BIZ_ID}_topo_cache"), expect_format_result["biz_format_topo"])
+
+    def test_apply_biz_topo_events_fallback(self):
+        format_result = format_biz_topo(self.build_biz_topo())
+        cache.set(f"{MOCK_BK_BIZ_ID}_topo_cache", format_result["biz_format_topo"])
+
+        # 父节点不在拓扑中，无法增量更新，回退到全量重建
+        events = [
+            {
+                "bk_event_type": constants.ResourceEventType.create,
+                "bk_resource": constants.ResourceType.set,
+                "bk_detail": {"bk_set_id": 12, "bk_set_name": "custom_set", "bk_parent_id": 9999},
+            }
+        ]
+        with patch("apps.node_man.periodic_tasks.sync_cmdb_biz_topo_task.get_and_cache_format_biz_topo") as rebuild:
+            apply_biz_topo_events(MOCK_BK_BIZ_ID, events)
+            rebuild.delay.assert_called_once_with(MOCK_BK_BIZ_ID)
@@ -13,7 +13,10 @@ from unittest.mock import patch
 
 from apps.node_man import constants
 from apps.node_man.models import Host
-from apps.node_man.periodic_tasks.sync_cmdb_host import sync_cmdb_host_periodic_task
+from apps.node_man.periodic_tasks.sync_cmdb_host import (
+    sync_cmdb_host_periodic_task,
+    update_or_create_host_base,
+)
 from apps.utils.unittest.testcase import CustomBaseTestCase
 
 from .mock_data import MOCK_BK_BIZ_ID, MOCK_HOST, MOCK_HOST_NUM
@@ -56,3 +59,22 @@ class TestSyncCMDBHost(CustomBaseTestCase):
 
         # 验证主机信息是否删除成功
         self.assertEqual(Host.objects.filter(bk_host_id=-1).count(), 0)
+
+    @patch("apps.node_man.periodic_tasks.sync_cmdb_host.client_v2", MockClient)
+    def test_skip_unchanged_hosts(self):
+        cmdb_host_data = MockClient.cc.list_resource_pool_hosts()["info"]
+        update_or_create_host_base(MOCK_BK_BIZ_ID, None, cmdb_host_data)
+        self.assertEqual(Host.objects.count(), len(cmdb_host_data))
+
+        # CMDB 主机信息无变化时，不产生更新
+        with patch("apps.node_man.periodic_tasks.sync_cmdb_host._bulk_update_host") as bulk_update_host:
+            update_or_create_host_base(MOCK_BK_BIZ_ID, None, cmdb_host_data)
+            for call in bulk_update_host.call_args_list:
+                self.assertEqual(call[0][0], [])
+
+        # 仅更新发生变更的主机
+        cmdb_host_data[0]["bk_host_name"] = "changed"
+        with patch("apps.node_man.periodic_tasks.sync_cmdb_host._bulk_update_host") as bulk_update_host:
+            update_or_create_host_base(MOCK_BK_BIZ_ID, None, cmdb_host_data)
+            updated_host_ids = [host.bk_host_id for call in bulk_update_host.call_args_list for host in call[0][0]]
+            self.assertEqual(updated_host_ids, [cmdb_host_data[0]["bk_host_id"]])
@@ -248,18 +248,19 @@ class PolicyTools:
         topo_order = CmdbHandler.get_topo_order()
         subscription = models.Subscription.get_subscription(policy_id)
 
-        host_nodes_gby_2th_policy_id = defaultdict(list)
+        host_infos = list(host_infos)
         for host in host_infos:
-
             # 适配同值但不同数据源的主机信息，DB中host的内网IP字段为 inner_ip，需要适配为 cmdb 返回的字段名称 -> bk_host_innerip
             host["bk_host_innerip"] = host["inner_ip"]
-            check_is_suppressed_result = subscription.check_is_suppressed(
-                action=action,
-                cmdb_host_info=host,
-                topo_order=topo_order,
-                host_id__bk_obj_sub_map=host_id__bk_obj_sub_map,
-            )
+        check_is_suppressed_results = subscription.bulk_check_is_suppressed(
+            action=action,
+            cmdb_host_infos=host_infos,
+            topo_order=topo_order,
+            host_id__bk_obj_sub_map=host_id__bk_obj_sub_map,
+        )
 
+        host_nodes_gby_2th_policy_id = defaultdict(list)
+        for host, check_is_suppressed_result in zip(host_infos, check_is_suppressed_results):
             if check_is_suppressed_result["is_suppressed"]:
                 host_nodes_gby_2th_policy_id[check_is_suppressed_result["suppressed_by"]["subscription_id"]].append(
                     {"bk_host_id": host["bk_host_id"], "bk_biz_id": host["bk_biz_id"]}
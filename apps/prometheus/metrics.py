@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from django_prometheus.conf import NAMESPACE
+from prometheus_client import Counter, Gauge, Histogram
+
+sync_cmdb_host_rows_by_action = Counter(
+    "django_app_sync_cmdb_host_rows_by_action",
+    "Count of host rows handled by sync_cmdb_host, by action.",
+    ["action"],
+    namespace=NAMESPACE,
+)
+
+resource_watch_events_applied_total = Counter(
+    "django_app_resource_watch_events_applied_total",
+    "Count of applied CMDB resource watch events, by resource.",
+    ["resource"],
+    namespace=NAMESPACE,
+)
+
+resource_watch_cursor_lag_seconds = Gauge(
+    "django_app_resource_watch_cursor_lag_seconds",
+    "Seconds since the CMDB resource watcher last caught up with the CMDB event head, by resource.",
+    ["resource"],
+    namespace=NAMESPACE,
+)
+
+resource_watch_cursor_gaps_total = Counter(
+    "django_app_resource_watch_cursor_gaps_total",
+    "Count of invalid CMDB resource watch cursors, by resource and recovery action.",
+    ["resource", "action"],
+    namespace=NAMESPACE,
+)
+
+resource_watch_events_apply_lag_seconds = Gauge(
+    "django_app_resource_watch_events_apply_lag_seconds",
+    "Seconds between the oldest pending CMDB resource watch event being stored and being applied.",
+    namespace=NAMESPACE,
+)
+
+job_status_poller_queries_total = Counter(
+    "django_app_job_status_poller_queries_total",
+    "Count of JOB instance status queries issued by the shared poller, by result.",
+    ["result"],
+    namespace=NAMESPACE,
+)
+
+scope_instance_cache_requests_total = Counter(
+    "django_app_scope_instance_cache_requests_total",
+    "Count of subscription scope instance cache reads, by result.",
+    ["result"],
+    namespace=NAMESPACE,
+)
+
+scope_instance_cache_payload_bytes = Histogram(
+    "django_app_scope_instance_cache_payload_bytes",
+    "Size of subscription scope instance cache payloads, by encoding.",
+    ["encoding"],
+    namespace=NAMESPACE,
+    buckets=(1 << 10, 1 << 14, 1 << 17, 1 << 20, 1 << 22, 1 << 24, 1 << 26, float("inf")),
+)
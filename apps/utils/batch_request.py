@@ -8,9 +8,11 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import asyncio
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from copy import deepcopy
 from multiprocessing.pool import ThreadPool
+from typing import Any, Callable, Coroutine, Dict, List, Optional
 
 from django.conf import settings
 from django.utils.translation import get_language
@@ -18,6 +20,7 @@ from django.utils.translation import get_language
 from apps.exceptions import AppBaseException
 from apps.node_man import constants
 from apps.utils.local import get_request
+from common.api.utils.session import async_session_pool
 
 from . import translation
 from .concurrent import inject_request
@@ -103,6 +106,115 @@ def batch_request(
     return data
 
 
+async def async_batch_request(
+    func: Callable[..., Coroutine],
+    params: Dict[str, Any],
+    get_data: Callable = lambda x: x["info"],
+    get_count: Optional[Callable] = lambda x: x["count"],
+    limit: int = constants.QUERY_CMDB_LIMIT,
+    sort: Optional[str] = None,
+    split_params: bool = False,
+    concurrency: Optional[int] = None,
+) -> List[Any]:
+    """
+    协程并发请求接口，参数与 batch_request 一致，func 需为返回协程对象的方法，如 common.api.base.AsyncDataAPI
+    所有分页请求在同一个事件循环中执行，通过信号量限制同时在途的请求数量
+    :param func: 请求方法
+    :param params: 请求参数
+    :param get_data: 获取数据函数
+    :param get_count: 获取总数函数
+    :param limit: 一次请求数量
+    :param sort: 排序
+    :param split_params: 是否拆分参数
+    :param concurrency: 最大并发数，默认为 settings.CONCURRENT_NUMBER
+    :return: 请求结果
+    """
+    semaphore = asyncio.Semaphore(concurrency or settings.CONCURRENT_NUMBER)
+
+    async def _request(_request_params: Dict[str, Any]):
+        async with semaphore:
+            return await func(_request_params)
+
+    # 如果该接口没有返回count参数，只能逐页请求
+    if not get_count:
+        data = []
+        start = 0
+        while True:
+            request_params = {"page": {"limit": limit, "start": start}}
+            request_params.update(params)
+            result = get_data(await _request(request_params))
+            data.extend(result)
+            if len(result) < limit:
+                break
+            start += limit
+        return data
+
+    params_list: List[Dict[str, Any]] = []
+    if not split_params:
+        params_list.append(params)
+    else:
+        # 拆分params适配bk_module_id大于500情况
+        bk_module_ids = params.pop("bk_module_ids", [])
+        if not bk_module_ids:
+            params_list.append(params)
+        for s_index in range(0, len(bk_module_ids), constants.QUERY_CMDB_MODULE_LIMIT):
+            single_params = deepcopy(params)
+            single_params["bk_module_ids"] = bk_module_ids[s_index : s_index + constants.QUERY_CMDB_MODULE_LIMIT]
+            params_list.append(single_params)
+
+    # 并发获取每组参数的总数
+    counts = await asyncio.gather(
+        *[_request(dict(page={"start": 0, "limit": 1}, **_params)) for _params in params_list]
+    )
+
+    page_coros: List[Coroutine] = []
+    for _params, count_result in zip(params_list, counts):
+        for start in range(0, get_count(count_result), limit):
+            request_params = {"page": {"limit": limit, "start": start}}
+            if sort:
+                request_params["page"]["sort"] = sort
+            request_params.update(_params)
+            page_coros.append(_request(request_params))
+
+    data = []
+    # gather 保证结果顺序与分页顺序一致
+    for page_result in await asyncio.gather(*page_coros):
+        data.extend(get_data(page_result))
+    return data
+
+
+def batch_request_coroutine(
+    func: Callable[..., Coroutine],
+    params: Dict[str, Any],
+    get_data: Callable = lambda x: x["info"],
+    get_count: Optional[Callable] = lambda x: x["count"],
+    limit: int = constants.QUERY_CMDB_LIMIT,
+    sort: Optional[str] = None,
+    split_params: bool = False,
+    concurrency: Optional[int] = None,
+) -> List[Any]:
+    """
+    在同步代码中执行 async_batch_request，参数说明见 async_batch_request
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(
+            async_batch_request(
+                func=func,
+                params=params,
+                get_data=get_data,
+                get_count=get_count,
+                limit=limit,
+                sort=sort,
+                split_params=split_params,
+                concurrency=concurrency,
+            )
+        )
+    finally:
+        loop.run_until_complete(async_session_pool.close())
+        loop.close()
+
+
 def sync_batch_request(func, params, get_data=lambda x: x["info"], limit=500):
     """
     同步请求接口
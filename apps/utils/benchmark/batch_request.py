@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import asyncio
+import logging
+import socket
+import threading
+import time
+import typing
+
+from aiohttp import web
+
+from apps.utils import batch_request
+from common.api.base import AsyncDataAPI, DataAPI
+
+"""
+DataAPI 分页拉取性能对比：线程池（batch_request） vs 协程（batch_request_coroutine）
+使用本地 aiohttp 服务模拟 CMDB 分页接口，每次请求固定延迟，避免对真实 CMDB 造成压力
+
+使用方式（需在 Django 环境中执行）：
+>>> from apps.utils.benchmark import batch_request as bench
+>>> bench.do_performance(totals=[10000, 50000, 100000], latency=0.2, repeat=3)
+"""
+
+logging.basicConfig(
+    format="%(levelname)s [%(asctime)s] %(name)s | %(funcName)s | %(lineno)d %(message)s", level=logging.ERROR
+)
+
+
+class FakeCMDBServer:
+    """模拟 CMDB list_hosts 类分页接口的本地服务"""
+
+    def __init__(self, total: int, latency: float):
+        self.total = total
+        self.latency = latency
+        self.port: typing.Optional[int] = None
+        self.request_count: int = 0
+        self._loop: typing.Optional[asyncio.AbstractEventLoop] = None
+        self._runner: typing.Optional[web.AppRunner] = None
+        self._ready = threading.Event()
+
+    async def list_hosts(self, request: web.Request) -> web.Response:
+        self.request_count += 1
+        params = await request.json()
+        await asyncio.sleep(self.latency)
+        start, limit = params["page"]["start"], params["page"]["limit"]
+        info = [{"bk_host_id": bk_host_id} for bk_host_id in range(start, min(start + limit, self.total))]
+        return web.json_response(
+            {"result": True, "code": 0, "message": "", "data": {"count": self.total, "info": info}}
+        )
+
+    def _serve(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_post("/list_hosts/", self.list_hosts)
+        self._runner = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self._loop.run_until_complete(web.TCPSite(self._runner, "127.0.0.1", self.port).start())
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self):
+        threading.Thread(target=self._serve, daemon=True).start()
+        self._ready.wait()
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/list_hosts/"
+
+
+def time_cost(func: typing.Callable, *args, **kwargs) -> typing.Tuple[typing.Any, float]:
+    begin = time.time()
+    result = func(*args, **kwargs)
+    return result, time.time() - begin
+
+
+def do_performance(totals: typing.List[int], latency: float = 0.2, repeat: int = 3, concurrency: int = 200):
+    for total in totals:
+        server = FakeCMDBServer(total=total, latency=latency)
+        server.start()
+
+        data_api = DataAPI(method="POST", url=server.url, module="benchmark", description="模拟CMDB分页接口")
+        async_data_api = AsyncDataAPI.from_data_api(data_api)
+
+        thread_cost, coroutine_cost = 0, 0
+        for __ in range(repeat):
+            thread_result, cost = time_cost(batch_request.batch_request, data_api, {})
+            thread_cost += cost
+            coroutine_result, cost = time_cost(
+                batch_request.batch_request_coroutine, async_data_api, {}, concurrency=concurrency
+            )
+            coroutine_cost += cost
+            assert len(thread_result) == len(coroutine_result) == total
+
+        server.stop()
+        logging.error(
+            f"\n{'-' * 150} \n"
+            f"total -> {total}, latency -> {latency}, requests -> {server.request_count}, \n"
+            f"thread cost -> {round(thread_cost / repeat, 3)}, "
+            f"coroutine(concurrency={concurrency}) cost -> {round(coroutine_cost / repeat, 3)} \n"
+            f"{'-' * 150} \n\n"
+        )
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import logging
+import time
+import typing
+from unittest import mock
+
+from apps.core.ipchooser.tools.base import HostQuerySqlHelper
+from apps.node_man import constants, models
+
+"""
+IP 选择器主机模糊搜索对比：like '%value%' 全表扫描 vs n-gram 索引候选 + like 校验
+在独立的业务 ID 及主机 ID 区间内构造合成主机表，测试结束后清理
+
+使用方式（需在 Django 环境中执行，会写入数据库，请勿在生产环境执行）：
+>>> from apps.utils.benchmark import host_search_index as bench
+>>> bench.do_performance(host_num=1000000, keywords=["10.1.23", "web-0012", "3.45.6", "agent-00099"])
+"""
+
+logging.basicConfig(
+    format="%(levelname)s [%(asctime)s] %(name)s | %(funcName)s | %(lineno)d %(message)s", level=logging.ERROR
+)
+
+BENCHMARK_BIZ_ID = 99999999
+BENCHMARK_BEGIN_HOST_ID = 1000000000
+BATCH_SIZE = 5000
+
+
+def generate_host(bk_host_id: int) -> models.Host:
+    seq: int = bk_host_id - BENCHMARK_BEGIN_HOST_ID
+    return models.Host(
+        bk_host_id=bk_host_id,
+        bk_agent_id=f"agent-{seq:010d}",
+        bk_biz_id=BENCHMARK_BIZ_ID,
+        bk_cloud_id=constants.DEFAULT_CLOUD,
+        bk_host_name=f"web-{seq:07d}",
+        inner_ip=f"10.{seq // 65536 % 256}.{seq // 256 % 256}.{seq % 256}",
+        os_type=constants.OsType.LINUX,
+        node_type=constants.NodeType.AGENT,
+    )
+
+
+def create_hosts(host_num: int):
+    for begin in range(BENCHMARK_BEGIN_HOST_ID, BENCHMARK_BEGIN_HOST_ID + host_num, BATCH_SIZE):
+        bk_host_ids: typing.List[int] = list(range(begin, min(begin + BATCH_SIZE, BENCHMARK_BEGIN_HOST_ID + host_num)))
+        models.Host.objects.bulk_create([generate_host(bk_host_id) for bk_host_id in bk_host_ids])
+        models.ProcessStatus.objects.bulk_create(
+            [
+                models.ProcessStatus(
+                    bk_host_id=bk_host_id,
+                    source_type=models.ProcessStatus.SourceType.DEFAULT,
+                    status=constants.ProcStateType.RUNNING,
+                    name=models.ProcessStatus.GSE_AGENT_PROCESS_NAME,
+                )
+                for bk_host_id in bk_host_ids
+            ]
+        )
+        models.HostSearchToken.refresh_without_check(bk_host_ids)
+
+
+def clear_hosts(host_num: int):
+    bk_host_id_range: typing.Tuple[int, int] = (BENCHMARK_BEGIN_HOST_ID, BENCHMARK_BEGIN_HOST_ID + host_num)
+    models.Host.objects.filter(bk_host_id__range=bk_host_id_range).delete()
+    models.ProcessStatus.objects.filter(bk_host_id__range=bk_host_id_range).delete()
+    models.HostSearchToken.objects.filter(bk_host_id__range=bk_host_id_range).delete()
+
+
+def search(keyword: str, page_size: int) -> typing.Tuple[int, typing.List[typing.Dict]]:
+    host_queryset = HostQuerySqlHelper.multiple_cond_sql(
+        params={"conditions": [{"key": "query", "value": keyword}]},
+        biz_scope=[BENCHMARK_BIZ_ID],
+        return_all_node_type=True,
+    )
+    return host_queryset.count(), list(host_queryset.values("bk_host_id", "inner_ip")[:page_size])
+
+
+def do_performance(host_num: int = 1000000, keywords: typing.List[str] = None, page_size: int = 20):
+    keywords = keywords or ["10.1.23", "web-0012", "3.45.6", "agent-00099"]
+
+    begin = time.time()
+    create_hosts(host_num)
+    logging.error(f"\n{'-' * 150} \nprepare: host_num -> {host_num}, cost -> {round(time.time() - begin, 4)} \n")
+
+    try:
+        for keyword in keywords:
+            for mode, use_index in [("like", False), ("n-gram", True)]:
+                with mock.patch.object(models.HostSearchToken, "is_available", return_value=use_index):
+                    begin = time.time()
+                    total, hosts = search(keyword, page_size)
+                    cost = time.time() - begin
+
+                logging.error(
+                    f"\n{'-' * 150} \n"
+                    f"mode -> {mode}: host_num -> {host_num}, keyword -> {keyword} \n"
+                    f"total -> {total}, page -> {len(hosts)}, cost -> {round(cost, 4)} \n"
+                    f"{'-' * 150} \n\n"
+                )
+    finally:
+        clear_hosts(host_num)
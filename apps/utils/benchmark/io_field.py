@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import logging
+import pickle
+import time
+import typing
+
+from django.db import connection
+
+from pipeline.engine.models import io_codecs
+
+"""
+pipeline IOField 编解码性能对比，数据取自当前环境中真实的流水线运行时数据
+对比维度：pickle 协议版本 × 压缩编码 × 压缩等级，统计压缩后大小、编码及解码耗时
+
+使用方式（需在 Django 环境中执行，lz4 / zstd 未安装时自动跳过）：
+>>> from apps.utils.benchmark import io_field as bench
+>>> bench.do_performance(limit=200)
+"""
+
+logging.basicConfig(
+    format="%(levelname)s [%(asctime)s] %(name)s | %(funcName)s | %(lineno)d %(message)s", level=logging.ERROR
+)
+
+# 表名 -> IOField 字段名
+IO_FIELD_TABLES: typing.Dict[str, str] = {
+    "engine_processsnapshot": "data",
+    "engine_data": "outputs",
+    "engine_scheduleservice": "service_act",
+}
+
+CODEC_LEVELS: typing.List[typing.Tuple[str, typing.Optional[int]]] = [
+    ("zlib", 6),
+    ("zlib", 1),
+    ("lz4", None),
+    ("zstd", 1),
+    ("zstd", 3),
+]
+
+
+def fetch_values(table: str, field: str, limit: int) -> typing.List[typing.Any]:
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {field} FROM {table} ORDER BY id DESC LIMIT %s", [limit])
+        rows = cursor.fetchall()
+    values = []
+    for (raw,) in rows:
+        try:
+            values.append(pickle.loads(io_codecs.decode(bytes(raw))))
+        except Exception:
+            continue
+    return values
+
+
+def do_performance(limit: int = 200, repeat: int = 3):
+    for table, field in IO_FIELD_TABLES.items():
+        values = fetch_values(table, field, limit)
+        if not values:
+            continue
+
+        for protocol in sorted({3, pickle.HIGHEST_PROTOCOL}):
+            begin = time.time()
+            payloads = [pickle.dumps(value, protocol=protocol) for value in values]
+            dumps_cost = time.time() - begin
+            begin = time.time()
+            for payload in payloads:
+                pickle.loads(payload)
+            loads_cost = time.time() - begin
+
+            for codec_name, level in CODEC_LEVELS:
+                codec = io_codecs.get_codec(codec_name)
+                if codec is None:
+                    continue
+
+                encode_cost, decode_cost, size = 0, 0, 0
+                for __ in range(repeat):
+                    begin = time.time()
+                    encoded_list = [codec.encode(payload, level) for payload in payloads]
+                    encode_cost += time.time() - begin
+                    begin = time.time()
+                    for encoded in encoded_list:
+                        io_codecs.decode(encoded)
+                    decode_cost += time.time() - begin
+                    size = sum(len(encoded) for encoded in encoded_list)
+
+                logging.error(
+                    f"\n{'-' * 150} \n"
+                    f"{table}.{field}: rows -> {len(values)}, raw size -> {sum(len(p) for p in payloads)} \n"
+                    f"pickle protocol -> {protocol}: dumps cost -> {round(dumps_cost, 4)}, "
+                    f"loads cost -> {round(loads_cost, 4)} \n"
+                    f"codec -> {codec_name}(level={level}): size -> {size}, "
+                    f"encode cost -> {round(encode_cost / repeat, 4)}, "
+                    f"decode cost -> {round(decode_cost / repeat, 4)} \n"
+                    f"{'-' * 150} \n\n"
+                )
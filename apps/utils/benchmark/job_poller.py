@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import logging
+import time
+import typing
+
+from apps.backend.components.collections.job_poller import JobStatusPoller
+from apps.mock_data.api_mkd.job.utils import FakeJobApi
+from apps.node_man import constants
+from apps.utils.batch_request import request_multi_thread
+
+"""
+作业平台执行状态查询对比：原子各自轮询 vs 集中轮询，作业平台由本地替身 FakeJobApi 模拟
+统计维度：作业平台状态查询次数、全部作业被感知完成的耗时
+
+使用方式（需在 Django 环境中执行，并已配置 Redis）：
+>>> from apps.utils.benchmark import job_poller as bench
+>>> bench.do_performance(node_num=200, job_num_per_node=5)
+"""
+
+logging.basicConfig(
+    format="%(levelname)s [%(asctime)s] %(name)s | %(funcName)s | %(lineno)d %(message)s", level=logging.ERROR
+)
+
+UNFINISHED_STATUSES = (constants.BkJobStatus.PENDING, constants.BkJobStatus.RUNNING)
+
+
+class BenchmarkJobStatusPoller(JobStatusPoller):
+    # 与线上数据隔离
+    KEY_PREFIX = "node_man:benchmark:job_status_poller"
+
+    def clear(self):
+        self.redis_inst.delete(self.pending_key, self.heartbeat_key)
+
+
+def create_jobs(fake_job_api: FakeJobApi, node_num: int, job_num_per_node: int) -> typing.Dict[int, typing.Set[int]]:
+    return {
+        node_id: {fake_job_api.fast_execute_script({})["job_instance_id"] for __ in range(job_num_per_node)}
+        for node_id in range(node_num)
+    }
+
+
+def run_per_node_polling(
+    fake_job_api: FakeJobApi, node_id__pending_ids_map: typing.Dict[int, typing.Set[int]], interval
+):
+    """模拟各原子在每个调度周期内独立查询未完成的作业"""
+
+    def _query(job_instance_id: int):
+        status = fake_job_api.get_job_instance_status({"job_instance_id": job_instance_id})["job_instance"]["status"]
+        return [(job_instance_id, status)]
+
+    while any(node_id__pending_ids_map.values()):
+        for pending_ids in node_id__pending_ids_map.values():
+            results = request_multi_thread(
+                _query, [{"job_instance_id": job_instance_id} for job_instance_id in pending_ids], get_data=lambda x: x
+            )
+            pending_ids -= {job_instance_id for job_instance_id, status in results if status not in UNFINISHED_STATUSES}
+        time.sleep(interval)
+
+
+def run_shared_polling(
+    poller: BenchmarkJobStatusPoller, node_id__pending_ids_map: typing.Dict[int, typing.Set[int]], interval
+):
+    """模拟周期任务集中轮询，各原子仅读取轮询器缓存的结果"""
+    for pending_ids in node_id__pending_ids_map.values():
+        poller.register(pending_ids)
+
+    while any(node_id__pending_ids_map.values()):
+        poller.poll_once()
+        for pending_ids in node_id__pending_ids_map.values():
+            pending_ids -= set(poller.get_finished_statuses(pending_ids).keys())
+        time.sleep(interval)
+
+
+def do_performance(
+    node_num: int = 200,
+    job_num_per_node: int = 5,
+    interval: float = 1,
+    min_duration: float = 1,
+    max_duration: float = 10,
+    latency: float = 0.01,
+    max_queries_per_round: int = 500,
+):
+    for mode in ["per_node", "shared"]:
+        fake_job_api = FakeJobApi(min_duration=min_duration, max_duration=max_duration, latency=latency)
+        node_id__pending_ids_map = create_jobs(fake_job_api, node_num, job_num_per_node)
+
+        begin = time.time()
+        if mode == "per_node":
+            run_per_node_polling(fake_job_api, node_id__pending_ids_map, interval)
+        else:
+            poller = BenchmarkJobStatusPoller(
+                query_func=fake_job_api.get_job_instance_status,
+                max_queries_per_round=max_queries_per_round,
+                interval=interval,
+            )
+            try:
+                run_shared_polling(poller, node_id__pending_ids_map, interval)
+            finally:
+                poller.clear()
+        cost = time.time() - begin
+
+        logging.error(
+            f"\n{'-' * 150} \n"
+            f"mode -> {mode}: node_num -> {node_num}, job_num_per_node -> {job_num_per_node}, "
+            f"interval -> {interval}, latency -> {latency} \n"
+            f"get_job_instance_status calls -> {fake_job_api.call_counter['get_job_instance_status']}, "
+            f"cost -> {round(cost, 4)} \n"
+            f"{'-' * 150} \n\n"
+        )
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import logging
+import pickle
+import time
+import typing
+import zlib
+
+from pipeline import builder
+from pipeline.builder import Data, ServiceActivity, Var
+from pipeline.engine.utils import Stack
+from pipeline.parser import PipelineParser
+
+"""
+进程快照单次保存写入字节数对比：整体快照（旧格式） vs pipeline 树 / 进程运行时数据拆分存储（新格式）
+按 NodeMan 订阅任务的编排方式构造流水线：并行网关下每个分支为一条多步骤的批量主机流水线
+
+使用方式（需在 Django 环境中执行）：
+>>> from apps.utils.benchmark import process_snapshot as bench
+>>> bench.do_performance(branch_nums=[10, 100], host_num_per_branch=500, step_num=8)
+"""
+
+logging.basicConfig(
+    format="%(levelname)s [%(asctime)s] %(name)s | %(funcName)s | %(lineno)d %(message)s", level=logging.ERROR
+)
+
+COMPRESS_LEVEL = 6
+
+
+def build_pipeline(branch_num: int, host_num_per_branch: int, step_num: int):
+    start_event = builder.EmptyStartEvent()
+    branches = []
+    for branch_idx in range(branch_num):
+        activities = []
+        for step_idx in range(step_num):
+            act = ServiceActivity(component_code="init_process_status", name=f"step-{step_idx}")
+            act.component.inputs.subscription_instance_ids = Var(
+                type=Var.PLAIN,
+                value=list(range(branch_idx * host_num_per_branch, (branch_idx + 1) * host_num_per_branch)),
+            )
+            act.component.inputs.meta = Var(type=Var.PLAIN, value={"STEPS": step_num, "GSE_VERSION": "V2"})
+            activities.append(act)
+        for pre_act, act in zip(activities, activities[1:]):
+            pre_act.extend(act)
+        branches.append(activities[0])
+
+    parallel_gw = builder.ParallelGateway()
+    converge_gw = builder.ConvergeGateway()
+    end_event = builder.EmptyEndEvent()
+    start_event.extend(parallel_gw).connect(*branches).to(parallel_gw).converge(converge_gw).extend(end_event)
+    return PipelineParser(pipeline_tree=builder.build_tree(start_event, data=Data())).parse()
+
+
+def dump_size(value: typing.Any) -> typing.Tuple[int, float]:
+    begin = time.time()
+    size = len(zlib.compress(pickle.dumps(value), COMPRESS_LEVEL))
+    return size, time.time() - begin
+
+
+def do_performance(branch_nums: typing.List[int], host_num_per_branch: int = 500, step_num: int = 8):
+    for branch_num in branch_nums:
+        pipeline = build_pipeline(branch_num, host_num_per_branch, step_num)
+        data = {"_pipeline_stack": Stack([pipeline]), "_root_pipeline": pipeline}
+        runtime_data = {"_subprocess_stack": Stack(), "_children": [f"{idx:032x}" for idx in range(branch_num)]}
+
+        full_size, full_cost = dump_size({**data, **runtime_data})
+        data_size, __ = dump_size(data)
+        runtime_size, runtime_cost = dump_size(runtime_data)
+
+        # 根进程在并行网关处的保存序列：join（仅子进程变化） -> sleep（无变化） -> 子进程全部完成后 clean_children（树变化）
+        transitions = [("join", False), ("sleep", False), ("clean_children", True)]
+        legacy_bytes = full_size * len(transitions)
+        delta_bytes = sum(
+            data_size + runtime_size if tree_changed else runtime_size for __, tree_changed in transitions
+        )
+
+        logging.error(
+            f"\n{'-' * 150} \n"
+            f"branch_num -> {branch_num}, host_num_per_branch -> {host_num_per_branch}, step_num -> {step_num} \n"
+            f"full snapshot -> {full_size} bytes ({round(full_cost, 4)}s), "
+            f"pipeline tree -> {data_size} bytes, runtime data -> {runtime_size} bytes ({round(runtime_cost, 4)}s) \n"
+            f"bytes written per transition: legacy -> {legacy_bytes // len(transitions)}, "
+            f"delta -> {delta_bytes // len(transitions)} \n"
+            f"{'-' * 150} \n\n"
+        )
@@ -8,8 +8,11 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps
-from typing import Callable, Optional
+from typing import Any, Callable, Hashable, Optional, Tuple
 
 import ujson as json
 from django.core.cache import cache
@@ -76,3 +79,52 @@ def func_cache_decorator(cache_time: int = DEFAULT_CACHE_TIME):
         return wrapper
 
     return decorate
+
+
+class LocalTTLCache:
+    """
+    进程内缓存，支持过期时间及 LRU 淘汰，线程安全
+    适用于读多写少、可容忍短时间不一致的数据，如全局配置
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 5):
+        """
+        :param max_size: 最大缓存条目数，超出后淘汰最久未使用的条目
+        :param ttl: 默认过期时间（秒）
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        获取缓存
+        :param key: 缓存键
+        :return: (是否命中, 缓存值)
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return False, None
+            expire_at, value = item
+            if expire_at < time.monotonic():
+                self._data.pop(key, None)
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
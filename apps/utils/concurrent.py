@@ -10,12 +10,14 @@ specific language governing permissions and limitations under the License.
 """
 import asyncio
 import inspect
+import os
 import sys
+import threading
 import time
 from concurrent.futures import as_completed
 from concurrent.futures.thread import ThreadPoolExecutor
 from multiprocessing import cpu_count, get_context
-from typing import Callable, Coroutine, Dict, List
+from typing import Any, Callable, Coroutine, Dict, List, Optional
 
 from asgiref.sync import async_to_sync
 from django.conf import settings
@@ -146,6 +148,140 @@ def batch_call_coroutine(
     return result
 
 
+class EventLoopThread:
+    """
+    进程级常驻事件循环，在后台线程中运行，同步代码通过 run 提交协程并等待结果
+    1. 同一进程内的协程共用一个事件循环，避免每批次创建 / 关闭事件循环及线程的开销，绑定事件循环的连接（如 asyncssh）也可以跨批次复用
+    2. fork 后子进程不会继承事件循环线程，按进程 ID 重新创建
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def get_loop(self) -> asyncio.AbstractEventLoop:
+        pid = os.getpid()
+        if self._loop is not None and self._pid == pid:
+            return self._loop
+
+        with self._lock:
+            if self._loop is None or self._pid != pid:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="EventLoopThread", daemon=True)
+                self._thread.start()
+                self._pid = pid
+            return self._loop
+
+    def run(self, coro: Coroutine) -> Any:
+        """
+        在常驻事件循环中执行协程，阻塞至执行完成
+        :param coro: 协程对象
+        :return: 协程返回值
+        """
+        loop = self.get_loop()
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("cannot wait for a coroutine inside the event loop thread, use await instead")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+event_loop_thread = EventLoopThread()
+
+
+class _LanguageBoundAwaitable:
+    """
+    逐步驱动协程，每次恢复执行前激活指定语言，让出控制权前还原
+    事件循环线程中的协程交替执行，语言设置在协程间互相覆盖，仅在协程入口激活一次不可靠
+    """
+
+    def __init__(self, coro: Coroutine, language: Optional[str]):
+        self.coro = coro
+        self.language = language
+
+    def __await__(self):
+        iterator = self.coro.__await__()
+        send_value: Any = None
+        throw_exc: Optional[BaseException] = None
+        while True:
+            try:
+                with translation.respect_language(self.language):
+                    if throw_exc is None:
+                        yielded = iterator.send(send_value)
+                    else:
+                        yielded = iterator.throw(throw_exc)
+            except StopIteration as stop:
+                return stop.value
+
+            send_value, throw_exc = None, None
+            try:
+                send_value = yield yielded
+            except GeneratorExit:
+                self.coro.close()
+                raise
+            except BaseException as exc:
+                throw_exc = exc
+
+
+async def bind_language(coro: Coroutine, language: Optional[str]) -> Any:
+    """
+    在指定语言下执行协程，协程的每一步执行前均重新激活该语言
+    :param coro: 协程对象
+    :param language: 语言，为空时沿用执行线程的语言设置
+    :return: 协程返回值
+    """
+    return await _LanguageBoundAwaitable(coro, language)
+
+
+def run_coroutine(coro: Coroutine) -> Any:
+    """在进程级常驻事件循环中执行协程，并返回结果，执行期间沿用调用方的语言设置"""
+    return event_loop_thread.run(bind_language(coro, get_language()))
+
+
+async def batch_call_async(
+    func: Callable[..., Coroutine],
+    params_list: List[Dict],
+    get_data: Callable = lambda x: x,
+    extend_result: bool = False,
+    interval: float = 0,
+    concurrency: Optional[int] = None,
+    **kwargs
+) -> List:
+    """
+    在当前事件循环中并发执行协程，参数说明参考 batch_call
+    :param concurrency: 最大并发数，为空时取 CONCURRENT_NUMBER，为 1 时串行执行
+    :return: 与 params_list 顺序一致的结果
+    """
+    # 同一事件循环中的协程交替执行，需为每个协程单独绑定提交时的语言
+    language: Optional[str] = get_language()
+    if concurrency == 1:
+        # 与 batch_call_serial 一致，前一个任务完成后间隔 interval 再执行下一个
+        coro_results = []
+        for idx, params in enumerate(params_list):
+            if idx != 0:
+                await asyncio.sleep(interval)
+            coro_results.append(await bind_language(func(**params), language))
+    else:
+        semaphore = asyncio.Semaphore(concurrency or settings.CONCURRENT_NUMBER)
+
+        async def _call(idx: int, params: Dict) -> Any:
+            # 与 batch_call 一致，任务按 interval 间隔依次提交
+            await asyncio.sleep(idx * interval)
+            async with semaphore:
+                return await bind_language(func(**params), language)
+
+        coro_results = await asyncio.gather(*[_call(idx, params) for idx, params in enumerate(params_list)])
+
+    result = []
+    for coro_result in coro_results:
+        if extend_result:
+            result.extend(get_data(coro_result))
+        else:
+            result.append(get_data(coro_result))
+    return result
+
+
 def batch_call_multi_proc(
     func, params_list: List[Dict], get_data=lambda x: x, extend_result: bool = False, **kwargs
 ) -> List:
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import asyncio
+import typing
+
+from apps.node_man import constants
+
+from .. import batch_request
+from ..unittest import testcase
+
+
+class FakeListHostsApi:
+    def __init__(self, total: int):
+        self.total = total
+        self.in_flight: int = 0
+        self.max_in_flight: int = 0
+
+    async def __call__(self, params: typing.Dict[str, typing.Any]):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        start, limit = params["page"]["start"], params["page"]["limit"]
+        return {"count": self.total, "info": list(range(start, min(start + limit, self.total)))}
+
+
+class TestAsyncBatchRequest(testcase.CustomBaseTestCase):
+    def test_batch_request_coroutine(self):
+        total = constants.QUERY_CMDB_LIMIT * 10 + 1
+        fake_api = FakeListHostsApi(total=total)
+        result = batch_request.batch_request_coroutine(fake_api, {}, concurrency=3)
+        # 结果顺序与分页顺序一致
+        self.assertEqual(result, list(range(total)))
+        self.assertLessEqual(fake_api.max_in_flight, 3)
+
+    def test_batch_request_coroutine_without_count(self):
+        total = constants.QUERY_CMDB_LIMIT * 2 + 1
+        fake_api = FakeListHostsApi(total=total)
+        result = batch_request.batch_request_coroutine(fake_api, {}, get_count=None)
+        self.assertEqual(result, list(range(total)))
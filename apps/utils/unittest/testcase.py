@@ -212,6 +212,13 @@ class OverwriteSettingsMixin(TestCaseLifeCycleMixin):
 class CustomBaseTestCase(OverwriteSettingsMixin, AssertDataMixin, TestCase):
     client_class = Client
 
+    def setUp(self) -> None:
+        super().setUp()
+        from apps.node_man.models import GlobalSettings
+
+        # 用例之间 DB 会回滚，进程内的全局配置缓存需同步清理
+        GlobalSettings.invalidate_cache()
+
     @property
     def request_factory(self):
         """按需加载request_factory"""
@@ -8,14 +8,17 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import asyncio
 import hashlib
 import json
 import logging
 import time
-from typing import Dict
+from typing import Dict, Tuple
 from urllib import parse
 
+import aiohttp
 import requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.core.cache import cache
 from django.utils import translation
@@ -29,6 +32,7 @@ from apps.utils.time_handler import timestamp_to_datetime
 
 from .exception import DataAPIException
 from .utils.params import add_esb_info_before_request
+from .utils.session import async_session_pool, session_pool
 
 logger = logging.getLogger("component")
 
@@ -151,12 +155,12 @@ class DataAPI(object):
             params = {}
         if headers is None:
             headers = {}
-        self.timeout = timeout or self.default_timeout
-        self.request_id = get_request_id()
-        self.data = data
+        # 请求级别的上下文通过参数传递，避免多线程共享同一个 DataAPI 对象时相互覆盖
+        timeout = timeout or self.default_timeout
+        request_id = get_request_id()
 
         try:
-            response = self._send_request(params, headers, use_admin=use_admin)
+            response = self._send_request(params, headers, request_id, timeout, use_admin=use_admin)
             if raw:
                 return response.response
 
@@ -173,7 +177,7 @@ class DataAPI(object):
             return response.data
         except DataAPIException as error:
             logger.exception(f"{error.error_message}, url => {self.url}, params => {params}, headers => {headers}")
-            raise ApiRequestError(error.error_message, self.request_id)
+            raise ApiRequestError(error.error_message, request_id)
 
     def get_error_message(self, error_message):
         url_path = ""
@@ -187,7 +191,7 @@ class DataAPI(object):
             message += f" path => {url_path}"
         return message
 
-    def _send_request(self, params, headers, use_admin=False):
+    def _prepare_params(self, params, use_admin=False):
         # 请求前的参数清洗处理
         if self.before_request is not None:
             params = self.before_request(params)
@@ -198,134 +202,151 @@ class DataAPI(object):
         if use_admin:
             params["bk_username"] = settings.BK_ADMIN_USERNAME
             params = remove_auth_args(params)
+        return params
+
+    def _send_request(self, params, headers, request_id, timeout, use_admin=False):
+        params = self._prepare_params(params, use_admin=use_admin)
 
         # 是否有默认返回，调试阶段可用
         if self.default_return_value is not None:
-            return DataResponse(self.default_return_value, self.request_id)
+            return DataResponse(self.default_return_value, request_id)
 
         # 缓存
+        cache_key = None
         try:
             cache_key = self._build_cache_key(params)
             if self.cache_time:
                 result = self._get_cache(cache_key)
                 if result is not None:
                     # 有缓存时返回
-                    return DataResponse(result, self.request_id)
+                    return DataResponse(result, request_id)
         except (TypeError, AttributeError):
             pass
 
         response = None
-        error_message = ""
 
         # 发送请求
         # 开始时记录请求时间
         start_time = time.time()
         try:
             try:
-                raw_response = self._send(params, headers, use_admin=use_admin)
+                raw_response = self._send(params, headers, request_id, timeout, use_admin=use_admin)
             except requests.exceptions.ReadTimeout as error:
                 raise DataAPIException(self, self.get_error_message(str(error)))
             except requests.exceptions.RequestException as error:
                 raise DataAPIException(self, self.get_error_message(str(error)))
 
-            # http层面的处理结果
+            response = self._parse_raw_response(raw_response, request_id)
             if raw_response.status_code != self.HTTP_STATUS_OK:
-                request_response = {
-                    "result": False,
-                    "message": f"[{raw_response.status_code}]" + (raw_response.text or raw_response.reason),
-                    "code": raw_response.status_code,
-                }
-                response = DataResponse(request_response, self.request_id)
-                raise DataAPIException(self, self.get_error_message(request_response["message"]), response=raw_response)
+                raise DataAPIException(self, self.get_error_message(response.message), response=raw_response)
 
-            # 结果层面的处理结果
-            try:
-                response_result = raw_response.json()
-            except AttributeError:
-                error_message = "data api response not json format url->[{}] content->[{}]".format(
-                    self.url,
-                    raw_response.text,
-                )
-                logger.exception(error_message)
+            if self.cache_time and cache_key is not None:
+                self._set_cache(cache_key, response.response)
+            return response
+        finally:
+            self._record_request(params, response, start_time, request_id)
 
-                raise DataAPIException(self, _("返回数据格式不正确，结果格式非json."), response=raw_response)
-            else:
-                # 防止第三方接口不规范，补充返回数据
-                response_result = self.safe_response(response_result)
-                # 只有正常返回才会调用 after_request 进行处理
-                if response_result["result"]:
+    def _parse_raw_response(self, raw_response, request_id):
+        """
+        将原始返回处理为 DataResponse
+        @param raw_response: 原始返回，需具备 status_code / text / reason 属性及 json 方法
+        @param request_id: 请求ID
+        @return: DataResponse
+        """
+        # http层面的处理结果
+        if raw_response.status_code != self.HTTP_STATUS_OK:
+            request_response = {
+                "result": False,
+                "message": f"[{raw_response.status_code}]" + (raw_response.text or raw_response.reason),
+                "code": raw_response.status_code,
+            }
+            return DataResponse(request_response, request_id)
 
-                    # 请求完成后的清洗处理
-                    if self.after_request is not None:
-                        response_result = self.after_request(response_result)
+        # 结果层面的处理结果
+        try:
+            response_result = raw_response.json()
+        except AttributeError:
+            error_message = "data api response not json format url->[{}] content->[{}]".format(
+                self.url,
+                raw_response.text,
+            )
+            logger.exception(error_message)
 
-                    if self.after_serializer is not None:
-                        serializer = self.after_serializer(data=response_result)
-                        serializer.is_valid(raise_exception=True)
-                        response_result = serializer.validated_data
+            raise DataAPIException(self, _("返回数据格式不正确，结果格式非json."), response=raw_response)
 
-                if self.cache_time and "cache_key" in locals():
-                    self._set_cache(locals()["cache_key"], response_result)
+        # 防止第三方接口不规范，补充返回数据
+        response_result = self.safe_response(response_result)
+        # 只有正常返回才会调用 after_request 进行处理
+        if response_result["result"]:
 
-                response = DataResponse(response_result, self.request_id)
-                return response
-        finally:
-            # 最后记录时间
-            end_time = time.time()
-            # 判断是否需要记录,及其最大返回值
-            bk_username = params.get("bk_username", "")
-
-            if response is not None:
-                response_result = response.is_success()
-                response_data = json.dumps(response.data)[: self.max_response_record]
-
-                for _param in settings.SENSITIVE_PARAMS:
-                    params.pop(_param, None)
-
-                try:
-                    params = json.dumps(params)[: self.max_query_params_record]
-                except TypeError:
-                    params = ""
-
-                # 防止部分平台不规范接口搞出大新闻
-                if response.code is None:
-                    response.response["code"] = "00"
-                # message不符合规范，不为string的处理
-                if type(response.message) not in [str]:
-                    response.response["message"] = str(response.message)
-                response_code = response.code
-            else:
-                response_data = ""
-                response_code = -1
-                response_result = False
-            response_message = response.message if response is not None else error_message
-            response_errors = response.errors if response is not None else ""
-
-            # 增加流水的记录
-            _info = {
-                "request_datetime": timestamp_to_datetime(start_time),
-                "url": self.url,
-                "module": self.module,
-                "method": self.method,
-                "method_override": self.method_override,
-                "query_params": params,
-                "response_result": response_result,
-                "response_code": response_code,
-                "response_data": response_data,
-                "response_message": response_message[:1023],
-                "response_errors": response_errors,
-                "cost_time": (end_time - start_time),
-                "request_id": self.request_id,
-                "request_user": bk_username,
-            }
+            # 请求完成后的清洗处理
+            if self.after_request is not None:
+                response_result = self.after_request(response_result)
 
-            _log = _("[BKAPI] {info}").format(
-                info=" && ".join([" {}=>{} ".format(_k, _v) for _k, _v in list(_info.items())])
-            )
-            if response_result:
-                logger.info(_log)
-            else:
-                logger.exception(_log)
+            if self.after_serializer is not None:
+                serializer = self.after_serializer(data=response_result)
+                serializer.is_valid(raise_exception=True)
+                response_result = serializer.validated_data
+
+        return DataResponse(response_result, request_id)
+
+    def _record_request(self, params, response, start_time, request_id):
+        # 最后记录时间
+        end_time = time.time()
+        # 判断是否需要记录,及其最大返回值
+        bk_username = params.get("bk_username", "")
+
+        if response is not None:
+            response_result = response.is_success()
+            response_data = json.dumps(response.data)[: self.max_response_record]
+
+            for _param in settings.SENSITIVE_PARAMS:
+                params.pop(_param, None)
+
+            try:
+                params = json.dumps(params)[: self.max_query_params_record]
+            except TypeError:
+                params = ""
+
+            # 防止部分平台不规范接口搞出大新闻
+            if response.code is None:
+                response.response["code"] = "00"
+            # message不符合规范，不为string的处理
+            if type(response.message) not in [str]:
+                response.response["message"] = str(response.message)
+            response_code = response.code
+        else:
+            response_data = ""
+            response_code = -1
+            response_result = False
+        response_message = response.message if response is not None else ""
+        response_errors = response.errors if response is not None else ""
+
+        # 增加流水的记录
+        _info = {
+            "request_datetime": timestamp_to_datetime(start_time),
+            "url": self.url,
+            "module": self.module,
+            "method": self.method,
+            "method_override": self.method_override,
+            "query_params": params,
+            "response_result": response_result,
+            "response_code": response_code,
+            "response_data": response_data,
+            "response_message": response_message[:1023],
+            "response_errors": response_errors,
+            "cost_time": (end_time - start_time),
+            "request_id": request_id,
+            "request_user": bk_username,
+        }
+
+        _log = _("[BKAPI] {info}").format(
+            info=" && ".join([" {}=>{} ".format(_k, _v) for _k, _v in list(_info.items())])
+        )
+        if response_result:
+            logger.info(_log)
+        else:
+            logger.exception(_log)
 
     def _build_cache_key(self, params):
         """
@@ -348,19 +369,22 @@ class DataAPI(object):
         """
         cache.set(cache_key, data, self.cache_time)
 
-    def _send(self, params: Dict, headers: Dict, use_admin: bool = False):
+    def _build_headers_and_cookies(
+        self, params: Dict, headers: Dict, request_id: str, use_admin: bool = False
+    ) -> Tuple[Dict, Dict]:
         """
-        发送和接受返回请求的包装
-        @param params: 请求的参数,预期是一个字典
-        @return: requests response
+        构造单次请求的 headers 及 cookies
+        @param params: 请求的参数
+        @param headers: 请求头
+        @param request_id: 请求ID
+        @param use_admin: 是否使用管理员账户请求
+        @return: headers, cookies
         """
-
         # 增加request id
-        session = requests.session()
-        session.headers.update(headers)
-        session.headers.update(
+        headers = dict(headers)
+        headers.update(
             {
-                "X-Bkapi-Request-Id": self.request_id,
+                "X-Bkapi-Request-Id": request_id,
                 "X-Bkapi-App-Code": params.get("bk_app_code"),
                 "X-Bkapi-App-Secret": params.get("bk_app_secret"),
                 "X-Bkapi-User-Name": params.get("bk_username"),
@@ -377,29 +401,52 @@ class DataAPI(object):
         except AppBaseException:
             local_request = None
 
+        cookies = {}
         if local_request and local_request.COOKIES and not use_admin:
-            session.cookies.update(local_request.COOKIES)
+            cookies.update(local_request.COOKIES)
             # 用于跨服务调用透传国际化设置
-            session.cookies.set("blueking_language", translation.get_language())
+            cookies["blueking_language"] = translation.get_language()
 
         # headers 申明重载请求方法
         if self.method_override is not None:
-            session.headers.update({"X-METHOD-OVERRIDE": self.method_override})
+            headers.update({"X-METHOD-OVERRIDE": self.method_override})
 
+        return headers, cookies
+
+    def _send(self, params: Dict, headers: Dict, request_id: str, timeout: int, use_admin: bool = False):
+        """
+        发送和接受返回请求的包装
+        @param params: 请求的参数,预期是一个字典
+        @param headers: 请求头
+        @param request_id: 请求ID
+        @param timeout: 超时时间
+        @return: requests response
+        """
         url = self.build_actual_url(params)
+        # 同一目标站点复用连接池，请求级别的 headers / cookies 不写入共享的 session
+        session = session_pool.get_session(url)
+        headers, cookies = self._build_headers_and_cookies(params, headers, request_id, use_admin=use_admin)
+
+        request_kwargs = {
+            "method": self.method,
+            "url": url,
+            "headers": headers,
+            "cookies": cookies,
+            "verify": False,
+            "timeout": timeout,
+        }
+
         # 发出请求并返回结果
         non_file_data, file_data = self._split_file_data(params)
         request_method = self.method.upper()
         if request_method == "GET":
-            result = session.request(method=self.method, url=url, params=params, verify=False, timeout=self.timeout)
+            result = session.request(params=params, **request_kwargs)
         elif request_method == "DELETE":
-            session.headers.update({"Content-Type": "application/json; charset=utf-8"})
-            result = session.request(
-                method=self.method, url=url, data=json.dumps(non_file_data), verify=False, timeout=self.timeout
-            )
+            headers.update({"Content-Type": "application/json; charset=utf-8"})
+            result = session.request(data=json.dumps(non_file_data), **request_kwargs)
         elif request_method in ["PUT", "PATCH", "POST"]:
             if not file_data:
-                session.headers.update({"Content-Type": "application/json; charset=utf-8"})
+                headers.update({"Content-Type": "application/json; charset=utf-8"})
                 params = json.dumps(non_file_data)
             else:
                 params = non_file_data
@@ -407,11 +454,9 @@ class DataAPI(object):
             # PUT 方法上传文件时，data需作为
             if request_method == "PUT" and file_data:
                 data = list(file_data.values())[0]
-                result = session.request(method=self.method, url=url, data=data, verify=False, timeout=self.timeout)
+                result = session.request(data=data, **request_kwargs)
             else:
-                result = session.request(
-                    method=self.method, url=url, data=params, files=file_data, verify=False, timeout=self.timeout
-                )
+                result = session.request(data=params, files=file_data, **request_kwargs)
         else:
             raise ApiRequestError("异常请求方式，{method}".format(method=self.method))
 
@@ -455,6 +500,140 @@ class DataAPI(object):
             return cache.get(cache_key)
 
 
+class _AsyncRawResponse(object):
+    """对齐 requests.Response 的必要属性，便于复用 DataAPI 的返回处理逻辑"""
+
+    def __init__(self, status_code: int, text: str, reason: str):
+        self.status_code = status_code
+        self.text = text
+        self.reason = reason
+
+    def json(self):
+        return json.loads(self.text)
+
+    def __str__(self):
+        return f"<AsyncRawResponse [{self.status_code}]>"
+
+
+class AsyncDataAPI(DataAPI):
+    """
+    基于 aiohttp 的协程版 DataAPI，请求前后的处理、清洗及缓存逻辑与 DataAPI 保持一致
+    >>> list_biz_hosts = AsyncDataAPI.from_data_api(CCApi.list_biz_hosts)
+    >>> await list_biz_hosts({"bk_biz_id": 2, "page": {"start": 0, "limit": 500}})
+    """
+
+    @classmethod
+    def from_data_api(cls, data_api: DataAPI) -> "AsyncDataAPI":
+        async_data_api = cls.__new__(cls)
+        async_data_api.__dict__.update(data_api.__dict__)
+        return async_data_api
+
+    async def __call__(
+        self,
+        params=None,
+        data=None,
+        raw=False,
+        timeout=None,
+        raise_exception=True,
+        use_admin=False,
+        headers=None,
+        url=None,
+    ):
+        if params is None:
+            params = {}
+        if headers is None:
+            headers = {}
+        timeout = timeout or self.default_timeout
+        request_id = get_request_id()
+
+        try:
+            response = await self._async_send_request(params, headers, request_id, timeout, use_admin=use_admin)
+            if raw:
+                return response.response
+
+            # 统一处理返回内容，根据平台既定规则，断定成功与否
+            if raise_exception and not response.is_success():
+                raise ApiResultError(
+                    self.get_error_message(response.message),
+                    code=response.code,
+                    errors=response.errors,
+                    data=response.data,
+                    permission=response.permission,
+                )
+
+            return response.data
+        except DataAPIException as error:
+            logger.exception(f"{error.error_message}, url => {self.url}, params => {params}, headers => {headers}")
+            raise ApiRequestError(error.error_message, request_id)
+
+    async def _async_send_request(self, params, headers, request_id, timeout, use_admin=False):
+        params = self._prepare_params(params, use_admin=use_admin)
+
+        # 是否有默认返回，调试阶段可用
+        if self.default_return_value is not None:
+            return DataResponse(self.default_return_value, request_id)
+
+        # 缓存，Django 缓存（db backend）不允许在事件循环中同步调用
+        cache_key = None
+        try:
+            cache_key = self._build_cache_key(params)
+            if self.cache_time:
+                result = await sync_to_async(self._get_cache)(cache_key)
+                if result is not None:
+                    return DataResponse(result, request_id)
+        except (TypeError, AttributeError):
+            pass
+
+        response = None
+        start_time = time.time()
+        try:
+            try:
+                raw_response = await self._async_send(params, headers, request_id, timeout, use_admin=use_admin)
+            except asyncio.TimeoutError:
+                raise DataAPIException(self, self.get_error_message(_("请求超时")))
+            except aiohttp.ClientError as error:
+                raise DataAPIException(self, self.get_error_message(str(error)))
+
+            response = self._parse_raw_response(raw_response, request_id)
+            if raw_response.status_code != self.HTTP_STATUS_OK:
+                raise DataAPIException(self, self.get_error_message(response.message), response=raw_response)
+
+            if self.cache_time and cache_key is not None:
+                await sync_to_async(self._set_cache)(cache_key, response.response)
+            return response
+        finally:
+            self._record_request(params, response, start_time, request_id)
+
+    async def _async_send(
+        self, params: Dict, headers: Dict, request_id: str, timeout: int, use_admin: bool = False
+    ) -> _AsyncRawResponse:
+        url = self.build_actual_url(params)
+        session = async_session_pool.get_session(url)
+        headers, cookies = self._build_headers_and_cookies(params, headers, request_id, use_admin=use_admin)
+        # aiohttp 不接受值为 None 的 header / cookie，与 requests 的合并逻辑保持一致，直接丢弃
+        headers = {key: value for key, value in headers.items() if value is not None}
+        cookies = {key: value for key, value in cookies.items() if value is not None}
+
+        non_file_data, file_data = self._split_file_data(params)
+        if file_data:
+            raise ApiRequestError(_("协程请求暂不支持文件上传"))
+
+        request_method = self.method.upper()
+        request_kwargs = {"headers": headers, "cookies": cookies, "timeout": aiohttp.ClientTimeout(total=timeout)}
+        if request_method == "GET":
+            # 与 requests 保持一致的参数编码方式，列表展开为多个同名参数
+            url = f"{url}?{parse.urlencode(non_file_data, doseq=True)}" if non_file_data else url
+        elif request_method in ["DELETE", "PUT", "PATCH", "POST"]:
+            headers.update({"Content-Type": "application/json; charset=utf-8"})
+            request_kwargs["data"] = json.dumps(non_file_data)
+        else:
+            raise ApiRequestError("异常请求方式，{method}".format(method=self.method))
+
+        async with session.request(self.method, url, **request_kwargs) as resp:
+            text = await resp.text()
+            return _AsyncRawResponse(status_code=resp.status, text=text, reason=resp.reason)
+
+
 DRF_DATAAPI_CONFIG = [
     "description",
     "default_return_value",
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-节点管理(BlueKing-BK-NODEMAN) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import asyncio
+import os
+import threading
+import typing
+import weakref
+from http.cookiejar import DefaultCookiePolicy
+from urllib import parse
+
+import aiohttp
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+"""
+DataAPI 使用的 HTTP 连接池
+1. 以 进程 + 目标站点（scheme://netloc）为维度复用 Session，保持长连接，避免每次请求都进行 TCP / TLS 握手
+2. Session 上不保存任何请求级状态（headers / cookies 均在单次请求中传入），因此可以在多线程间共享
+3. 协程版本的 aiohttp.ClientSession 与事件循环绑定，以 事件循环 + 目标站点 为维度复用
+"""
+
+
+class _NoStoreCookiePolicy(DefaultCookiePolicy):
+    """拒绝将响应中的 cookies 写入共享 Session，防止不同用户的请求之间串 cookies"""
+
+    def set_ok(self, cookie, request):
+        return False
+
+
+class SessionPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid: typing.Optional[int] = None
+        self._sessions: typing.Dict[str, requests.Session] = {}
+
+    @staticmethod
+    def get_pool_key(url: str) -> str:
+        parsed_url = parse.urlparse(url)
+        return f"{parsed_url.scheme}://{parsed_url.netloc}"
+
+    @staticmethod
+    def create_session() -> requests.Session:
+        session = requests.Session()
+        session.cookies.set_policy(_NoStoreCookiePolicy())
+        adapter = HTTPAdapter(
+            pool_connections=settings.DATAAPI_POOL_CONNECTIONS,
+            pool_maxsize=settings.DATAAPI_POOL_MAXSIZE,
+            max_retries=settings.DATAAPI_POOL_MAX_RETRIES,
+            pool_block=settings.DATAAPI_POOL_BLOCK,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def get_session(self, url: str) -> requests.Session:
+        """
+        获取目标地址对应的 Session
+        :param url: 请求地址
+        :return:
+        """
+        pool_key = self.get_pool_key(url)
+        pid = os.getpid()
+        session = self._sessions.get(pool_key)
+        if session is not None and self._pid == pid:
+            return session
+
+        with self._lock:
+            # fork 后连接不可在父子进程间共享，丢弃继承自父进程的连接池
+            if self._pid != pid:
+                self._sessions = {}
+                self._pid = pid
+            if pool_key not in self._sessions:
+                self._sessions[pool_key] = self.create_session()
+            return self._sessions[pool_key]
+
+    def clear(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+
+class AsyncSessionPool:
+    def __init__(self):
+        self._loop__sessions_map: typing.MutableMapping[
+            asyncio.AbstractEventLoop, typing.Dict[str, aiohttp.ClientSession]
+        ] = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def create_session() -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(limit=settings.DATAAPI_POOL_MAXSIZE, ssl=False)
+        return aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar())
+
+    def get_session(self, url: str) -> aiohttp.ClientSession:
+        """
+        获取当前事件循环下目标地址对应的 ClientSession，需要在协程中调用
+        :param url: 请求地址
+        :return:
+        """
+        pool_key = SessionPool.get_pool_key(url)
+        sessions = self._loop__sessions_map.setdefault(asyncio.get_event_loop(), {})
+        session = sessions.get(pool_key)
+        if session is None or session.closed:
+            session = sessions[pool_key] = self.create_session()
+        return session
+
+    async def close(self):
+        """关闭当前事件循环下的所有 ClientSession，应在事件循环关闭前调用"""
+        sessions = self._loop__sessions_map.pop(asyncio.get_event_loop(), {})
+        for session in sessions.values():
+            await session.close()
+
+
+session_pool = SessionPool()
+async_session_pool = AsyncSessionPool()
@@ -345,6 +345,41 @@ SHOW_EXCEPTION_DETAIL = False
 # 并发数
 CONCURRENT_NUMBER = int(os.getenv("CONCURRENT_NUMBER", 50) or 50)
 
+# DataAPI 连接池：缓存的目标站点连接池数量
+DATAAPI_POOL_CONNECTIONS = get_type_env(key="BKAPP_DATAAPI_POOL_CONNECTIONS", default=10, _type=int)
+# DataAPI 连接池：单个站点保持的最大连接数，默认与并发数保持一致
+DATAAPI_POOL_MAXSIZE = get_type_env(key="BKAPP_DATAAPI_POOL_MAXSIZE", default=CONCURRENT_NUMBER, _type=int)
+# DataAPI 连接池：连接层面的重试次数
+DATAAPI_POOL_MAX_RETRIES = get_type_env(key="BKAPP_DATAAPI_POOL_MAX_RETRIES", default=0, _type=int)
+# DataAPI 连接池：连接数达到上限时是否阻塞等待
+DATAAPI_POOL_BLOCK = get_type_env(key="BKAPP_DATAAPI_POOL_BLOCK", default=False, _type=bool)
+
+# 全局配置（GlobalSettings）进程内缓存的条目数及过期时间（秒）
+GLOBAL_SETTINGS_LOCAL_CACHE_SIZE = get_type_env(key="BKAPP_GLOBAL_SETTINGS_LOCAL_CACHE_SIZE", default=1024, _type=int)
+GLOBAL_SETTINGS_LOCAL_CACHE_TTL = get_type_env(key="BKAPP_GLOBAL_SETTINGS_LOCAL_CACHE_TTL", default=5, _type=int)
+# 全局配置（GlobalSettings）Redis 缓存过期时间（秒）
+GLOBAL_SETTINGS_REDIS_CACHE_TTL = get_type_env(key="BKAPP_GLOBAL_SETTINGS_REDIS_CACHE_TTL", default=300, _type=int)
+
+# 作业平台执行状态集中轮询：是否启用，关闭时各原子自行查询作业状态
+JOB_STATUS_POLLER_ENABLE = get_type_env(key="BKAPP_JOB_STATUS_POLLER_ENABLE", default=False, _type=bool)
+# 作业平台执行状态集中轮询：每轮最多查询的作业数
+JOB_STATUS_POLLER_MAX_QUERIES_PER_ROUND = get_type_env(
+    key="BKAPP_JOB_STATUS_POLLER_MAX_QUERIES_PER_ROUND", default=500, _type=int
+)
+# 作业平台执行状态集中轮询：已结束作业状态的缓存时间（秒）
+JOB_STATUS_POLLER_STATUS_TTL = get_type_env(key="BKAPP_JOB_STATUS_POLLER_STATUS_TTL", default=30 * 60, _type=int)
+
+# 自适应轮询：是否启用，关闭时作业平台及 GSE 轮询原子使用固定轮询间隔
+BACKEND_ADAPTIVE_POLLING_ENABLE = get_type_env(key="BKAPP_BACKEND_ADAPTIVE_POLLING_ENABLE", default=False, _type=bool)
+# 自适应轮询：最小 / 最大轮询间隔（秒）
+BACKEND_POLLING_MIN_INTERVAL = get_type_env(key="BKAPP_BACKEND_POLLING_MIN_INTERVAL", default=1, _type=int)
+BACKEND_POLLING_MAX_INTERVAL = get_type_env(key="BKAPP_BACKEND_POLLING_MAX_INTERVAL", default=30, _type=int)
+# 自适应轮询：全局每秒调度轮询次数预算，超出时按比例拉长轮询间隔，小于等于 0 表示不限制
+BACKEND_POLLING_BUDGET_PER_SECOND = get_type_env(key="BKAPP_BACKEND_POLLING_BUDGET_PER_SECOND", default=200, _type=int)
+
+# 主机模糊搜索 n-gram 索引：是否启用，需先执行 rebuild_host_search_index 完成全量构建，未构建时回退为 like 查询
+HOST_SEARCH_INDEX_ENABLE = get_type_env(key="BKAPP_HOST_SEARCH_INDEX_ENABLE", default=False, _type=bool)
+
 # 敏感参数
 SENSITIVE_PARAMS = ["app_code", "app_secret", "bk_app_code", "bk_app_secret", "auth_info"]
 
@@ -516,6 +551,9 @@ BK_SCRIPTS_PATH = os.path.join(PROJECT_ROOT, "script_tools")
 
 PIPELINE_DATA_BACKEND = "pipeline.engine.core.data.mysql_backend.MySQLDataBackend"
 PIPELINE_END_HANDLER = "apps.backend.agent.signals.pipeline_end_handler"
+# pipeline 运行时数据（IOField）的压缩编码及压缩等级，可选 zlib / lz4 / zstd
+PIPELINE_IO_FIELD_CODEC = get_type_env(key="BKAPP_PIPELINE_IO_FIELD_CODEC", default="zlib", _type=str)
+PIPELINE_IO_FIELD_COMPRESS_LEVEL = get_type_env(key="BKAPP_PIPELINE_IO_FIELD_COMPRESS_LEVEL", default=None, _type=int)
 ENGINE_ZOMBIE_PROCESS_DOCTORS = [
     {
         "class": "pipeline.engine.health.zombie.doctors.RunningNodeZombieDoctor",
@@ -11,6 +11,8 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+import pickle
+
 from django.conf import settings
 
 # pipeline template context module, to use this, you need
@@ -42,6 +44,19 @@ PIPELINE_WORKER_STATUS_CACHE_EXPIRES = getattr(settings, "PIPELINE_WORKER_STATUS
 PIPELINE_RERUN_MAX_TIMES = getattr(settings, "PIPELINE_RERUN_MAX_TIMES", 0)
 PIPELINE_RERUN_INDEX_OFFSET = getattr(settings, "PIPELINE_RERUN_INDEX_OFFSET", -1)
 
+# run_loop 内引擎冻结开关及 root pipeline 状态的缓存时间（秒），为 0 时每个节点推进前均查询数据库
+PIPELINE_ENGINE_STATE_CACHE_TTL = getattr(settings, "PIPELINE_ENGINE_STATE_CACHE_TTL", 1)
+# run_loop 内节点关系批量写入的数量上限
+PIPELINE_NODE_RELATIONSHIP_BATCH_SIZE = getattr(settings, "PIPELINE_NODE_RELATIONSHIP_BATCH_SIZE", 100)
+
+# IOField 序列化配置
+#   1) PIPELINE_IO_FIELD_CODEC 压缩编码，可选 zlib / lz4 / zstd，lz4 及 zstd 需要安装对应依赖，未安装时降级为 zlib
+#   2) PIPELINE_IO_FIELD_COMPRESS_LEVEL 压缩等级，为 None 时使用编码默认等级（zlib 使用字段声明的等级）
+#   3) PIPELINE_IO_FIELD_PICKLE_PROTOCOL pickle 协议版本，读取时自动识别，修改后新旧数据可以共存
+PIPELINE_IO_FIELD_CODEC = getattr(settings, "PIPELINE_IO_FIELD_CODEC", "zlib")
+PIPELINE_IO_FIELD_COMPRESS_LEVEL = getattr(settings, "PIPELINE_IO_FIELD_COMPRESS_LEVEL", None)
+PIPELINE_IO_FIELD_PICKLE_PROTOCOL = getattr(settings, "PIPELINE_IO_FIELD_PICKLE_PROTOCOL", pickle.HIGHEST_PROTOCOL)
+
 COMPONENT_AUTO_DISCOVER_PATH = [
     "components.collections",
 ]
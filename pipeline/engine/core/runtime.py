@@ -19,11 +19,13 @@ from pipeline.conf import settings as pipeline_settings
 from pipeline.core.flow.activity import SubProcess
 from pipeline.engine import states
 from pipeline.engine.core.handlers import HandlersFactory
+from pipeline.engine.core.state_cache import FROZEN_KEY, EngineStateCache
 from pipeline.engine.models import NAME_MAX_LENGTH, FunctionSwitch, NodeRelationship, Status
 
 logger = logging.getLogger("celery")
 
 RERUN_MAX_LIMIT = pipeline_settings.PIPELINE_RERUN_MAX_TIMES
+RELATIONSHIP_BATCH_SIZE = pipeline_settings.PIPELINE_NODE_RELATIONSHIP_BATCH_SIZE
 
 
 @contextlib.contextmanager
@@ -41,89 +43,115 @@ def run_loop(process):
     :param process: 当前进程
     :return:
     """
-    with runtime_exception_handler(process):
-        while True:
-            current_node = process.top_pipeline.node(process.current_node_id)
-
-            # check child process destination
-            if process.destination_id == current_node.id:
-                try:
-                    process.destroy_and_wake_up_parent(current_node.id)
-                except Exception:
-                    logger.error(traceback.format_exc())
-                logger.info("child process(%s) finish." % process.id)
-                return
-
-            # check root pipeline status
-            need_sleep, pipeline_state = process.root_sleep_check()
-            if need_sleep:
-                logger.info("pipeline(%s) turn to sleep." % process.root_pipeline.id)
-                process.sleep(do_not_save=(pipeline_state == states.REVOKED))
-                return
-
-            # check subprocess status
-            need_sleep, subproc_above = process.subproc_sleep_check()
-            if need_sleep:
-                logger.info("process(%s) turn to sleep." % process.root_pipeline.id)
-                process.sleep(adjust_status=True, adjust_scope=subproc_above)
-                return
-
-            # check engine status
-            if FunctionSwitch.objects.is_frozen():
-                logger.info("pipeline(%s) have been frozen." % process.id)
-                process.freeze()
-                return
-
-                # try to transit current node to running state
-            name = (current_node.name or str(current_node.__class__))[:NAME_MAX_LENGTH]
-            action = Status.objects.transit(id=current_node.id, to_state=states.RUNNING, start=True, name=name)
-
-            # check rerun limit
-            if (
-                not isinstance(current_node, SubProcess) and
-                RERUN_MAX_LIMIT != 0 and
-                action.extra.loop > RERUN_MAX_LIMIT
-            ):
-                logger.info(
-                    "node({nid}) rerun times exceed max limit: {limit}".format(
-                        nid=current_node.id, limit=RERUN_MAX_LIMIT
-                    )
-                )
+    state_cache = EngineStateCache()
+    relationships = []
 
-                # fail
-                action = Status.objects.fail(
-                    current_node, "rerun times exceed max limit: {limit}".format(limit=RERUN_MAX_LIMIT)
+    try:
+        with runtime_exception_handler(process):
+            _run_loop(process, state_cache, relationships)
+    finally:
+        # 节点关系仅用于状态树查询，写入失败不影响流程推进
+        try:
+            if relationships:
+                NodeRelationship.objects.batch_build_relationship(relationships)
+        except Exception:
+            logger.error(traceback.format_exc())
+
+
+def _run_loop(process, state_cache, relationships):
+    """
+    :param process: 当前进程
+    :param state_cache: 本次推进的引擎状态缓存
+    :param relationships: 待写入的节点关系，在推进结束后批量写入
+    :return:
+    """
+    while True:
+        current_node = process.top_pipeline.node(process.current_node_id)
+
+        # check child process destination
+        if process.destination_id == current_node.id:
+            try:
+                process.destroy_and_wake_up_parent(current_node.id)
+            except Exception:
+                logger.error(traceback.format_exc())
+            logger.info("child process(%s) finish." % process.id)
+            return
+
+        # check root pipeline status
+        need_sleep, pipeline_state = process.root_sleep_check(state_cache=state_cache)
+        if need_sleep:
+            logger.info("pipeline(%s) turn to sleep." % process.root_pipeline.id)
+            process.sleep(do_not_save=(pipeline_state == states.REVOKED))
+            return
+
+        # check subprocess status
+        need_sleep, subproc_above = process.subproc_sleep_check()
+        if need_sleep:
+            logger.info("process(%s) turn to sleep." % process.root_pipeline.id)
+            process.sleep(adjust_status=True, adjust_scope=subproc_above)
+            return
+
+        # check engine status
+        if state_cache.get(FROZEN_KEY, FunctionSwitch.objects.is_frozen):
+            logger.info("pipeline(%s) have been frozen." % process.id)
+            process.freeze()
+            return
+
+            # try to transit current node to running state
+        name = (current_node.name or str(current_node.__class__))[:NAME_MAX_LENGTH]
+        action = Status.objects.transit(id=current_node.id, to_state=states.RUNNING, start=True, name=name)
+
+        # check rerun limit
+        if (
+            not isinstance(current_node, SubProcess) and
+            RERUN_MAX_LIMIT != 0 and
+            action.extra.loop > RERUN_MAX_LIMIT
+        ):
+            logger.info(
+                "node({nid}) rerun times exceed max limit: {limit}".format(
+                    nid=current_node.id, limit=RERUN_MAX_LIMIT
                 )
+            )
 
-                if not action.result:
-                    logger.warning(
-                        "can not transit node({}) to running, pipeline({}) turn to sleep. "
-                        "message: {}".format(current_node.id, process.root_pipeline.id, action.message)
-                    )
-
-                process.sleep(adjust_status=True)
-                return
+            # fail
+            action = Status.objects.fail(
+                current_node, "rerun times exceed max limit: {limit}".format(limit=RERUN_MAX_LIMIT)
+            )
 
             if not action.result:
                 logger.warning(
-                    "can not transit node({}) to running, pipeline({}) turn to sleep. message: {}".format(
-                        current_node.id, process.root_pipeline.id, action.message
-                    )
+                    "can not transit node({}) to running, pipeline({}) turn to sleep. "
+                    "message: {}".format(current_node.id, process.root_pipeline.id, action.message)
                 )
-                process.sleep(adjust_status=True)
-                return
 
-            # refresh current node
-            process.refresh_current_node(current_node.id)
+            process.sleep(adjust_status=True)
+            return
+
+        if not action.result:
+            logger.warning(
+                "can not transit node({}) to running, pipeline({}) turn to sleep. message: {}".format(
+                    current_node.id, process.root_pipeline.id, action.message
+                )
+            )
+            process.sleep(adjust_status=True)
+            return
 
-            # build relationship
-            NodeRelationship.objects.build_relationship(process.top_pipeline.id, current_node.id)
-            result = HandlersFactory.handlers_for(current_node)(process, current_node, action.extra)
+        # refresh current node
+        process.refresh_current_node(current_node.id)
 
-            if result.should_return or result.should_sleep:
-                if result.should_sleep:
-                    process.sleep(adjust_status=True)
-                return
+        # build relationship
+        relationships.append((process.top_pipeline.id, current_node.id))
+        if isinstance(current_node, SubProcess) or len(relationships) >= RELATIONSHIP_BATCH_SIZE:
+            # 子流程节点的关系会在推进子流程内节点（可能在其他进程中）时作为祖先关系查询，需要立即写入
+            NodeRelationship.objects.batch_build_relationship(list(relationships))
+            del relationships[:]
+
+        result = HandlersFactory.handlers_for(current_node)(process, current_node, action.extra)
+
+        if result.should_return or result.should_sleep:
+            if result.should_sleep:
+                process.sleep(adjust_status=True)
+            return
 
-            # store current node id
-            process.current_node_id = result.next_node.id
+        # store current node id
+        process.current_node_id = result.next_node.id
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2019 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import time
+import weakref
+
+from pipeline.conf import settings
+
+FROZEN_KEY = "engine_frozen"
+
+
+def pipeline_state_key(pipeline_id):
+    return "pipeline_state_{}".format(pipeline_id)
+
+
+class EngineStateCache(object):
+    """
+    单次进程推进（run_loop）内的引擎状态缓存，用于减少每个节点推进前的状态检查查询
+    1. 缓存引擎冻结开关及 root pipeline 状态，过期时间为 PIPELINE_ENGINE_STATE_CACHE_TTL 秒，为 0 时不缓存
+    2. 本进程内的状态变更通过 invalidate_all 使所有存活的缓存失效，其他进程的变更在缓存过期后生效
+    """
+
+    _instances = weakref.WeakSet()
+
+    def __init__(self, ttl=None):
+        self.ttl = settings.PIPELINE_ENGINE_STATE_CACHE_TTL if ttl is None else ttl
+        self._values = {}
+        self._instances.add(self)
+
+    def get(self, key, loader):
+        value, expire_at = self._values.get(key, (None, 0))
+        now = time.time()
+        if now < expire_at:
+            return value
+        value = loader()
+        if self.ttl > 0:
+            self._values[key] = (value, now + self.ttl)
+        return value
+
+    def invalidate(self, key=None):
+        if key is None:
+            self._values.clear()
+        else:
+            self._values.pop(key, None)
+
+    @classmethod
+    def invalidate_all(cls, key=None):
+        for instance in list(cls._instances):
+            instance.invalidate(key)
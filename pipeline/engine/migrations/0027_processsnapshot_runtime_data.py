@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+from django.db import migrations, models
+
+import pipeline.engine.models.fields
+
+
+class Migration(migrations.Migration):
+    """
+    旧格式快照无需数据迁移：读取时会将子进程 ID 列表及子流程栈从 data 迁移到 runtime_data，并在下次保存时整体写入
+    """
+
+    dependencies = [
+        ("engine", "0026_auto_20200610_1442"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="processsnapshot",
+            name="runtime_data",
+            field=pipeline.engine.models.fields.IOField(default=dict, verbose_name="进程运行时数据"),
+        ),
+        migrations.AddField(
+            model_name="processsnapshot",
+            name="data_digest",
+            field=models.CharField(default="", max_length=40, verbose_name="pipeline 运行时数据摘要"),
+        ),
+    ]
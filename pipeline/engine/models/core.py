@@ -12,8 +12,10 @@ specific language governing permissions and limitations under the License.
 """
 
 import contextlib
+import hashlib
 import logging
 import traceback
+from collections import defaultdict
 
 from celery.task.control import revoke
 from django.db import models, transaction
@@ -27,7 +29,9 @@ from pipeline.core.pipeline import Pipeline
 from pipeline.django_signal_valve import valve
 from pipeline.engine import exceptions, signals, states, utils
 from pipeline.engine.core import data as data_service
-from pipeline.engine.models.fields import IOField
+from pipeline.engine.core.state_cache import pipeline_state_key
+from pipeline.engine.models import io_codecs
+from pipeline.engine.models.fields import IOField, PickledValue
 from pipeline.engine.utils import ActionResult, Stack, calculate_elapsed_time
 from pipeline.log.models import LogEntry
 from pipeline.utils.uniqid import node_uniqid, uniqid
@@ -42,26 +46,74 @@ class ProcessSnapshotManager(models.Manager):
     def create_snapshot(self, pipeline_stack, children, root_pipeline, subprocess_stack):
         data = {
             "_pipeline_stack": pipeline_stack,
+            "_root_pipeline": root_pipeline,
+        }
+        runtime_data = {
             "_subprocess_stack": subprocess_stack,
             "_children": children,
-            "_root_pipeline": root_pipeline,
         }
-        return self.create(data=data)
+        return self.create(data=data, runtime_data=runtime_data)
 
 
 class ProcessSnapshot(models.Model):
+    """
+    进程快照，拆分为两部分存储
+        1. data：pipeline 树（运行时栈及根 pipeline），体积大，仅在内容发生变化时写入
+        2. runtime_data：子进程 ID 列表及子流程栈，体积小，每次保存均写入
+    """
+
+    RUNTIME_DATA_KEYS = ("_subprocess_stack", "_children")
+
     id = models.BigAutoField(_("ID"), primary_key=True)
     data = IOField(verbose_name=_("pipeline 运行时数据"))
+    runtime_data = IOField(verbose_name=_("进程运行时数据"), default=dict)
+    data_digest = models.CharField(_("pipeline 运行时数据摘要"), max_length=40, default="")
 
     objects = ProcessSnapshotManager()
 
+    def __init__(self, *args, **kwargs):
+        super(ProcessSnapshot, self).__init__(*args, **kwargs)
+        self.migrate_legacy_data()
+
+    def migrate_legacy_data(self):
+        """
+        兼容旧格式快照：子进程 ID 列表及子流程栈从 data 中迁移到 runtime_data，下次保存时整体写入
+        :return:
+        """
+        data = self.__dict__.get("data")
+        if not isinstance(data, dict) or not any(key in data for key in self.RUNTIME_DATA_KEYS):
+            return
+        self.runtime_data = {key: data.pop(key, None) for key in self.RUNTIME_DATA_KEYS}
+        self.data_digest = ""
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "data" not in update_fields:
+            return super(ProcessSnapshot, self).save(*args, **kwargs)
+
+        payload = io_codecs.dumps(self.data)
+        data_digest = hashlib.sha1(payload).hexdigest()
+        if update_fields is not None:
+            kwargs["update_fields"] = set(update_fields) | {"data_digest"}
+        elif not (self._state.adding or kwargs.get("force_insert")) and data_digest == self.data_digest:
+            # pipeline 树未发生变化，仅写入进程运行时数据
+            kwargs["update_fields"] = ["runtime_data"]
+            return super(ProcessSnapshot, self).save(*args, **kwargs)
+
+        # 复用计算摘要时的序列化结果，避免重复 pickle
+        data, self.data, self.data_digest = self.data, PickledValue(payload), data_digest
+        try:
+            return super(ProcessSnapshot, self).save(*args, **kwargs)
+        finally:
+            self.data = data
+
     @property
     def pipeline_stack(self):
         return self.data["_pipeline_stack"]
 
     @property
     def children(self):
-        return self.data["_children"]
+        return self.runtime_data["_children"]
 
     @property
     def root_pipeline(self):
@@ -69,10 +121,10 @@ class ProcessSnapshot(models.Model):
 
     @property
     def subprocess_stack(self):
-        return self.data["_subprocess_stack"]
+        return self.runtime_data["_subprocess_stack"]
 
     def clean_children(self):
-        self.data["_children"] = []
+        self.runtime_data["_children"] = []
 
     def prune_top_pipeline(self, keep_from, keep_to):
         self.data["_pipeline_stack"].top().prune(keep_from, keep_to)
@@ -277,12 +329,19 @@ class PipelineProcess(models.Model):
             self.children.append(child.id)
         self.save()
 
-    def root_sleep_check(self):
+    def root_sleep_check(self, state_cache=None):
         """
         检测 root pipeline 的状态判断当前进程是否需要休眠
+        :param state_cache: 引擎状态缓存，为空时直接查询
         :return:
         """
-        root_state = Status.objects.state_for(self.root_pipeline.id)
+        root_pipeline_id = self.root_pipeline.id
+        if state_cache is None:
+            root_state = Status.objects.state_for(root_pipeline_id)
+        else:
+            root_state = state_cache.get(
+                pipeline_state_key(root_pipeline_id), lambda: Status.objects.state_for(root_pipeline_id)
+            )
         if root_state in states.SLEEP_STATES:
             return True, root_state
         if root_state == states.BLOCKED:
@@ -599,16 +658,47 @@ class PipelineModel(models.Model):
 
 class RelationshipManager(models.Manager):
     def build_relationship(self, ancestor_id, descendant_id):
-        if self.filter(ancestor_id=ancestor_id, descendant_id=descendant_id).exists():
-            # already build
+        self.batch_build_relationship([(ancestor_id, descendant_id)])
+
+    def batch_build_relationship(self, pairs):
+        """
+        批量建立节点关系，固定三次查询，与节点数量无关
+        :param pairs: [(ancestor_id, descendant_id)]，ancestor_id 为节点所在的 pipeline
+        :return:
+        """
+        # 同一节点仅以首次出现的关系为准
+        ancestor_id_map = {}
+        for ancestor_id, descendant_id in pairs:
+            ancestor_id_map.setdefault(descendant_id, ancestor_id)
+        if not ancestor_id_map:
             return
-        ancestors = self.filter(descendant_id=ancestor_id)
-        relationships = [NodeRelationship(ancestor_id=descendant_id, descendant_id=descendant_id, distance=0)]
-        for ancestor in ancestors:
-            rel = NodeRelationship(
-                ancestor_id=ancestor.ancestor_id, descendant_id=descendant_id, distance=ancestor.distance + 1
-            )
-            relationships.append(rel)
+
+        built_pairs = set(
+            self.filter(
+                descendant_id__in=list(ancestor_id_map.keys()), ancestor_id__in=set(ancestor_id_map.values())
+            ).values_list("ancestor_id", "descendant_id")
+        )
+        to_be_built = {
+            descendant_id: ancestor_id
+            for descendant_id, ancestor_id in ancestor_id_map.items()
+            if (ancestor_id, descendant_id) not in built_pairs
+        }
+        if not to_be_built:
+            return
+
+        ancestors_map = defaultdict(list)
+        for ancestor in self.filter(descendant_id__in=set(to_be_built.values())):
+            ancestors_map[ancestor.descendant_id].append(ancestor)
+
+        relationships = []
+        for descendant_id, ancestor_id in to_be_built.items():
+            relationships.append(NodeRelationship(ancestor_id=descendant_id, descendant_id=descendant_id, distance=0))
+            for ancestor in ancestors_map[ancestor_id]:
+                relationships.append(
+                    NodeRelationship(
+                        ancestor_id=ancestor.ancestor_id, descendant_id=descendant_id, distance=ancestor.distance + 1
+                    )
+                )
         self.bulk_create(relationships)
 
 
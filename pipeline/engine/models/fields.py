@@ -13,29 +13,42 @@ specific language governing permissions and limitations under the License.
 
 import pickle
 import traceback
-import zlib
 
 from django.db import models
 
+from pipeline.engine.models import io_codecs
 from pipeline.utils.utils import convert_bytes_to_str
 
 
+class PickledValue(object):
+    """
+    已完成 pickle 序列化的字段值，IOField 入库时直接压缩，避免重复序列化
+    """
+
+    __slots__ = ("payload",)
+
+    def __init__(self, payload):
+        self.payload = payload
+
+
 class IOField(models.BinaryField):
     def __init__(self, compress_level=6, *args, **kwargs):
         super(IOField, self).__init__(*args, **kwargs)
         self.compress_level = compress_level
 
     def get_prep_value(self, value):
+        if isinstance(value, PickledValue):
+            return io_codecs.encode(value.payload, self.compress_level)
         value = super(IOField, self).get_prep_value(value)
-        return zlib.compress(pickle.dumps(value), self.compress_level)
+        return io_codecs.encode(io_codecs.dumps(value), self.compress_level)
 
     def to_python(self, value):
         try:
             value = super(IOField, self).to_python(value)
-            return pickle.loads(zlib.decompress(value))
+            return pickle.loads(io_codecs.decode(value))
         except UnicodeDecodeError:
             # py2 pickle data process
-            return convert_bytes_to_str(pickle.loads(zlib.decompress(value), encoding="bytes"))
+            return convert_bytes_to_str(pickle.loads(io_codecs.decode(value), encoding="bytes"))
         except Exception:
             return "IOField to_python raise error: {}".format(traceback.format_exc())
 
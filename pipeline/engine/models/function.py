@@ -18,6 +18,7 @@ from django.db import models
 from django.utils.translation import ugettext_lazy as _
 
 from pipeline.engine.conf import function_switch
+from pipeline.engine.core.state_cache import FROZEN_KEY, EngineStateCache
 
 logger = logging.getLogger("celery")
 
@@ -45,9 +46,11 @@ class FunctionSwitchManager(models.Manager):
 
     def freeze_engine(self):
         self.filter(name=function_switch.FREEZE_ENGINE).update(is_active=True)
+        EngineStateCache.invalidate_all(FROZEN_KEY)
 
     def unfreeze_engine(self):
         self.filter(name=function_switch.FREEZE_ENGINE).update(is_active=False)
+        EngineStateCache.invalidate_all(FROZEN_KEY)
 
 
 class FunctionSwitch(models.Model):
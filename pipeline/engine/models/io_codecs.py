@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2019 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import logging
+import pickle
+import zlib
+
+from pipeline.conf import settings
+
+logger = logging.getLogger("celery")
+
+"""
+IOField 压缩编解码
+1. zlib 编码结果不带额外头部（zlib 数据流首字节固定为 0x78），与历史数据及旧版本 worker 保持兼容
+2. 其他编码在压缩结果前追加一个字节的头部标识编码类型，读取时按头部选择解码器，新旧格式可以共存
+"""
+
+
+class BaseCodec(object):
+    name = None
+    header = b""
+    default_level = None
+
+    def compress(self, payload, level=None):
+        raise NotImplementedError()
+
+    def decompress(self, data):
+        raise NotImplementedError()
+
+    def encode(self, payload, level=None):
+        return self.header + self.compress(payload, self.default_level if level is None else level)
+
+    def decode(self, data):
+        return self.decompress(data[len(self.header) :])
+
+
+class ZlibCodec(BaseCodec):
+    name = "zlib"
+    default_level = 6
+
+    def compress(self, payload, level=None):
+        return zlib.compress(payload, level)
+
+    def decompress(self, data):
+        return zlib.decompress(data)
+
+
+class Lz4Codec(BaseCodec):
+    name = "lz4"
+    header = b"\x01"
+    default_level = 0
+
+    def __init__(self):
+        import lz4.frame
+
+        self.lz4_frame = lz4.frame
+
+    def compress(self, payload, level=None):
+        return self.lz4_frame.compress(payload, compression_level=level)
+
+    def decompress(self, data):
+        return self.lz4_frame.decompress(data)
+
+
+class ZstdCodec(BaseCodec):
+    name = "zstd"
+    header = b"\x02"
+    default_level = 3
+
+    def __init__(self):
+        import zstandard
+
+        self.zstandard = zstandard
+
+    def compress(self, payload, level=None):
+        return self.zstandard.ZstdCompressor(level=level).compress(payload)
+
+    def decompress(self, data):
+        return self.zstandard.ZstdDecompressor().decompress(data)
+
+
+CODEC_CLASSES = [ZlibCodec, Lz4Codec, ZstdCodec]
+
+_CODECS = {}
+
+
+def get_codec(name):
+    """
+    获取编码器，可选依赖未安装时返回 None
+    :param name: 编码名称
+    :return:
+    """
+    if name not in _CODECS:
+        codec_cls = next((codec_cls for codec_cls in CODEC_CLASSES if codec_cls.name == name), None)
+        try:
+            _CODECS[name] = codec_cls() if codec_cls else None
+        except ImportError:
+            logger.warning("[IOField] codec(%s) is not installed", name)
+            _CODECS[name] = None
+    return _CODECS[name]
+
+
+def get_codec_by_header(data):
+    for codec_cls in CODEC_CLASSES:
+        if codec_cls.header and data[: len(codec_cls.header)] == codec_cls.header:
+            codec = get_codec(codec_cls.name)
+            if codec is None:
+                raise ValueError("codec({}) is required to decode IOField data".format(codec_cls.name))
+            return codec
+    # 无头部标识的为 zlib 编码（包括历史数据）
+    return get_codec(ZlibCodec.name)
+
+
+def get_default_codec():
+    """
+    获取配置的编码器，未安装对应依赖时降级为 zlib
+    :return:
+    """
+    return get_codec(settings.PIPELINE_IO_FIELD_CODEC) or get_codec(ZlibCodec.name)
+
+
+def dumps(value):
+    return pickle.dumps(value, protocol=settings.PIPELINE_IO_FIELD_PICKLE_PROTOCOL)
+
+
+def encode(payload, level=None):
+    """
+    压缩已序列化的数据
+    :param payload: pickle 序列化结果
+    :param level: 压缩等级，优先使用配置的压缩等级
+    :return:
+    """
+    codec = get_default_codec()
+    if settings.PIPELINE_IO_FIELD_COMPRESS_LEVEL is not None:
+        level = settings.PIPELINE_IO_FIELD_COMPRESS_LEVEL
+    elif codec.name != ZlibCodec.name:
+        # 字段上声明的压缩等级为 zlib 等级，其他编码使用各自的默认等级
+        level = None
+    return codec.encode(payload, level)
+
+
+def decode(data):
+    return get_codec_by_header(data).decode(data)
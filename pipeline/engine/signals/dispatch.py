@@ -13,6 +13,7 @@ specific language governing permissions and limitations under the License.
 
 import traceback
 
+from django.db.models.signals import post_save
 from django.utils.module_loading import import_string
 
 from pipeline.conf import settings
@@ -95,6 +96,10 @@ def dispatch_service_activity_timeout_monitor_end():
     )
 
 
+def dispatch_status_post_save():
+    post_save.connect(handlers.status_post_save_handler, sender=models.Status, dispatch_uid="_status_post_save")
+
+
 def dispatch():
     dispatch_pipeline_ready()
     dispatch_pipeline_end()
@@ -106,3 +111,4 @@ def dispatch():
     dispatch_process_unfreeze()
     dispatch_service_activity_timeout_monitor_start()
     dispatch_service_activity_timeout_monitor_end()
+    dispatch_status_post_save()
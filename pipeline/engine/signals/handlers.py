@@ -13,6 +13,7 @@ specific language governing permissions and limitations under the License.
 
 from pipeline.celery.settings import QueueResolver
 from pipeline.engine import tasks
+from pipeline.engine.core.state_cache import EngineStateCache, pipeline_state_key
 from pipeline.engine.models import NodeCeleryTask, PipelineModel, PipelineProcess, ProcessCeleryTask, ScheduleCeleryTask
 
 
@@ -132,3 +133,7 @@ def service_activity_timeout_monitor_start_handler(sender, node_id, version, roo
 
 def service_activity_timeout_monitor_end_handler(sender, node_id, version, **kwargs):
     NodeCeleryTask.objects.revoke(node_id)
+
+
+def status_post_save_handler(sender, instance, **kwargs):
+    EngineStateCache.invalidate_all(pipeline_state_key(instance.id))
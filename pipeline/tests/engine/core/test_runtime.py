@@ -19,7 +19,7 @@ from pipeline.engine.models import FunctionSwitch, NodeRelationship, Status
 from pipeline.tests.engine.mock import *  # noqa
 from pipeline.tests.mock_settings import *  # noqa
 
-PIPELINE_BUILD_RELATIONSHIP = "pipeline.engine.models.NodeRelationship.objects.build_relationship"
+PIPELINE_BUILD_RELATIONSHIP = "pipeline.engine.models.NodeRelationship.objects.batch_build_relationship"
 PIPELINE_STATUS_TRANSIT = "pipeline.engine.models.Status.objects.transit"
 PIPELINE_ENGINE_IS_FROZEN = "pipeline.engine.models.FunctionSwitch.objects.is_frozen"
 PIPELINE_SETTING_RERUN_MAX_LIMIT = "pipeline.engine.core.runtime.RERUN_MAX_LIMIT"
@@ -75,7 +75,7 @@ class RuntimeTestCase(TestCase):
 
         process.refresh_current_node.assert_not_called()
 
-        NodeRelationship.objects.build_relationship.assert_not_called()
+        NodeRelationship.objects.batch_build_relationship.assert_not_called()
 
         self.assertEqual(process.current_node_id, destination_node.id)
 
@@ -107,7 +107,7 @@ class RuntimeTestCase(TestCase):
 
         process.refresh_current_node.assert_not_called()
 
-        NodeRelationship.objects.build_relationship.assert_not_called()
+        NodeRelationship.objects.batch_build_relationship.assert_not_called()
 
         self.assertEqual(process.current_node_id, current_node.id)
 
@@ -137,7 +137,7 @@ class RuntimeTestCase(TestCase):
 
             process.refresh_current_node.assert_not_called()
 
-            NodeRelationship.objects.build_relationship.assert_not_called()
+            NodeRelationship.objects.batch_build_relationship.assert_not_called()
 
             self.assertEqual(process.current_node_id, current_node.id)
 
@@ -168,7 +168,7 @@ class RuntimeTestCase(TestCase):
 
         process.refresh_current_node.assert_not_called()
 
-        NodeRelationship.objects.build_relationship.assert_not_called()
+        NodeRelationship.objects.batch_build_relationship.assert_not_called()
 
         self.assertEqual(process.current_node_id, current_node.id)
 
@@ -199,7 +199,7 @@ class RuntimeTestCase(TestCase):
 
             process.refresh_current_node.assert_not_called()
 
-            NodeRelationship.objects.build_relationship.assert_not_called()
+            NodeRelationship.objects.batch_build_relationship.assert_not_called()
 
             self.assertEqual(process.current_node_id, current_node.id)
 
@@ -234,7 +234,7 @@ class RuntimeTestCase(TestCase):
 
             process.refresh_current_node.assert_not_called()
 
-            NodeRelationship.objects.build_relationship.assert_not_called()
+            NodeRelationship.objects.batch_build_relationship.assert_not_called()
 
             self.assertEqual(process.current_node_id, current_node.id)
 
@@ -271,8 +271,8 @@ class RuntimeTestCase(TestCase):
 
             process.refresh_current_node.assert_called_once_with(current_node.id)
 
-            NodeRelationship.objects.build_relationship.assert_called_once_with(
-                process.top_pipeline.id, current_node.id
+            NodeRelationship.objects.batch_build_relationship.assert_called_once_with(
+                [(process.top_pipeline.id, current_node.id)]
             )
 
             hdl.assert_called_once_with(process, current_node, None)
@@ -283,7 +283,7 @@ class RuntimeTestCase(TestCase):
 
             FunctionSwitch.objects.is_frozen.reset_mock()
             Status.objects.transit.reset_mock()
-            NodeRelationship.objects.build_relationship.reset_mock()
+            NodeRelationship.objects.batch_build_relationship.reset_mock()
             hdl.reset_mock()
 
             # 6.2. test should sleep
@@ -317,8 +317,8 @@ class RuntimeTestCase(TestCase):
 
                 process.refresh_current_node.assert_called_once_with(current_node.id)
 
-                NodeRelationship.objects.build_relationship.assert_called_once_with(
-                    process.top_pipeline.id, current_node.id
+                NodeRelationship.objects.batch_build_relationship.assert_called_once_with(
+                    [(process.top_pipeline.id, current_node.id)]
                 )
 
                 hdl.assert_called_once_with(process, current_node, None)
@@ -329,7 +329,7 @@ class RuntimeTestCase(TestCase):
 
                 FunctionSwitch.objects.is_frozen.reset_mock()
                 Status.objects.transit.reset_mock()
-                NodeRelationship.objects.build_relationship.reset_mock()
+                NodeRelationship.objects.batch_build_relationship.reset_mock()
                 hdl.reset_mock()
 
             # 6.3. test execute 3 node and return
@@ -361,11 +361,12 @@ class RuntimeTestCase(TestCase):
 
             process.destroy_and_wake_up_parent.assert_not_called()
 
-            process.root_sleep_check.assert_has_calls([mock.call(), mock.call(), mock.call()])
+            process.root_sleep_check.assert_has_calls([mock.call(state_cache=mock.ANY)] * 3)
 
             process.subproc_sleep_check.assert_has_calls([mock.call(), mock.call(), mock.call()])
 
-            FunctionSwitch.objects.is_frozen.assert_has_calls([mock.call(), mock.call(), mock.call()])
+            # 引擎冻结开关在单次推进内缓存
+            FunctionSwitch.objects.is_frozen.assert_called_once()
 
             process.freeze.assert_not_called()
 
@@ -383,11 +384,12 @@ class RuntimeTestCase(TestCase):
                 [mock.call(current_node.id), mock.call(nodes[0].id), mock.call(nodes[1].id)]
             )
 
-            NodeRelationship.objects.build_relationship.assert_has_calls(
+            # 节点关系在推进结束后批量写入
+            NodeRelationship.objects.batch_build_relationship.assert_called_once_with(
                 [
-                    mock.call(process.top_pipeline.id, current_node.id),
-                    mock.call(process.top_pipeline.id, nodes[0].id),
-                    mock.call(process.top_pipeline.id, nodes[1].id),
+                    (process.top_pipeline.id, current_node.id),
+                    (process.top_pipeline.id, nodes[0].id),
+                    (process.top_pipeline.id, nodes[1].id),
                 ]
             )
 
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2019 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from django.test import TestCase
+from mock import MagicMock
+
+from pipeline.engine.core.state_cache import EngineStateCache, pipeline_state_key
+
+
+class EngineStateCacheTestCase(TestCase):
+    def test_get(self):
+        loader = MagicMock(return_value="RUNNING")
+        state_cache = EngineStateCache(ttl=60)
+
+        self.assertEqual(state_cache.get("key", loader), "RUNNING")
+        self.assertEqual(state_cache.get("key", loader), "RUNNING")
+        loader.assert_called_once()
+
+    def test_get__without_ttl(self):
+        loader = MagicMock(return_value="RUNNING")
+        state_cache = EngineStateCache(ttl=0)
+
+        state_cache.get("key", loader)
+        state_cache.get("key", loader)
+        self.assertEqual(loader.call_count, 2)
+
+    def test_invalidate_all(self):
+        loader = MagicMock(return_value="RUNNING")
+        state_cache = EngineStateCache(ttl=60)
+        key = pipeline_state_key("pipeline_id")
+
+        state_cache.get(key, loader)
+        EngineStateCache.invalidate_all(key)
+        state_cache.get(key, loader)
+        self.assertEqual(loader.call_count, 2)
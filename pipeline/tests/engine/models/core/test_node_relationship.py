@@ -63,3 +63,19 @@ class TestNodeRelationship(TestCase):
         self.assertRaises(NodeRelationship.DoesNotExist, get, "2", "6")
         self.assertRaises(NodeRelationship.DoesNotExist, get, "3", "4")
         self.assertRaises(NodeRelationship.DoesNotExist, get, "3", "5")
+
+    def test_batch_build_relationship(self):
+        NodeRelationship.objects.build_relationship("1", "1")
+        NodeRelationship.objects.build_relationship("1", "2")
+
+        with self.assertNumQueries(3):
+            NodeRelationship.objects.batch_build_relationship([("2", "3"), ("2", "4"), ("1", "5"), ("2", "3")])
+
+        # rebuild check
+        NodeRelationship.objects.batch_build_relationship([("1", "2"), ("2", "3")])
+        self.assertEqual(NodeRelationship.objects.filter(descendant_id="2").count(), 2)
+        self.assertEqual(NodeRelationship.objects.filter(descendant_id="3").count(), 3)
+
+        self.assertEqual(NodeRelationship.objects.get(ancestor_id="1", descendant_id="3").distance, 2)
+        self.assertEqual(NodeRelationship.objects.get(ancestor_id="2", descendant_id="4").distance, 1)
+        self.assertEqual(NodeRelationship.objects.get(ancestor_id="1", descendant_id="5").distance, 1)
@@ -795,7 +795,7 @@ class TestPipelineProcess(TestCase):
         def get_child(id):
             return {1: child_1, 2: child_2, 3: child_3}[id]
 
-        mock_snapshot.data["_children"] = [1, 2, 3]
+        mock_snapshot.runtime_data["_children"] = [1, 2, 3]
 
         with mock.patch(PIPELINE_PROCESS_GET, get_child):
             process.revoke_subprocess()
@@ -831,7 +831,7 @@ class TestPipelineProcess(TestCase):
         process.destroy.assert_called()
         process.destroy.reset_mock()
 
-        mock_snapshot.data["_children"] = [1, 2, 3]
+        mock_snapshot.runtime_data["_children"] = [1, 2, 3]
 
         child_1 = Object()
         child_1.children = []
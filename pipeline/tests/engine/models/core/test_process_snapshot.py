@@ -11,7 +11,9 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+from django.db import models
 from django.test import TestCase
+from mock import patch
 
 from pipeline.engine.models.core import ProcessSnapshot
 from pipeline.engine.utils import Stack
@@ -39,3 +41,40 @@ class TestProcessSnapshot(TestCase):
     def test_clean_children(self):
         self.snapshot.clean_children()
         self.assertEqual(len(self.snapshot.children), 0)
+
+    def test_save_runtime_data_only_when_data_unchanged(self):
+        snapshot = ProcessSnapshot.objects.get(id=self.snapshot.id)
+        snapshot.children.append("child3")
+        with patch.object(models.Model, "save") as model_save:
+            snapshot.save()
+        model_save.assert_called_once_with(update_fields=["runtime_data"])
+
+        snapshot.save()
+        snapshot = ProcessSnapshot.objects.get(id=self.snapshot.id)
+        self.assertEqual(snapshot.children, ["child1", "child2", "child3"])
+
+    def test_save_data_when_changed(self):
+        snapshot = ProcessSnapshot.objects.get(id=self.snapshot.id)
+        data_digest = snapshot.data_digest
+        snapshot.pipeline_stack.push("pipeline3")
+        snapshot.save()
+
+        snapshot = ProcessSnapshot.objects.get(id=self.snapshot.id)
+        self.assertNotEqual(snapshot.data_digest, data_digest)
+        self.assertEqual(snapshot.pipeline_stack, Stack(["pipeline1", "pipeline2", "pipeline3"]))
+
+    def test_migrate_legacy_data(self):
+        ProcessSnapshot.objects.filter(id=self.snapshot.id).update(
+            data={
+                "_pipeline_stack": self.pipeline_stack,
+                "_subprocess_stack": self.subprocess_stack,
+                "_children": self.children,
+                "_root_pipeline": self.root_pipeline,
+            },
+            runtime_data={},
+            data_digest="",
+        )
+        snapshot = ProcessSnapshot.objects.get(id=self.snapshot.id)
+        self.assertEqual(set(snapshot.data.keys()), {"_pipeline_stack", "_root_pipeline"})
+        self.assertEqual(snapshot.children, self.children)
+        self.assertEqual(snapshot.subprocess_stack, self.subprocess_stack)
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云PaaS平台社区版 (BlueKing PaaS Community
+Edition) available.
+Copyright (C) 2017-2019 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import pickle
+import zlib
+
+from django.test import TestCase, override_settings
+
+from pipeline.engine.models import io_codecs
+from pipeline.engine.models.fields import IOField, PickledValue
+
+
+class TestIOField(TestCase):
+    def setUp(self):
+        self.field = IOField()
+        self.value = {"inputs": {"bk_host_ids": list(range(100))}, "outputs": {"result": True}}
+
+    def test_round_trip(self):
+        self.assertEqual(self.field.to_python(self.field.get_prep_value(self.value)), self.value)
+
+    def test_read_legacy_data(self):
+        legacy_data = zlib.compress(pickle.dumps(self.value, protocol=3), 6)
+        self.assertEqual(self.field.to_python(legacy_data), self.value)
+
+    def test_zlib_without_header(self):
+        # zlib 编码不追加头部，旧版本 worker 可以直接读取
+        prep_value = self.field.get_prep_value(self.value)
+        self.assertEqual(pickle.loads(zlib.decompress(prep_value)), self.value)
+
+    def test_pickled_value(self):
+        prep_value = self.field.get_prep_value(PickledValue(io_codecs.dumps(self.value)))
+        self.assertEqual(self.field.to_python(prep_value), self.value)
+
+    @override_settings(PIPELINE_IO_FIELD_COMPRESS_LEVEL=1)
+    def test_compress_level(self):
+        prep_value = self.field.get_prep_value(self.value)
+        self.assertEqual(prep_value, zlib.compress(io_codecs.dumps(self.value), 1))
+
+    @override_settings(PIPELINE_IO_FIELD_CODEC="not_exist")
+    def test_fallback_to_zlib(self):
+        prep_value = self.field.get_prep_value(self.value)
+        self.assertEqual(pickle.loads(zlib.decompress(prep_value)), self.value)
+
+    def test_decode_by_header(self):
+        class RawCodec(io_codecs.BaseCodec):
+            name = "raw"
+            header = b"\x7f"
+
+            def compress(self, payload, level=None):
+                return payload
+
+            def decompress(self, data):
+                return data
+
+        io_codecs.CODEC_CLASSES.append(RawCodec)
+        try:
+            with override_settings(PIPELINE_IO_FIELD_CODEC=RawCodec.name):
+                prep_value = self.field.get_prep_value(self.value)
+            self.assertEqual(prep_value[:1], RawCodec.header)
+            # 新旧编码共存
+            self.assertEqual(self.field.to_python(prep_value), self.value)
+            self.assertEqual(self.field.to_python(zlib.compress(pickle.dumps(self.value))), self.value)
+        finally:
+            io_codecs.CODEC_CLASSES.remove(RawCodec)
+            io_codecs._CODECS.pop(RawCodec.name, None)
@@ -132,6 +132,10 @@ Ref: https://cert-manager.io/docs/usage/ingress/#supported-annotations
 {{- printf "%s-%s"  (include "bk-nodeman.fullname" .) "backend-sync-process" }}
 {{- end -}}
 
+{{- define "bk-nodeman.backend-sync-biz-topo.fullname" -}}
+{{- printf "%s-%s"  (include "bk-nodeman.fullname" .) "backend-sync-biz-topo" }}
+{{- end -}}
+
 {{- define "bk-nodeman.backend-sync-watch.fullname" -}}
 {{- printf "%s-%s"  (include "bk-nodeman.fullname" .) "backend-sync-watch" }}
 {{- end -}}